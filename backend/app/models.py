@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional, Dict
+from typing import List, Literal, Optional, Dict
 from datetime import datetime
 
 class StockData(BaseModel):
@@ -18,6 +18,13 @@ class StockData(BaseModel):
 class StockRequest(BaseModel):
     symbol: str = Field(..., description="Stock symbol to search for")
 
+# Upper bound on symbols accepted by the batch quote endpoint
+MAX_BATCH_SYMBOLS = 500
+
+class BatchQuoteRequest(BaseModel):
+    symbols: List[str] = Field(..., min_length=1, max_length=MAX_BATCH_SYMBOLS, description="Stock symbols to fetch")
+    fields: Optional[List[str]] = Field(None, description="Subset of quote fields to return (default: all)")
+
 class StockResponse(BaseModel):
     success: bool = Field(..., description="Request success status")
     data: Optional[StockData] = Field(None, description="Stock data")
@@ -50,6 +57,7 @@ class PortfolioStock(BaseModel):
 
 class Portfolio(BaseModel):
     id: str = Field(..., description="Portfolio ID")
+    owner_id: Optional[str] = Field(None, description="ID of the user who owns the portfolio")
     name: str = Field(..., description="Portfolio name")
     description: Optional[str] = Field(None, description="Portfolio description")
     total_value: float = Field(..., description="Total portfolio value")
@@ -73,10 +81,15 @@ class PortfolioComparison(BaseModel):
     portfolios: List[str] = Field(..., description="Portfolio IDs to compare")
     time_range: str = Field("1y", description="Time range for comparison")
     metrics: List[str] = Field(["value", "returns"], description="Metrics to compare")
+    rebase: bool = Field(False, description="Rebase every series to 100 at its first point")
+    forward_fill: bool = Field(False, description="Carry the last value across missing dates")
+    max_points: Optional[int] = Field(None, ge=4, description="Downsample chart data to at most this many dates")
+    downsample: Literal["lttb", "minmax"] = Field("lttb", description="Downsampling method for max_points")
 
 class CreatePortfolioRequest(BaseModel):
     name: str = Field(..., description="Portfolio name")
     description: Optional[str] = Field(None, description="Portfolio description")
+    owner_id: Optional[str] = Field(None, description="ID of the user who owns the portfolio")
 
 class UpdatePortfolioRequest(BaseModel):
     name: Optional[str] = Field(None, description="Portfolio name")
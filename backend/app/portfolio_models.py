@@ -0,0 +1,81 @@
+"""
+Database models for portfolios, their holdings and daily value history
+"""
+from sqlalchemy import Column, String, DateTime, Date, Float, ForeignKey, Integer, LargeBinary, Text, Index
+from sqlalchemy.orm import relationship
+from datetime import datetime
+import uuid
+from .db import Base
+
+class PortfolioDB(Base):
+    __tablename__ = "portfolios"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    owner_id = Column(String, nullable=True)
+    name = Column(String, nullable=False)
+    description = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Holdings are small and always shown with the portfolio: eager, one JOIN
+    holdings = relationship(
+        "HoldingDB", back_populates="portfolio", cascade="all, delete-orphan",
+        lazy="joined", order_by="HoldingDB.id"
+    )
+    # History can span years: never loaded implicitly, read by date range
+    history = relationship(
+        "PortfolioHistoryChunkDB", cascade="all, delete-orphan", passive_deletes=True, lazy="raise"
+    )
+
+    __table_args__ = (
+        # A user's portfolios, listed newest first
+        Index("ix_portfolios_owner_created", "owner_id", "created_at"),
+    )
+
+class HoldingDB(Base):
+    __tablename__ = "portfolio_holdings"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    portfolio_id = Column(String, ForeignKey("portfolios.id", ondelete="CASCADE"), nullable=False, index=True)
+    symbol = Column(String, nullable=False)
+    name = Column(String, nullable=False)
+    shares = Column(Integer, nullable=False)
+    avg_cost = Column(Float, nullable=False)
+    last_price = Column(Float, nullable=False)  # seeds valuation until a live quote arrives
+
+    portfolio = relationship("PortfolioDB", back_populates="holdings")
+
+class PortfolioHistoryChunkDB(Base):
+    __tablename__ = "portfolio_history_chunks"
+
+    # One compressed chunk per portfolio per calendar year (see services/history_chunks.py);
+    # the key orders a portfolio's chunks by year for range reads
+    portfolio_id = Column(String, ForeignKey("portfolios.id", ondelete="CASCADE"), primary_key=True)
+    year = Column(Integer, primary_key=True)
+    first_date = Column(Date, nullable=False)
+    last_date = Column(Date, nullable=False)
+    points = Column(Integer, nullable=False)
+    dates = Column(LargeBinary, nullable=False)  # zlib(uint16 day gaps after first_date)
+    values = Column(LargeBinary, nullable=False)  # zlib(float64 value, change, change_percent columns)
+
+class SnapshotRunDB(Base):
+    __tablename__ = "portfolio_snapshot_runs"
+
+    # One end-of-day snapshot run per market date; `cursor` is the last
+    # portfolio id written, so an interrupted run resumes after it
+    date = Column(Date, primary_key=True)
+    status = Column(String, nullable=False, default="running")  # 'running', 'complete'
+    cursor = Column(String, nullable=False, default="")
+    portfolios = Column(Integer, nullable=False, default=0)
+    started_at = Column(DateTime, default=datetime.utcnow)
+    finished_at = Column(DateTime, nullable=True)
+    portfolios_per_second = Column(Float, nullable=True)
+
+class SnapshotLeaseDB(Base):
+    __tablename__ = "portfolio_snapshot_lease"
+
+    # One row per background job; only the worker named in `holder` runs the
+    # job until `expires_at`, renewing it with every checkpoint
+    name = Column(String, primary_key=True)
+    holder = Column(String, nullable=False, default="")
+    expires_at = Column(DateTime, nullable=False)
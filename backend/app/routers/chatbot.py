@@ -1,15 +1,27 @@
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator, Callable, Awaitable, Tuple
 from functools import lru_cache
+import asyncio
 import json
 import logging
+import os
+import time
 from datetime import datetime
 from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from ..services.ai_services import AIStockAnalyzer, get_real_time_stock_data, get_stock_trends
+from ..services.ai_services import (
+    AIStockAnalyzer, get_portfolio_risk, get_real_time_stock_data, get_stock_trends
+)
 from ..services.chat_database import ChatDatabaseService
-from ..db import get_db
+from ..services.intent_cache import get_intent_cache
+from ..services.intent_classifier import get_intent_classifier
+from ..services.llm_client import get_llm_client
+from ..services.quote_cache import get_quote_cache
+from ..services.quote_scheduler import get_quote_scheduler
+from ..db import SessionLocal, get_db
+from .portfolios import owner_holdings
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -39,9 +51,15 @@ def get_ai_analyzer() -> AIStockAnalyzer:
 # Configuration constants for stock data fetching
 MAX_PRICE_SYMBOLS = 5  # Maximum number of symbols for price queries
 MAX_TREND_SYMBOLS = 3  # Maximum number of symbols for trend analysis  
+MAX_RISK_SYMBOLS = 10  # Maximum number of symbols in an ad-hoc risk basket
+MAX_RISK_PORTFOLIOS = 3  # Maximum number of portfolios analyzed per risk query
 DEFAULT_TREND_DAYS = 30  # Default time range for trend analysis in days
 MAJOR_MARKET_STOCKS = ["AAPL", "GOOGL", "MSFT"]  # Default stocks for market summary
 EXAMPLE_STOCKS = ["AAPL", "GOOGL", "MSFT", "TSLA"]  # Example stocks for user guidance
+FETCH_CONCURRENCY = 5  # Maximum upstream symbol fetches in flight per chat request
+SYMBOL_FETCH_TIMEOUT = 8.0  # Seconds allowed per symbol before returning a partial result
+# Answer /chat in one tool-calling conversation instead of parse + fetch + generate
+CHAT_TOOL_CALLING = os.getenv("CHAT_TOOL_CALLING", "false").lower() in ("1", "true", "yes")
 
 # Pydantic models
 class ChatRequest(BaseModel):
@@ -87,15 +105,20 @@ async def chat_with_ai(
         
         # Use dependency-injected AI analyzer (singleton for performance)
         # No need to create new instance - analyzer is reused across requests
-        
-        # Analyze user query
-        analysis = await ai_analyzer.analyze_stock_query(request.message)
-        
-        # Fetch required data based on analysis
-        data = await fetch_stock_data(analysis)
-        
-        # Generate AI response
-        response = await ai_analyzer.generate_response(request.message, data)
+        answered = None
+        if CHAT_TOOL_CALLING and ai_analyzer.client:
+            answered = await answer_with_tools(request.message, ai_analyzer, request.user_id)
+        if answered is not None:
+            analysis, data, response = answered
+        else:
+            # Analyze user query
+            analysis = await ai_analyzer.analyze_stock_query(request.message)
+            
+            # Fetch required data based on analysis
+            data = await fetch_stock_data(analysis, request.user_id)
+            
+            # Generate AI response
+            response = await ai_analyzer.generate_response(request.message, data)
         
         # Store assistant response in database
         await run_in_threadpool(
@@ -125,6 +148,94 @@ async def chat_with_ai(
             detail=f"An internal error occurred while processing the chat request. Error ID: {ChatErrorCodes.PROCESSING_ERROR}"
         )
 
+def _sse(event: str, payload: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(payload, default=str)}\n\n"
+
+def _elapsed_ms(started: float) -> float:
+    return round((time.perf_counter() - started) * 1000, 1)
+
+async def _chat_events(
+    request: ChatRequest,
+    db: Session,
+    ai_analyzer: AIStockAnalyzer,
+    started: float
+) -> AsyncIterator[str]:
+    """SSE events for one chat turn: `intent`, `token`..., then `done` (or `error`)"""
+    request_timestamp = datetime.utcnow()
+    try:
+        # Stored up front, as /chat does, so a failed or abandoned stream keeps the question
+        await run_in_threadpool(
+            chat_service.add_exchange,
+            db,
+            request.session_id,
+            request.user_id,
+            [("user", request.message, {"request_timestamp": request_timestamp.isoformat()}, request_timestamp)]
+        )
+        analysis = await ai_analyzer.analyze_stock_query(request.message)
+        data = await fetch_stock_data(analysis, request.user_id)
+        yield _sse("intent", {"analysis": analysis, "data": data})
+        first_byte_ms = _elapsed_ms(started)
+
+        parts: List[str] = []
+        first_token_ms = None
+        async for text in ai_analyzer.stream_response(request.message, data):
+            if first_token_ms is None:
+                first_token_ms = _elapsed_ms(started)
+            parts.append(text)
+            yield _sse("token", {"text": text})
+        response = "".join(parts)
+        generated_ms = _elapsed_ms(started)
+
+        # The answer is stored once, when it is complete
+        timings = {"first_byte_ms": first_byte_ms, "first_token_ms": first_token_ms, "generated_ms": generated_ms}
+        await run_in_threadpool(
+            chat_service.add_exchange,
+            db,
+            request.session_id,
+            request.user_id,
+            [("assistant", response, {
+                "analysis": analysis,
+                "stock_data": data,
+                "response_timestamp": request_timestamp.isoformat(),
+                "timings": dict(timings)
+            }, datetime.utcnow())]
+        )
+        timings["total_ms"] = _elapsed_ms(started)
+        logger.info(
+            "Chat stream %s: first byte %.0f ms, first token %.0f ms, total %.0f ms",
+            request.session_id, first_byte_ms, first_token_ms or 0.0, timings["total_ms"]
+        )
+        yield _sse("done", {
+            "response": response,
+            "session_id": request.session_id,
+            "timestamp": request_timestamp.isoformat(),
+            "timings": timings
+        })
+    except Exception as e:
+        logger.error(f"Chat stream error for session {request.session_id}: {str(e)}", exc_info=True)
+        yield _sse("error", {
+            "detail": f"An internal error occurred while processing the chat request. Error ID: {ChatErrorCodes.PROCESSING_ERROR}"
+        })
+
+@router.post("/chat/stream")
+async def stream_chat_with_ai(
+    request: ChatRequest,
+    db: Session = Depends(get_db),
+    ai_analyzer: AIStockAnalyzer = Depends(get_ai_analyzer)
+):
+    """Chat endpoint streaming the answer as Server-Sent Events.
+
+    Sends an `intent` event (parsed analysis and fetched stock data) as soon as
+    the data is ready, a `token` event per piece of generated text, and a final
+    `done` event with the full response and timings once the answer is stored.
+    The user's message is stored before anything is streamed.
+    """
+    return StreamingResponse(
+        _chat_events(request, db, ai_analyzer, time.perf_counter()),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @router.get("/sessions/{session_id}")
 async def get_chat_history(session_id: str, db: Session = Depends(get_db)):
     """Get chat history for a session from database"""
@@ -184,31 +295,79 @@ async def get_user_sessions(user_id: str, db: Session = Depends(get_db)):
             detail=f"Unable to retrieve user sessions. Error ID: {ChatErrorCodes.USER_SESSIONS_ERROR}"
         )
 
-async def fetch_stock_data(analysis: Dict[str, Any]) -> Dict[str, Any]:
-    """Fetch relevant stock data based on AI analysis"""
+async def fetch_symbols_concurrently(
+    symbols: List[str],
+    fetch: Callable[[str], Awaitable[Dict[str, Any]]]
+) -> Dict[str, Dict[str, Any]]:
+    """Fetch all symbols concurrently with a bounded fan-out and a per-symbol timeout.
+
+    A slow or failing symbol yields an error entry instead of stalling the others,
+    so latency tracks the slowest symbol rather than the sum of all of them.
+    """
+    semaphore = asyncio.Semaphore(FETCH_CONCURRENCY)
+
+    async def fetch_one(symbol: str) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                return await asyncio.wait_for(fetch(symbol), timeout=SYMBOL_FETCH_TIMEOUT)
+            except asyncio.TimeoutError:
+                logger.warning(f"Timed out fetching data for {symbol} after {SYMBOL_FETCH_TIMEOUT}s")
+                return {"symbol": symbol, "error": f"Timed out fetching data for {symbol}"}
+            except Exception as e:
+                logger.error(f"Error fetching data for {symbol}: {str(e)}", exc_info=True)
+                return {"symbol": symbol, "error": f"Could not fetch data for {symbol}"}
+
+    # Preserve request order while dropping duplicate symbols
+    unique_symbols = list(dict.fromkeys(symbols))
+    results = await asyncio.gather(*(fetch_one(symbol) for symbol in unique_symbols))
+    return dict(zip(unique_symbols, results))
+
+def user_portfolio_holdings(user_id: str) -> List[Tuple[str, Dict[str, float]]]:
+    """The requesting user's portfolios to analyze (sync: run in the threadpool)"""
+    db = SessionLocal()
+    try:
+        return owner_holdings(db, user_id, MAX_RISK_PORTFOLIOS)
+    finally:
+        db.close()
+
+async def fetch_stock_data(analysis: Dict[str, Any], user_id: Optional[str] = None) -> Dict[str, Any]:
+    """Fetch relevant stock data based on AI analysis (portfolio risk only for `user_id`'s portfolios)"""
     data = {}
     
     try:
         if analysis["action"] == "get_price":
             # Limit symbols using configurable constant
-            for symbol in analysis.get("symbols", [])[:MAX_PRICE_SYMBOLS]:
-                stock_data = await get_real_time_stock_data(symbol)
-                data[symbol] = stock_data
+            symbols = analysis.get("symbols", [])[:MAX_PRICE_SYMBOLS]
+            data.update(await fetch_symbols_concurrently(symbols, get_real_time_stock_data))
         
         elif analysis["action"] == "get_trends":
             # Limit symbols and use configurable time range
-            for symbol in analysis.get("symbols", [])[:MAX_TREND_SYMBOLS]:
-                trends = await get_stock_trends(
-                    symbol, 
-                    analysis.get("time_range", DEFAULT_TREND_DAYS)
-                )
-                data[f"{symbol}_trends"] = trends
+            symbols = analysis.get("symbols", [])[:MAX_TREND_SYMBOLS]
+            days = analysis.get("time_range", DEFAULT_TREND_DAYS)
+            trends = await fetch_symbols_concurrently(
+                symbols,
+                lambda symbol: get_stock_trends(symbol, days)
+            )
+            for symbol, trend in trends.items():
+                data[f"{symbol}_trends"] = trend
+        
+        elif analysis["action"] == "analyze_risk":
+            symbols = analysis.get("symbols", [])[:MAX_RISK_SYMBOLS]
+            if symbols:
+                # Mentioned symbols are analyzed as an equal-weight basket
+                data["basket_risk"] = await get_portfolio_risk({symbol: 1.0 for symbol in symbols})
+            elif user_id:
+                # Only the requesting user's portfolios, analyzed concurrently
+                holdings = await run_in_threadpool(user_portfolio_holdings, user_id)
+                risks = await asyncio.gather(*(get_portfolio_risk(values) for _, values in holdings))
+                for (name, _), risk in zip(holdings, risks):
+                    data[f"{name}_risk"] = risk
+            if not data:
+                data["info"] = "Name the stocks to analyze, or sign in to analyze the risk of your portfolios."
         
         elif analysis["action"] == "market_summary":
             # Use configurable list of major market stocks
-            for symbol in MAJOR_MARKET_STOCKS:
-                stock_data = await get_real_time_stock_data(symbol)
-                data[symbol] = stock_data
+            data.update(await fetch_symbols_concurrently(MAJOR_MARKET_STOCKS, get_real_time_stock_data))
         
         # If no symbols found, provide general market info with configurable examples
         if not data and analysis["action"] in ["get_price", "get_trends"]:
@@ -221,7 +380,53 @@ async def fetch_stock_data(analysis: Dict[str, Any]) -> Dict[str, Any]:
     
     return data
 
+async def run_chat_tool(name: str, arguments: Dict[str, Any], user_id: Optional[str] = None) -> Dict[str, Any]:
+    """Run one CHAT_TOOLS call from the model through the same fetchers as the intent pipeline"""
+    symbols = arguments.get("symbols")
+    symbols = [str(symbol).upper() for symbol in symbols] if isinstance(symbols, list) else []
+    if name == "get_real_time_stock_data":
+        return await fetch_stock_data({"action": "get_price", "symbols": symbols})
+    if name == "get_stock_trends":
+        days = arguments.get("days")
+        days = days if isinstance(days, int) and days > 0 else DEFAULT_TREND_DAYS
+        return await fetch_stock_data({"action": "get_trends", "symbols": symbols, "time_range": days})
+    if name == "get_portfolio_risk":
+        return await fetch_stock_data({"action": "analyze_risk", "symbols": symbols}, user_id)
+    return {"error": f"Unknown tool {name}"}
+
+async def answer_with_tools(
+    query: str,
+    ai_analyzer: AIStockAnalyzer,
+    user_id: Optional[str] = None
+) -> Optional[Tuple[Dict[str, Any], Dict[str, Any], str]]:
+    """(analysis, data, response) from one tool-calling conversation, or None if the model failed"""
+    async def run_tool(name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        return await run_chat_tool(name, arguments, user_id)
+
+    try:
+        response, calls = await ai_analyzer.answer_with_tools(query, run_tool)
+    except Exception as e:
+        logger.warning(f"Tool-calling chat failed, using the intent pipeline: {str(e)}", exc_info=True)
+        return None
+    data: Dict[str, Any] = {}
+    for call in calls:
+        data.update(call["result"])
+    analysis = {
+        "mode": "tools",
+        "tool_calls": [{"name": call["name"], "arguments": call["arguments"]} for call in calls]
+    }
+    return analysis, data, response
+
 @router.get("/health")
 async def chatbot_health():
-    """Health check endpoint"""
-    return {"status": "healthy", "service": "AI Stock Chatbot"}
\ No newline at end of file
+    """Health check endpoint with quote/intent cache, upstream scheduler and LLM client counters"""
+    llm = get_llm_client()
+    return {
+        "status": "healthy",
+        "service": "AI Stock Chatbot",
+        "quote_cache": get_quote_cache().stats(),
+        "quote_scheduler": get_quote_scheduler().stats(),
+        "intent_cache": get_intent_cache().stats(),
+        "intent_classifier": get_intent_classifier().stats(),
+        "llm": llm.stats() if llm is not None else None
+    }
\ No newline at end of file
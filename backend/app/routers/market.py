@@ -1,19 +1,34 @@
 from fastapi import APIRouter
+import numpy as np
 from app.models import MarketSummary, MarketTrends
+from app.services.quote_store import get_quote_store
 
 router = APIRouter(prefix="/api/market", tags=["market"])
 
+# Number of symbols returned in top movers / most active lists
+TOP_MOVERS_COUNT = 5
+
 @router.get("/summary", response_model=MarketSummary)
 async def get_market_summary():
     """
-    Get market summary data
+    Get market summary data computed from the columnar quote store
     """
+    store = get_quote_store()
+    change_percent = store.column("change_percent")
+    advancers = int(np.count_nonzero(change_percent > 0))
+    decliners = int(np.count_nonzero(change_percent < 0))
+    if advancers > decliners:
+        sentiment = "bullish"
+    elif decliners > advancers:
+        sentiment = "bearish"
+    else:
+        sentiment = "neutral"
     return MarketSummary(
-        total_market_cap=6700000000000,
-        active_stocks=5000,
-        market_sentiment="bullish",
-        top_gainers=["AAPL", "MSFT", "NVDA", "AMZN", "META"],
-        top_losers=["GOOGL", "TSLA", "NFLX", "UBER", "LYFT"]
+        total_market_cap=float(np.nansum(store.column("market_cap"))),
+        active_stocks=len(store),
+        market_sentiment=sentiment,
+        top_gainers=store.top_n("change_percent", TOP_MOVERS_COUNT, largest=True, threshold=0.0),
+        top_losers=store.top_n("change_percent", TOP_MOVERS_COUNT, largest=False, threshold=0.0)
     )
 
 @router.get("/trends", response_model=MarketTrends)
@@ -112,17 +127,17 @@ async def get_market_indicators():
 @router.get("/volume")
 async def get_market_volume():
     """
-    Get market volume data
+    Get market volume data computed from the columnar quote store
     """
+    store = get_quote_store()
+    volume = store.column("volume")
+    most_active = store.top_n("volume", TOP_MOVERS_COUNT)
     return {
-        "total_volume": 8500000000,
-        "average_volume": 4200000000,
+        "total_volume": int(volume.sum()),
+        "average_volume": int(volume.mean()) if len(store) else 0,
         "volume_change": 0.12,
         "most_active": [
-            {"symbol": "TSLA", "volume": 60000000},
-            {"symbol": "AAPL", "volume": 50000000},
-            {"symbol": "AMZN", "volume": 40000000},
-            {"symbol": "MSFT", "volume": 35000000},
-            {"symbol": "GOOGL", "volume": 25000000}
+            {"symbol": symbol, "volume": int(volume[store.row(symbol)])}
+            for symbol in most_active
         ]
-    } 
\ No newline at end of file
+    }
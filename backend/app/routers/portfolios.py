@@ -1,139 +1,267 @@
-from fastapi import APIRouter, HTTPException
-from typing import List, Dict
-from datetime import datetime, timedelta
+from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+from typing import List, Dict, Optional, Tuple
+from datetime import date, datetime, timedelta
 import uuid
 import random
 
+import numpy as np
+
+from ..db import get_db
 from ..models import (
     Portfolio, PortfolioStock, PortfolioHistory, PortfolioComparison,
     CreatePortfolioRequest, UpdatePortfolioRequest
 )
+from ..portfolio_models import PortfolioDB
+from ..services.ai_services import get_portfolio_risk
+from ..services.downsampling import (
+    DOWNSAMPLE_METHODS, LTTB, MIN_POINTS, downsample_frame, downsample_indices
+)
+from ..services import portfolio_analytics as analytics_service
+from ..services.portfolio_database import PortfolioDatabaseService
+from ..services.portfolio_comparison import (
+    align_histories, chart_records, compute_metrics, fill_gaps, rebase, time_range_start
+)
+from ..services.quote_store import get_quote_store
+from ..services.valuation_engine import get_valuation_engine
 
 router = APIRouter(prefix="/api/portfolios", tags=["portfolios"])
 
-# Mock data storage (in production, use a database)
-mock_portfolios: Dict[str, Portfolio] = {}
-mock_portfolio_history: Dict[str, List[PortfolioHistory]] = {}
-
-# Initialize with sample portfolios
-def init_sample_portfolios():
-    if not mock_portfolios:
-        # Sample Portfolio 1: Long-Term
-        portfolio1_id = str(uuid.uuid4())
-        portfolio1 = Portfolio(
-            id=portfolio1_id,
-            name="Long-Term Growth",
-            description="Conservative long-term investment strategy",
-            total_value=45000.0,
-            total_cost=38000.0,
-            day_change=234.50,
-            day_change_percent=0.52,
-            total_gain_loss=7000.0,
-            total_gain_loss_percent=18.42,
-            stocks=[
-                PortfolioStock(
-                    symbol="AAPL", name="Apple Inc.", shares=50, avg_cost=150.0,
-                    current_price=174.79, value=8739.5, allocation=19.4
-                ),
-                PortfolioStock(
-                    symbol="MSFT", name="Microsoft", shares=40, avg_cost=280.0,
-                    current_price=338.47, value=13538.8, allocation=30.1
-                ),
-                PortfolioStock(
-                    symbol="GOOG", name="Alphabet", shares=60, avg_cost=120.0,
-                    current_price=138.96, value=8337.6, allocation=18.5
-                ),
-                PortfolioStock(
-                    symbol="VTI", name="Vanguard Total Stock", shares=100, avg_cost=140.0,
-                    current_price=143.84, value=14384.0, allocation=32.0
-                )
-            ],
-            created_at=datetime.now() - timedelta(days=365),
-            updated_at=datetime.now()
-        )
-        
-        # Sample Portfolio 2: Trading Account
-        portfolio2_id = str(uuid.uuid4())
-        portfolio2 = Portfolio(
-            id=portfolio2_id,
-            name="Trading Account",
-            description="Active trading portfolio for short-term gains",
-            total_value=25000.0,
-            total_cost=23000.0,
-            day_change=-156.75,
-            day_change_percent=-0.62,
-            total_gain_loss=2000.0,
-            total_gain_loss_percent=8.70,
-            stocks=[
-                PortfolioStock(
-                    symbol="TSLA", name="Tesla", shares=30, avg_cost=180.0,
-                    current_price=163.57, value=4907.1, allocation=19.6
-                ),
-                PortfolioStock(
-                    symbol="NVDA", name="NVIDIA", shares=25, avg_cost=400.0,
-                    current_price=445.67, value=11141.75, allocation=44.6
-                ),
-                PortfolioStock(
-                    symbol="AMD", name="Advanced Micro Devices", shares=50, avg_cost=90.0,
-                    current_price=95.23, value=4761.5, allocation=19.0
-                ),
-                PortfolioStock(
-                    symbol="AMZN", name="Amazon", shares=15, avg_cost=140.0,
-                    current_price=147.03, value=2205.45, allocation=8.8
-                ),
-                PortfolioStock(
-                    symbol="META", name="Meta Platforms", shares=10, avg_cost=180.0,
-                    current_price=198.45, value=1984.5, allocation=7.9
-                )
-            ],
-            created_at=datetime.now() - timedelta(days=180),
-            updated_at=datetime.now()
-        )
-        
-        mock_portfolios[portfolio1_id] = portfolio1
-        mock_portfolios[portfolio2_id] = portfolio2
-        
-        # Generate mock history for both portfolios
-        for portfolio_id in [portfolio1_id, portfolio2_id]:
-            history = []
-            base_value = mock_portfolios[portfolio_id].total_value
-            for i in range(90, 0, -1):
-                date = datetime.now() - timedelta(days=i)
-                # Simulate value fluctuation
-                variation = random.uniform(-0.03, 0.03)
-                value = base_value * (1 + variation * (90 - i) / 90)
-                change = random.uniform(-500, 500)
-                change_percent = (change / value) * 100 if value > 0 else 0
-                
-                history.append(PortfolioHistory(
-                    portfolio_id=portfolio_id,
-                    date=date.strftime("%Y-%m-%d"),
-                    value=round(value, 2),
-                    change=round(change, 2),
-                    change_percent=round(change_percent, 2)
-                ))
-            mock_portfolio_history[portfolio_id] = history
-
-init_sample_portfolios()
+# The database is the source of truth, shared by every worker: portfolios and
+# their history are read from it on each request, never held here. Only the
+# holdings are kept in process, as the valuation engine's arrays (for marking
+# to market and the analytics summary); they are loaded on startup, re-synced
+# whenever a portfolio is read, and fully re-synced before the analytics
+# summary whenever the stored set changed (see sync_if_changed).
+
+# NOTE: PortfolioDatabaseService methods are synchronous, so the endpoints
+# that use them are plain `def` and run in the threadpool
+portfolio_service = PortfolioDatabaseService()
+
+# Holdings are marked to market by the valuation engine; the value fields of
+# the stored models are refreshed from it whenever a portfolio is returned
+valuation_engine = get_valuation_engine()
+# Combined totals and best/worst performers follow every revaluation
+portfolio_analytics = analytics_service.get_portfolio_analytics()
+# Mark to the current quotes and revalue on every later price change (fresh
+# upstream quotes reach the store through the quote scheduler)
+valuation_engine.attach(get_quote_store())
+
+# Portfolios per page when listing, and per query when loading holdings on startup
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+RESTORE_PAGE_SIZE = 1000
+
+# PortfolioDatabaseService.change_marker as of this worker's last full sync
+_synced_marker: Optional[Tuple] = None
+
+def register_holdings(portfolio: Portfolio) -> None:
+    """Load a portfolio's holdings into the valuation engine and the analytics"""
+    stocks = portfolio.stocks
+    valuation_engine.set_holdings(
+        portfolio.id,
+        [s.symbol for s in stocks],
+        [s.shares for s in stocks],
+        [s.avg_cost for s in stocks],
+        seed_prices=[s.current_price for s in stocks]
+    )
+    portfolio_analytics.track(portfolio.id, portfolio.name)
+
+def marked_to_market(portfolio: Portfolio) -> Portfolio:
+    """Refresh a portfolio's totals and holding values from the valuation engine"""
+    valuation = valuation_engine.valuation(portfolio.id)
+    if valuation is None:
+        return portfolio
+    holdings = valuation.pop("holdings")
+    for field, value in valuation.items():
+        setattr(portfolio, field, value)
+    for stock in portfolio.stocks:
+        holding = holdings.get(stock.symbol.upper())
+        if holding is not None:
+            stock.current_price = holding["current_price"]
+            stock.value = holding["value"]
+            stock.allocation = holding["allocation"]
+    return portfolio
+
+def sample_portfolios() -> List[Tuple[Portfolio, List[PortfolioHistory]]]:
+    """Sample portfolios with 90 days of simulated history, stored on first boot"""
+    # Sample Portfolio 1: Long-Term
+    portfolio1 = Portfolio(
+        id=str(uuid.uuid4()),
+        name="Long-Term Growth",
+        description="Conservative long-term investment strategy",
+        total_value=45000.0,
+        total_cost=38000.0,
+        day_change=234.50,
+        day_change_percent=0.52,
+        total_gain_loss=7000.0,
+        total_gain_loss_percent=18.42,
+        stocks=[
+            PortfolioStock(
+                symbol="AAPL", name="Apple Inc.", shares=50, avg_cost=150.0,
+                current_price=174.79, value=8739.5, allocation=19.4
+            ),
+            PortfolioStock(
+                symbol="MSFT", name="Microsoft", shares=40, avg_cost=280.0,
+                current_price=338.47, value=13538.8, allocation=30.1
+            ),
+            PortfolioStock(
+                symbol="GOOG", name="Alphabet", shares=60, avg_cost=120.0,
+                current_price=138.96, value=8337.6, allocation=18.5
+            ),
+            PortfolioStock(
+                symbol="VTI", name="Vanguard Total Stock", shares=100, avg_cost=140.0,
+                current_price=143.84, value=14384.0, allocation=32.0
+            )
+        ],
+        created_at=datetime.now() - timedelta(days=365),
+        updated_at=datetime.now()
+    )
+    
+    # Sample Portfolio 2: Trading Account
+    portfolio2 = Portfolio(
+        id=str(uuid.uuid4()),
+        name="Trading Account",
+        description="Active trading portfolio for short-term gains",
+        total_value=25000.0,
+        total_cost=23000.0,
+        day_change=-156.75,
+        day_change_percent=-0.62,
+        total_gain_loss=2000.0,
+        total_gain_loss_percent=8.70,
+        stocks=[
+            PortfolioStock(
+                symbol="TSLA", name="Tesla", shares=30, avg_cost=180.0,
+                current_price=163.57, value=4907.1, allocation=19.6
+            ),
+            PortfolioStock(
+                symbol="NVDA", name="NVIDIA", shares=25, avg_cost=400.0,
+                current_price=445.67, value=11141.75, allocation=44.6
+            ),
+            PortfolioStock(
+                symbol="AMD", name="Advanced Micro Devices", shares=50, avg_cost=90.0,
+                current_price=95.23, value=4761.5, allocation=19.0
+            ),
+            PortfolioStock(
+                symbol="AMZN", name="Amazon", shares=15, avg_cost=140.0,
+                current_price=147.03, value=2205.45, allocation=8.8
+            ),
+            PortfolioStock(
+                symbol="META", name="Meta Platforms", shares=10, avg_cost=180.0,
+                current_price=198.45, value=1984.5, allocation=7.9
+            )
+        ],
+        created_at=datetime.now() - timedelta(days=180),
+        updated_at=datetime.now()
+    )
+    
+    # Generate mock history for both portfolios
+    samples = []
+    for portfolio in [portfolio1, portfolio2]:
+        history = []
+        base_value = portfolio.total_value
+        for i in range(90, 0, -1):
+            date = datetime.now() - timedelta(days=i)
+            # Simulate value fluctuation
+            variation = random.uniform(-0.03, 0.03)
+            value = base_value * (1 + variation * (90 - i) / 90)
+            change = random.uniform(-500, 500)
+            change_percent = (change / value) * 100 if value > 0 else 0
+            
+            history.append(PortfolioHistory(
+                portfolio_id=portfolio.id,
+                date=date.strftime("%Y-%m-%d"),
+                value=round(value, 2),
+                change=round(change, 2),
+                change_percent=round(change_percent, 2)
+            ))
+        samples.append((portfolio, history))
+    return samples
+
+def load_portfolio(row: PortfolioDB) -> Portfolio:
+    """API model of a stored portfolio, with its holdings (re)synced into the valuation engine"""
+    portfolio = portfolio_service.to_portfolio(row)
+    register_holdings(portfolio)
+    return portfolio
+
+def drop_portfolio(portfolio_id: str) -> None:
+    """Stop valuing a deleted portfolio"""
+    portfolio_analytics.forget(portfolio_id)
+    valuation_engine.remove_portfolio(portfolio_id)
+
+def find_portfolio(portfolio_id: str, db: Session) -> Optional[Portfolio]:
+    """Stored portfolio by id (one SELECT with its holdings), or None"""
+    row = portfolio_service.get_portfolio(db, portfolio_id)
+    if row is None:
+        drop_portfolio(portfolio_id)  # e.g. deleted by another worker
+        return None
+    return load_portfolio(row)
+
+def restore_portfolios(db: Session) -> int:
+    """Load every stored portfolio on startup; on first boot store the samples (and their history)"""
+    if portfolio_service.count_portfolios(db) == 0:
+        for portfolio, history in sample_portfolios():
+            portfolio_service.save_portfolio(db, portfolio)
+            portfolio_service.add_history(db, history)
+    return sync_portfolios(db)
+
+def sync_portfolios(db: Session) -> int:
+    """Sync the valuation engine and the analytics with every stored portfolio.
+
+    Pages through the portfolios in id order; only the engine's arrays are
+    kept, unchanged holdings and names cost nothing, and portfolios no longer
+    stored are dropped.
+    """
+    global _synced_marker
+    # Taken first: a change made during the sync is picked up by the next check
+    marker = portfolio_service.change_marker(db)
+    loaded = set()
+    for page in portfolio_service.iter_portfolios(db, RESTORE_PAGE_SIZE):
+        for row in page:
+            register_holdings(portfolio_service.to_portfolio(row))
+            loaded.add(row.id)
+    for portfolio_id in set(valuation_engine.portfolio_ids) - loaded:
+        drop_portfolio(portfolio_id)
+    _synced_marker = marker
+    return len(loaded)
+
+def sync_if_changed(db: Session) -> None:
+    """Re-sync when any worker created, renamed, deleted or re-held a portfolio since the last sync"""
+    if portfolio_service.change_marker(db) != _synced_marker:
+        sync_portfolios(db)
+
+def portfolio_history(portfolio_id: str, db: Session, days: int = 0) -> List[PortfolioHistory]:
+    """A portfolio's stored history (last `days` points when positive)"""
+    return portfolio_service.get_history(db, portfolio_id, last=days if days > 0 else None)
 
 @router.get("/", response_model=List[Portfolio])
-async def get_portfolios():
-    """Get all portfolios"""
-    return list(mock_portfolios.values())
+def get_portfolios(
+    owner_id: Optional[str] = Query(None, description="Only this user's portfolios"),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
+    """Get a page of portfolios, newest first"""
+    rows = portfolio_service.list_portfolios(db, owner_id=owner_id, limit=limit, offset=offset)
+    return [marked_to_market(load_portfolio(row)) for row in rows]
 
 @router.get("/{portfolio_id}", response_model=Portfolio)
-async def get_portfolio(portfolio_id: str):
+def get_portfolio(portfolio_id: str, db: Session = Depends(get_db)):
     """Get a specific portfolio by ID"""
-    if portfolio_id not in mock_portfolios:
+    portfolio = find_portfolio(portfolio_id, db)
+    if portfolio is None:
         raise HTTPException(status_code=404, detail="Portfolio not found")
-    return mock_portfolios[portfolio_id]
+    return marked_to_market(portfolio)
 
 @router.post("/", response_model=Portfolio)
-async def create_portfolio(request: CreatePortfolioRequest):
+def create_portfolio(request: CreatePortfolioRequest, db: Session = Depends(get_db)):
     """Create a new portfolio"""
     portfolio_id = str(uuid.uuid4())
     portfolio = Portfolio(
         id=portfolio_id,
+        owner_id=request.owner_id,
         name=request.name,
         description=request.description,
         total_value=0.0,
@@ -146,124 +274,143 @@ async def create_portfolio(request: CreatePortfolioRequest):
         created_at=datetime.now(),
         updated_at=datetime.now()
     )
-    mock_portfolios[portfolio_id] = portfolio
-    mock_portfolio_history[portfolio_id] = []
+    portfolio_service.save_portfolio(db, portfolio, owner_id=request.owner_id)
+    register_holdings(portfolio)
     return portfolio
 
 @router.put("/{portfolio_id}", response_model=Portfolio)
-async def update_portfolio(portfolio_id: str, request: UpdatePortfolioRequest):
+def update_portfolio(portfolio_id: str, request: UpdatePortfolioRequest, db: Session = Depends(get_db)):
     """Update a portfolio"""
-    if portfolio_id not in mock_portfolios:
+    portfolio = find_portfolio(portfolio_id, db)
+    if portfolio is None:
         raise HTTPException(status_code=404, detail="Portfolio not found")
     
-    portfolio = mock_portfolios[portfolio_id]
     if request.name:
         portfolio.name = request.name
     if request.description:
         portfolio.description = request.description
     portfolio.updated_at = datetime.now()
+    portfolio_service.save_portfolio(db, portfolio)
+    portfolio_analytics.track(portfolio_id, portfolio.name)
     
-    return portfolio
+    return marked_to_market(portfolio)
 
 @router.delete("/{portfolio_id}")
-async def delete_portfolio(portfolio_id: str):
+def delete_portfolio(portfolio_id: str, db: Session = Depends(get_db)):
     """Delete a portfolio"""
-    if portfolio_id not in mock_portfolios:
+    stored = portfolio_service.delete_portfolio(db, portfolio_id)
+    drop_portfolio(portfolio_id)
+    if not stored:
         raise HTTPException(status_code=404, detail="Portfolio not found")
     
-    del mock_portfolios[portfolio_id]
-    if portfolio_id in mock_portfolio_history:
-        del mock_portfolio_history[portfolio_id]
-    
     return {"success": True, "message": "Portfolio deleted successfully"}
 
+def history_arrays(history: List[PortfolioHistory]) -> Tuple[np.ndarray, np.ndarray]:
+    """Dates and values of a history as arrays for vectorized processing"""
+    dates = np.array([point.date for point in history], dtype="datetime64[D]")
+    values = np.array([point.value for point in history], dtype=np.float64)
+    return dates, values
+
+def stored_history_arrays(
+    portfolio_id: str, db: Session, start: Optional[np.datetime64] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Dates and values of a stored history from `start` on, decoding only the chunks in range"""
+    since = None if start is None else start.astype(date)
+    dates, columns = portfolio_service.get_history_arrays(db, portfolio_id, start=since)
+    return dates, columns[:, 0]
+
 @router.get("/{portfolio_id}/history", response_model=List[PortfolioHistory])
-async def get_portfolio_history(portfolio_id: str, days: int = 90):
-    """Get portfolio historical data"""
-    if portfolio_id not in mock_portfolios:
+def get_portfolio_history(
+    portfolio_id: str,
+    days: int = 90,
+    max_points: Optional[int] = Query(None, ge=MIN_POINTS, description="Downsample to at most this many points"),
+    downsample: str = Query(LTTB, pattern=f"^({'|'.join(DOWNSAMPLE_METHODS)})$", description="lttb or minmax"),
+    db: Session = Depends(get_db)
+):
+    """Get portfolio historical data, optionally downsampled for charting"""
+    if find_portfolio(portfolio_id, db) is None:
         raise HTTPException(status_code=404, detail="Portfolio not found")
     
-    history = mock_portfolio_history.get(portfolio_id, [])
-    return history[-days:] if days > 0 else history
+    history = portfolio_history(portfolio_id, db, days)
+    if max_points and len(history) > max_points:
+        dates, values = history_arrays(history)
+        keep = downsample_indices(dates.astype(np.float64), values, max_points, downsample)
+        history = [history[i] for i in keep.tolist()]
+    return history
+
+def holding_values(portfolio: Portfolio) -> Dict[str, float]:
+    """Market value per symbol, the weights used by the risk engine"""
+    valuation = valuation_engine.valuation(portfolio.id)
+    if valuation is None:
+        return {stock.symbol: stock.shares * stock.current_price for stock in portfolio.stocks}
+    return {symbol: holding["value"] for symbol, holding in valuation["holdings"].items()}
+
+def owner_holdings(db: Session, owner_id: str, limit: int) -> List[Tuple[str, Dict[str, float]]]:
+    """Name and holding values of a user's newest portfolios (for the chatbot's risk answers)"""
+    result = []
+    for row in portfolio_service.list_portfolios(db, owner_id=owner_id, limit=limit):
+        portfolio = load_portfolio(row)
+        result.append((portfolio.name, holding_values(portfolio)))
+    return result
+
+@router.get("/{portfolio_id}/risk")
+async def get_portfolio_risk_analysis(portfolio_id: str, db: Session = Depends(get_db)):
+    """Volatility, VaR/CVaR, beta and per-holding risk contribution"""
+    portfolio = await run_in_threadpool(find_portfolio, portfolio_id, db)
+    if portfolio is None:
+        raise HTTPException(status_code=404, detail="Portfolio not found")
+    
+    return await get_portfolio_risk(holding_values(portfolio))
 
 @router.post("/compare")
-async def compare_portfolios(comparison: PortfolioComparison):
-    """Compare multiple portfolios"""
-    result = {"portfolios": [], "comparison_data": []}
+def compare_portfolios(comparison: PortfolioComparison, db: Session = Depends(get_db)):
+    """Compare multiple portfolios on date-aligned histories"""
+    portfolio_ids = list(dict.fromkeys(comparison.portfolios))
     
     # Validate portfolio IDs
-    for portfolio_id in comparison.portfolios:
-        if portfolio_id not in mock_portfolios:
+    found = {}
+    for portfolio_id in portfolio_ids:
+        found[portfolio_id] = find_portfolio(portfolio_id, db)
+        if found[portfolio_id] is None:
             raise HTTPException(status_code=404, detail=f"Portfolio {portfolio_id} not found")
     
-    # Get portfolio data
-    for portfolio_id in comparison.portfolios:
-        portfolio = mock_portfolios[portfolio_id]
-        history = mock_portfolio_history.get(portfolio_id, [])
-        
+    try:
+        start = time_range_start(comparison.time_range)
+        frame = align_histories(
+            {pid: stored_history_arrays(pid, db, start) for pid in portfolio_ids},
+            start=start
+        )
+        metrics = compute_metrics(frame, comparison.metrics)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    result = {"portfolios": [], "comparison_data": []}
+    for portfolio_id in portfolio_ids:
+        portfolio = marked_to_market(found[portfolio_id])
         result["portfolios"].append({
             "id": portfolio.id,
             "name": portfolio.name,
             "total_value": portfolio.total_value,
             "total_gain_loss_percent": portfolio.total_gain_loss_percent,
-            "day_change_percent": portfolio.day_change_percent
+            "day_change_percent": portfolio.day_change_percent,
+            "metrics": metrics[portfolio_id]
         })
     
-    # Generate comparison chart data
-    if len(comparison.portfolios) > 0:
-        # Get the longest history to align dates
-        all_histories = [mock_portfolio_history.get(pid, []) for pid in comparison.portfolios]
-        if all_histories and any(all_histories):
-            max_length = max(len(h) for h in all_histories if h)
-            
-            for i in range(max_length):
-                data_point = {}
-                for j, portfolio_id in enumerate(comparison.portfolios):
-                    history = all_histories[j]
-                    if i < len(history):
-                        if not data_point.get("date"):
-                            data_point["date"] = history[i].date
-                        portfolio_name = mock_portfolios[portfolio_id].name
-                        data_point[portfolio_name] = history[i].value
-                
-                if data_point:
-                    result["comparison_data"].append(data_point)
+    # Chart series: one row per date across all portfolios (outer join)
+    chart = fill_gaps(frame) if comparison.forward_fill else frame
+    if comparison.rebase:
+        chart = rebase(chart)
+    chart = downsample_frame(chart, comparison.max_points, comparison.downsample)
+    result["comparison_data"] = chart_records(
+        chart, {pid: found[pid].name for pid in portfolio_ids}
+    )
     
-    return result
+    # Plain JSON types already: skip the per-value jsonable_encoder walk
+    return JSONResponse(result)
 
 @router.get("/analytics/summary")
-async def get_portfolio_analytics():
+def get_portfolio_analytics(db: Session = Depends(get_db)):
     """Get combined analytics across all portfolios"""
-    if not mock_portfolios:
-        return {
-            "total_portfolios": 0,
-            "combined_value": 0.0,
-            "combined_gain_loss": 0.0,
-            "combined_gain_loss_percent": 0.0,
-            "best_performer": None,
-            "worst_performer": None
-        }
-    
-    portfolios = list(mock_portfolios.values())
-    total_value = sum(p.total_value for p in portfolios)
-    total_cost = sum(p.total_cost for p in portfolios)
-    combined_gain_loss = total_value - total_cost
-    combined_gain_loss_percent = (combined_gain_loss / total_cost * 100) if total_cost > 0 else 0
-    
-    best_performer = max(portfolios, key=lambda p: p.total_gain_loss_percent)
-    worst_performer = min(portfolios, key=lambda p: p.total_gain_loss_percent)
-    
-    return {
-        "total_portfolios": len(portfolios),
-        "combined_value": round(total_value, 2),
-        "combined_gain_loss": round(combined_gain_loss, 2),
-        "combined_gain_loss_percent": round(combined_gain_loss_percent, 2),
-        "best_performer": {
-            "name": best_performer.name,
-            "gain_loss_percent": best_performer.total_gain_loss_percent
-        },
-        "worst_performer": {
-            "name": worst_performer.name,
-            "gain_loss_percent": worst_performer.total_gain_loss_percent
-        }
-    }
\ No newline at end of file
+    # Portfolios are created, renamed and deleted by every worker
+    sync_if_changed(db)
+    return portfolio_analytics.summary()
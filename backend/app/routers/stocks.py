@@ -1,10 +1,26 @@
-from fastapi import APIRouter, HTTPException
-from typing import List
-from app.models import StockData, StockRequest, StockResponse
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse
+from datetime import date, timedelta
+from typing import List, Optional, Tuple
+import json
+import logging
+import os
+import numpy as np
+from app.models import StockData, StockRequest, StockResponse, BatchQuoteRequest
+from app.services.bar_store import get_bar_store
+from app.services.indicators import WARMUP_BARS, compute_indicators, summarize
+from app.services.quote_store import QUOTE_FIELDS, get_quote_store
+from app.services.response_cache import SerializedResponseCache, cached_json_response
+from app.services.symbol_search import get_search_index, load_listings_csv
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/api/stocks", tags=["stocks"])
 
-# Mock stock data for demonstration
+# Fields returned by the lightweight price endpoint
+PRICE_FIELDS = ("symbol", "price", "change", "change_percent")
+
+# Mock stock data for demonstration (seed data for the quote store)
 MOCK_STOCKS = {
     "AAPL": StockData(
         symbol="AAPL",
@@ -68,32 +84,126 @@ MOCK_STOCKS = {
     )
 }
 
+# Company names for the seeded symbols (used by the search index)
+COMPANY_NAMES = {
+    "AAPL": "Apple Inc.",
+    "GOOGL": "Alphabet Inc. Class A",
+    "MSFT": "Microsoft Corporation",
+    "AMZN": "Amazon.com Inc.",
+    "TSLA": "Tesla Inc.",
+}
+
+# Seed quotes into the shared columnar store; routers read quotes from the
+# store, and writes must go through upsert_stock() (or the store itself) so
+# the store versions that key cached responses are bumped.
+quote_store = get_quote_store()
+quote_store.load_stocks(MOCK_STOCKS.values())
+
+_response_cache = SerializedResponseCache()
+
+def _search_listings() -> List[Tuple[str, str]]:
+    """The seeded symbols plus the optional LISTINGS_CSV (symbol,name) universe.
+
+    Read when the search index is first needed rather than at import, so a
+    LISTINGS_CSV set in .env applies.
+    """
+    listings = list(COMPANY_NAMES.items())
+    listings_csv = os.getenv("LISTINGS_CSV")
+    if listings_csv:
+        try:
+            listings.extend(load_listings_csv(listings_csv))
+        except (OSError, KeyError) as e:
+            logger.error(f"Could not load listings from {listings_csv}: {e}")
+    return listings
+
+def upsert_stock(stock: StockData) -> None:
+    """Insert or replace a quote and invalidate its cached responses"""
+    quote_store.upsert_stock(stock)
+
 @router.get("/", response_model=List[StockData])
-async def get_stocks():
+async def get_stocks(request: Request):
+    """
+    Get list of all available stocks (pre-serialized, ETag-aware)
+    """
+    body, etag = _response_cache.get_or_build(
+        ("list",), quote_store.version,
+        lambda: json.dumps(quote_store.all_records()).encode()
+    )
+    return cached_json_response(request, body, etag)
+
+@router.get("/search")
+async def search_stocks(
+    q: str = Query(..., min_length=1, max_length=64, description="Partial symbol or company name"),
+    limit: int = Query(10, ge=1, le=50, description="Maximum number of results")
+):
+    """
+    Typeahead search ranking symbol prefixes, company-name word prefixes
+    and fuzzy (trigram) matches
     """
-    Get list of all available stocks
+    return {"query": q, "results": get_search_index(_search_listings).search(q, limit)}
+
+def _resolve_batch_fields(fields: Optional[List[str]]) -> List[str]:
+    """Validate a requested field subset; symbol is always included"""
+    if not fields:
+        return list(QUOTE_FIELDS)
+    unknown = [f for f in fields if f not in QUOTE_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return ["symbol"] + [f for f in dict.fromkeys(fields) if f != "symbol"]
+
+@router.post("/batch")
+async def get_stocks_batch(request: BatchQuoteRequest):
     """
-    return list(MOCK_STOCKS.values())
+    Get quotes for many symbols in one response.
+    Unknown symbols are reported inline; known rows are gathered column by
+    column from the quote store rather than one model per symbol.
+    """
+    fields = _resolve_batch_fields(request.fields)
+    symbols = list(dict.fromkeys(s.upper() for s in request.symbols))
+    rows = quote_store.rows_for(symbols)
+    found = iter(quote_store.records(rows[rows >= 0], fields))
+    quotes = []
+    not_found = []
+    for symbol, row in zip(symbols, rows.tolist()):
+        if row < 0:
+            not_found.append(symbol)
+            quotes.append({"symbol": symbol, "error": "not_found"})
+        else:
+            quotes.append(next(found))
+    return JSONResponse({
+        "success": True,
+        "count": len(quotes) - len(not_found),
+        "quotes": quotes,
+        "not_found": not_found
+    })
 
 @router.get("/{symbol}", response_model=StockResponse)
-async def get_stock(symbol: str):
+async def get_stock(symbol: str, request: Request):
     """
-    Get specific stock data by symbol
+    Get specific stock data by symbol (pre-serialized, ETag-aware)
     """
     symbol_upper = symbol.upper()
-    if symbol_upper in MOCK_STOCKS:
-        return StockResponse(success=True, data=MOCK_STOCKS[symbol_upper])
-    else:
+    version = quote_store.row_version(symbol_upper)
+    if version < 0:
         raise HTTPException(status_code=404, detail=f"Stock {symbol} not found")
+    body, etag = _response_cache.get_or_build(
+        ("stock", symbol_upper), version,
+        lambda: json.dumps({
+            "success": True,
+            "data": quote_store.get(symbol_upper),
+            "message": None
+        }).encode()
+    )
+    return cached_json_response(request, body, etag)
 
 @router.post("/search", response_model=StockResponse)
 async def search_stock(request: StockRequest):
     """
     Search for stock data
     """
-    symbol_upper = request.symbol.upper()
-    if symbol_upper in MOCK_STOCKS:
-        return StockResponse(success=True, data=MOCK_STOCKS[symbol_upper])
+    quote = quote_store.get(request.symbol)
+    if quote is not None:
+        return StockResponse(success=True, data=StockData(**quote))
     else:
         return StockResponse(
             success=False,
@@ -101,18 +211,63 @@ async def search_stock(request: StockRequest):
         )
 
 @router.get("/{symbol}/price")
-async def get_stock_price(symbol: str):
+async def get_stock_price(symbol: str, request: Request):
     """
-    Get only the price for a specific stock
+    Get only the price for a specific stock (pre-serialized, ETag-aware)
     """
     symbol_upper = symbol.upper()
-    if symbol_upper in MOCK_STOCKS:
-        stock = MOCK_STOCKS[symbol_upper]
-        return {
-            "symbol": stock.symbol,
-            "price": stock.price,
-            "change": stock.change,
-            "change_percent": stock.change_percent
-        }
-    else:
-        raise HTTPException(status_code=404, detail=f"Stock {symbol} not found") 
\ No newline at end of file
+    version = quote_store.row_version(symbol_upper)
+    if version < 0:
+        raise HTTPException(status_code=404, detail=f"Stock {symbol} not found")
+    body, etag = _response_cache.get_or_build(
+        ("price", symbol_upper), version,
+        lambda: json.dumps(quote_store.get(symbol_upper, PRICE_FIELDS)).encode()
+    )
+    return cached_json_response(request, body, etag)
+
+def _json_series(values: np.ndarray) -> List[Optional[float]]:
+    """Round a float series for JSON, mapping NaN warm-up positions to null"""
+    return [round(v, 4) if v == v else None for v in values.tolist()]
+
+def _build_indicators_body(symbol: str, days: int) -> bytes:
+    start = date.today() - timedelta(days=days)
+    bars = get_bar_store().read(symbol, start=start, lookback=WARMUP_BARS)
+    closes = np.asarray(bars["close"], dtype=np.float64)
+    indicators = compute_indicators(closes)
+    # Indicators are computed with warm-up history but only the window is returned
+    in_window = bars["time"] >= np.datetime64(start, "s")
+    series = {"date": [str(t)[:10] for t in bars["time"][in_window].tolist()]}
+    series["close"] = _json_series(closes[in_window])
+    for name, values in indicators.items():
+        series[name] = _json_series(values[in_window])
+    return json.dumps({
+        "success": True,
+        "data": {
+            "symbol": symbol,
+            "period": f"{days} days",
+            "summary": summarize(closes, indicators),
+            "series": series
+        },
+        "message": None
+    }).encode()
+
+@router.get("/{symbol}/indicators")
+async def get_stock_indicators(
+    symbol: str,
+    request: Request,
+    days: int = Query(180, ge=1, le=3650, description="Calendar days of history to return")
+):
+    """
+    Get technical indicators (returns, volatility, SMA/EMA, RSI, MACD, Bollinger)
+    computed from stored daily bars
+    """
+    symbol_upper = symbol.upper()
+    store = get_bar_store()
+    count = store.count(symbol_upper)
+    if count == 0:
+        raise HTTPException(status_code=404, detail=f"No price history for {symbol}")
+    body, etag = _response_cache.get_or_build(
+        ("indicators", symbol_upper, days, count, date.today()), store.version(symbol_upper),
+        lambda: _build_indicators_body(symbol_upper, days)
+    )
+    return cached_json_response(request, body, etag)
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import logging
+from typing import List
+
+from fastapi import APIRouter, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+
+from app.services.quote_stream import Subscriber, get_quote_broadcaster
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/stocks/stream", tags=["stocks"])
+
+# Seconds between SSE keep-alive comments when no quotes change
+STREAM_HEARTBEAT_SECONDS = 15.0
+
+def _parse_symbols(raw: str) -> List[str]:
+    return [s for s in (part.strip().upper() for part in raw.split(",")) if s]
+
+def _error_message(message: str) -> str:
+    return json.dumps({"type": "error", "message": message})
+
+@router.websocket("/ws")
+async def stream_quotes_ws(websocket: WebSocket):
+    """
+    Stream quote deltas over a WebSocket.
+    Send {"action": "subscribe" | "unsubscribe", "symbols": [...]}; each new
+    symbol gets a full snapshot followed by changed-fields-only deltas.
+    """
+    await websocket.accept()
+    broadcaster = get_quote_broadcaster()
+    subscriber = broadcaster.connect()
+    initial = websocket.query_params.get("symbols")
+    if initial:
+        broadcaster.subscribe(subscriber, _parse_symbols(initial))
+
+    async def read_commands() -> None:
+        while True:
+            try:
+                command = await websocket.receive_json()
+            except ValueError:
+                subscriber.offer(_error_message("Messages must be JSON objects"))
+                continue
+            symbols = command.get("symbols") if isinstance(command, dict) else None
+            action = command.get("action") if isinstance(command, dict) else None
+            if not isinstance(symbols, list):
+                subscriber.offer(_error_message("'symbols' must be a list"))
+            elif action == "subscribe":
+                broadcaster.subscribe(subscriber, [str(s) for s in symbols])
+            elif action == "unsubscribe":
+                broadcaster.unsubscribe(subscriber, [str(s) for s in symbols])
+            else:
+                subscriber.offer(_error_message("Unknown action; use subscribe or unsubscribe"))
+
+    async def write_messages() -> None:
+        while True:
+            for message in await subscriber.next_messages():
+                await websocket.send_text(message)
+
+    tasks = [asyncio.create_task(read_commands()), asyncio.create_task(write_messages())]
+    try:
+        done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            error = task.exception()
+            if error is not None and not isinstance(error, WebSocketDisconnect):
+                logger.error("Quote stream websocket error", exc_info=error)
+    finally:
+        for task in tasks:
+            task.cancel()
+        broadcaster.disconnect(subscriber)
+
+async def _sse_events(request: Request, subscriber: Subscriber):
+    broadcaster = get_quote_broadcaster()
+    try:
+        while not await request.is_disconnected():
+            try:
+                messages = await asyncio.wait_for(subscriber.next_messages(), STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            yield "".join(f"data: {message}\n\n" for message in messages)
+    finally:
+        broadcaster.disconnect(subscriber)
+
+@router.get("/sse")
+async def stream_quotes_sse(
+    request: Request,
+    symbols: str = Query(..., min_length=1, description="Comma-separated symbols to stream")
+):
+    """
+    Stream quote snapshots and deltas as Server-Sent Events
+    """
+    broadcaster = get_quote_broadcaster()
+    subscriber = broadcaster.connect()
+    broadcaster.subscribe(subscriber, _parse_symbols(symbols))
+    return StreamingResponse(
+        _sse_events(request, subscriber),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
@@ -1,11 +1,21 @@
-from openai import OpenAI
+import asyncio
 import json
 import os
 import re
 import logging
-from typing import Dict, Any, List, Optional
-import httpx
+from typing import Dict, Any, AsyncIterator, Awaitable, Callable, List, Optional, Tuple
 from datetime import datetime, timedelta
+import numpy as np
+from openai import APIConnectionError, APITimeoutError
+from .bar_store import get_bar_store, make_bars
+from .http_client import get_http_client
+from .indicators import WARMUP_BARS, compute_indicators, summarize
+from .intent_cache import IntentCache, get_intent_cache
+from .intent_classifier import IntentClassifier, get_intent_classifier
+from .llm_client import LLMClient, get_llm_client
+from .quote_scheduler import QuoteRateLimited, get_quote_scheduler
+from .risk_engine import get_risk_engine
+from .rolling_indicators import get_rolling_indicators
 
 logger = logging.getLogger(__name__)
 
@@ -18,20 +28,83 @@ ANALYSIS_TEMPERATURE = 0.7
 DEFAULT_CONFIDENCE = 0.7
 DEFAULT_TIME_RANGE = 30  # Default time range for trend analysis in days
 JSON_INDENT = 2
+MAX_TOOL_CALLS = 6  # Most data tools run for one tool-calling chat turn
+
+# Data tools offered to the model in tool-calling chat mode (run by the chat router)
+CHAT_TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "get_real_time_stock_data",
+            "description": "Latest quote (price, change, volume) for stock tickers. "
+                           "For general market questions use major stocks such as AAPL, GOOGL and MSFT.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "symbols": {"type": "array", "items": {"type": "string"}, "description": "Upper-case tickers"},
+                },
+                "required": ["symbols"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_stock_trends",
+            "description": "Price trend and technical indicators (moving averages, RSI, MACD) over a period.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "symbols": {"type": "array", "items": {"type": "string"}, "description": "Upper-case tickers"},
+                    "days": {"type": "integer", "description": "Length of the period in days (default 30)"},
+                },
+                "required": ["symbols"],
+            },
+        },
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "get_portfolio_risk",
+            "description": "Volatility, value at risk, beta and maximum drawdown of an equal-weight basket of tickers, "
+                           "or of the user's portfolios when no tickers are given.",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "symbols": {"type": "array", "items": {"type": "string"}, "description": "Upper-case tickers"},
+                },
+            },
+        },
+    },
+]
+
+# Upstream quote provider configuration
+ALPHA_VANTAGE_URL = os.getenv("ALPHA_VANTAGE_URL", "https://www.alphavantage.co/query")
+QUOTE_REQUEST_TIMEOUT = float(os.getenv("QUOTE_REQUEST_TIMEOUT", "5"))  # seconds per request
+
+def _total_tokens(response: Any) -> int:
+    usage = getattr(response, "usage", None)
+    return int(getattr(usage, "total_tokens", 0) or 0)
 
 class AIStockAnalyzer:
-    def __init__(self):
+    def __init__(
+        self,
+        intent_cache: Optional[IntentCache] = None,
+        classifier: Optional[IntentClassifier] = None,
+    ):
         self.openai_api_key = os.getenv("OPENAI_API_KEY")
         self.alpha_vantage_key = os.getenv("ALPHA_VANTAGE_API_KEY")
-        
-        # Initialize OpenAI client with API key
-        if self.openai_api_key:
-            self.client = OpenAI(api_key=self.openai_api_key)
-        else:
-            self.client = None
         # Track if JSON mode succeeded once (avoid double attempts later)
         self._json_mode_supported: bool = True
         self.logger = logging.getLogger(__name__)
+        # An empty cache is falsy, so test for None explicitly
+        self.intent_cache = intent_cache if intent_cache is not None else get_intent_cache()
+        self.classifier = classifier if classifier is not None else get_intent_classifier()
+
+    @property
+    def client(self) -> Optional[LLMClient]:
+        """Shared async LLM client (None without an OpenAI API key)"""
+        return get_llm_client()
 
     # ----------------------------- JSON Parsing Helpers ----------------------------- #
     def _extract_json_from_fenced_block(self, content: str) -> Optional[str]:
@@ -112,9 +185,22 @@ class AIStockAnalyzer:
     
     async def analyze_stock_query(self, query: str, context: Optional[Dict[str, Any]] = None):
         """Analyze user query and determine what stock data to fetch using JSON mode when possible."""
-        if not self.client:
-            return self._simple_query_analysis(query)
+        local = self._simple_query_analysis(query)
+        # Clear-cut questions are answered by the local classifier, skipping the LLM
+        if not self.client or self.classifier.is_confident(local):
+            return local
 
+        # Repeated questions reuse the intent parsed the first time, skipping the LLM
+        cached = self.intent_cache.get(query)
+        if cached is not None:
+            return cached
+        intent, tokens = await self._llm_query_analysis(query)
+        if tokens is not None:
+            self.intent_cache.set(query, intent, tokens=tokens)
+        return intent
+
+    async def _llm_query_analysis(self, query: str) -> Tuple[Dict[str, Any], Optional[int]]:
+        """Intent parsed by the LLM and the tokens spent (None when the LLM gave no answer)"""
         base_system_prompt = (
             "You are an AI stock analyst assistant. Return ONLY structured JSON describing the user's intent. "
             "Recognize: symbols (list of uppercase stock tickers), action (one of get_price, get_trends, compare_portfolios, analyze_risk, market_summary), "
@@ -126,7 +212,7 @@ class AIStockAnalyzer:
         # Attempt JSON mode first (efficient & guaranteed if supported)
         if self._json_mode_supported:
             try:
-                response = self.client.chat.completions.create(
+                response = await self.client.complete(
                     model=OPENAI_MODEL,
                     messages=[
                         {"role": "system", "content": base_system_prompt},
@@ -139,7 +225,11 @@ class AIStockAnalyzer:
                 content = response.choices[0].message.content
                 loaded = self._safe_json_load(content.strip())
                 if isinstance(loaded, dict):
-                    return loaded
+                    return loaded, _total_tokens(response)
+            except (asyncio.TimeoutError, APITimeoutError, APIConnectionError):
+                # Busy or unreachable, not a JSON mode problem: answer without the LLM
+                self.logger.warning("LLM unavailable for query analysis; using keyword analysis", exc_info=True)
+                return self._simple_query_analysis(query), None
             except Exception as json_mode_err:
                 # Mark unsupported and fall back to prompt-based fenced JSON strategy
                 self._json_mode_supported = False
@@ -154,7 +244,7 @@ class AIStockAnalyzer:
                 base_system_prompt +
                 " Output ONLY a markdown fenced JSON block like:\n```json\n{ ... }\n```\nNo extra commentary outside the block."
             )
-            response = self.client.chat.completions.create(
+            response = await self.client.complete(
                 model=OPENAI_MODEL,
                 messages=[
                     {"role": "system", "content": fenced_prompt},
@@ -164,43 +254,99 @@ class AIStockAnalyzer:
                 temperature=PARSER_TEMPERATURE,
             )
             content = response.choices[0].message.content
-            return self._parse_ai_response(content, query)
+            return self._parse_ai_response(content, query), _total_tokens(response)
         except Exception as e:
             self.logger.error("OpenAI analyze fallback error", exc_info=True)
-            return self._simple_query_analysis(query)
+            return self._simple_query_analysis(query), None
     
     def _simple_query_analysis(self, query: str) -> Dict[str, Any]:
-        """Simple fallback analysis without AI"""
-        query_lower = query.lower()
-        
-        # Extract common stock symbols
-        symbols = []
-        common_symbols = ['aapl', 'googl', 'msft', 'amzn', 'tsla', 'meta', 'nvda', 'nflx']
-        for symbol in common_symbols:
-            if symbol in query_lower:
-                symbols.append(symbol.upper())
-        
-        # Determine action based on keywords
-        if any(word in query_lower for word in ['price', 'cost', 'value', 'current']):
-            action = "get_price"
-        elif any(word in query_lower for word in ['trend', 'analysis', 'performance', 'growth']):
-            action = "get_trends"
-        elif any(word in query_lower for word in ['compare', 'comparison', 'portfolio']):
-            action = "compare_portfolios"
-        elif any(word in query_lower for word in ['risk', 'volatility']):
-            action = "analyze_risk"
-        else:
-            action = "market_summary"
-        
-        return {
-            "action": action,
-            "symbols": symbols,
-            "time_range": DEFAULT_TIME_RANGE,
-            "confidence": DEFAULT_CONFIDENCE
-        }
+        """Fallback analysis without AI: the local keyword classifier"""
+        return self.classifier.classify(query)
     
     # (Original _parse_ai_response replaced by robust version above)
     
+    def _response_messages(self, query: str, data: Dict[str, Any]) -> List[Dict[str, str]]:
+        context = f"""
+            User Query: {query}
+            Stock Data: {json.dumps(data, indent=JSON_INDENT)}
+            
+            Provide a helpful, professional response with insights and recommendations.
+            """
+        return [
+            {"role": "system", "content": "You are a professional stock analyst providing clear, actionable insights."},
+            {"role": "user", "content": context}
+        ]
+
+    async def answer_with_tools(
+        self,
+        query: str,
+        run_tool: Callable[[str, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+    ) -> Tuple[str, List[Dict[str, Any]]]:
+        """Answer in one tool-calling conversation instead of parse + fetch + generate.
+
+        The model picks the CHAT_TOOLS calls it needs, `run_tool(name, arguments)`
+        runs them concurrently, and the model writes the answer from their results.
+        Returns the answer and the calls made ({"name", "arguments", "result"}).
+        Raises if the model cannot be reached for the first completion.
+        """
+        messages: List[Dict[str, Any]] = [
+            {"role": "system", "content": (
+                "You are a professional stock analyst providing clear, actionable insights. "
+                "Call the tools for any market data you need, all at once when they are independent, "
+                "then answer from their results."
+            )},
+            {"role": "user", "content": query},
+        ]
+        response = await self.client.complete(
+            model=OPENAI_MODEL,
+            messages=messages,
+            tools=CHAT_TOOLS,
+            tool_choice="auto",
+            max_tokens=ANALYSIS_MAX_TOKENS,
+            temperature=ANALYSIS_TEMPERATURE
+        )
+        message = response.choices[0].message
+        if not message.tool_calls:
+            return message.content or "", []
+
+        tool_calls = message.tool_calls[:MAX_TOOL_CALLS]
+        calls = []
+        for call in tool_calls:
+            arguments = self._safe_json_load(call.function.arguments or "{}")
+            calls.append({"name": call.function.name, "arguments": arguments if isinstance(arguments, dict) else {}})
+        # Independent tool calls run concurrently, so the fetch costs the slowest one
+        results = await asyncio.gather(*(run_tool(c["name"], c["arguments"]) for c in calls))
+
+        messages.append({
+            "role": "assistant",
+            "content": message.content,
+            "tool_calls": [
+                {"id": call.id, "type": "function",
+                 "function": {"name": call.function.name, "arguments": call.function.arguments}}
+                for call in tool_calls
+            ],
+        })
+        for call, info, result in zip(tool_calls, calls, results):
+            info["result"] = result
+            messages.append({"role": "tool", "tool_call_id": call.id, "content": json.dumps(result, default=str)})
+
+        try:
+            final = await self.client.complete(
+                model=OPENAI_MODEL,
+                messages=messages,
+                tools=CHAT_TOOLS,
+                tool_choice="none",
+                max_tokens=ANALYSIS_MAX_TOKENS,
+                temperature=ANALYSIS_TEMPERATURE
+            )
+            return final.choices[0].message.content or "", calls
+        except Exception:
+            self.logger.error("OpenAI tool-calling answer error", exc_info=True)
+            data: Dict[str, Any] = {}
+            for info in calls:
+                data.update(info["result"])
+            return self._generate_simple_response(query, data), calls
+
     async def generate_response(self, query: str, data: Dict[str, Any]) -> str:
         """Generate natural language response"""
         
@@ -208,19 +354,9 @@ class AIStockAnalyzer:
             return self._generate_simple_response(query, data)
         
         try:
-            context = f"""
-            User Query: {query}
-            Stock Data: {json.dumps(data, indent=JSON_INDENT)}
-            
-            Provide a helpful, professional response with insights and recommendations.
-            """
-            
-            response = self.client.chat.completions.create(
+            response = await self.client.complete(
                 model=OPENAI_MODEL,
-                messages=[
-                    {"role": "system", "content": "You are a professional stock analyst providing clear, actionable insights."},
-                    {"role": "user", "content": context}
-                ],
+                messages=self._response_messages(query, data),
                 max_tokens=ANALYSIS_MAX_TOKENS,
                 temperature=ANALYSIS_TEMPERATURE
             )
@@ -230,6 +366,28 @@ class AIStockAnalyzer:
         except Exception as e:
             self.logger.error("OpenAI response generation error", exc_info=True)
             return self._generate_simple_response(query, data)
+
+    async def stream_response(self, query: str, data: Dict[str, Any]) -> AsyncIterator[str]:
+        """Yield the natural language response in pieces as the model produces them"""
+        if not self.client:
+            yield self._generate_simple_response(query, data)
+            return
+
+        produced = False
+        try:
+            async for text in self.client.stream(
+                model=OPENAI_MODEL,
+                messages=self._response_messages(query, data),
+                max_tokens=ANALYSIS_MAX_TOKENS,
+                temperature=ANALYSIS_TEMPERATURE
+            ):
+                produced = True
+                yield text
+        except Exception:
+            self.logger.error("OpenAI response streaming error", exc_info=True)
+            # Nothing sent yet: answer without the LLM; otherwise keep the partial answer
+            if not produced:
+                yield self._generate_simple_response(query, data)
     
     def _generate_simple_response(self, query: str, data: Dict[str, Any]) -> str:
         """Simple response generation without AI"""
@@ -242,6 +400,11 @@ class AIStockAnalyzer:
             if isinstance(value, dict):
                 if 'price' in value:
                     response_parts.append(f"{key}: Current price is ${value['price']:.2f}")
+                elif 'annualized_volatility' in value:
+                    response_parts.append(
+                        f"{key}: annualized volatility {value['annualized_volatility']:.1%}, "
+                        f"1-day {value['confidence']:.0%} VaR ${value['historical_var']['amount']:,.2f}"
+                    )
                 elif 'change' in value:
                     change = value['change']
                     direction = "up" if change > 0 else "down"
@@ -255,8 +418,47 @@ class AIStockAnalyzer:
             return "I found some data but couldn't format it properly. Please try rephrasing your question."
 
 # Stock data fetching functions
-async def get_real_time_stock_data(symbol: str) -> Dict[str, Any]:
-    """Fetch real-time stock data"""
+async def fetch_alpha_vantage_quote(symbol: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+    """Fetch one quote from Alpha Vantage; raises on HTTP or payload errors"""
+    api_key = os.getenv("ALPHA_VANTAGE_API_KEY")
+    params = {"function": "GLOBAL_QUOTE", "symbol": symbol, "apikey": api_key}
+    
+    # Reuse pooled keep-alive connections instead of a client per call
+    client = get_http_client()
+    response = await client.get(
+        ALPHA_VANTAGE_URL,
+        params=params,
+        timeout=timeout if timeout is not None else QUOTE_REQUEST_TIMEOUT
+    )
+    response.raise_for_status()  # Raises exception for HTTP errors
+    data = response.json()
+    
+    # The provider answers throttled calls with 200 and a "Note"/"Information" message
+    if "Note" in data or "Information" in data:
+        raise QuoteRateLimited(data.get("Note") or data.get("Information"))
+    if "Global Quote" not in data:
+        raise ValueError("Invalid API response")
+    
+    quote = data["Global Quote"]
+    result = {
+        "symbol": symbol,
+        "price": float(quote["05. price"]),
+        "change": float(quote["09. change"]),
+        "change_percent": float(quote["10. change percent"].replace("%", "")),
+        "volume": int(quote["06. volume"]),
+        "high": float(quote["03. high"]),
+        "low": float(quote["04. low"])
+    }
+    # Every fresh quote is a tick for the O(1) rolling indicators
+    result["rolling"] = get_rolling_indicators().update(symbol, result["price"])
+    return result
+
+async def get_real_time_stock_data(symbol: str, timeout: Optional[float] = None) -> Dict[str, Any]:
+    """Return the freshest known quote with its `age_seconds`, never blocking on the provider.
+
+    `timeout` bounds the wait for a symbol that has never been fetched; the
+    upstream call itself is made by the rate-limited quote scheduler.
+    """
     try:
         # Using Alpha Vantage API (free tier available)
         api_key = os.getenv("ALPHA_VANTAGE_API_KEY")
@@ -272,62 +474,73 @@ async def get_real_time_stock_data(symbol: str) -> Dict[str, Any]:
                 "note": "Demo data - add ALPHA_VANTAGE_API_KEY for real data"
             }
         
-        url = f"https://www.alphavantage.co/query?function=GLOBAL_QUOTE&symbol={symbol}&apikey={api_key}"
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url)
-            response.raise_for_status()  # Raises exception for HTTP errors
-            data = response.json()
-        
-        if "Global Quote" in data:
-            quote = data["Global Quote"]
-            return {
-                "symbol": symbol,
-                "price": float(quote["05. price"]),
-                "change": float(quote["09. change"]),
-                "change_percent": float(quote["10. change percent"].replace("%", "")),
-                "volume": int(quote["06. volume"]),
-                "high": float(quote["03. high"]),
-                "low": float(quote["04. low"])
-            }
-        else:
-            raise Exception("Invalid API response")
+        return await get_quote_scheduler().get_quote(symbol, wait=timeout)
             
     except Exception as e:
         logger.error(f"Stock data error for {symbol}: {e}", exc_info=True)
-        # Return mock data on error
-        return {
-            "symbol": symbol,
-            "price": 100.00,
-            "change": 0.0,
-            "change_percent": 0.0,
-            "volume": 0,
-            "error": f"Could not fetch real data for {symbol}"
-        }
+        # No made-up prices: callers see that the quote is unavailable
+        return {"symbol": symbol, "error": f"Could not fetch real data for {symbol}"}
+
+def _demo_bars(symbol: str, days: int):
+    """Deterministic synthetic daily bars for demo mode (nothing is stored)"""
+    rng = np.random.default_rng(sum(map(ord, symbol.upper())))
+    # Geometric walk so long demo windows never reach zero or negative prices
+    closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.015, days)))
+    today = datetime.now().date()
+    return make_bars(
+        ((today - timedelta(days=days - i)).isoformat(), c, c, c, c, 0.0)
+        for i, c in enumerate(closes)
+    )
 
 async def get_stock_trends(symbol: str, days: int = 30) -> Dict[str, Any]:
-    """Get stock trend analysis"""
+    """Get stock trend analysis and indicators from the stored daily bars"""
     try:
-        # For demo purposes, return mock trend data
-        import random
+        start = (datetime.now() - timedelta(days=days)).date()
+        # Zero-copy view of the requested window plus indicator warm-up bars
+        bars = get_bar_store().read(symbol, start=start, lookback=WARMUP_BARS)
+        window_start = np.datetime64(start, "s")
+        note = None
+        if len(bars) == 0:
+            if os.getenv("ALPHA_VANTAGE_API_KEY"):
+                return {"symbol": symbol, "error": f"No price history stored for {symbol}"}
+            bars = _demo_bars(symbol, days + WARMUP_BARS)
+            note = "Demo data - load daily bars into the bar store for real history"
         
-        trend_data = []
-        base_price = 100
-        for i in range(days):
-            price = base_price + random.uniform(-5, 5)
-            trend_data.append({
-                "date": (datetime.now() - timedelta(days=days-i)).strftime("%Y-%m-%d"),
-                "price": round(price, 2)
-            })
-            base_price = price
+        closes = np.asarray(bars["close"], dtype=np.float64)
+        indicators = compute_indicators(closes)
+        summary = summarize(closes, indicators)
+        in_window = bars["time"] >= window_start
+        trend_data = [
+            {"date": str(d)[:10], "price": round(p, 2)}
+            for d, p in zip(bars["time"][in_window].tolist(), closes[in_window].tolist())
+        ]
         
-        return {
+        result = {
             "symbol": symbol,
             "period": f"{days} days",
             "trend_data": trend_data,
-            "trend_direction": "upward" if trend_data[-1]["price"] > trend_data[0]["price"] else "downward",
-            "volatility": "moderate"
+            "trend_direction": summary.pop("trend_direction"),
+            "volatility": summary.pop("volatility"),
+            "indicators": summary
         }
+        if note:
+            result["note"] = note
+        return result
         
     except Exception as e:
-        return {"error": f"Could not analyze trends for {symbol}: {e}"}
\ No newline at end of file
+        return {"error": f"Could not analyze trends for {symbol}: {e}"}
+
+async def get_portfolio_risk(holdings: Dict[str, float]) -> Dict[str, Any]:
+    """Risk analysis (volatility, VaR/CVaR, max drawdown, beta, contributions) for {symbol: market value}"""
+    try:
+        # Demo mode fills symbols without stored history with synthetic bars
+        fallback = None if os.getenv("ALPHA_VANTAGE_API_KEY") else _demo_bars
+        # Covariance, VaR and beta are NumPy work: keep them off the event loop
+        result = await asyncio.to_thread(get_risk_engine().analyze, holdings, fallback)
+        store = get_bar_store()
+        if fallback is not None and "error" not in result and not all(store.count(s) for s in result["symbols"]):
+            result["note"] = "Demo data - load daily bars into the bar store for real history"
+        return result
+    except Exception as e:
+        logger.error(f"Risk analysis error: {e}", exc_info=True)
+        return {"error": "Could not analyze portfolio risk"}
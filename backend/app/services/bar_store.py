@@ -0,0 +1,217 @@
+"""
+Memory-mapped historical OHLCV bar store
+
+PERFORMANCE NOTE: Each symbol's bars live in one file of fixed-width records
+(BAR_DTYPE) sorted by timestamp, read through numpy.memmap. A date-range read
+is two binary searches over the mapped timestamp column and returns a view
+into the mapping, so only the pages that are touched are ever read from disk
+and whole histories are never loaded into RAM. New bars are appended to the
+end of the file.
+"""
+import logging
+import os
+import threading
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Storage configuration (overridable via the BARS_DIR environment variable,
+# read on first use so a .env loaded after import still applies)
+DEFAULT_BARS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "data", "bars")
+DAILY = "1d"
+
+# One fixed-width little-endian record per bar; timestamps are UTC seconds
+BAR_DTYPE = np.dtype([
+    ("time", "<M8[s]"),
+    ("open", "<f8"),
+    ("high", "<f8"),
+    ("low", "<f8"),
+    ("close", "<f8"),
+    ("volume", "<f8"),
+])
+BAR_FIELDS = BAR_DTYPE.names
+
+TimeLike = Union[str, date, datetime, np.datetime64]
+
+
+def to_datetime64(value: TimeLike) -> np.datetime64:
+    """Normalize a date, datetime or ISO string to a second-resolution timestamp"""
+    if isinstance(value, datetime):
+        value = value.replace(tzinfo=None)
+    return np.datetime64(value, "s")
+
+
+def make_bars(rows: Iterable[Union[Dict[str, Any], Sequence[Any]]]) -> np.ndarray:
+    """Build a BAR_DTYPE array from dicts or (time, open, high, low, close, volume) tuples"""
+    records: List[Tuple[Any, ...]] = []
+    for row in rows:
+        if isinstance(row, dict):
+            row = (row.get("time", row.get("date")),) + tuple(row[f] for f in BAR_FIELDS[1:])
+        records.append((to_datetime64(row[0]),) + tuple(float(v) for v in row[1:]))
+    return np.array(records, dtype=BAR_DTYPE)
+
+
+class BarStore:
+    """Per-symbol, per-interval bar files under one root directory"""
+
+    def __init__(self, root: Optional[str] = None):
+        self._root = root
+        self._lock = threading.Lock()
+        # (interval, symbol) -> (record count, read-only memmap)
+        self._maps: Dict[Tuple[str, str], Tuple[int, np.memmap]] = {}
+        # Bumped on every write so derived caches know when history changed
+        self._versions: Dict[Tuple[str, str], int] = {}
+
+    @property
+    def root(self) -> str:
+        """Directory of the bar files; defaults to BARS_DIR, read when first needed"""
+        if self._root is None:
+            self._root = os.getenv("BARS_DIR", DEFAULT_BARS_DIR)
+        return self._root
+
+    def path(self, symbol: str, interval: str = DAILY) -> str:
+        return os.path.join(self.root, interval, f"{symbol.upper()}.bin")
+
+    def __contains__(self, symbol: str) -> bool:
+        return self.count(symbol) > 0
+
+    def count(self, symbol: str, interval: str = DAILY) -> int:
+        try:
+            return os.path.getsize(self.path(symbol, interval)) // BAR_DTYPE.itemsize
+        except OSError:
+            return 0
+
+    def symbols(self, interval: str = DAILY) -> List[str]:
+        try:
+            names = os.listdir(os.path.join(self.root, interval))
+        except OSError:
+            return []
+        return sorted(name[:-4] for name in names if name.endswith(".bin"))
+
+    def version(self, symbol: str, interval: str = DAILY) -> int:
+        return self._versions.get((interval, symbol.upper()), 0)
+
+    def _mapped(self, symbol: str, interval: str) -> Optional[np.memmap]:
+        key = (interval, symbol.upper())
+        count = self.count(symbol, interval)
+        if count == 0:
+            return None
+        cached = self._maps.get(key)
+        if cached is not None and cached[0] == count:
+            return cached[1]
+        mapped = np.memmap(self.path(symbol, interval), dtype=BAR_DTYPE, mode="r", shape=(count,))
+        self._maps[key] = (count, mapped)
+        return mapped
+
+    def read(
+        self,
+        symbol: str,
+        start: Optional[TimeLike] = None,
+        end: Optional[TimeLike] = None,
+        interval: str = DAILY,
+        lookback: int = 0,
+    ) -> np.ndarray:
+        """Bars with start <= time <= end as a zero-copy view (empty when none).
+
+        `lookback` extra bars before `start` are included, e.g. to warm up indicators.
+        """
+        bars = self._mapped(symbol, interval)
+        if bars is None:
+            return np.empty(0, dtype=BAR_DTYPE)
+        times = bars["time"]
+        lo = 0 if start is None else int(np.searchsorted(times, to_datetime64(start), side="left"))
+        hi = len(bars) if end is None else int(np.searchsorted(times, to_datetime64(end), side="right"))
+        return bars[max(lo - lookback, 0):hi]
+
+    def tail(self, symbol: str, n: int, interval: str = DAILY) -> np.ndarray:
+        """The last `n` bars as a zero-copy view"""
+        bars = self._mapped(symbol, interval)
+        if bars is None or n <= 0:
+            return np.empty(0, dtype=BAR_DTYPE)
+        return bars[-n:]
+
+    def last_time(self, symbol: str, interval: str = DAILY) -> Optional[np.datetime64]:
+        bars = self.tail(symbol, 1, interval)
+        return bars["time"][0] if len(bars) else None
+
+    def append(self, symbol: str, bars: np.ndarray, interval: str = DAILY) -> int:
+        """Append bars newer than the stored ones; returns how many were written.
+
+        A first bar with the same timestamp as the last stored bar replaces it
+        in place (an intraday update of today's bar); older bars raise ValueError.
+        """
+        bars = np.asarray(bars, dtype=BAR_DTYPE)
+        if len(bars) == 0:
+            return 0
+        if len(bars) > 1 and not np.all(bars["time"][1:] > bars["time"][:-1]):
+            raise ValueError("Bars must be strictly increasing in time")
+        path = self.path(symbol, interval)
+        with self._lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            last = self.last_time(symbol, interval)
+            replace_last = last is not None and bars["time"][0] == last
+            if last is not None and bars["time"][0] < last:
+                raise ValueError(f"Bars for {symbol.upper()} must start at or after {last}")
+            with open(path, "r+b" if replace_last else "ab") as handle:
+                if replace_last:
+                    handle.seek(-BAR_DTYPE.itemsize, os.SEEK_END)
+                handle.write(bars.tobytes())
+            key = (interval, symbol.upper())
+            self._maps.pop(key, None)
+            self._versions[key] = self._versions.get(key, 0) + 1
+        return len(bars)
+
+    def delete(self, symbol: str, interval: str = DAILY) -> None:
+        key = (interval, symbol.upper())
+        with self._lock:
+            self._maps.pop(key, None)
+            self._versions[key] = self._versions.get(key, 0) + 1
+            try:
+                os.remove(self.path(symbol, interval))
+            except FileNotFoundError:
+                pass
+
+    def load_csv(self, path: str, symbol: Optional[str] = None, interval: str = DAILY) -> Dict[str, int]:
+        """Bulk-load bars from CSV with date/time, open, high, low, close, volume columns.
+
+        A `symbol` column lets one file carry many symbols; otherwise pass
+        `symbol`. Rows already stored (at or before the last stored bar) are
+        skipped, so re-running a loader only appends what is new.
+        """
+        import pandas as pd
+
+        frame = pd.read_csv(path)
+        frame.columns = [c.strip().lower() for c in frame.columns]
+        time_column = "time" if "time" in frame.columns else "date"
+        frame[time_column] = pd.to_datetime(frame[time_column], utc=True).dt.tz_localize(None)
+        if "symbol" not in frame.columns:
+            if symbol is None:
+                raise ValueError("CSV has no symbol column; pass symbol=")
+            frame["symbol"] = symbol
+        frame["symbol"] = frame["symbol"].str.upper()
+
+        loaded: Dict[str, int] = {}
+        for sym, group in frame.groupby("symbol", sort=False):
+            group = group.sort_values(time_column).drop_duplicates(time_column, keep="last")
+            bars = np.empty(len(group), dtype=BAR_DTYPE)
+            bars["time"] = group[time_column].to_numpy(dtype="datetime64[s]")
+            for field in BAR_FIELDS[1:]:
+                bars[field] = group[field].to_numpy(dtype=np.float64)
+            last = self.last_time(sym, interval)
+            if last is not None:
+                bars = bars[bars["time"] > last]
+            loaded[sym] = self.append(sym, bars, interval)
+        logger.info(f"Loaded {sum(loaded.values())} bars for {len(loaded)} symbols from {path}")
+        return loaded
+
+
+# Process-wide store rooted at BARS_DIR (resolved on first use)
+bar_store = BarStore()
+
+
+def get_bar_store() -> BarStore:
+    """Return the shared process-wide bar store"""
+    return bar_store
@@ -6,7 +6,7 @@ because they use synchronous SQLAlchemy operations. Using async def with sync DB
 operations would block the FastAPI event loop and severely degrade performance.
 """
 from sqlalchemy.orm import Session
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime
 from ..chat_models import ChatSession, ChatMessage
 from ..db import get_db
@@ -65,7 +65,38 @@ class ChatDatabaseService:
         db.commit()
         db.refresh(message)
         return message
-    
+
+    @staticmethod
+    def add_exchange(
+        db: Session,
+        session_id: str,
+        user_id: Optional[str],
+        messages: List[Tuple[str, str, Dict[str, Any], datetime]]
+    ) -> None:
+        """Store (role, content, metadata, timestamp) messages, creating the session if needed, in one commit"""
+        session = db.query(ChatSession).filter(ChatSession.session_id == session_id).first()
+        if not session:
+            session = ChatSession(
+                session_id=session_id,
+                user_id=user_id,
+                title=f"Chat Session {datetime.utcnow().strftime('%Y-%m-%d %H:%M')}"
+            )
+            db.add(session)
+            db.flush()
+
+        for role, content, metadata, timestamp in messages:
+            enriched_meta = dict(metadata)
+            enriched_meta.setdefault("session_id", session.session_id)
+            db.add(ChatMessage(
+                chat_session_fk=session.id,
+                role=role,
+                content=content,
+                message_metadata=enriched_meta,
+                timestamp=timestamp
+            ))
+        session.updated_at = datetime.utcnow()
+        db.commit()
+
     @staticmethod
     def get_session_messages(db: Session, session_id: str) -> List[Dict[str, Any]]:
         """Get all messages for a session"""
@@ -0,0 +1,118 @@
+"""
+Chart downsampling for long time series
+
+PERFORMANCE NOTE: A chart a few hundred pixels wide cannot show thousands of
+points, so long histories are reduced to `max_points` before serialization.
+Both methods return indices into the original arrays (dates and values stay
+exact samples). Min/max bucketing is a single 2-D reduction; LTTB
+(Largest-Triangle-Three-Buckets) precomputes bucket edges and next-bucket
+averages as arrays and only loops once per output bucket, never per input
+point.
+"""
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+LTTB = "lttb"
+MINMAX = "minmax"
+DOWNSAMPLE_METHODS = (LTTB, MINMAX)
+MIN_POINTS = 4  # first, last and one bucket's min and max
+
+
+def _check_budget(n_out: int) -> None:
+    if n_out < MIN_POINTS:
+        raise ValueError(f"Downsampling needs at least {MIN_POINTS} points, got {n_out}")
+
+
+def _bucket_edges(n: int, buckets: int) -> np.ndarray:
+    # Interior points 1..n-2 split into equal-width buckets; first/last are kept
+    return np.linspace(1, n - 1, buckets + 1).astype(np.int64)
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices of the points LTTB keeps when reducing (x, y) to `n_out` points"""
+    _check_budget(n_out)
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    buckets = n_out - 2
+    edges = _bucket_edges(n, buckets)
+    # Average point of every bucket (the last point stands in after the final one)
+    sizes = np.diff(edges)
+    avg_x = np.append(np.add.reduceat(x[:-1], edges[:-1]) / sizes, x[-1])
+    avg_y = np.append(np.add.reduceat(y[:-1], edges[:-1]) / sizes, y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, n - 1
+    a = 0
+    for b in range(buckets):
+        lo, hi = edges[b], edges[b + 1]
+        cx, cy = avg_x[b + 1], avg_y[b + 1]
+        # Twice the triangle area (a, candidate, next-bucket average)
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        selected[b + 1] = a
+    return selected
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Indices of each bucket's minimum and maximum (plus first/last), at most `n_out`"""
+    _check_budget(n_out)
+    n = len(y)
+    if n_out >= n:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+
+    buckets = (n_out - 2) // 2
+    edges = _bucket_edges(n, buckets)
+    width = int(np.diff(edges).max())
+    # (buckets x width) index grid; slots past a bucket's end are masked out
+    grid = edges[:-1, None] + np.arange(width)
+    valid = grid < edges[1:, None]
+    values = y[np.minimum(grid, n - 1)]
+    rows = np.arange(buckets)
+    low = grid[rows, np.where(valid, values, np.inf).argmin(axis=1)]
+    high = grid[rows, np.where(valid, values, -np.inf).argmax(axis=1)]
+    return np.unique(np.concatenate(([0, n - 1], low, high)))
+
+
+def downsample_indices(x: np.ndarray, y: np.ndarray, n_out: int, method: str = LTTB) -> np.ndarray:
+    """Indices to keep for one series using `method` ('lttb' or 'minmax')"""
+    if method == LTTB:
+        return lttb_indices(x, y, n_out)
+    if method == MINMAX:
+        return minmax_indices(y, n_out)
+    raise ValueError(f"Unsupported downsampling method: {method} (supported: {', '.join(DOWNSAMPLE_METHODS)})")
+
+
+def downsample_frame(frame: pd.DataFrame, max_points: Optional[int], method: str = LTTB) -> pd.DataFrame:
+    """Rows of a date-indexed frame kept so every column keeps its shape.
+
+    Each column gets an equal share of the point budget over its own non-null
+    values and the union of the chosen dates is returned. With too many
+    columns for a useful share, rows are chosen on the average of the columns
+    (each scaled to its own first value) instead.
+    """
+    if not max_points or len(frame) <= max_points or frame.empty:
+        return frame
+    _check_budget(max_points)
+    x = frame.index.values.astype("datetime64[s]").astype(np.float64)
+    values = frame.to_numpy(dtype=np.float64)
+
+    share = max_points // values.shape[1]
+    if share < MIN_POINTS:
+        scaled = values / frame.bfill().iloc[0].to_numpy(dtype=np.float64)
+        present = np.flatnonzero(~np.isnan(scaled).all(axis=1))
+        with np.errstate(invalid="ignore"):
+            average = np.nanmean(scaled[present], axis=1)
+        return frame.iloc[present[downsample_indices(x[present], average, max_points, method)]]
+
+    keep = np.zeros(len(frame), dtype=bool)
+    for column in values.T:
+        present = np.flatnonzero(~np.isnan(column))
+        keep[present[downsample_indices(x[present], column[present], share, method)]] = True
+    return frame.iloc[np.flatnonzero(keep)]
@@ -0,0 +1,392 @@
+"""
+End-of-day portfolio history snapshots
+
+PERFORMANCE NOTE: After the market close the stored portfolios are read
+from the database a batch at a time (keyset pages in id order, holdings as
+plain rows, no ORM objects), so every worker's portfolios are covered, not
+just those in this worker's valuation engine. Each batch is valued with a
+sparse product (np.bincount over its holdings) at the closing prices and
+at the prior closes, and written to the compressed history chunks with
+one read and one flush. Closes are looked up once per symbol per run.
+Each run is recorded per market date with a cursor (the last portfolio id
+written) committed with every batch, so an interrupted run resumes where
+it stopped and a finished date is never written twice; re-writing a date
+replaces its points instead of adding rows. Trading days missed while the server was down are backfilled from
+the stored daily bars.
+
+Every API worker starts the scheduler, but only one runs the job: workers
+share a lease row in the database (portfolio_snapshot_lease), taken with
+one conditional UPDATE and renewed in the same transaction as every
+checkpoint. A worker whose lease was taken over stops before it writes
+another batch, so the cursor has a single writer. A worker that dies
+mid-run holds the lease until SNAPSHOT_LEASE_SECONDS pass; the next run
+then resumes after its cursor.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..db import SessionLocal
+from ..portfolio_models import SnapshotLeaseDB, SnapshotRunDB
+from .bar_store import BarStore, get_bar_store
+from .portfolio_database import PortfolioDatabaseService
+from .valuation_engine import ValuationEngine, get_valuation_engine
+
+logger = logging.getLogger(__name__)
+
+EOD_SNAPSHOTS_ENABLED = os.getenv("EOD_SNAPSHOTS_ENABLED", "true").lower() in ("1", "true", "yes")
+# Portfolios written (and checkpointed) per database round trip
+SNAPSHOT_BATCH_SIZE = int(os.getenv("SNAPSHOT_BATCH_SIZE", "1000"))
+# Most trading days backfilled after downtime
+SNAPSHOT_MAX_BACKFILL_DAYS = int(os.getenv("SNAPSHOT_MAX_BACKFILL_DAYS", "30"))
+# After the 16:00 New York close in both summer (20:00 UTC) and winter (21:00 UTC)
+MARKET_CLOSE_UTC = os.getenv("MARKET_CLOSE_UTC", "21:00")
+# How long a worker keeps the job without checkpointing before another worker
+# may take over (a batch must be written well within this)
+SNAPSHOT_LEASE_SECONDS = int(os.getenv("SNAPSHOT_LEASE_SECONDS", "300"))
+
+RUNNING = "running"
+COMPLETE = "complete"
+LEASE_NAME = "eod-snapshots"
+
+
+class SnapshotLeaseLost(Exception):
+    """Another worker took over the snapshot job; this one must stop writing"""
+
+
+class SnapshotLease:
+    """Database lease that lets one worker at a time run the snapshot job.
+
+    Acquiring is a single conditional UPDATE (free, expired or already ours),
+    so it is atomic on SQLite and PostgreSQL alike; renewing only succeeds
+    while this worker is still the holder.
+    """
+
+    def __init__(self, holder: Optional[str] = None, seconds: int = SNAPSHOT_LEASE_SECONDS, name: str = LEASE_NAME):
+        self.holder = holder or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.seconds = seconds
+        self.name = name
+
+    def _mine(self, db: Session):
+        return db.query(SnapshotLeaseDB).filter(
+            SnapshotLeaseDB.name == self.name, SnapshotLeaseDB.holder == self.holder
+        )
+
+    def acquire(self, db: Session) -> bool:
+        """Take (or extend) the lease; False while another worker holds it"""
+        now = datetime.utcnow()
+        if db.get(SnapshotLeaseDB, self.name) is None:
+            db.add(SnapshotLeaseDB(name=self.name, holder="", expires_at=now))
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()  # another worker created it first
+        taken = db.query(SnapshotLeaseDB).filter(
+            SnapshotLeaseDB.name == self.name,
+            or_(SnapshotLeaseDB.holder == self.holder, SnapshotLeaseDB.expires_at <= now),
+        ).update(
+            {"holder": self.holder, "expires_at": now + timedelta(seconds=self.seconds)},
+            synchronize_session=False,
+        )
+        db.commit()
+        return taken == 1
+
+    def renew(self, db: Session) -> None:
+        """Extend the lease in the caller's transaction, before it commits"""
+        renewed = self._mine(db).update(
+            {"expires_at": datetime.utcnow() + timedelta(seconds=self.seconds)}, synchronize_session=False
+        )
+        if renewed != 1:
+            db.rollback()
+            raise SnapshotLeaseLost(f"snapshot lease {self.name!r} is held by another worker")
+
+    def release(self, db: Session) -> None:
+        self._mine(db).update({"holder": "", "expires_at": datetime.utcnow()}, synchronize_session=False)
+        db.commit()
+
+
+def market_close_time() -> Tuple[int, int]:
+    hour, minute = MARKET_CLOSE_UTC.split(":")
+    return int(hour), int(minute)
+
+
+def last_closed_day(now: datetime) -> date:
+    """The latest date whose market close has passed at `now` (UTC, weekends skipped)"""
+    hour, minute = market_close_time()
+    day = now.date() if (now.hour, now.minute) >= (hour, minute) else now.date() - timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= timedelta(days=1)
+    return day
+
+
+def trading_days(after: date, through: date) -> List[date]:
+    """Weekdays in (after, through]; exchange holidays are not modelled"""
+    days = np.arange(np.datetime64(after, "D") + 1, np.datetime64(through, "D") + 1, dtype="datetime64[D]")
+    return [d.item() for d in days[np.is_busday(days)]]
+
+
+def seconds_until_next_close(now: datetime) -> float:
+    hour, minute = market_close_time()
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    while target.weekday() >= 5:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+class SnapshotJob:
+    """Values all stored portfolios at a market close and appends one history point each.
+
+    The valuation engine only supplies this worker's live quotes.
+    """
+
+    def __init__(
+        self,
+        engine: Optional[ValuationEngine] = None,
+        bars: Optional[BarStore] = None,
+        session_factory: Callable[[], Session] = SessionLocal,
+        batch_size: int = SNAPSHOT_BATCH_SIZE,
+        lease: Optional[SnapshotLease] = None,
+    ):
+        # An empty engine is falsy, so test for None explicitly
+        self.engine = engine if engine is not None else get_valuation_engine()
+        self.bars = bars if bars is not None else get_bar_store()
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.lease = lease if lease is not None else SnapshotLease()
+        self.store = PortfolioDatabaseService()
+
+    # ----------------------------- Prices ----------------------------- #
+    def live_quotes(self, symbols: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """Live price and previous close per symbol from the valuation engine (NaN when unknown)"""
+        price, previous = self.engine.prices()
+        # Columns are only ever appended, so the first len(price) symbols match
+        index = {s: i for i, s in enumerate(self.engine.symbols[: len(price)])}
+        cols = np.array([index.get(s, -1) for s in symbols], dtype=np.int64)
+        known = cols >= 0
+        current = np.full(len(symbols), np.nan)
+        previous_close = np.full(len(symbols), np.nan)
+        current[known] = price[cols[known]]
+        previous_close[known] = previous[cols[known]]
+        return current, previous_close
+
+    def closing_prices(
+        self, symbols: List[str], day: date, live: bool, seeds: Optional[List[float]] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Close on `day` and the close before it, per symbol.
+
+        Stored daily bars give historical closes; the live quotes are used for
+        today's close (`live`) and for symbols without stored bars. `seeds`
+        (the stored last prices) cover symbols with neither.
+        """
+        current, previous_close = self.live_quotes(symbols)
+        close = np.full(len(symbols), np.nan)
+        prior = np.full(len(symbols), np.nan)
+        end = np.datetime64(day, "D") + np.timedelta64(1, "D") - np.timedelta64(1, "s")
+        for i, symbol in enumerate(symbols):
+            closes = self.bars.read(symbol, end=end)["close"]
+            if len(closes):
+                close[i] = closes[-1]
+                prior[i] = closes[-2] if len(closes) > 1 else closes[-1]
+        quoted_prior = np.where(np.isnan(previous_close), current, previous_close)
+        use_quotes = ~np.isnan(current) if live else np.isnan(close)
+        close = np.where(use_quotes, current, close)
+        prior = np.where(use_quotes, quoted_prior, prior)
+        if seeds is not None:
+            seeds = np.asarray(seeds, dtype=np.float64)
+            close = np.where(np.isnan(close), seeds, close)
+            prior = np.where(np.isnan(prior), close, prior)
+        return close, prior
+
+    def value_page(
+        self,
+        ids: List[str],
+        holdings: List[Tuple[str, str, int, float]],
+        day: date,
+        live: bool,
+        closes: Dict[str, Tuple[float, float]],
+    ) -> np.ndarray:
+        """(n, 3) value/change/change_percent columns for a page of stored portfolios.
+
+        `holdings` are (portfolio_id, symbol, shares, last_price) rows; `closes`
+        caches (close, prior close) per symbol across the pages of a run.
+        """
+        index = {pid: row for row, pid in enumerate(ids)}
+        rows, symbols, shares, seeds = [], [], [], {}
+        for portfolio_id, symbol, count, last_price in holdings:
+            row = index.get(portfolio_id)
+            if row is None:  # created after the ids were read: misses this date, like any created mid-run
+                continue
+            symbol = symbol.upper()
+            rows.append(row)
+            symbols.append(symbol)
+            shares.append(count)
+            seeds.setdefault(symbol, last_price)
+        missing = [s for s in seeds if s not in closes]
+        if missing:
+            close, prior = self.closing_prices(missing, day, live, [seeds[s] for s in missing])
+            closes.update(zip(missing, zip(close.tolist(), prior.tolist())))
+
+        pairs = np.nan_to_num(np.array([closes[s] for s in symbols], dtype=np.float64).reshape(-1, 2))
+        rows_arr, shares_arr = np.array(rows, dtype=np.int64), np.array(shares, dtype=np.float64)
+        value = np.round(np.bincount(rows_arr, shares_arr * pairs[:, 0], minlength=len(ids)), 2)
+        previous = np.bincount(rows_arr, shares_arr * pairs[:, 1], minlength=len(ids))
+        change = np.round(value - previous, 2)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            change_percent = np.round(np.where(previous != 0, (value - previous) / previous * 100, 0.0), 2)
+        return np.stack([value, change, change_percent], axis=1)
+
+    # ------------------------------ Runs ------------------------------ #
+    def pending_days(self, db: Session, through: date) -> List[date]:
+        """Unfinished runs plus trading days since the last finished one (capped)"""
+        unfinished = [d for (d,) in db.query(SnapshotRunDB.date).filter(SnapshotRunDB.status != COMPLETE)]
+        last = db.query(func.max(SnapshotRunDB.date)).filter(SnapshotRunDB.status == COMPLETE).scalar()
+        if last is None:
+            missed = [through]  # first run: nothing to catch up on
+        else:
+            missed = trading_days(last, through)[-SNAPSHOT_MAX_BACKFILL_DAYS:]
+        return sorted(set(unfinished) | set(missed))
+
+    def run(self, now: Optional[datetime] = None) -> List[Dict[str, Any]]:
+        """Snapshot every pending market date up to the latest close.
+
+        Does nothing while another worker holds the lease.
+        """
+        through = last_closed_day(now or datetime.utcnow())
+        db = self.session_factory()
+        try:
+            if not self.lease.acquire(db):
+                logger.info("EOD snapshot skipped: another worker holds the lease")
+                return []
+            days = self.pending_days(db, through)
+        finally:
+            db.close()
+        reports = []
+        try:
+            for day in days:
+                reports.append(self.snapshot(day, live=day == through))
+        except SnapshotLeaseLost:
+            logger.warning("EOD snapshot stopped: another worker took over the lease")
+            return reports
+        db = self.session_factory()
+        try:
+            self.lease.release(db)
+        finally:
+            db.close()
+        return reports
+
+    def snapshot(self, day: date, live: bool = False) -> Dict[str, Any]:
+        """Write one history point per portfolio for `day`, resuming an interrupted run.
+
+        Every commit renews the lease first, so SnapshotLeaseLost is raised
+        (and nothing more is written) once another worker holds it.
+        """
+        db = self.session_factory()
+        try:
+            if not self.lease.acquire(db):
+                raise SnapshotLeaseLost(f"snapshot lease {self.lease.name!r} is held by another worker")
+            run = db.get(SnapshotRunDB, day)
+            if run is not None and run.status == COMPLETE:
+                return self._report(run, written=0, elapsed=0.0)
+            if run is None:
+                run = SnapshotRunDB(date=day, status=RUNNING, cursor="", portfolios=0)
+                db.add(run)
+                self.lease.renew(db)
+                db.commit()
+
+            started = time.perf_counter()
+            dates = np.array([day], dtype="datetime64[D]")
+            closes: Dict[str, Tuple[float, float]] = {}
+            written = 0
+            # Portfolios created or deleted by any worker since the last page are seen here
+            for ids, holdings in self.store.iter_holding_pages(db, self.batch_size, after=run.cursor or None):
+                columns = self.value_page(ids, holdings, day, live, closes)
+                # History, cursor and lease renewal commit together, or not at all
+                self.store.add_history_arrays(db, {
+                    pid: (dates, columns[i:i + 1]) for i, pid in enumerate(ids)
+                }, commit=False)
+                run.cursor = ids[-1]
+                run.portfolios += len(ids)
+                self.lease.renew(db)
+                db.commit()
+                written += len(ids)
+
+            elapsed = time.perf_counter() - started
+            run.status = COMPLETE
+            run.finished_at = datetime.utcnow()
+            run.portfolios_per_second = written / elapsed if elapsed > 0 else None
+            self.lease.renew(db)
+            db.commit()
+            report = self._report(run, written, elapsed)
+            logger.info(
+                "EOD snapshot %s: %d portfolios in %.2f s (%.0f portfolios/s)",
+                day, written, elapsed, report["portfolios_per_second"] or 0.0
+            )
+            return report
+        finally:
+            db.close()
+
+    @staticmethod
+    def _report(run: SnapshotRunDB, written: int, elapsed: float) -> Dict[str, Any]:
+        return {
+            "date": run.date.isoformat(),
+            "status": run.status,
+            "portfolios": run.portfolios,
+            "written": written,
+            "seconds": round(elapsed, 3),
+            "portfolios_per_second": round(written / elapsed, 1) if written and elapsed > 0 else None,
+        }
+
+
+class SnapshotScheduler:
+    """Runs the snapshot job (catching up first) after every market close.
+
+    Safe to start in every worker: the job's lease lets one of them write.
+    """
+
+    def __init__(self, job: Optional[SnapshotJob] = None):
+        self.job = job
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    async def start(self) -> None:
+        if not EOD_SNAPSHOTS_ENABLED or (self._task is not None and not self._task.done()):
+            return
+        if self.job is None:
+            self.job = SnapshotJob()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                # Synchronous database work stays off the event loop
+                await loop.run_in_executor(None, self.job.run)
+            except Exception:
+                logger.error("EOD snapshot run failed", exc_info=True)
+            await asyncio.sleep(seconds_until_next_close(datetime.utcnow()))
+
+
+# Process-wide scheduler started with the app
+snapshot_scheduler = SnapshotScheduler()
+
+
+def get_snapshot_scheduler() -> SnapshotScheduler:
+    """Return the shared process-wide snapshot scheduler"""
+    return snapshot_scheduler
@@ -0,0 +1,98 @@
+"""
+Compressed per-year chunks of portfolio history
+
+PERFORMANCE NOTE: A portfolio's daily history is stored as one chunk per
+calendar year instead of one row per day. A chunk holds the first date, the
+day gaps between consecutive points (delta-encoded, uint16, zlib) and the
+value/change/change_percent columns as column-major float64 (zlib). Values
+stay exact. A year of daily points compresses to a few KB instead of a
+row plus index entry per point, and a date-range read only decompresses
+the chunks whose year overlaps the range.
+"""
+import os
+import zlib
+from datetime import date
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+
+ZLIB_LEVEL = int(os.getenv("HISTORY_ZLIB_LEVEL", "6"))
+# value, change, change_percent
+HISTORY_COLUMNS = 3
+# Day gaps are stored as uint16: consecutive points may be at most this far apart
+MAX_DAY_GAP = np.iinfo(np.uint16).max
+
+EMPTY_DATES = np.zeros(0, dtype="datetime64[D]")
+
+
+def empty_columns() -> np.ndarray:
+    return np.zeros((0, HISTORY_COLUMNS))
+
+
+def encode_chunk(dates: np.ndarray, columns: np.ndarray) -> Dict[str, object]:
+    """Chunk fields for sorted, unique `dates` and their (n, 3) `columns`"""
+    days = np.asarray(dates, dtype="datetime64[D]")
+    if not len(days):
+        raise ValueError("Cannot encode an empty history chunk")
+    gaps = np.diff(days.astype(np.int64))
+    if len(gaps) and (gaps.min() <= 0 or gaps.max() > MAX_DAY_GAP):
+        raise ValueError("History dates must be strictly increasing, at most 65535 days apart")
+    values = np.ascontiguousarray(np.asarray(columns, dtype="<f8").T)
+    return {
+        "first_date": days[0].item(),
+        "last_date": days[-1].item(),
+        "points": len(days),
+        "dates": zlib.compress(gaps.astype("<u2").tobytes(), ZLIB_LEVEL),
+        "values": zlib.compress(values.tobytes(), ZLIB_LEVEL),
+    }
+
+
+def decode_chunk(first_date: date, points: int, dates: bytes, values: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    """Dates (datetime64[D]) and (n, 3) columns of one stored chunk"""
+    gaps = np.frombuffer(zlib.decompress(dates), dtype="<u2").astype(np.int64)
+    offsets = np.concatenate(([0], np.cumsum(gaps)))
+    days = np.datetime64(first_date, "D") + offsets
+    columns = np.frombuffer(zlib.decompress(values), dtype="<f8").reshape(HISTORY_COLUMNS, points).T
+    return days, columns
+
+
+def split_years(dates: np.ndarray) -> Iterator[Tuple[int, slice]]:
+    """(year, slice) runs of sorted dates"""
+    years = np.asarray(dates, dtype="datetime64[Y]").astype(np.int64) + 1970
+    edges = np.flatnonzero(np.diff(years)) + 1
+    bounds = np.concatenate(([0], edges, [len(years)]))
+    for lo, hi in zip(bounds[:-1].tolist(), bounds[1:].tolist()):
+        yield int(years[lo]), slice(lo, hi)
+
+
+def merge_points(
+    dates: np.ndarray, columns: np.ndarray, new_dates: np.ndarray, new_columns: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Merge new points into a sorted series (a new point replaces one on the same date).
+
+    Returns the merged dates and columns and how many dates were not there before.
+    """
+    new_dates = np.asarray(new_dates, dtype="datetime64[D]")
+    new_columns = np.asarray(new_columns, dtype=np.float64)
+    if len(new_dates) == 1 and (not len(dates) or new_dates[0] > dates[-1]):
+        # The common case, a new latest point: append without searching
+        return np.concatenate((dates, new_dates)), np.concatenate((columns, new_columns)), 1
+    # Last write wins among duplicates in the new batch
+    reverse_unique, reverse_first = np.unique(new_dates[::-1], return_index=True)
+    new_columns = new_columns[::-1][reverse_first]
+    new_dates = reverse_unique
+    kept = ~np.isin(dates, new_dates)
+    merged_dates = np.concatenate((dates[kept], new_dates))
+    merged_columns = np.concatenate((columns[kept], new_columns))
+    order = np.argsort(merged_dates, kind="stable")
+    added = len(merged_dates) - len(dates)
+    return merged_dates[order], merged_columns[order], added
+
+
+def clip_range(
+    dates: np.ndarray, columns: np.ndarray, start: Optional[date] = None, end: Optional[date] = None
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Points of a sorted series within [start, end]"""
+    lo = 0 if start is None else int(np.searchsorted(dates, np.datetime64(start, "D"), side="left"))
+    hi = len(dates) if end is None else int(np.searchsorted(dates, np.datetime64(end, "D"), side="right"))
+    return dates[lo:hi], columns[lo:hi]
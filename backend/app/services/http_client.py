@@ -0,0 +1,93 @@
+"""
+Shared async HTTP client for upstream market data providers
+
+PERFORMANCE NOTE: A single pooled httpx.AsyncClient is created at application
+startup and closed at shutdown. Quote requests reuse keep-alive connections
+(and HTTP/2 multiplexing when the server negotiates it) instead of paying a
+fresh TCP/TLS handshake on every call.
+"""
+import logging
+import os
+from typing import Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Connection pool configuration (overridable via environment)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "30"))
+
+# Default timeouts in seconds; individual requests may override them
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "10"))
+HTTP_WRITE_TIMEOUT = float(os.getenv("HTTP_WRITE_TIMEOUT", "10"))
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "5"))
+
+_client: Optional[httpx.AsyncClient] = None
+
+
+def http2_available() -> bool:
+    """Return True when the optional h2 package needed for HTTP/2 is installed"""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def build_timeout(total: Optional[float] = None) -> httpx.Timeout:
+    """Build a timeout, using `total` for every phase when given"""
+    if total is not None:
+        return httpx.Timeout(total)
+    return httpx.Timeout(
+        connect=HTTP_CONNECT_TIMEOUT,
+        read=HTTP_READ_TIMEOUT,
+        write=HTTP_WRITE_TIMEOUT,
+        pool=HTTP_POOL_TIMEOUT,
+    )
+
+
+def create_http_client(
+    max_connections: int = HTTP_MAX_CONNECTIONS,
+    max_keepalive_connections: int = HTTP_MAX_KEEPALIVE_CONNECTIONS,
+    timeout: Optional[httpx.Timeout] = None,
+) -> httpx.AsyncClient:
+    """Create a pooled AsyncClient with connection limits and HTTP/2 if available"""
+    limits = httpx.Limits(
+        max_connections=max_connections,
+        max_keepalive_connections=max_keepalive_connections,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY,
+    )
+    return httpx.AsyncClient(
+        limits=limits,
+        timeout=timeout or build_timeout(),
+        http2=http2_available(),
+    )
+
+
+async def init_http_client() -> httpx.AsyncClient:
+    """Create the app-wide client (called from the application lifespan)"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_http_client()
+        logger.info("Shared HTTP client started (http2=%s)", http2_available())
+    return _client
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """Return the app-wide client, creating it lazily outside the app lifespan"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_http_client()
+    return _client
+
+
+async def close_http_client() -> None:
+    """Close the app-wide client and release pooled connections"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        logger.info("Shared HTTP client closed")
@@ -0,0 +1,248 @@
+"""
+Vectorized technical indicators over price series
+
+PERFORMANCE NOTE: Every indicator works on whole arrays with time on the last
+axis, so a (symbols x days) matrix is processed in a single pass instead of a
+Python loop per symbol and per day. Windowed sums use cumulative sums, and
+exponential smoothing is solved in closed form over blocks of bars, so only
+one small Python iteration runs per block. Warm-up positions are NaN and
+input prices must not contain NaN.
+"""
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+# Indicator defaults (classic parameterizations)
+TRADING_DAYS_PER_YEAR = 252
+SMA_WINDOW = 20
+EMA_SPAN = 20
+RSI_PERIOD = 14
+MACD_FAST = 12
+MACD_SLOW = 26
+MACD_SIGNAL = 9
+BOLLINGER_WINDOW = 20
+BOLLINGER_K = 2.0
+VOLATILITY_WINDOW = 20
+WARMUP_BARS = MACD_SLOW + MACD_SIGNAL  # history needed before every indicator is defined
+
+# Largest growth factor allowed inside one closed-form EMA block (keeps precision)
+EMA_BLOCK_MAX_GAIN = 1e10
+EMA_MAX_BLOCK = 256
+
+# Annualized volatility bands used for the human-readable label
+LOW_VOLATILITY = 0.20
+HIGH_VOLATILITY = 0.40
+
+
+def _as_2d(values: np.ndarray) -> np.ndarray:
+    values = np.asarray(values, dtype=np.float64)
+    return values[np.newaxis, :] if values.ndim == 1 else values
+
+
+def _like_input(result: np.ndarray, original: np.ndarray) -> np.ndarray:
+    return result[0] if np.ndim(original) == 1 else result
+
+
+def log_returns(prices: np.ndarray) -> np.ndarray:
+    """log(p_t / p_{t-1}); the first position is NaN"""
+    p = _as_2d(prices)
+    out = np.full_like(p, np.nan)
+    out[:, 1:] = np.diff(np.log(p), axis=1)
+    return _like_input(out, prices)
+
+
+def _rolling_sum(values: np.ndarray, window: int) -> np.ndarray:
+    out = np.empty_like(values)
+    if window > values.shape[1]:
+        out.fill(np.nan)
+        return out
+    csum = np.cumsum(values, axis=1)
+    out[:, :window - 1] = np.nan
+    out[:, window - 1] = csum[:, window - 1]
+    np.subtract(csum[:, window:], csum[:, :-window], out=out[:, window:])
+    return out
+
+
+def sma(prices: np.ndarray, window: int = SMA_WINDOW) -> np.ndarray:
+    """Simple moving average over `window` observations"""
+    p = _as_2d(prices)
+    return _like_input(_rolling_sum(p, window) / window, prices)
+
+
+def _rolling_std(values: np.ndarray, window: int, ddof: int = 0) -> np.ndarray:
+    # Shift by the first value so the sum-of-squares form keeps its precision
+    centered = values - values[:, :1]
+    mean = _rolling_sum(centered, window) / window
+    mean_sq = _rolling_sum(centered * centered, window) / window
+    var = np.maximum(mean_sq - mean * mean, 0.0) * (window / (window - ddof))
+    return np.sqrt(var)
+
+
+def _ema_2d(values: np.ndarray, alpha: float) -> np.ndarray:
+    """y_t = alpha * x_t + (1 - alpha) * y_{t-1} with y_0 = x_0, along axis 1.
+
+    Inside a block of L bars the recurrence has the closed form
+    y_t = d^(t+1) * (y_prev + alpha * cumsum(x_i * d^-(i+1))_t) with d = 1 - alpha,
+    so each block is a few array operations and only the carry is sequential.
+    """
+    decay = 1.0 - alpha
+    if decay <= 0.0:
+        return values.copy()
+    block = int(min(EMA_MAX_BLOCK, max(1, np.log(EMA_BLOCK_MAX_GAIN) // -np.log(decay))))
+    steps = np.arange(1, block + 1)
+    growth = decay ** -steps
+    shrink = decay ** steps
+    out = np.empty_like(values)
+    carry = values[:, 0].copy()
+    for start in range(0, values.shape[1], block):
+        length = min(block, values.shape[1] - start)
+        chunk = np.cumsum(values[:, start:start + length] * growth[:length], axis=1)
+        chunk *= alpha
+        chunk += carry[:, np.newaxis]
+        chunk *= shrink[:length]
+        out[:, start:start + length] = chunk
+        carry = chunk[:, -1]
+    return out
+
+
+def ema(prices: np.ndarray, span: int = EMA_SPAN, alpha: Optional[float] = None) -> np.ndarray:
+    """Exponential moving average seeded with the first price (pandas adjust=False)"""
+    p = _as_2d(prices)
+    alpha = 2.0 / (span + 1.0) if alpha is None else alpha
+    return _like_input(_ema_2d(p, alpha), prices)
+
+
+def rsi(prices: np.ndarray, period: int = RSI_PERIOD) -> np.ndarray:
+    """Relative Strength Index with Wilder smoothing (alpha = 1 / period)"""
+    p = _as_2d(prices)
+    out = np.full_like(p, np.nan)
+    delta = np.diff(p, axis=1)
+    if delta.shape[1] < period:
+        return _like_input(out, prices)
+    # Wilder's seed is the simple average of the first `period` moves
+    avg_gain = _ema_2d(_seed_with_mean(np.maximum(delta, 0.0), period), 1.0 / period)
+    avg_move = _ema_2d(_seed_with_mean(np.abs(delta), period), 1.0 / period)
+    # RSI = 100 - 100 / (1 + gain / loss) = 100 * gain / (gain + loss); flat series read 100
+    np.divide(100.0 * avg_gain, avg_move, out=out[:, period:], where=avg_move > 0)
+    out[:, period:][avg_move <= 0] = 100.0
+    return _like_input(out, prices)
+
+
+def _seed_with_mean(moves: np.ndarray, period: int) -> np.ndarray:
+    """Replace the first `period` moves by their mean so an EMA starts at the SMA"""
+    seeded = moves[:, period - 1:].copy()
+    seeded[:, 0] = moves[:, :period].mean(axis=1)
+    return seeded
+
+
+def macd(
+    prices: np.ndarray, fast: int = MACD_FAST, slow: int = MACD_SLOW, signal: int = MACD_SIGNAL
+) -> Dict[str, np.ndarray]:
+    """MACD line (fast EMA - slow EMA), its signal EMA and the histogram"""
+    p = _as_2d(prices)
+    line = _ema_2d(p, 2.0 / (fast + 1.0))
+    line -= _ema_2d(p, 2.0 / (slow + 1.0))
+    signal_line = _ema_2d(line, 2.0 / (signal + 1.0))
+    return {
+        "macd": _like_input(line, prices),
+        "macd_signal": _like_input(signal_line, prices),
+        "macd_hist": _like_input(line - signal_line, prices),
+    }
+
+
+def _bands(mid: np.ndarray, p: np.ndarray, window: int, k: float) -> Dict[str, np.ndarray]:
+    width = _rolling_std(p, window)
+    width *= k
+    return {"bollinger_mid": mid, "bollinger_upper": mid + width, "bollinger_lower": mid - width}
+
+
+def bollinger(
+    prices: np.ndarray, window: int = BOLLINGER_WINDOW, k: float = BOLLINGER_K
+) -> Dict[str, np.ndarray]:
+    """Middle band (SMA) and upper/lower bands at k population standard deviations"""
+    p = _as_2d(prices)
+    bands = _bands(_rolling_sum(p, window) / window, p, window, k)
+    return {name: _like_input(values, prices) for name, values in bands.items()}
+
+
+def _rolling_volatility(returns: np.ndarray, window: int, periods_per_year: int) -> np.ndarray:
+    out = np.full_like(returns, np.nan)
+    if window >= 2:
+        out[:, 1:] = _rolling_std(returns[:, 1:], window, ddof=1)
+        out[:, 1:] *= np.sqrt(periods_per_year)
+    return out
+
+
+def realized_volatility(
+    prices: np.ndarray,
+    window: Optional[int] = VOLATILITY_WINDOW,
+    periods_per_year: int = TRADING_DAYS_PER_YEAR,
+) -> np.ndarray:
+    """Annualized rolling std of log returns; `window=None` gives one value per series"""
+    returns = _as_2d(log_returns(prices))
+    if window is not None:
+        return _like_input(_rolling_volatility(returns, window, periods_per_year), prices)
+    if returns.shape[1] < 3:
+        vol = np.full(returns.shape[0], np.nan)
+    else:
+        vol = returns[:, 1:].std(axis=1, ddof=1) * np.sqrt(periods_per_year)
+    return vol[0] if np.ndim(prices) == 1 else vol
+
+
+def compute_indicators(prices: np.ndarray) -> Dict[str, np.ndarray]:
+    """Every indicator for a series or a (symbols x days) matrix in one call.
+
+    Shared intermediates (log returns, the SMA that doubles as the middle
+    Bollinger band) are computed once.
+    """
+    p = _as_2d(prices)
+    returns = _as_2d(log_returns(p))
+    mid = _rolling_sum(p, SMA_WINDOW) / SMA_WINDOW
+    if BOLLINGER_WINDOW == SMA_WINDOW:
+        bands = _bands(mid, p, BOLLINGER_WINDOW, BOLLINGER_K)
+    else:
+        bands = bollinger(p)
+    result = {
+        "log_return": returns,
+        "volatility": _rolling_volatility(returns, VOLATILITY_WINDOW, TRADING_DAYS_PER_YEAR),
+        f"sma_{SMA_WINDOW}": mid,
+        f"ema_{EMA_SPAN}": _ema_2d(p, 2.0 / (EMA_SPAN + 1.0)),
+        f"rsi_{RSI_PERIOD}": rsi(p),
+    }
+    result.update(macd(p))
+    result.update(bands)
+    return {name: _like_input(values, prices) for name, values in result.items()}
+
+
+def volatility_label(annualized: float) -> str:
+    if not np.isfinite(annualized):
+        return "unknown"
+    if annualized < LOW_VOLATILITY:
+        return "low"
+    if annualized > HIGH_VOLATILITY:
+        return "high"
+    return "moderate"
+
+
+def _latest(values: np.ndarray) -> Optional[float]:
+    value = float(values[-1]) if len(values) else float("nan")
+    return round(value, 4) if np.isfinite(value) else None
+
+
+def summarize(prices: np.ndarray, indicators: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, Any]:
+    """Latest indicator readings plus trend and volatility labels for one series"""
+    prices = np.asarray(prices, dtype=np.float64)
+    indicators = indicators if indicators is not None else compute_indicators(prices)
+    latest = {name: _latest(values) for name, values in indicators.items()}
+    vol = realized_volatility(prices, window=None)
+    trend_sma = indicators[f"sma_{SMA_WINDOW}"]
+    if len(prices) and np.isfinite(trend_sma[-1]):
+        direction = "upward" if prices[-1] > trend_sma[-1] else "downward"
+    else:
+        direction = "upward" if len(prices) and prices[-1] > prices[0] else "downward"
+    latest.update({
+        "annualized_volatility": round(float(vol), 4) if np.isfinite(vol) else None,
+        "volatility": volatility_label(vol),
+        "trend_direction": direction,
+    })
+    return latest
@@ -0,0 +1,143 @@
+"""
+Memoized chat intents keyed by a normalized query
+
+PERFORMANCE NOTE: Many users ask the same few questions ("price of AAPL",
+"market summary"), and each parse is a full LLM round trip. Parsed intents
+are cached under a normalized form of the query (case, whitespace and
+punctuation folded, tickers canonicalized, so "What's the price of $aapl?"
+and "whats the price of AAPL" share an entry) with a TTL and LRU eviction.
+A hit skips the LLM call entirely; the counters report the hit rate and the
+calls and tokens saved.
+"""
+import copy
+import os
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+# Cache configuration (overridable via environment)
+INTENT_CACHE_TTL = float(os.getenv("INTENT_CACHE_TTL", "3600"))  # seconds
+INTENT_CACHE_MAX_ENTRIES = int(os.getenv("INTENT_CACHE_MAX_ENTRIES", "4096"))
+
+# Company names users type instead of the ticker
+TICKER_ALIASES = {
+    "apple": "AAPL",
+    "alphabet": "GOOGL",
+    "google": "GOOGL",
+    "microsoft": "MSFT",
+    "amazon": "AMZN",
+    "tesla": "TSLA",
+    "facebook": "META",
+    "nvidia": "NVDA",
+    "netflix": "NFLX",
+}
+KNOWN_TICKERS = frozenset(TICKER_ALIASES.values())
+
+_EXCHANGE_PREFIX_RE = re.compile(r"\b(?:nasdaq|nyse|amex)\s*:\s*")
+_POSSESSIVE_RE = re.compile(r"\b([a-z]+)['’]s\b")
+_APOSTROPHE_RE = re.compile(r"['’]")
+_NON_WORD_RE = re.compile(r"[^a-z0-9]+")
+
+
+def _ticker(token: str) -> Optional[str]:
+    return TICKER_ALIASES.get(token) or (token.upper() if token.upper() in KNOWN_TICKERS else None)
+
+
+def _drop_possessive(match: "re.Match[str]") -> str:
+    # "tesla's" -> "tesla", but "what's" -> "whats"
+    word = match.group(1)
+    return word if _ticker(word) else word + "s"
+
+
+def normalize_query(query: str) -> str:
+    """Cache key for a chat query.
+
+    Case, whitespace and punctuation are folded ("what's" -> "whats"), `$`
+    and exchange prefixes and possessives are dropped ("NASDAQ:AAPL's" ->
+    "AAPL") and company names map to their ticker ("apple" -> "AAPL").
+    """
+    text = query.casefold()
+    text = _EXCHANGE_PREFIX_RE.sub(" ", text)
+    text = _POSSESSIVE_RE.sub(_drop_possessive, text)
+    text = _APOSTROPHE_RE.sub("", text)
+    return " ".join(_ticker(token) or token for token in _NON_WORD_RE.sub(" ", text).split())
+
+
+class IntentCache:
+    """TTL + LRU cache of parsed intents keyed by normalized query"""
+
+    def __init__(
+        self,
+        ttl_seconds: float = INTENT_CACHE_TTL,
+        max_entries: int = INTENT_CACHE_MAX_ENTRIES,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._clock = clock
+        # key -> (expires_at, intent, tokens spent parsing it); least to most recently used
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any], int]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+        self.tokens_saved = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, query: str) -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached intent for `query`, or None (counted as a miss)"""
+        key = normalize_query(query)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] <= self._clock():
+            del self._entries[key]
+            self.expirations += 1
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        self.tokens_saved += entry[2]
+        return copy.deepcopy(entry[1])
+
+    def set(self, query: str, intent: Dict[str, Any], tokens: int = 0) -> None:
+        """Store the intent parsed for `query` and what parsing it cost in tokens"""
+        key = normalize_query(query)
+        self._entries[key] = (self._clock() + self.ttl_seconds, copy.deepcopy(intent), tokens)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "llm_calls_saved": self.hits,
+            "tokens_saved": self.tokens_saved,
+        }
+
+    def reset_stats(self) -> None:
+        self.hits = self.misses = self.expirations = self.evictions = self.tokens_saved = 0
+
+
+# Process-wide cache shared by every chat request
+intent_cache = IntentCache()
+
+
+def get_intent_cache() -> IntentCache:
+    """Return the shared process-wide intent cache"""
+    return intent_cache
@@ -0,0 +1,209 @@
+"""
+Local keyword classifier for chat intents with calibrated confidence
+
+PERFORMANCE NOTE: Every feature phrase is compiled into one alternation
+regex (longest phrases first), so a query is scanned once instead of once
+per keyword list. Matched phrases add weights to each action's score,
+tickers are picked out by a second precompiled pattern, and a temperature-
+scaled softmax over the five scores gives the confidence. A query
+classifies in microseconds; the chatbot calls the LLM only when the
+confidence is below INTENT_CONFIDENCE_THRESHOLD. The weights and the
+temperature are tuned on tests/data/intent_tuning.jsonl only; accuracy and
+the share of queries answered locally at the threshold are reported on
+tests/data/intent_holdout.jsonl, which is never used for tuning (see
+benchmarks/bench_intent_classifier.py).
+"""
+import math
+import os
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+from .intent_cache import TICKER_ALIASES
+
+DEFAULT_TIME_RANGE = 30  # days, when the query names no period
+# Minimum confidence for answering without the LLM
+INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.8"))
+# Softmax temperature. Deliberately above the NLL optimum on the tuning set,
+# which the weights were fitted to and so overstates how separable real queries are
+INTENT_TEMPERATURE = 1.0
+
+ACTIONS = ("get_price", "get_trends", "analyze_risk", "compare_portfolios", "market_summary")
+PRICE, TRENDS, RISK, PORTFOLIOS, MARKET = ACTIONS
+
+# With no evidence at all the query is treated as a general market question
+ACTION_BIAS = {MARKET: 1.0}
+
+# phrase -> {action: weight}; matched at word boundaries, each phrase counted once
+FEATURES: Dict[str, Dict[str, float]] = {
+    # Price
+    "price": {PRICE: 2.5}, "prices": {PRICE: 2.5}, "quote": {PRICE: 3.0}, "quotes": {PRICE: 3.0},
+    "trading at": {PRICE: 3.0}, "trading for": {PRICE: 3.0}, "how much": {PRICE: 2.5}, "cost": {PRICE: 2.0},
+    "worth": {PRICE: 2.0}, "value": {PRICE: 1.5}, "current": {PRICE: 1.0}, "latest": {PRICE: 1.0},
+    "right now": {PRICE: 1.0}, "real time": {PRICE: 1.5}, "share price": {PRICE: 1.0}, "close at": {PRICE: 2.5},
+    "up today": {PRICE: 2.0}, "today": {PRICE: 0.5, MARKET: 1.0}, "doing today": {PRICE: 1.0},
+    # Trends and indicators
+    "trend": {TRENDS: 3.0}, "trends": {TRENDS: 3.0}, "trending": {TRENDS: 3.0}, "uptrend": {TRENDS: 3.5},
+    "downtrend": {TRENDS: 3.5}, "performance": {TRENDS: 2.0}, "performed": {TRENDS: 2.5}, "perform": {TRENDS: 2.5},
+    "performing": {TRENDS: 1.5}, "growth": {TRENDS: 2.0}, "grown": {TRENDS: 2.5}, "chart": {TRENDS: 3.0},
+    "history": {TRENDS: 3.0}, "price history": {TRENDS: 3.0}, "price trend": {TRENDS: 2.0}, "historical": {TRENDS: 3.0}, "moving average": {TRENDS: 3.5},
+    "moving averages": {TRENDS: 3.5}, "rsi": {TRENDS: 4.0}, "macd": {TRENDS: 4.0}, "bollinger": {TRENDS: 4.0},
+    "indicator": {TRENDS: 3.5}, "indicators": {TRENDS: 3.5}, "technical": {TRENDS: 3.0}, "momentum": {TRENDS: 3.5},
+    "overbought": {TRENDS: 4.0}, "oversold": {TRENDS: 4.0}, "trajectory": {TRENDS: 3.5}, "moved": {TRENDS: 2.5},
+    "going up": {TRENDS: 3.0}, "going down": {TRENDS: 3.0}, "gone up": {TRENDS: 3.0}, "over the": {TRENDS: 1.5},
+    "past": {TRENDS: 1.0}, "last": {TRENDS: 0.5}, "since": {TRENDS: 2.0}, "recently": {TRENDS: 1.5},
+    "long term": {TRENDS: 2.5}, "this year": {TRENDS: 2.0}, "this week": {TRENDS: 1.5}, "vs": {TRENDS: 1.5},
+    "versus": {TRENDS: 1.5}, "analysis": {TRENDS: 1.0, RISK: 0.5}, "analyze": {TRENDS: 0.5, RISK: 0.5},
+    # Risk
+    "risk": {RISK: 4.0}, "risky": {RISK: 4.5}, "volatility": {RISK: 4.5}, "volatile": {RISK: 4.5},
+    "var": {RISK: 4.5}, "cvar": {RISK: 5.0}, "value at risk": {RISK: 5.0}, "beta": {RISK: 4.0},
+    "drawdown": {RISK: 4.5}, "safe": {RISK: 3.5}, "dangerous": {RISK: 4.0}, "exposed": {RISK: 3.0},
+    "exposure": {RISK: 3.0}, "diversified": {RISK: 4.0}, "diversification": {RISK: 4.0},
+    "expected shortfall": {RISK: 5.0}, "standard deviation": {RISK: 4.5}, "lose": {RISK: 5.0},
+    "loss": {RISK: 2.0}, "worst case": {RISK: 3.0}, "downside": {RISK: 2.5}, "tail": {RISK: 1.5},
+    # The user's own portfolios
+    "portfolio": {PORTFOLIOS: 3.0}, "portfolio performance": {PORTFOLIOS: 3.5}, "portfolios": {PORTFOLIOS: 4.5}, "my portfolio": {PORTFOLIOS: 1.5},
+    "my portfolios": {PORTFOLIOS: 2.0}, "compare": {PORTFOLIOS: 1.5, TRENDS: 1.0}, "comparison": {PORTFOLIOS: 2.0},
+    "my holdings": {PORTFOLIOS: 2.0}, "my investments": {PORTFOLIOS: 2.0}, "my accounts": {PORTFOLIOS: 4.0},
+    "side by side": {PORTFOLIOS: 2.0}, "stack up": {PORTFOLIOS: 2.5}, "rank": {PORTFOLIOS: 2.0},
+    "best performing": {PORTFOLIOS: 1.0}, "gains and losses": {PORTFOLIOS: 3.0}, "break down": {PORTFOLIOS: 2.0},
+    # The market as a whole
+    "market": {MARKET: 4.0}, "markets": {MARKET: 4.5}, "stock market": {MARKET: 1.0}, "overview": {MARKET: 2.5},
+    "summary": {MARKET: 3.0}, "summarize": {MARKET: 1.5}, "recap": {MARKET: 3.5}, "update": {MARKET: 2.0},
+    "s&p": {MARKET: 3.5}, "s&p 500": {MARKET: 1.0}, "dow": {MARKET: 4.0}, "nasdaq": {MARKET: 4.0},
+    "indices": {MARKET: 4.5}, "indexes": {MARKET: 4.5}, "index": {MARKET: 3.5}, "wall street": {MARKET: 5.0},
+    "sector": {MARKET: 4.0}, "sectors": {MARKET: 4.0}, "movers": {MARKET: 4.0}, "top gainers": {MARKET: 5.0},
+    "sentiment": {MARKET: 3.5}, "news": {MARKET: 3.0}, "stocks": {MARKET: 2.0}, "should i buy": {MARKET: 1.0},
+}
+
+# Weights from the tickers found and their interaction with the phrases above
+TICKER_WEIGHTS = {PRICE: 2.0, TRENDS: 0.5, RISK: 0.5, MARKET: -3.0, PORTFOLIOS: -3.0}
+MULTI_TICKER_COMPARE = {TRENDS: 1.5, PORTFOLIOS: -2.0}
+PERSONAL_WEIGHTS = {PORTFOLIOS: 1.5, MARKET: -2.0}  # "my ..." without tickers
+
+# Tickers users type in lower case (besides the company-name aliases)
+LOWERCASE_TICKERS = frozenset({
+    "aapl", "googl", "goog", "msft", "amzn", "tsla", "meta", "nvda", "nflx", "amd", "intc", "jpm",
+    "ibm", "orcl", "crm", "uber", "pypl", "spy", "qqq", "baba", "adbe", "csco",
+}) | frozenset(TICKER_ALIASES)
+# Upper-case words that are not tickers
+NOT_TICKERS = frozenset({
+    "I", "A", "AI", "US", "USA", "UK", "EU", "ETF", "ETFS", "CEO", "CFO", "IPO", "VAR", "CVAR", "RSI", "MACD",
+    "SMA", "EMA", "EPS", "PE", "GDP", "OK", "ATH", "YTD", "DOW", "NYSE", "NASDAQ", "AMEX", "S", "P", "TV", "IT",
+})
+
+PERIOD_DAYS = {"day": 1, "week": 7, "month": 30, "quarter": 90, "year": 365}
+_PERIOD_RE = re.compile(r"\b(\d+)[\s-]*(day|week|month|quarter|year)s?\b|\b(?:last|past|this)\s+(day|week|month|quarter|year)\b")
+_TICKER_RE = re.compile(r"\$([A-Za-z]{1,5}(?:\.[A-Za-z])?)\b|\b([A-Z]{1,5}(?:\.[A-Z])?)\b|\b([A-Za-z]{2,9})\b")
+
+
+def _compile_features(phrases) -> "re.Pattern[str]":
+    ordered = sorted(phrases, key=len, reverse=True)
+    return re.compile(r"(?<![\w&])(?:" + "|".join(re.escape(p) for p in ordered) + r")(?![\w&])")
+
+
+class IntentClassifier:
+    """Scores the five chat actions from one scan of the query"""
+
+    def __init__(
+        self,
+        features: Optional[Dict[str, Dict[str, float]]] = None,
+        temperature: float = INTENT_TEMPERATURE,
+        threshold: float = INTENT_CONFIDENCE_THRESHOLD,
+    ):
+        self.features = features if features is not None else FEATURES
+        self.temperature = temperature
+        self.threshold = threshold
+        self._pattern = _compile_features(self.features)
+        self.classified = 0
+        self.confident = 0
+
+    def symbols(self, query: str) -> List[str]:
+        """Tickers mentioned in the query, in order: $TICKER, upper-case words and known names"""
+        letters = re.findall(r"[A-Za-z]{2,}", query)
+        # An all-caps query is shouting, not a list of tickers
+        shouting = len(letters) > 2 and sum(w.isupper() for w in letters) > len(letters) / 2
+        found: List[str] = []
+        for match in _TICKER_RE.finditer(query):
+            dollar, upper, lower = match.groups()
+            if dollar:
+                symbol = dollar.upper()
+            elif upper:
+                lowered = upper.lower()
+                if upper in NOT_TICKERS or (shouting and lowered not in LOWERCASE_TICKERS):
+                    continue
+                symbol = TICKER_ALIASES.get(lowered, upper)
+            elif lower.lower() in LOWERCASE_TICKERS:
+                symbol = TICKER_ALIASES.get(lower.lower(), lower.upper())
+            else:
+                continue
+            if symbol not in found:
+                found.append(symbol)
+        return found
+
+    @staticmethod
+    def time_range(text: str) -> int:
+        """Days named in the (lower-cased) query, or the default range"""
+        match = _PERIOD_RE.search(text)
+        if match is None:
+            return DEFAULT_TIME_RANGE
+        count, unit, bare_unit = match.groups()
+        return int(count) * PERIOD_DAYS[unit] if count else PERIOD_DAYS[bare_unit]
+
+    def scores(self, query: str) -> Tuple[Dict[str, float], List[str]]:
+        """Raw action scores and the tickers found"""
+        text = re.sub(r"['’]", "", query.casefold()).replace("-", " ")
+        scores = {action: ACTION_BIAS.get(action, 0.0) for action in ACTIONS}
+        for phrase in set(self._pattern.findall(text)):
+            for action, weight in self.features[phrase].items():
+                scores[action] += weight
+        symbols = self.symbols(query)
+        if symbols:
+            for action, weight in TICKER_WEIGHTS.items():
+                scores[action] += weight
+            if len(symbols) > 1:
+                for action, weight in MULTI_TICKER_COMPARE.items():
+                    scores[action] += weight
+        elif re.search(r"\bmy\b", text):
+            for action, weight in PERSONAL_WEIGHTS.items():
+                scores[action] += weight
+        return scores, symbols
+
+    def classify(self, query: str) -> Dict[str, Any]:
+        """{"action", "symbols", "time_range", "confidence"} for a chat query"""
+        scores, symbols = self.scores(query)
+        best = max(ACTIONS, key=scores.__getitem__)
+        # Softmax probability of the best action, computed relative to it for stability
+        total = sum(math.exp((scores[a] - scores[best]) / self.temperature) for a in ACTIONS)
+        confidence = round(1.0 / total, 4)
+        self.classified += 1
+        if confidence >= self.threshold:
+            self.confident += 1
+        return {
+            "action": best,
+            "symbols": symbols,
+            "time_range": self.time_range(query.casefold()),
+            "confidence": confidence,
+        }
+
+    def is_confident(self, intent: Dict[str, Any]) -> bool:
+        return intent["confidence"] >= self.threshold
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "classified": self.classified,
+            "answered_locally": self.confident,
+            "threshold": self.threshold,
+            "local_rate": round(self.confident / self.classified, 4) if self.classified else 0.0,
+        }
+
+    def reset_stats(self) -> None:
+        self.classified = self.confident = 0
+
+
+# Process-wide classifier (the compiled pattern is shared by every request)
+intent_classifier = IntentClassifier()
+
+
+def get_intent_classifier() -> IntentClassifier:
+    """Return the shared process-wide intent classifier"""
+    return intent_classifier
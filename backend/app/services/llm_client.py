@@ -0,0 +1,183 @@
+"""
+Shared async OpenAI client for the chatbot
+
+PERFORMANCE NOTE: Chat completions go through one AsyncOpenAI client backed
+by a pooled httpx.AsyncClient, so an LLM call awaits the network instead of
+blocking the event loop, and calls reuse keep-alive connections. Streamed
+completions hold their slot until the last token. Explicit
+connect/read timeouts bound a stuck call, and a process-wide semaphore caps
+the completions in flight; calls over the cap wait (at most
+LLM_QUEUE_TIMEOUT seconds) for a slot rather than piling onto the provider.
+"""
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+from openai import AsyncOpenAI
+
+logger = logging.getLogger(__name__)
+
+# Optional OpenAI-compatible endpoint (proxies, local stand-ins)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+# Most chat completions in flight across the whole process
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+# Seconds a call may wait for a free slot before giving up
+LLM_QUEUE_TIMEOUT = float(os.getenv("LLM_QUEUE_TIMEOUT", "10"))
+# Timeouts in seconds; read covers the whole generation of a non-streamed reply
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "30"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "1"))
+
+
+class LLMClient:
+    """AsyncOpenAI client with a pooled connection and a cap on in-flight calls"""
+
+    def __init__(
+        self,
+        api_key: str,
+        base_url: Optional[str] = None,
+        max_concurrency: int = LLM_MAX_CONCURRENCY,
+        queue_timeout: float = LLM_QUEUE_TIMEOUT,
+    ):
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        timeout = httpx.Timeout(LLM_READ_TIMEOUT, connect=LLM_CONNECT_TIMEOUT)
+        self._http = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+            timeout=timeout,
+        )
+        self.client = AsyncOpenAI(
+            api_key=api_key,
+            base_url=base_url,
+            timeout=timeout,
+            max_retries=LLM_MAX_RETRIES,
+            http_client=self._http,
+        )
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.in_flight = 0
+        self.waiting = 0
+        self.peak_in_flight = 0
+        self.calls = 0
+        self.failures = 0
+        self.queue_timeouts = 0
+        self.total_seconds = 0.0
+
+    @property
+    def is_closed(self) -> bool:
+        return self._http.is_closed
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._loop is not loop:
+            # A semaphore's waiters belong to one loop
+            self._slots = asyncio.Semaphore(self.max_concurrency)
+            self._loop = loop
+        return self._slots
+
+    @asynccontextmanager
+    async def _slot(self) -> AsyncIterator[None]:
+        """Hold one of the in-flight slots, waiting at most `queue_timeout` for it"""
+        slots = self._semaphore()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.queue_timeouts += 1
+            raise
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.failures += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self.calls += 1
+            self.total_seconds += time.perf_counter() - started
+            slots.release()
+
+    async def complete(self, **params: Any) -> Any:
+        """Create a chat completion once a slot is free (`params` as for the OpenAI API)"""
+        async with self._slot():
+            return await self.client.chat.completions.create(**params)
+
+    async def stream(self, **params: Any) -> AsyncIterator[str]:
+        """Yield the content deltas of a streamed chat completion.
+
+        The slot is held until the stream ends or the caller stops iterating.
+        """
+        async with self._slot():
+            chunks = await self.client.chat.completions.create(stream=True, **params)
+            try:
+                async for chunk in chunks:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            finally:
+                await chunks.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "peak_in_flight": self.peak_in_flight,
+            "calls": self.calls,
+            "failures": self.failures,
+            "queue_timeouts": self.queue_timeouts,
+            "avg_seconds": round(self.total_seconds / self.calls, 3) if self.calls else None,
+        }
+
+    async def aclose(self) -> None:
+        await self.client.close()
+
+
+_client: Optional[LLMClient] = None
+
+
+def create_llm_client() -> Optional[LLMClient]:
+    """Create a client from OPENAI_API_KEY, or None when no key is configured"""
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        return None
+    return LLMClient(
+        api_key=api_key,
+        base_url=OPENAI_BASE_URL,
+        max_concurrency=LLM_MAX_CONCURRENCY,
+        queue_timeout=LLM_QUEUE_TIMEOUT,
+    )
+
+
+async def init_llm_client() -> Optional[LLMClient]:
+    """Create the app-wide client (called from the application lifespan)"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_llm_client()
+        if _client is not None:
+            logger.info("Shared LLM client started (max %d calls in flight)", _client.max_concurrency)
+    return _client
+
+
+def get_llm_client() -> Optional[LLMClient]:
+    """Return the app-wide client, creating it lazily outside the app lifespan"""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = create_llm_client()
+    return _client
+
+
+async def close_llm_client() -> None:
+    """Close the app-wide client and release pooled connections"""
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+        logger.info("Shared LLM client closed")
@@ -0,0 +1,206 @@
+"""
+Running cross-portfolio analytics
+
+PERFORMANCE NOTE: The analytics summary used to re-sum every portfolio and
+scan them all for the best and worst performer on each request. Combined
+value and cost are now running sums adjusted by the delta of each portfolio
+whenever it is created, updated, deleted or revalued, and best/worst
+performers sit in two heaps keyed by gain/loss percent with lazy deletion:
+an update pushes a new (key, version) entry and the superseded one is
+discarded only when it surfaces at the top. Reading the summary is O(1)
+plus the amortized pops of stale tops. A tick that revalues a large share
+of all portfolios rebuilds the heaps with one heapify instead of pushing
+entry by entry.
+"""
+import heapq
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .valuation_engine import ValuationEngine, get_valuation_engine
+
+logger = logging.getLogger(__name__)
+
+# Re-sum the running totals from the per-portfolio values this often (float drift)
+RESUM_EVERY_UPDATES = int(os.getenv("ANALYTICS_RESUM_EVERY_UPDATES", "1024"))
+# Batches touching more than this share of portfolios rebuild the heaps instead
+HEAP_REBUILD_FRACTION = float(os.getenv("ANALYTICS_HEAP_REBUILD_FRACTION", "0.25"))
+# Rebuild a heap once stale entries outnumber live ones this many times over
+HEAP_STALE_FACTOR = 4
+
+# (sort key, version, engine row); the best-performer heap negates the key
+HeapEntry = Tuple[float, int, int]
+
+
+def gain_loss_percent(value: np.ndarray, cost: np.ndarray) -> np.ndarray:
+    """Total gain/loss percent, 0 for portfolios without cost (as the models report it)"""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(cost != 0, (value - cost) / cost * 100, 0.0)
+
+
+class PortfolioAnalytics:
+    """Combined totals and best/worst performer, maintained incrementally"""
+
+    def __init__(self, engine: Optional[ValuationEngine] = None):
+        self.engine = get_valuation_engine() if engine is None else engine
+        self._lock = threading.RLock()
+        # Indexed by valuation engine row
+        self._tracked = np.zeros(0, dtype=bool)
+        self._value = np.zeros(0)
+        self._cost = np.zeros(0)
+        self._percent = np.zeros(0)
+        self._version = np.zeros(0, dtype=np.int64)
+        self._names: Dict[int, str] = {}
+        self._rows: Dict[str, int] = {}
+        self.total_value = 0.0
+        self.total_cost = 0.0
+        self._best: List[HeapEntry] = []
+        self._worst: List[HeapEntry] = []
+        self._heaps_dirty = False
+        self._updates_since_resum = 0
+        self.heap_rebuilds = 0
+        self.engine.add_listener(self.refresh)
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _reserve(self, row: int) -> None:
+        if row < len(self._tracked):
+            return
+        size = max(row + 1, len(self._tracked) * 2, 64)
+        for name in ("_tracked", "_value", "_cost", "_percent", "_version"):
+            values = getattr(self, name)
+            grown = np.zeros(size, dtype=values.dtype)
+            grown[: len(values)] = values
+            setattr(self, name, grown)
+
+    # ---------------------------- Updates ----------------------------- #
+    def track(self, portfolio_id: str, name: str) -> None:
+        """Start (or keep) counting a portfolio already loaded into the engine"""
+        row = int(self.engine.rows_for([portfolio_id])[0])
+        if row < 0:
+            raise KeyError(f"Portfolio {portfolio_id} has no holdings in the valuation engine")
+        with self._lock:
+            if self._rows.get(portfolio_id) == row and self._names.get(row) == name:
+                return  # already counted; revaluations arrive through `refresh`
+            self._reserve(row)
+            self._rows[portfolio_id] = row
+            self._names[row] = name
+            self._tracked[row] = True
+            self._apply(np.array([row], dtype=np.int64))
+
+    def forget(self, portfolio_id: str) -> None:
+        """Drop a deleted portfolio from the totals; its heap entries go stale"""
+        with self._lock:
+            row = self._rows.pop(portfolio_id, None)
+            if row is None:
+                return
+            self.total_value -= self._value[row]
+            self.total_cost -= self._cost[row]
+            self._value[row] = self._cost[row] = self._percent[row] = 0.0
+            self._tracked[row] = False
+            self._version[row] += 1
+            del self._names[row]
+
+    def refresh(self, portfolio_ids: np.ndarray) -> None:
+        """Valuation engine listener: fold revalued portfolios into the aggregates"""
+        rows = self.engine.rows_for(portfolio_ids)
+        with self._lock:
+            rows = rows[(rows >= 0) & (rows < len(self._tracked))]
+            rows = rows[self._tracked[rows]]
+            if len(rows):
+                self._apply(rows)
+
+    def _apply(self, rows: np.ndarray) -> None:
+        value, cost = self.engine.row_totals(rows)
+        self.total_value += float((value - self._value[rows]).sum())
+        self.total_cost += float((cost - self._cost[rows]).sum())
+        self._value[rows] = value
+        self._cost[rows] = cost
+        percent = gain_loss_percent(value, cost)
+        self._percent[rows] = percent
+        self._version[rows] += 1
+
+        self._updates_since_resum += 1
+        if self._updates_since_resum >= RESUM_EVERY_UPDATES:
+            self._resum()
+        if self._heaps_dirty or len(rows) > max(1, HEAP_REBUILD_FRACTION * len(self._rows)):
+            self._heaps_dirty = True  # rebuilt once, on the next read
+            return
+        versions = self._version[rows]
+        for row, key, version in zip(rows.tolist(), percent.tolist(), versions.tolist()):
+            heapq.heappush(self._best, (-key, version, row))
+            heapq.heappush(self._worst, (key, version, row))
+
+    def _resum(self) -> None:
+        tracked = self._tracked
+        self.total_value = float(self._value[tracked].sum())
+        self.total_cost = float(self._cost[tracked].sum())
+        self._updates_since_resum = 0
+
+    def _rebuild_heaps(self) -> None:
+        rows = np.flatnonzero(self._tracked)
+        keys = self._percent[rows].tolist()
+        versions = self._version[rows].tolist()
+        rows = rows.tolist()
+        self._best = [(-k, v, r) for k, v, r in zip(keys, versions, rows)]
+        self._worst = list(zip(keys, versions, rows))
+        heapq.heapify(self._best)
+        heapq.heapify(self._worst)
+        self._heaps_dirty = False
+        self.heap_rebuilds += 1
+
+    # ----------------------------- Reads ------------------------------ #
+    def _top(self, heap: List[HeapEntry]) -> Optional[int]:
+        while heap:
+            _, version, row = heap[0]
+            if self._tracked[row] and self._version[row] == version:
+                return row
+            heapq.heappop(heap)
+        return None
+
+    def summary(self) -> Dict[str, Any]:
+        """Combined analytics across all tracked portfolios"""
+        with self._lock:
+            if self._heaps_dirty or len(self._best) > HEAP_STALE_FACTOR * len(self._rows) + 64:
+                self._rebuild_heaps()
+            best, worst = self._top(self._best), self._top(self._worst)
+            total_value, total_cost = self.total_value, self.total_cost
+            count = len(self._rows)
+
+            def performer(row: Optional[int]) -> Optional[Dict[str, Any]]:
+                if row is None:
+                    return None
+                return {"name": self._names[row], "gain_loss_percent": round(float(self._percent[row]), 2)}
+
+            best_performer, worst_performer = performer(best), performer(worst)
+
+        gain = total_value - total_cost
+        return {
+            "total_portfolios": count,
+            "combined_value": round(total_value, 2),
+            "combined_gain_loss": round(gain, 2),
+            "combined_gain_loss_percent": round(gain / total_cost * 100, 2) if total_cost > 0 else 0.0,
+            "best_performer": best_performer,
+            "worst_performer": worst_performer,
+        }
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "portfolios": len(self._rows),
+            "best_heap": len(self._best),
+            "worst_heap": len(self._worst),
+            "heap_rebuilds": self.heap_rebuilds,
+        }
+
+
+# Process-wide aggregates over the shared valuation engine
+portfolio_analytics = PortfolioAnalytics()
+
+
+def get_portfolio_analytics() -> PortfolioAnalytics:
+    """Return the shared process-wide portfolio analytics"""
+    return portfolio_analytics
@@ -0,0 +1,114 @@
+"""
+Date-aligned portfolio comparison
+
+PERFORMANCE NOTE: Histories are outer-joined on their dates into one
+(days x portfolios) frame, so alignment, forward-fill, rebasing and every
+requested metric are column-wise NumPy/pandas operations instead of nested
+per-point loops. Portfolios created on different days line up by date, with
+gaps left empty (or carried forward) rather than shifted by list position.
+"""
+import re
+from datetime import date
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .indicators import TRADING_DAYS_PER_YEAR
+
+REBASE_VALUE = 100.0
+SUPPORTED_METRICS = ("value", "returns", "annualized_return", "volatility", "sharpe", "max_drawdown")
+
+_TIME_RANGE = re.compile(r"^(\d+)\s*([dwmy])$")
+_UNIT_DAYS = {"d": 1, "w": 7, "m": 30, "y": 365}
+
+
+def time_range_start(time_range: str, today: Optional[date] = None) -> Optional[np.datetime64]:
+    """First date covered by a range like '90d', '6m', '1y', 'ytd' or 'max' (None = everything)"""
+    today = today or date.today()
+    key = (time_range or "max").strip().lower()
+    if key in ("max", "all"):
+        return None
+    if key == "ytd":
+        return np.datetime64(f"{today.year}-01-01", "D")
+    match = _TIME_RANGE.match(key)
+    if not match:
+        raise ValueError(f"Unsupported time range: {time_range}")
+    return np.datetime64(today, "D") - np.timedelta64(int(match.group(1)) * _UNIT_DAYS[match.group(2)], "D")
+
+
+def align_histories(
+    histories: Dict[str, Tuple[np.ndarray, np.ndarray]],
+    start: Optional[np.datetime64] = None,
+) -> pd.DataFrame:
+    """Outer-join {key: (dates, values)} on date into a (days x keys) frame"""
+    columns = {}
+    for key, (dates, values) in histories.items():
+        series = pd.Series(np.asarray(values, dtype=np.float64), index=pd.DatetimeIndex(dates))
+        columns[key] = series[~series.index.duplicated(keep="last")]
+    # The union of all dates becomes the index; absent days are NaN
+    frame = pd.DataFrame(columns, columns=list(histories)).sort_index()
+    if start is not None:
+        frame = frame.loc[frame.index >= pd.Timestamp(start)]
+    return frame
+
+
+def fill_gaps(frame: pd.DataFrame) -> pd.DataFrame:
+    """Forward-fill missing dates inside each column's history (not before or after it)"""
+    return frame.ffill().where(frame.bfill().notna())
+
+
+def rebase(frame: pd.DataFrame, base: float = REBASE_VALUE) -> pd.DataFrame:
+    """Scale every column so its first available value equals `base`"""
+    return frame / frame.bfill().iloc[0] * base if len(frame) else frame
+
+
+def compute_metrics(frame: pd.DataFrame, metrics: Sequence[str]) -> Dict[str, Dict[str, Optional[float]]]:
+    """Requested metrics for every column at once, as {column: {metric: value}}"""
+    unknown = [m for m in metrics if m not in SUPPORTED_METRICS]
+    if unknown:
+        raise ValueError(f"Unsupported metrics: {', '.join(unknown)} (supported: {', '.join(SUPPORTED_METRICS)})")
+
+    metrics = list(dict.fromkeys(metrics))
+    if frame.empty:
+        return {column: dict.fromkeys(metrics) for column in frame.columns}
+
+    # Interior gaps carry the last value; days outside a portfolio's history stay out
+    values = fill_gaps(frame)
+    first, last = values.bfill().iloc[0], values.ffill().iloc[-1]
+    daily = values.pct_change(fill_method=None)
+    table = pd.DataFrame(index=frame.columns, dtype=np.float64)
+
+    if "value" in metrics:
+        table["value"] = last
+    if "returns" in metrics or "annualized_return" in metrics:
+        growth = last / first
+        if "returns" in metrics:
+            table["returns"] = (growth - 1) * 100
+        if "annualized_return" in metrics:
+            observed = values.notna()
+            years = (observed[::-1].idxmax() - observed.idxmax()).dt.days / 365.25
+            table["annualized_return"] = (growth ** (1 / years.where(years > 0)) - 1) * 100
+    if "volatility" in metrics or "sharpe" in metrics:
+        std = daily.std()
+        if "volatility" in metrics:
+            table["volatility"] = std * np.sqrt(TRADING_DAYS_PER_YEAR) * 100
+        if "sharpe" in metrics:
+            table["sharpe"] = daily.mean() / std.where(std > 0) * np.sqrt(TRADING_DAYS_PER_YEAR)
+    if "max_drawdown" in metrics:
+        table["max_drawdown"] = (values / values.cummax() - 1).min() * 100
+
+    table = table[metrics].round(4)
+    table = table.astype(object).where(table.notna(), None)
+    return table.to_dict("index")
+
+
+def chart_records(frame: pd.DataFrame, labels: Dict[str, str]) -> List[Dict[str, Any]]:
+    """Rows of {'date': ..., <label>: value} for charting; missing points are None"""
+    values = np.round(frame.to_numpy(dtype=np.float64), 2)
+    # One bulk conversion to Python objects (NaN -> None) instead of per-cell work
+    cells = values.astype(object)
+    cells[np.isnan(values)] = None
+    keys = ["date"] + [labels.get(column, column) for column in frame.columns]
+    dates = frame.index.strftime("%Y-%m-%d").tolist()
+    return [dict(zip(keys, (day, *row))) for day, row in zip(dates, cells.tolist())]
@@ -0,0 +1,297 @@
+"""
+Database service layer for portfolios, holdings and daily history
+
+PERFORMANCE NOTE: Holdings are eager-loaded with a JOIN, so fetching one
+portfolio or a page of them is a single SELECT regardless of how many
+holdings each has (no N+1 lazy loads). History is never loaded through the
+relationship: it is kept as compressed per-year chunks (see
+history_chunks.py) and a range read fetches and decodes only the chunks
+whose year overlaps the range. Like the chat database service, every
+method is synchronous and is meant to be called from sync (threadpool)
+endpoints.
+"""
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import delete, func, insert, select, update
+from sqlalchemy.orm import Session, joinedload
+
+from ..models import Portfolio, PortfolioHistory, PortfolioStock
+from ..portfolio_models import HoldingDB, PortfolioDB, PortfolioHistoryChunkDB
+from .history_chunks import (
+    EMPTY_DATES, HISTORY_COLUMNS, clip_range, decode_chunk, empty_columns, encode_chunk,
+    merge_points, split_years
+)
+
+class PortfolioDatabaseService:
+    """Service for storing portfolios and reading them back efficiently"""
+
+    @staticmethod
+    def list_portfolios(
+        db: Session,
+        owner_id: Optional[str] = None,
+        limit: Optional[int] = None,
+        offset: int = 0
+    ) -> List[PortfolioDB]:
+        """Portfolios (newest first) with their holdings, in one query"""
+        query = db.query(PortfolioDB).options(joinedload(PortfolioDB.holdings))
+        if owner_id is not None:
+            query = query.filter(PortfolioDB.owner_id == owner_id)
+        query = query.order_by(PortfolioDB.created_at.desc(), PortfolioDB.id)
+        if limit is not None:
+            query = query.limit(limit)
+        if offset:
+            query = query.offset(offset)
+        return query.all()
+
+    @staticmethod
+    def iter_portfolios(db: Session, page_size: int = 1000) -> Iterator[List[PortfolioDB]]:
+        """Every portfolio with its holdings, a page at a time in id order (keyset paging)"""
+        last_id = None
+        while True:
+            query = db.query(PortfolioDB).options(joinedload(PortfolioDB.holdings))
+            if last_id is not None:
+                query = query.filter(PortfolioDB.id > last_id)
+            page = query.order_by(PortfolioDB.id).limit(page_size).all()
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            last_id = page[-1].id
+
+    @staticmethod
+    def iter_holding_pages(
+        db: Session,
+        page_size: int = 1000,
+        after: Optional[str] = None
+    ) -> Iterator[Tuple[List[str], List[Tuple[str, str, int, float]]]]:
+        """Portfolio ids (> `after`) a page at a time in id order, with their holdings as
+        (portfolio_id, symbol, shares, last_price) rows.
+
+        Two plain SELECTs per page (ids, then holdings by id range on the
+        indexed portfolio_id), no ORM objects: for jobs that value every portfolio.
+        """
+        last_id = after
+        while True:
+            query = select(PortfolioDB.id).order_by(PortfolioDB.id).limit(page_size)
+            if last_id is not None:
+                query = query.where(PortfolioDB.id > last_id)
+            ids = db.execute(query).scalars().all()
+            if not ids:
+                return
+            h = HoldingDB
+            query = select(h.portfolio_id, h.symbol, h.shares, h.last_price).where(h.portfolio_id <= ids[-1])
+            if last_id is not None:
+                query = query.where(h.portfolio_id > last_id)
+            holdings = [tuple(row) for row in db.execute(query)]
+            last_id = ids[-1]
+            yield ids, holdings
+            if len(ids) < page_size:
+                return
+
+    @staticmethod
+    def get_portfolio(db: Session, portfolio_id: str) -> Optional[PortfolioDB]:
+        """One portfolio with its holdings, in one query"""
+        return (db.query(PortfolioDB)
+            .options(joinedload(PortfolioDB.holdings))
+            .filter(PortfolioDB.id == portfolio_id)
+            .first())
+
+    @staticmethod
+    def count_portfolios(db: Session) -> int:
+        return db.query(PortfolioDB).count()
+
+    @staticmethod
+    def change_marker(db: Session) -> Tuple[Any, ...]:
+        """Cheap fingerprint of the stored portfolios (two aggregate queries).
+
+        Portfolio count and latest update time, holding count and total
+        shares: it changes whenever any worker creates, renames, deletes or
+        re-holds a portfolio.
+        """
+        portfolios = db.execute(select(func.count(PortfolioDB.id), func.max(PortfolioDB.updated_at))).one()
+        holdings = db.execute(select(func.count(HoldingDB.id), func.sum(HoldingDB.shares))).one()
+        return tuple(portfolios) + tuple(holdings)
+
+    @staticmethod
+    def save_portfolio(db: Session, portfolio: Portfolio, owner_id: Optional[str] = None) -> PortfolioDB:
+        """Insert or replace a portfolio and its holdings from the API model"""
+        row = PortfolioDatabaseService.get_portfolio(db, portfolio.id)
+        if row is None:
+            row = PortfolioDB(id=portfolio.id, owner_id=owner_id, created_at=portfolio.created_at)
+            db.add(row)
+        row.name = portfolio.name
+        row.description = portfolio.description
+        row.updated_at = portfolio.updated_at
+        row.holdings = [
+            HoldingDB(
+                symbol=stock.symbol, name=stock.name, shares=stock.shares,
+                avg_cost=stock.avg_cost, last_price=stock.current_price
+            )
+            for stock in portfolio.stocks
+        ]
+        db.commit()
+        return row
+
+    @staticmethod
+    def delete_portfolio(db: Session, portfolio_id: str) -> bool:
+        """Delete a portfolio, its holdings and its history"""
+        # Bulk deletes: SQLite does not enforce ON DELETE CASCADE by default
+        db.execute(delete(PortfolioHistoryChunkDB).where(PortfolioHistoryChunkDB.portfolio_id == portfolio_id))
+        db.execute(delete(HoldingDB).where(HoldingDB.portfolio_id == portfolio_id))
+        deleted = db.execute(delete(PortfolioDB).where(PortfolioDB.id == portfolio_id)).rowcount
+        db.commit()
+        return bool(deleted)
+
+    @staticmethod
+    def add_history(db: Session, points: Iterable[PortfolioHistory]) -> int:
+        """Store history points; returns how many dates were new (same-date points are replaced)"""
+        grouped: Dict[str, List[PortfolioHistory]] = {}
+        for point in points:
+            grouped.setdefault(point.portfolio_id, []).append(point)
+        series = {
+            portfolio_id: (
+                np.array([p.date for p in group], dtype="datetime64[D]"),
+                np.array([(p.value, p.change, p.change_percent) for p in group], dtype=np.float64)
+            )
+            for portfolio_id, group in grouped.items()
+        }
+        return PortfolioDatabaseService.add_history_arrays(db, series)
+
+    @staticmethod
+    def add_history_arrays(
+        db: Session,
+        series: Dict[str, Tuple[np.ndarray, np.ndarray]],
+        commit: bool = True
+    ) -> int:
+        """Merge {portfolio_id: (dates, (n, 3) value/change/change_percent)} into the yearly chunks.
+
+        The chunks touched are read in one query and written back with one bulk
+        INSERT and one bulk UPDATE (executemany, no ORM objects). With
+        `commit=False` the writes are left in the caller's transaction.
+        """
+        updates: Dict[Tuple[str, int], Tuple[np.ndarray, np.ndarray]] = {}
+        for portfolio_id, (dates, columns) in series.items():
+            dates = np.asarray(dates, dtype="datetime64[D]")
+            columns = np.asarray(columns, dtype=np.float64).reshape(len(dates), HISTORY_COLUMNS)
+            if len(dates) == 1:  # daily snapshots: one point, one chunk
+                updates[(portfolio_id, dates[0].item().year)] = (dates, columns)
+                continue
+            order = np.argsort(dates, kind="stable")
+            dates, columns = dates[order], columns[order]
+            for year, run in split_years(dates):
+                updates[(portfolio_id, year)] = (dates[run], columns[run])
+        if not updates:
+            return 0
+
+        c = PortfolioHistoryChunkDB
+        existing = {
+            (portfolio_id, year): (first_date, points, dates, values)
+            for portfolio_id, year, first_date, points, dates, values in db.execute(
+                select(c.portfolio_id, c.year, c.first_date, c.points, c.dates, c.values).where(
+                    c.portfolio_id.in_({pid for pid, _ in updates}),
+                    c.year.in_({year for _, year in updates})
+                )
+            )
+        }
+        inserts, replacements, added = [], [], 0
+        for key, (dates, columns) in updates.items():
+            stored = existing.get(key)
+            if stored is None:
+                old_dates, old_columns = EMPTY_DATES, empty_columns()
+            else:
+                old_dates, old_columns = decode_chunk(*stored)
+            dates, columns, new = merge_points(old_dates, old_columns, dates, columns)
+            row = {"portfolio_id": key[0], "year": key[1], **encode_chunk(dates, columns)}
+            (inserts if stored is None else replacements).append(row)
+            added += new
+        if inserts:
+            db.execute(insert(c), inserts)
+        if replacements:
+            db.execute(update(c), replacements)  # bulk UPDATE by primary key
+        if commit:
+            db.commit()
+        return added
+
+    @staticmethod
+    def get_history_arrays(
+        db: Session,
+        portfolio_id: str,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        last: Optional[int] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Dates and (n, 3) value/change/change_percent columns, decoding only the chunks in range"""
+        c = PortfolioHistoryChunkDB
+        query = select(c.first_date, c.points, c.dates, c.values).where(c.portfolio_id == portfolio_id)
+        if start is not None:
+            query = query.where(c.year >= start.year)
+        if end is not None:
+            query = query.where(c.year <= end.year)
+        # Newest chunk first, so `last` stops decoding as soon as it has enough points
+        decoded, points = [], 0
+        result = db.execute(query.order_by(c.year.desc()))
+        try:
+            for first_date, count, dates, values in result:
+                chunk_dates, chunk_columns = clip_range(*decode_chunk(first_date, count, dates, values), start, end)
+                decoded.append((chunk_dates, chunk_columns))
+                points += len(chunk_dates)
+                if last and points >= last:
+                    break
+        finally:
+            result.close()
+        if not decoded:
+            return EMPTY_DATES, empty_columns()
+        decoded.reverse()
+        dates = np.concatenate([d for d, _ in decoded])
+        columns = np.concatenate([v for _, v in decoded])
+        if last:
+            dates, columns = dates[-last:], columns[-last:]
+        return dates, columns
+
+    @staticmethod
+    def get_history(
+        db: Session,
+        portfolio_id: str,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+        last: Optional[int] = None
+    ) -> List[PortfolioHistory]:
+        """History points in date order, optionally bounded by date and/or the last N points"""
+        dates, columns = PortfolioDatabaseService.get_history_arrays(db, portfolio_id, start, end, last)
+        return [
+            PortfolioHistory(
+                portfolio_id=portfolio_id, date=day, value=value,
+                change=change, change_percent=change_percent
+            )
+            for day, (value, change, change_percent) in zip(dates.astype(str).tolist(), columns.tolist())
+        ]
+
+    @staticmethod
+    def to_portfolio(row: PortfolioDB) -> Portfolio:
+        """API model of a stored portfolio; values are filled in when marked to market"""
+        stocks = [
+            PortfolioStock(
+                symbol=h.symbol, name=h.name, shares=h.shares, avg_cost=h.avg_cost,
+                current_price=h.last_price, value=h.shares * h.last_price, allocation=0.0
+            )
+            for h in row.holdings
+        ]
+        total_value = sum(s.value for s in stocks)
+        total_cost = sum(s.shares * s.avg_cost for s in stocks)
+        return Portfolio(
+            id=row.id,
+            owner_id=row.owner_id,
+            name=row.name,
+            description=row.description,
+            total_value=total_value,
+            total_cost=total_cost,
+            day_change=0.0,
+            day_change_percent=0.0,
+            total_gain_loss=total_value - total_cost,
+            total_gain_loss_percent=(total_value - total_cost) / total_cost * 100 if total_cost else 0.0,
+            stocks=stocks,
+            created_at=row.created_at or datetime.utcnow(),
+            updated_at=row.updated_at or datetime.utcnow()
+        )
@@ -0,0 +1,160 @@
+"""
+In-process quote cache with per-symbol TTL, LRU eviction and single-flight fetches
+
+PERFORMANCE NOTE: Every chat turn asks for the same handful of tickers. Serving
+them from memory saves provider quota and upstream latency, and concurrent
+misses for one symbol share a single upstream request instead of stampeding
+the provider.
+"""
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Cache configuration (overridable via environment)
+QUOTE_CACHE_TTL = float(os.getenv("QUOTE_CACHE_TTL", "60"))  # seconds
+QUOTE_CACHE_MAX_ENTRIES = int(os.getenv("QUOTE_CACHE_MAX_ENTRIES", "1024"))
+
+QuoteFetcher = Callable[[str], Awaitable[Dict[str, Any]]]
+
+
+class QuoteCache:
+    """TTL + LRU cache of quote dicts keyed by upper-cased symbol"""
+
+    def __init__(
+        self,
+        ttl_seconds: float = QUOTE_CACHE_TTL,
+        max_entries: int = QUOTE_CACHE_MAX_ENTRIES,
+        ttl_overrides: Optional[Dict[str, float]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.ttl_overrides = {k.upper(): v for k, v in (ttl_overrides or {}).items()}
+        self._clock = clock
+        # symbol -> (expires_at, quote); ordered from least to most recently used
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.upstream_requests = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def ttl_for(self, symbol: str) -> float:
+        """Return the TTL in seconds that applies to a symbol"""
+        return self.ttl_overrides.get(symbol.upper(), self.ttl_seconds)
+
+    def get(self, symbol: str) -> Optional[Dict[str, Any]]:
+        """Return a fresh cached quote or None; counts as a hit when found"""
+        key = symbol.upper()
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, quote = entry
+        if expires_at <= self._clock():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return dict(quote)
+
+    def set(self, symbol: str, quote: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        """Store a quote, evicting the least recently used entries when full"""
+        key = symbol.upper()
+        ttl = self.ttl_for(key) if ttl is None else ttl
+        self._entries[key] = (self._clock() + ttl, dict(quote))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def record_miss(self, coalesced: bool = False) -> None:
+        """Count a lookup that found no fresh quote, for callers fetching outside get_or_fetch.
+
+        `coalesced` marks a lookup that joined a fetch already under way.
+        """
+        if coalesced:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+
+    def record_upstream(self) -> None:
+        """Count one call to the quote provider made outside get_or_fetch"""
+        self.upstream_requests += 1
+
+    def invalidate(self, symbol: Optional[str] = None) -> None:
+        """Drop one symbol, or every entry when no symbol is given"""
+        if symbol is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(symbol.upper(), None)
+
+    async def get_or_fetch(
+        self, symbol: str, fetch: QuoteFetcher, ttl: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """Return a cached quote or fetch it, coalescing concurrent misses.
+
+        Exceptions raised by `fetch` propagate to every waiter and are not cached.
+        """
+        cached = self.get(symbol)
+        if cached is not None:
+            return cached
+
+        key = symbol.upper()
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return dict(await asyncio.shield(pending))
+
+        self.misses += 1
+        self.upstream_requests += 1
+        future: "asyncio.Future[Dict[str, Any]]" = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            quote = await fetch(symbol)
+        except BaseException as exc:
+            future.set_exception(exc)
+            # Mark retrieved so a miss without followers does not log a warning
+            future.exception()
+            raise
+        else:
+            self.set(key, quote, ttl)
+            future.set_result(quote)
+            return dict(quote)
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters used to size the TTL against provider rate limits"""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "upstream_requests": self.upstream_requests,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
+
+    def reset_stats(self) -> None:
+        self.hits = self.misses = self.coalesced = self.evictions = self.upstream_requests = 0
+
+
+# Process-wide cache shared by the chatbot and quote endpoints
+quote_cache = QuoteCache()
+
+
+def get_quote_cache() -> QuoteCache:
+    """Return the shared process-wide quote cache"""
+    return quote_cache
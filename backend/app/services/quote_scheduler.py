@@ -0,0 +1,410 @@
+"""
+Rate-limit-aware scheduler that owns every upstream quote request
+
+PERFORMANCE NOTE: The quote provider only allows a handful of calls per
+minute. All fetches go through one token bucket sized to that quota and a
+priority queue where user-facing requests always run before background
+refreshes. Callers never block on the provider once a symbol has been seen:
+they get the freshest known quote immediately with its age, while the idle
+quota refreshes symbols ranked by staleness x popularity. Symbols with live
+stream subscribers are watched: they stay refresh candidates however rarely
+anything else asks for them. Every fresh quote is also written to the quote
+store, whose change listeners feed the live quote stream and the portfolio
+valuation engine.
+"""
+import asyncio
+import heapq
+import logging
+import math
+import os
+import random
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .quote_cache import QuoteCache, get_quote_cache
+from .quote_store import QuoteStore, get_quote_store
+
+logger = logging.getLogger(__name__)
+
+# Provider quota and scheduling configuration (overridable via environment)
+QUOTE_RATE_LIMIT_PER_MINUTE = float(os.getenv("QUOTE_RATE_LIMIT_PER_MINUTE", "5"))  # provider quota
+QUOTE_COLD_WAIT = float(os.getenv("QUOTE_COLD_WAIT", "3"))  # seconds to wait for a never-seen symbol
+QUOTE_REFRESH_INTERVAL = float(os.getenv("QUOTE_REFRESH_INTERVAL", "5"))  # seconds between refresh checks
+QUOTE_POPULARITY_HALF_LIFE = float(os.getenv("QUOTE_POPULARITY_HALF_LIFE", "600"))  # seconds
+USER_TOKEN_RESERVE = 1  # tokens background refresh always leaves for user requests
+MIN_POPULARITY = 0.05  # symbols decayed below this are no longer refreshed
+# Without ALPHA_VANTAGE_API_KEY, refreshes nudge the last price so streams still move
+DEMO_QUOTE_TICKS = os.getenv("DEMO_QUOTE_TICKS", "true").lower() in ("1", "true", "yes")
+
+# Queue priorities (lower runs first)
+USER_PRIORITY = 0
+REFRESH_PRIORITY = 1
+
+QuoteFetcher = Callable[[str], Awaitable[Dict[str, Any]]]
+
+
+class QuoteRateLimited(Exception):
+    """The provider rejected a request because the quota is exhausted"""
+
+
+class TokenBucket:
+    """Classic token bucket: `capacity` burst, refilled at `rate` tokens/second"""
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        self._refill()
+        if self._tokens < tokens:
+            return False
+        self._tokens -= tokens
+        return True
+
+    def delay(self, tokens: float = 1.0) -> float:
+        """Seconds until `tokens` are available (0 when they already are)"""
+        self._refill()
+        missing = tokens - self._tokens
+        if missing <= 0:
+            return 0.0
+        return missing / self.rate if self.rate > 0 else math.inf
+
+    def drain(self) -> None:
+        """Empty the bucket, e.g. after the provider reports throttling"""
+        self._refill()
+        self._tokens = 0.0
+
+
+class QuoteScheduler:
+    """Single owner of upstream quote calls with prioritized, rate-limited dispatch"""
+
+    def __init__(
+        self,
+        fetch: QuoteFetcher,
+        bucket: Optional[TokenBucket] = None,
+        cache: Optional[QuoteCache] = None,
+        store: Optional[QuoteStore] = None,
+        cold_wait: float = QUOTE_COLD_WAIT,
+        refresh_interval: float = QUOTE_REFRESH_INTERVAL,
+        popularity_half_life: float = QUOTE_POPULARITY_HALF_LIFE,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.fetch = fetch
+        if bucket is None:
+            bucket = TokenBucket(QUOTE_RATE_LIMIT_PER_MINUTE / 60.0, max(QUOTE_RATE_LIMIT_PER_MINUTE, 1.0))
+        self.bucket = bucket
+        # An empty cache is falsy, so test for None explicitly
+        self.cache = cache if cache is not None else get_quote_cache()
+        # Where fresh quotes are published (None: only cached here)
+        self.store = store
+        self.cold_wait = cold_wait
+        self.refresh_interval = refresh_interval
+        self.popularity_half_life = popularity_half_life
+        self._clock = clock
+        # symbol -> (fetched_at, quote); the last good quote, kept after its TTL
+        self._latest: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        # symbol -> (decayed request count, updated_at)
+        self._popularity: Dict[str, Tuple[float, float]] = {}
+        # Symbols with live stream subscribers, refreshed whenever stale
+        self._watched: Set[str] = set()
+        self._last_attempt: Dict[str, float] = {}
+        self._reset_queue()
+        self._task: Optional["asyncio.Task[None]"] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.upstream_requests = 0
+        self.failures = 0
+        self.throttled = 0
+        self.refreshes = 0
+
+    def _reset_queue(self) -> None:
+        # Heap of (priority, seq, symbol); superseded entries are skipped on pop
+        self._heap: List[Tuple[int, int, str]] = []
+        self._queued: Dict[str, int] = {}
+        self._seq = 0
+        self._waiters: Dict[str, "asyncio.Future[Dict[str, Any]]"] = {}
+        self._inflight: Set[str] = set()
+        self._tasks: Set["asyncio.Task[None]"] = set()
+        self._wakeup: Optional[asyncio.Event] = None
+
+    # ----------------------------- Lifecycle ----------------------------- #
+    def _ensure_running(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._task is not None and not self._task.done() and self._loop is loop:
+            return
+        if self._loop is not loop:
+            # Futures and events belong to one loop; queued work cannot move across
+            self._reset_queue()
+        self._loop = loop
+        self._wakeup = asyncio.Event()
+        self._task = loop.create_task(self._run())
+
+    async def start(self) -> None:
+        self._ensure_running()
+
+    async def stop(self) -> None:
+        tasks = [t for t in [self._task, *self._tasks] if t is not None]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+        self._loop = None
+        self._reset_queue()
+
+    def reset(self) -> None:
+        """Forget all quotes, popularity and counters (the worker is left alone)"""
+        self._latest.clear()
+        self._popularity.clear()
+        self._last_attempt.clear()
+        self.bucket._tokens = self.bucket.capacity
+        self.upstream_requests = self.failures = self.throttled = self.refreshes = 0
+
+    # ----------------------------- Queue ----------------------------- #
+    def request_refresh(self, symbol: str, priority: int = REFRESH_PRIORITY) -> None:
+        """Queue an upstream fetch; a user request upgrades a queued background one"""
+        key = symbol.upper()
+        if key in self._inflight or self._queued.get(key, priority + 1) <= priority:
+            return
+        self._queued[key] = priority
+        self._seq += 1
+        heapq.heappush(self._heap, (priority, self._seq, key))
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def watch(self, symbols: Iterable[str]) -> None:
+        """Keep refreshing symbols in the background while something streams them"""
+        self._watched.update(s.upper() for s in symbols)
+        try:
+            self._ensure_running()
+        except RuntimeError:
+            return  # no event loop here: picked up once the worker runs
+        self._wakeup.set()
+
+    def unwatch(self, symbols: Iterable[str]) -> None:
+        """Stop the background refresh that `watch` asked for; popularity still applies"""
+        self._watched.difference_update(s.upper() for s in symbols)
+
+    def _pop(self) -> Optional[Tuple[str, int]]:
+        while self._heap:
+            priority, _, symbol = heapq.heappop(self._heap)
+            if self._queued.get(symbol) == priority:
+                del self._queued[symbol]
+                return symbol, priority
+        return None
+
+    def _popularity_of(self, symbol: str, now: float) -> float:
+        count, updated = self._popularity.get(symbol, (0.0, now))
+        return count * 0.5 ** ((now - updated) / self.popularity_half_life)
+
+    def _record_request(self, symbol: str) -> None:
+        now = self._clock()
+        self._popularity[symbol] = (self._popularity_of(symbol, now) + 1.0, now)
+
+    def next_refresh_candidate(self) -> Optional[str]:
+        """The stale symbol with the highest staleness x popularity, if any"""
+        now = self._clock()
+        best, best_score = None, 0.0
+        for symbol in set(self._popularity) | self._watched:
+            popularity = self._popularity_of(symbol, now)
+            if symbol in self._watched:
+                popularity = max(popularity, 1.0)
+            elif popularity < MIN_POPULARITY:
+                del self._popularity[symbol]
+                continue
+            if symbol in self._queued or symbol in self._inflight:
+                continue
+            ttl = self.cache.ttl_for(symbol)
+            if now - self._last_attempt.get(symbol, -math.inf) < ttl:
+                continue  # fetched (or tried) recently enough
+            latest = self._latest.get(symbol)
+            staleness = now - latest[0] if latest is not None else ttl * 10
+            if staleness < ttl:
+                continue
+            score = staleness * popularity
+            if score > best_score:
+                best, best_score = symbol, score
+        return best
+
+    # ----------------------------- Worker ----------------------------- #
+    async def _run(self) -> None:
+        while True:
+            if not self._heap and self.bucket.tokens >= 1 + USER_TOKEN_RESERVE:
+                candidate = self.next_refresh_candidate()
+                if candidate is not None:
+                    self.refreshes += 1
+                    self.request_refresh(candidate, REFRESH_PRIORITY)
+            if not self._heap:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.refresh_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            delay = self.bucket.delay()
+            if delay > 0:
+                # Re-check the queue afterwards: a user request may have jumped ahead
+                await asyncio.sleep(min(delay, self.refresh_interval))
+                continue
+            item = self._pop()
+            if item is None or not self.bucket.try_acquire():
+                continue
+            symbol, priority = item
+            self._inflight.add(symbol)
+            task = asyncio.get_running_loop().create_task(self._fetch(symbol, priority))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, symbol: str, priority: int) -> None:
+        self._last_attempt[symbol] = self._clock()
+        self.upstream_requests += 1
+        self.cache.record_upstream()
+        try:
+            quote = await self.fetch(symbol)
+        except QuoteRateLimited:
+            self.throttled += 1
+            logger.warning(f"Quote provider throttled {symbol}; backing off")
+            self.bucket.drain()
+            self._inflight.discard(symbol)
+            self.request_refresh(symbol, priority)
+            return
+        except Exception as exc:
+            self.failures += 1
+            self._inflight.discard(symbol)
+            logger.error(f"Upstream quote error for {symbol}: {exc}")
+            waiter = self._waiters.pop(symbol, None)
+            if waiter is not None and not waiter.done():
+                waiter.set_exception(exc)
+                # Mark retrieved so a refresh without waiters does not log a warning
+                waiter.exception()
+            return
+        self._inflight.discard(symbol)
+        self._store(symbol, quote)
+        waiter = self._waiters.pop(symbol, None)
+        if waiter is not None and not waiter.done():
+            waiter.set_result(quote)
+
+    def _store(self, symbol: str, quote: Dict[str, Any]) -> None:
+        self._latest[symbol] = (self._clock(), dict(quote))
+        self._latest.move_to_end(symbol)
+        while len(self._latest) > self.cache.max_entries:
+            self._latest.popitem(last=False)
+        self.cache.set(symbol, quote)
+        if self.store is not None:
+            try:
+                self.store.upsert_quote(symbol, quote)
+            except Exception as exc:
+                logger.error(f"Could not publish quote for {symbol}: {exc}")
+
+    # ----------------------------- Callers ----------------------------- #
+    def _with_age(self, symbol: str, quote: Dict[str, Any]) -> Dict[str, Any]:
+        latest = self._latest.get(symbol)
+        age = self._clock() - latest[0] if latest is not None else 0.0
+        result = dict(quote)
+        result["age_seconds"] = round(age, 1)
+        result["stale"] = age >= self.cache.ttl_for(symbol)
+        return result
+
+    async def get_quote(self, symbol: str, wait: Optional[float] = None) -> Dict[str, Any]:
+        """Return the freshest known quote with its age, queueing a refresh if stale.
+
+        Only a symbol with no quote at all waits, for at most `wait` seconds
+        (QUOTE_COLD_WAIT by default); on timeout or failure an error dict
+        without price fields is returned.
+        """
+        key = symbol.upper()
+        self._ensure_running()
+        self._record_request(key)
+
+        fresh = self.cache.get(key)
+        if fresh is not None:
+            return self._with_age(key, fresh)
+
+        # A miss joins the fetch already queued or under way for the symbol, if any
+        self.cache.record_miss(coalesced=key in self._queued or key in self._inflight)
+        latest = self._latest.get(key)
+        self.request_refresh(key, USER_PRIORITY)
+        if latest is not None:
+            return self._with_age(key, latest[1])
+
+        waiter = self._waiters.get(key)
+        if waiter is None:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters[key] = waiter
+        try:
+            quote = await asyncio.wait_for(
+                asyncio.shield(waiter), self.cold_wait if wait is None else wait
+            )
+        except asyncio.TimeoutError:
+            return {
+                "symbol": key,
+                "error": f"Quote for {key} is queued behind the provider rate limit",
+                "pending": True,
+            }
+        except Exception:
+            return {"symbol": key, "error": f"Could not fetch real data for {key}"}
+        return self._with_age(key, quote)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "tokens": round(self.bucket.tokens, 2),
+            "rate_per_minute": round(self.bucket.rate * 60, 2),
+            "queued": len(self._queued),
+            "inflight": len(self._inflight),
+            "tracked_symbols": len(self._popularity),
+            "watched_symbols": len(self._watched),
+            "upstream_requests": self.upstream_requests,
+            "background_refreshes": self.refreshes,
+            "throttled": self.throttled,
+            "failures": self.failures,
+        }
+
+
+def demo_quote(symbol: str, last: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Demo-mode quote: the last known price moved by a small random step"""
+    last = last or {}
+    price = last.get("price") or 150.25
+    previous = last.get("previous_close") or price
+    new = round(price * (1 + random.gauss(0, 0.002)), 2)
+    change = round(new - previous, 2)
+    return {
+        "symbol": symbol,
+        "price": new,
+        "change": change,
+        "change_percent": round(change / previous * 100, 2) if previous else 0.0,
+        "volume": last.get("volume") or 1000000,
+        "high": max(new, last.get("high") or new),
+        "low": min(new, last.get("low") or new),
+    }
+
+
+async def _fetch_upstream(symbol: str) -> Dict[str, Any]:
+    # Imported lazily: ai_services depends on this module
+    from .ai_services import fetch_alpha_vantage_quote
+
+    if not os.getenv("ALPHA_VANTAGE_API_KEY"):
+        if not DEMO_QUOTE_TICKS:
+            raise RuntimeError("No ALPHA_VANTAGE_API_KEY and demo quote ticks are off")
+        return demo_quote(symbol, get_quote_store().get(symbol))
+    return await fetch_alpha_vantage_quote(symbol)
+
+
+# Process-wide scheduler shared by every quote consumer
+quote_scheduler = QuoteScheduler(_fetch_upstream, store=get_quote_store())
+
+
+def get_quote_scheduler() -> QuoteScheduler:
+    """Return the shared process-wide quote scheduler"""
+    return quote_scheduler
@@ -0,0 +1,275 @@
+"""
+Columnar in-memory quote store
+
+PERFORMANCE NOTE: Quotes live in one NumPy array per field with a symbol -> row
+index instead of a dict of Pydantic models. Point lookups stay O(1), bulk
+updates and screens such as top-N by change_percent are vectorized, and 10k+
+tickers cost a few hundred bytes each.
+"""
+import logging
+import sys
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from ..models import StockData
+
+# Nullable numeric fields are stored as float64 with NaN meaning "missing";
+# timestamps are stored as POSIX seconds (UTC).
+FLOAT_FIELDS = (
+    "price", "change", "change_percent", "market_cap",
+    "high", "low", "open", "previous_close", "timestamp",
+)
+INT_FIELDS = ("volume",)
+QUOTE_FIELDS = ("symbol",) + tuple(f for f in StockData.model_fields if f != "symbol")
+
+DEFAULT_CAPACITY = 1024
+
+logger = logging.getLogger(__name__)
+
+# Called with {symbol: {field: new_value}} for the fields a write actually changed
+ChangeListener = Callable[[Dict[str, Dict[str, Any]]], None]
+
+
+def _to_epoch(value: Any) -> float:
+    if value is None:
+        return np.nan
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return float(value)
+
+
+class QuoteStore:
+    """Column-per-field quote table with a symbol -> row index"""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self._capacity = max(1, capacity)
+        self._size = 0
+        self._symbols: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._columns: Dict[str, np.ndarray] = {}
+        for field in FLOAT_FIELDS:
+            self._columns[field] = np.full(self._capacity, np.nan, dtype=np.float64)
+        for field in INT_FIELDS:
+            self._columns[field] = np.zeros(self._capacity, dtype=np.int64)
+        # Bumped on every write; used to key caches of derived data
+        self._row_versions = np.zeros(self._capacity, dtype=np.int64)
+        self.version = 0
+        self._listeners: List[ChangeListener] = []
+
+    # ----------------------------- Layout ----------------------------- #
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol.upper() in self._index
+
+    @property
+    def symbols(self) -> List[str]:
+        return list(self._symbols)
+
+    def column(self, field: str) -> np.ndarray:
+        """Read-only view of one field over the populated rows"""
+        view = self._columns[field][: self._size]
+        view.flags.writeable = False
+        return view
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held by the columns, versions and symbol index"""
+        arrays = sum(col.nbytes for col in self._columns.values()) + self._row_versions.nbytes
+        symbols = sys.getsizeof(self._symbols) + sum(sys.getsizeof(s) for s in self._symbols)
+        return arrays + symbols + sys.getsizeof(self._index)
+
+    def _grow(self, needed: int) -> None:
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        if capacity == self._capacity:
+            return
+        for field, col in self._columns.items():
+            fill = np.nan if field in FLOAT_FIELDS else 0
+            grown = np.full(capacity, fill, dtype=col.dtype)
+            grown[: self._size] = col[: self._size]
+            self._columns[field] = grown
+        versions = np.zeros(capacity, dtype=np.int64)
+        versions[: self._size] = self._row_versions[: self._size]
+        self._row_versions = versions
+        self._capacity = capacity
+
+    # ----------------------------- Lookups ----------------------------- #
+    def row(self, symbol: str) -> Optional[int]:
+        return self._index.get(symbol.upper())
+
+    def rows_for(self, symbols: Sequence[str], create: bool = False) -> np.ndarray:
+        """Row numbers for symbols; -1 marks unknown symbols unless `create` is set"""
+        rows = np.empty(len(symbols), dtype=np.int64)
+        for i, symbol in enumerate(symbols):
+            key = symbol.upper()
+            row = self._index.get(key)
+            if row is None:
+                if not create:
+                    rows[i] = -1
+                    continue
+                if self._size == self._capacity:
+                    self._grow(self._size + 1)
+                row = self._size
+                self._index[key] = row
+                self._symbols.append(key)
+                self._size += 1
+            rows[i] = row
+        return rows
+
+    def row_version(self, symbol: str) -> int:
+        row = self.row(symbol)
+        return -1 if row is None else int(self._row_versions[row])
+
+    def _json_values(self, field: str, rows: np.ndarray) -> List[Any]:
+        """One field for the given rows as JSON-ready Python values"""
+        if field == "symbol":
+            return [self._symbols[r] for r in rows.tolist()]
+        values = self._columns[field][rows].tolist()
+        if field == "timestamp":
+            return [
+                None if v != v else datetime.fromtimestamp(v, tz=timezone.utc).isoformat()
+                for v in values
+            ]
+        if field in FLOAT_FIELDS:
+            return [None if v != v else v for v in values]
+        return values
+
+    def records(self, rows: Sequence[int], fields: Sequence[str] = QUOTE_FIELDS) -> List[Dict[str, Any]]:
+        """JSON-ready dicts for the given rows, extracted column by column"""
+        rows = np.asarray(rows, dtype=np.int64)
+        columns = [self._json_values(field, rows) for field in fields]
+        return [dict(zip(fields, values)) for values in zip(*columns)]
+
+    def get(self, symbol: str, fields: Sequence[str] = QUOTE_FIELDS) -> Optional[Dict[str, Any]]:
+        """O(1) point lookup returning a JSON-ready dict, or None"""
+        row = self.row(symbol)
+        if row is None:
+            return None
+        return self.records([row], fields)[0]
+
+    def all_records(self, fields: Sequence[str] = QUOTE_FIELDS) -> List[Dict[str, Any]]:
+        return self.records(np.arange(self._size), fields)
+
+    def top_n(
+        self,
+        field: str,
+        n: int,
+        largest: bool = True,
+        threshold: Optional[float] = None,
+    ) -> List[str]:
+        """Symbols with the n largest (or smallest) values of a field.
+
+        Missing values are ignored; `threshold` keeps only values strictly above
+        it (largest) or strictly below it (smallest).
+        """
+        values = self._columns[field][: self._size].astype(np.float64)
+        mask = ~np.isnan(values)
+        if threshold is not None:
+            mask &= values > threshold if largest else values < threshold
+        candidates = np.flatnonzero(mask)
+        if n <= 0 or candidates.size == 0:
+            return []
+        keys = -values[candidates] if largest else values[candidates]
+        if candidates.size > n:
+            part = np.argpartition(keys, n - 1)[:n]
+            candidates, keys = candidates[part], keys[part]
+        ordered = candidates[np.argsort(keys, kind="stable")]
+        return [self._symbols[r] for r in ordered.tolist()]
+
+    # ----------------------------- Writes ----------------------------- #
+    def add_listener(self, listener: ChangeListener) -> None:
+        """Register a callback for field-level changes (used for streaming deltas)"""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: ChangeListener) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def bulk_update(self, symbols: Sequence[str], values: Mapping[str, Any]) -> np.ndarray:
+        """Vectorized upsert: each entry in `values` is one column of len(symbols).
+
+        Unknown symbols are appended. Returns the affected row numbers.
+        """
+        unknown = [field for field in values if field not in self._columns]
+        if unknown:
+            raise KeyError(f"Unknown quote field: {', '.join(unknown)}")
+        rows = self.rows_for(symbols, create=True)
+        # Snapshot old values only when someone listens for deltas
+        before = {f: self._columns[f][rows].copy() for f in values} if self._listeners else None
+        for field, column in values.items():
+            if field == "timestamp":
+                column = np.asarray([_to_epoch(v) for v in column], dtype=np.float64)
+            elif field in FLOAT_FIELDS and not isinstance(column, np.ndarray):
+                column = np.asarray([np.nan if v is None else v for v in column], dtype=np.float64)
+            self._columns[field][rows] = column
+        self.version += 1
+        self._row_versions[rows] = self.version
+        if before is not None:
+            self._emit_changes(rows, before)
+        return rows
+
+    def _emit_changes(self, rows: np.ndarray, before: Dict[str, np.ndarray]) -> None:
+        """Diff written columns against their old values and notify listeners"""
+        masks: Dict[str, np.ndarray] = {}
+        changed_any = np.zeros(len(rows), dtype=bool)
+        for field, old in before.items():
+            new = self._columns[field][rows]
+            mask = old != new
+            if field in FLOAT_FIELDS:
+                mask &= ~(np.isnan(old) & np.isnan(new))
+            masks[field] = mask
+            changed_any |= mask
+        if not changed_any.any():
+            return
+        changed_rows = rows[changed_any]
+        row_masks = {f: m[changed_any] for f, m in masks.items()}
+        values = {f: self._json_values(f, changed_rows) for f in masks}
+        changes: Dict[str, Dict[str, Any]] = {}
+        for i, row in enumerate(changed_rows.tolist()):
+            changes[self._symbols[row]] = {f: values[f][i] for f, m in row_masks.items() if m[i]}
+        for listener in list(self._listeners):
+            try:
+                listener(changes)
+            except Exception:
+                logger.error("Quote change listener failed", exc_info=True)
+
+    def upsert(self, symbol: str, **values: Any) -> int:
+        """Insert or update a single symbol; returns its row"""
+        return int(self.bulk_update([symbol], {k: [v] for k, v in values.items()})[0])
+
+    def upsert_stock(self, stock: StockData) -> int:
+        data = stock.model_dump(exclude={"symbol"})
+        return self.upsert(stock.symbol, **data)
+
+    def upsert_quote(self, symbol: str, quote: Mapping[str, Any]) -> int:
+        """Write the quote fields a provider returned; fields it left out keep their values"""
+        values = {f: quote[f] for f in QUOTE_FIELDS if f != "symbol" and quote.get(f) is not None}
+        if "previous_close" not in values and "price" in values and "change" in values:
+            values["previous_close"] = values["price"] - values["change"]
+        return self.upsert(symbol, **values)
+
+    def load_stocks(self, stocks: Iterable[StockData]) -> None:
+        """Bulk load StockData models, one column at a time"""
+        stocks = list(stocks)
+        if not stocks:
+            return
+        fields = [f for f in QUOTE_FIELDS if f != "symbol"]
+        self.bulk_update(
+            [s.symbol for s in stocks],
+            {f: [getattr(s, f) for s in stocks] for f in fields},
+        )
+
+
+# Process-wide store read by the stocks and market routers
+quote_store = QuoteStore()
+
+
+def get_quote_store() -> QuoteStore:
+    """Return the shared process-wide quote store"""
+    return quote_store
@@ -0,0 +1,199 @@
+"""
+Quote delta fan-out for streaming clients (WebSocket / Server-Sent Events)
+
+PERFORMANCE NOTE: Each quote change is JSON-encoded once and the same string
+is shared by every subscriber of that symbol. Every client has a bounded
+buffer; when a slow consumer overflows it, its backlog is discarded and it is
+resynchronized with a fresh snapshot, so the broadcaster never waits on a
+client. A symbol's first subscriber registers it with the quote scheduler
+and its last one drops it, so background refreshes keep streamed symbols
+moving without any other caller.
+"""
+import asyncio
+import json
+import logging
+import os
+from collections import defaultdict, deque
+from typing import Any, Deque, Dict, Iterable, List, Optional, Set
+
+from .quote_scheduler import QuoteScheduler, get_quote_scheduler
+from .quote_store import QuoteStore, get_quote_store
+
+logger = logging.getLogger(__name__)
+
+# Streaming configuration (overridable via environment)
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "256"))  # messages buffered per client
+MAX_STREAM_SYMBOLS = int(os.getenv("MAX_STREAM_SYMBOLS", "200"))  # symbols per client
+
+# Buffer marker telling a consumer its delta stream is incomplete
+_RESYNC = None
+
+
+def encode_message(message_type: str, symbol: str, data: Dict[str, Any]) -> str:
+    return json.dumps({"type": message_type, "symbol": symbol, "data": data}, separators=(",", ":"))
+
+
+class Subscriber:
+    """One streaming client: its symbols and a bounded outbound buffer"""
+
+    def __init__(self, broadcaster: "QuoteBroadcaster", queue_size: int):
+        self.broadcaster = broadcaster
+        self.loop = asyncio.get_running_loop()
+        self.queue_size = queue_size
+        self.symbols: Set[str] = set()
+        self.dropped = 0
+        self.resyncs = 0
+        # A deque plus a single waiter future is much cheaper per message than asyncio.Queue
+        self._buffer: Deque[Optional[str]] = deque()
+        self._waiter: Optional["asyncio.Future[None]"] = None
+
+    def pending(self) -> int:
+        return len(self._buffer)
+
+    def offer(self, message: Optional[str]) -> None:
+        """Buffer without ever blocking; on overflow drop the backlog and resync"""
+        if len(self._buffer) >= self.queue_size:
+            self.dropped += len(self._buffer)
+            self._buffer.clear()
+            self.resyncs += 1
+            message = _RESYNC
+        self._buffer.append(message)
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+
+    async def next_messages(self) -> List[str]:
+        """Wait for the next message, then drain whatever else is already buffered"""
+        while not self._buffer:
+            self._waiter = self.loop.create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        items = list(self._buffer)
+        self._buffer.clear()
+        if any(item is _RESYNC for item in items):
+            # Deltas were lost; a snapshot of every subscribed symbol replaces them
+            return self.broadcaster.snapshot_messages(self.symbols)
+        return items
+
+
+class QuoteBroadcaster:
+    """Routes quote-store changes to the subscribers of each symbol"""
+
+    def __init__(
+        self,
+        store: QuoteStore,
+        queue_size: int = STREAM_QUEUE_SIZE,
+        scheduler: Optional[QuoteScheduler] = None,
+    ):
+        self.store = store
+        self.queue_size = queue_size
+        # Refreshes subscribed symbols in the background (None: only relays store writes)
+        self.scheduler = scheduler
+        self._subscribers: Set[Subscriber] = set()
+        self._by_symbol: Dict[str, Set[Subscriber]] = defaultdict(set)
+        self.messages_encoded = 0
+        self.messages_fanned_out = 0
+
+    def __len__(self) -> int:
+        return len(self._subscribers)
+
+    def connect(self) -> Subscriber:
+        """Register a new client; must be called from the client's event loop"""
+        subscriber = Subscriber(self, self.queue_size)
+        if not self._subscribers:
+            # Only diff store writes while somebody is listening
+            self.store.add_listener(self.publish)
+        self._subscribers.add(subscriber)
+        return subscriber
+
+    def disconnect(self, subscriber: Subscriber) -> None:
+        self.unsubscribe(subscriber, list(subscriber.symbols))
+        self._subscribers.discard(subscriber)
+        if not self._subscribers:
+            self.store.remove_listener(self.publish)
+
+    def subscribe(self, subscriber: Subscriber, symbols: Iterable[str]) -> List[str]:
+        """Add symbols (up to MAX_STREAM_SYMBOLS) and queue a snapshot for each new one"""
+        added, first = [], []
+        for symbol in dict.fromkeys(s.strip().upper() for s in symbols if s and s.strip()):
+            if symbol in subscriber.symbols:
+                continue
+            if len(subscriber.symbols) >= MAX_STREAM_SYMBOLS:
+                break
+            if symbol not in self._by_symbol:
+                first.append(symbol)
+            subscriber.symbols.add(symbol)
+            self._by_symbol[symbol].add(subscriber)
+            added.append(symbol)
+        if first and self.scheduler is not None:
+            self.scheduler.watch(first)
+        for message in self.snapshot_messages(added):
+            subscriber.offer(message)
+        return added
+
+    def unsubscribe(self, subscriber: Subscriber, symbols: Iterable[str]) -> None:
+        last = []
+        for symbol in symbols:
+            symbol = symbol.upper()
+            subscriber.symbols.discard(symbol)
+            subs = self._by_symbol.get(symbol)
+            if subs is not None:
+                subs.discard(subscriber)
+                if not subs:
+                    del self._by_symbol[symbol]
+                    last.append(symbol)
+        if last and self.scheduler is not None:
+            self.scheduler.unwatch(last)
+
+    def snapshot_messages(self, symbols: Iterable[str]) -> List[str]:
+        messages = []
+        for symbol in symbols:
+            quote = self.store.get(symbol)
+            if quote is not None:
+                messages.append(encode_message("snapshot", symbol, quote))
+        return messages
+
+    def publish(self, changes: Dict[str, Dict[str, Any]]) -> None:
+        """Quote-store listener: encode each delta once and offer it to subscribers"""
+        try:
+            current_loop: Optional[asyncio.AbstractEventLoop] = asyncio.get_running_loop()
+        except RuntimeError:
+            current_loop = None
+        for symbol, delta in changes.items():
+            subscribers = self._by_symbol.get(symbol)
+            if not subscribers:
+                continue
+            message = encode_message("delta", symbol, delta)
+            self.messages_encoded += 1
+            for subscriber in tuple(subscribers):
+                self.messages_fanned_out += 1
+                if subscriber.loop is current_loop:
+                    subscriber.offer(message)
+                    continue
+                # Writes from another thread are handed to the client's own loop
+                try:
+                    subscriber.loop.call_soon_threadsafe(subscriber.offer, message)
+                except RuntimeError:
+                    logger.warning("Dropping stream subscriber with a closed event loop")
+                    self.disconnect(subscriber)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "subscribers": len(self._subscribers),
+            "symbols": len(self._by_symbol),
+            "messages_encoded": self.messages_encoded,
+            "messages_fanned_out": self.messages_fanned_out,
+            "dropped": sum(s.dropped for s in self._subscribers),
+            "resyncs": sum(s.resyncs for s in self._subscribers),
+        }
+
+
+# Process-wide broadcaster over the shared quote store, refreshed by the shared scheduler
+quote_broadcaster = QuoteBroadcaster(get_quote_store(), scheduler=get_quote_scheduler())
+
+
+def get_quote_broadcaster() -> QuoteBroadcaster:
+    """Return the shared process-wide quote broadcaster"""
+    return quote_broadcaster
@@ -0,0 +1,66 @@
+"""
+Pre-serialized JSON response cache with strong ETags
+
+PERFORMANCE NOTE: Quote snapshots change far less often than clients poll them.
+Each snapshot is serialized to bytes once per data version and reused until the
+version changes; clients revalidating with If-None-Match get an empty 304.
+"""
+import hashlib
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Tuple
+
+from fastapi import Request, Response
+
+# Upper bound on distinct cached response bodies
+RESPONSE_CACHE_MAX_ENTRIES = 4096
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag derived from the exact response bytes"""
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+class SerializedResponseCache:
+    """Map of key -> (version, body, etag); a new version replaces the old bytes"""
+
+    def __init__(self, max_entries: int = RESPONSE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, Tuple[int, bytes, str]]" = OrderedDict()
+        self.builds = 0
+
+    def get_or_build(self, key: Hashable, version: int, build: Callable[[], bytes]) -> Tuple[bytes, str]:
+        """Return cached bytes for `key` at `version`, serializing only on a version change"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            self._entries.move_to_end(key)
+            return entry[1], entry[2]
+        body = build()
+        etag = make_etag(body)
+        self.builds += 1
+        self._entries[key] = (version, body, etag)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return body, etag
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Evaluate If-None-Match (weak comparison, as RFC 9110 requires for GET)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in header.split(","))
+    return any((tag[2:] if tag.startswith("W/") else tag) == etag for tag in candidates)
+
+
+def cached_json_response(request: Request, body: bytes, etag: str) -> Response:
+    """Return the pre-serialized body, or a bodiless 304 when the client is current"""
+    headers: Dict[str, str] = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,245 @@
+"""
+Portfolio risk engine over stored daily bars
+
+PERFORMANCE NOTE: Holdings are aligned on common trading dates into one
+(days x symbols) return matrix, so covariance, portfolio volatility, VaR/CVaR,
+maximum drawdown, beta and risk contributions are a handful of matrix
+operations. The
+covariance (including the benchmark column) is cached per symbol set and
+window and reused until any underlying bar history changes. The matrix work
+is CPU-bound, so async callers run `analyze` in a worker thread; the cache
+is guarded by a lock for that.
+"""
+import logging
+import os
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+from functools import reduce
+from statistics import NormalDist
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .bar_store import BarStore, get_bar_store
+from .indicators import TRADING_DAYS_PER_YEAR
+
+logger = logging.getLogger(__name__)
+
+# Risk configuration (overridable via environment)
+RISK_HISTORY_DAYS = int(os.getenv("RISK_HISTORY_DAYS", "365"))  # calendar days of history
+RISK_CONFIDENCE = float(os.getenv("RISK_CONFIDENCE", "0.95"))
+RISK_BENCHMARK = os.getenv("RISK_BENCHMARK", "SPY")  # index used for beta
+COVARIANCE_CACHE_SIZE = 128
+MIN_OBSERVATIONS = 20  # fewer aligned returns than this is not a meaningful estimate
+
+# Supplies bars for symbols without stored history (e.g. demo data)
+BarsFallback = Callable[[str, int], np.ndarray]
+
+
+def aligned_closes(bars_by_symbol: Dict[str, np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+    """Closes on the dates every series shares, as (dates, days x symbols)"""
+    dates = reduce(np.intersect1d, (bars["time"] for bars in bars_by_symbol.values()))
+    matrix = np.empty((len(dates), len(bars_by_symbol)))
+    for column, bars in enumerate(bars_by_symbol.values()):
+        matrix[:, column] = bars["close"][np.searchsorted(bars["time"], dates)]
+    return dates, matrix
+
+
+def portfolio_risk(
+    returns: np.ndarray,
+    weights: np.ndarray,
+    covariance: Optional[np.ndarray] = None,
+    mean: Optional[np.ndarray] = None,
+    confidence: float = RISK_CONFIDENCE,
+) -> Dict[str, Any]:
+    """Risk figures for daily `returns` (days x assets) held at `weights`.
+
+    Returned VaR/CVaR are positive fractions of portfolio value over one day;
+    the maximum drawdown is the largest peak-to-trough fall over the window
+    (holdings rebalanced to `weights` daily), also a positive fraction.
+    """
+    covariance = np.cov(returns, rowvar=False) if covariance is None else covariance
+    covariance = np.atleast_2d(covariance)
+    mean = returns.mean(axis=0) if mean is None else mean
+    portfolio_returns = returns @ weights
+
+    variance = float(weights @ covariance @ weights)
+    daily_vol = np.sqrt(max(variance, 0.0))
+    tail = 1.0 - confidence
+
+    # Historical: empirical quantile of the portfolio's own return series
+    hist_var = -float(np.quantile(portfolio_returns, tail))
+    losses = portfolio_returns[portfolio_returns <= -hist_var]
+    hist_cvar = -float(losses.mean()) if len(losses) else hist_var
+
+    # Parametric (variance-covariance): normal with the sample mean and sigma
+    normal = NormalDist()
+    z = normal.inv_cdf(tail)
+    mu = float(mean @ weights)
+    param_var = -(mu + z * daily_vol)
+    param_cvar = -(mu - daily_vol * normal.pdf(z) / tail)
+
+    growth = np.cumprod(1.0 + portfolio_returns)
+    peaks = np.maximum.accumulate(np.concatenate([[1.0], growth]))[1:]
+    max_drawdown = float((1.0 - growth / peaks).max()) if len(growth) else 0.0
+
+    # Euler decomposition: contributions sum to the portfolio volatility
+    if daily_vol > 0:
+        contribution = weights * (covariance @ weights) / daily_vol
+        contribution_share = contribution / daily_vol
+    else:
+        contribution_share = np.zeros_like(weights)
+
+    return {
+        "daily_volatility": daily_vol,
+        "annualized_volatility": daily_vol * np.sqrt(TRADING_DAYS_PER_YEAR),
+        "historical": {"var": hist_var, "cvar": hist_cvar},
+        "parametric": {"var": param_var, "cvar": param_cvar},
+        "max_drawdown": max_drawdown,
+        "risk_contribution": contribution_share,
+    }
+
+
+class RiskEngine:
+    """Risk analysis of holdings with a covariance cache keyed by history version"""
+
+    def __init__(
+        self,
+        store: Optional[BarStore] = None,
+        history_days: int = RISK_HISTORY_DAYS,
+        benchmark: Optional[str] = RISK_BENCHMARK,
+        confidence: float = RISK_CONFIDENCE,
+        cache_size: int = COVARIANCE_CACHE_SIZE,
+    ):
+        self.store = store if store is not None else get_bar_store()
+        self.history_days = history_days
+        self.benchmark = benchmark.upper() if benchmark else None
+        self.confidence = confidence
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[Tuple[Any, ...], Tuple[Tuple[Any, ...], Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def _stamp(self, symbols: Sequence[str]) -> Tuple[Any, ...]:
+        # Changes whenever bars are appended here (version) or by another process (count)
+        return tuple((self.store.version(s), self.store.count(s)) for s in symbols)
+
+    def _load(self, symbols: Sequence[str], start: date, fallback: Optional[BarsFallback]):
+        bars_by_symbol: Dict[str, np.ndarray] = {}
+        missing: List[str] = []
+        for symbol in symbols:
+            bars = self.store.read(symbol, start=start)
+            if len(bars) == 0 and fallback is not None:
+                bars = fallback(symbol, (date.today() - start).days)
+            if len(bars) == 0:
+                missing.append(symbol)
+            else:
+                bars_by_symbol[symbol] = bars
+        return bars_by_symbol, missing
+
+    def covariance(self, symbols: Sequence[str], fallback: Optional[BarsFallback] = None) -> Dict[str, Any]:
+        """Aligned daily returns, their mean and covariance for `symbols` (+ benchmark)"""
+        start = date.today() - timedelta(days=self.history_days)
+        columns = list(dict.fromkeys(list(symbols) + ([self.benchmark] if self.benchmark else [])))
+        key = (tuple(columns), start, fallback is not None)
+        stamp = self._stamp(columns)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None and cached[0] == stamp:
+                self._cache.move_to_end(key)
+                self.cache_hits += 1
+                return cached[1]
+            self.cache_misses += 1
+
+        bars_by_symbol, missing = self._load(columns, start, fallback)
+        if bars_by_symbol:
+            dates, closes = aligned_closes(bars_by_symbol)
+            returns = closes[1:] / closes[:-1] - 1.0
+        else:
+            dates, returns = np.empty(0, dtype="datetime64[s]"), np.empty((0, 0))
+        entry = {
+            "columns": list(bars_by_symbol),
+            "missing": missing,
+            "dates": dates,
+            "returns": returns,
+            "mean": returns.mean(axis=0) if len(returns) else None,
+            "covariance": np.atleast_2d(np.cov(returns, rowvar=False)) if len(returns) > 1 else None,
+        }
+        with self._lock:
+            self._cache[key] = (stamp, entry)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return entry
+
+    def analyze(self, holdings: Dict[str, float], fallback: Optional[BarsFallback] = None) -> Dict[str, Any]:
+        """Risk of holdings given as {symbol: market value}"""
+        holdings = {s.upper(): float(v) for s, v in holdings.items() if v and v > 0}
+        if not holdings:
+            return {"error": "Portfolio has no holdings to analyze"}
+
+        data = self.covariance(list(holdings), fallback)
+        columns = data["columns"]
+        held = [s for s in columns if s in holdings]
+        missing = [s for s in holdings if s not in columns]
+        if not held or data["covariance"] is None or len(data["returns"]) < MIN_OBSERVATIONS:
+            return {
+                "error": "Not enough aligned price history to estimate risk",
+                "missing_history": missing,
+                "observations": len(data["returns"]),
+            }
+
+        index = np.array([columns.index(s) for s in held])
+        values = np.array([holdings[s] for s in held])
+        total = float(values.sum())
+        weights = values / total
+        covariance = data["covariance"][np.ix_(index, index)]
+        risk = portfolio_risk(
+            data["returns"][:, index], weights, covariance, data["mean"][index], self.confidence
+        )
+
+        beta = None
+        if self.benchmark in columns:
+            b = columns.index(self.benchmark)
+            bench_var = data["covariance"][b, b]
+            if bench_var > 0:
+                beta = float(data["covariance"][index, b] @ weights / bench_var)
+
+        def money(fraction: float) -> Dict[str, float]:
+            return {"return": round(fraction, 6), "amount": round(fraction * total, 2)}
+
+        return {
+            "symbols": held,
+            "weights": {s: round(float(w), 6) for s, w in zip(held, weights)},
+            "portfolio_value": round(total, 2),
+            "observations": len(data["returns"]),
+            "start": str(data["dates"][0])[:10],
+            "end": str(data["dates"][-1])[:10],
+            "confidence": self.confidence,
+            "daily_volatility": round(risk["daily_volatility"], 6),
+            "annualized_volatility": round(risk["annualized_volatility"], 6),
+            "historical_var": money(risk["historical"]["var"]),
+            "historical_cvar": money(risk["historical"]["cvar"]),
+            "parametric_var": money(risk["parametric"]["var"]),
+            "parametric_cvar": money(risk["parametric"]["cvar"]),
+            "max_drawdown": money(risk["max_drawdown"]),
+            "beta": round(beta, 4) if beta is not None else None,
+            "benchmark": self.benchmark,
+            "risk_contribution": {
+                s: round(float(c), 6) for s, c in zip(held, risk["risk_contribution"])
+            },
+            "missing_history": missing,
+        }
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._cache), "hits": self.cache_hits, "misses": self.cache_misses}
+
+
+# Process-wide engine over the shared bar store
+risk_engine = RiskEngine()
+
+
+def get_risk_engine() -> RiskEngine:
+    """Return the shared process-wide risk engine"""
+    return risk_engine
@@ -0,0 +1,198 @@
+"""
+Incremental rolling indicators for live quote ticks
+
+PERFORMANCE NOTE: Each symbol owns one row of preallocated NumPy state, not a
+dict of lists. A new tick updates the windowed mean/variance (Welford add and
+remove), the EMA, the rolling min/max (monotonic deques kept in ring buffers)
+and Wilder's RSI in constant (amortized) time. Nothing is recomputed over the
+window, so cost does not grow with window length.
+"""
+import math
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .indicators import EMA_SPAN, RSI_PERIOD, SMA_WINDOW
+
+DEFAULT_CAPACITY = 256
+# Recompute the windowed mean/variance from the ring this often to shed float drift
+RECALIBRATE_TICKS = 4096
+
+# Scalar state columns, one float64 array each
+_STATE_FIELDS = (
+    "ticks",     # ticks seen
+    "mean",      # windowed mean
+    "m2",        # windowed sum of squared deviations
+    "ema",
+    "last",      # previous price (RSI moves)
+    "gain",      # Wilder average gain (or running sum while seeding)
+    "loss",      # Wilder average loss (or running sum while seeding)
+)
+
+
+class RollingIndicators:
+    """O(1)-per-tick rolling statistics for many symbols"""
+
+    def __init__(
+        self,
+        window: int = SMA_WINDOW,
+        ema_span: int = EMA_SPAN,
+        rsi_period: int = RSI_PERIOD,
+        capacity: int = DEFAULT_CAPACITY,
+    ):
+        self.window = window
+        self.alpha = 2.0 / (ema_span + 1.0)
+        self.rsi_period = rsi_period
+        self._capacity = max(1, capacity)
+        self._index: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._state = {name: np.zeros(self._capacity) for name in _STATE_FIELDS}
+        # Ring buffer of the last `window` prices per symbol
+        self._ring = np.zeros((self._capacity, window))
+        # Monotonic deques for max (side 0) and min (side 1, stored negated):
+        # tick numbers and values in ring buffers with head/length counters
+        self._dq_tick = np.zeros((2, self._capacity, window), dtype=np.int64)
+        self._dq_value = np.zeros((2, self._capacity, window))
+        self._dq_head = np.zeros((2, self._capacity), dtype=np.int64)
+        self._dq_len = np.zeros((2, self._capacity), dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol.upper() in self._index
+
+    def memory_bytes(self) -> int:
+        arrays: List[np.ndarray] = list(self._state.values())
+        arrays += [self._ring, self._dq_tick, self._dq_value, self._dq_head, self._dq_len]
+        return sum(a.nbytes for a in arrays)
+
+    def _grow(self) -> None:
+        new_capacity = self._capacity * 2
+        for name, values in self._state.items():
+            grown = np.zeros(new_capacity)
+            grown[: self._capacity] = values
+            self._state[name] = grown
+        ring = np.zeros((new_capacity, self.window))
+        ring[: self._capacity] = self._ring
+        self._ring = ring
+        for attr in ("_dq_tick", "_dq_value", "_dq_head", "_dq_len"):
+            old = getattr(self, attr)
+            grown = np.zeros((2, new_capacity) + old.shape[2:], dtype=old.dtype)
+            grown[:, : self._capacity] = old
+            setattr(self, attr, grown)
+        self._capacity = new_capacity
+
+    def _row(self, symbol: str) -> int:
+        key = symbol.upper()
+        row = self._index.get(key)
+        if row is None:
+            if len(self._index) == self._capacity:
+                self._grow()
+            row = len(self._index)
+            self._index[key] = row
+        return row
+
+    def _push_deque(self, side: int, row: int, tick: int, value: float) -> float:
+        """Push onto the side's monotonic deque and return its current extreme"""
+        ticks, values = self._dq_tick[side, row], self._dq_value[side, row]
+        head, length, size = int(self._dq_head[side, row]), int(self._dq_len[side, row]), self.window
+        # Expire the front once it leaves the window (frees a slot for this tick)
+        if length and ticks[head] <= tick - size:
+            head = (head + 1) % size
+            length -= 1
+        # Drop dominated entries from the back (amortized O(1))
+        while length and values[(head + length - 1) % size] <= value:
+            length -= 1
+        slot = (head + length) % size
+        ticks[slot], values[slot] = tick, value
+        length += 1
+        self._dq_head[side, row], self._dq_len[side, row] = head, length
+        return float(values[head])
+
+    def update(self, symbol: str, price: float) -> Dict[str, Optional[float]]:
+        """Fold one tick into the symbol's state and return the current readings"""
+        price = float(price)
+        with self._lock:
+            row = self._row(symbol)
+            s = self._state
+            tick = int(s["ticks"][row])
+            window = self.window
+
+            # Windowed Welford: add the new price, removing the one it evicts
+            slot = tick % window
+            if tick < window:
+                n = tick + 1
+                delta = price - s["mean"][row]
+                s["mean"][row] += delta / n
+                s["m2"][row] += delta * (price - s["mean"][row])
+            else:
+                n = window
+                old = float(self._ring[row, slot])
+                old_mean = float(s["mean"][row])
+                new_mean = old_mean + (price - old) / n
+                s["m2"][row] = max(float(s["m2"][row]) + (price - old) * (price - new_mean + old - old_mean), 0.0)
+                s["mean"][row] = new_mean
+            self._ring[row, slot] = price
+            if tick >= window and tick % RECALIBRATE_TICKS == 0:
+                # O(window) once every RECALIBRATE_TICKS ticks: still O(1) amortized
+                values = self._ring[row]
+                s["mean"][row] = values.mean()
+                s["m2"][row] = float(((values - values.mean()) ** 2).sum())
+
+            # EMA seeded with the first price (matches indicators.ema)
+            s["ema"][row] = price if tick == 0 else self.alpha * price + (1 - self.alpha) * s["ema"][row]
+
+            high = self._push_deque(0, row, tick, price)
+            low = -self._push_deque(1, row, tick, -price)
+
+            # Wilder RSI: sums of the first `period` moves seed the averages
+            rsi = None
+            period = self.rsi_period
+            if tick > 0:
+                move = price - float(s["last"][row])
+                gain, loss = max(move, 0.0), max(-move, 0.0)
+                if tick <= period:
+                    s["gain"][row] += gain / period
+                    s["loss"][row] += loss / period
+                else:
+                    s["gain"][row] = (s["gain"][row] * (period - 1) + gain) / period
+                    s["loss"][row] = (s["loss"][row] * (period - 1) + loss) / period
+                if tick >= period:
+                    avg_gain, avg_loss = float(s["gain"][row]), float(s["loss"][row])
+                    rsi = 100.0 if avg_gain + avg_loss == 0 else 100.0 * avg_gain / (avg_gain + avg_loss)
+            s["last"][row] = price
+            s["ticks"][row] = tick + 1
+
+            variance = float(s["m2"][row]) / (n - 1) if n > 1 else None
+            return {
+                "ticks": tick + 1,
+                "mean": float(s["mean"][row]),
+                "std": math.sqrt(variance) if variance is not None else None,
+                "ema": float(s["ema"][row]),
+                "min": low,
+                "max": high,
+                "rsi": rsi,
+            }
+
+    def reset(self, symbol: Optional[str] = None) -> None:
+        """Forget one symbol's history (its row is reused), or everything"""
+        with self._lock:
+            rows = list(self._index.values()) if symbol is None else [self._index.get(symbol.upper())]
+            for row in rows:
+                if row is None:
+                    continue
+                for values in self._state.values():
+                    values[row] = 0.0
+                self._dq_head[:, row] = 0
+                self._dq_len[:, row] = 0
+
+
+# Process-wide state fed by the live quote path
+rolling_indicators = RollingIndicators()
+
+
+def get_rolling_indicators() -> RollingIndicators:
+    """Return the shared process-wide rolling indicator state"""
+    return rolling_indicators
@@ -0,0 +1,163 @@
+"""
+Prefix and fuzzy symbol search index for typeahead
+
+PERFORMANCE NOTE: The index is built once and never mutated, so concurrent
+requests read it without locks (rebuilds swap in a new index object). Prefix
+matches use bisect over sorted symbol and name-token arrays; fuzzy matches use
+a trigram inverted index scored with NumPy, so queries over ~50k listings
+answer in well under a millisecond.
+"""
+import csv
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Ranking weights: exact symbol > symbol prefix > name word prefix > fuzzy
+EXACT_SYMBOL_SCORE = 100.0
+SYMBOL_PREFIX_SCORE = 90.0
+NAME_PREFIX_SCORE = 70.0
+FUZZY_SCORE = 60.0
+FUZZY_MIN_SIMILARITY = 0.5  # minimum share of query trigrams found in a listing
+DEFAULT_SEARCH_LIMIT = 10
+MAX_PREFIX_CANDIDATES = 64  # cap on prefix scan length for very short queries
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+Listing = Tuple[str, str]  # (symbol, company name)
+
+
+def _trigrams(text: str) -> List[str]:
+    padded = f"  {text} "
+    return list({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+class SymbolSearchIndex:
+    """Immutable search index over (symbol, name) listings"""
+
+    def __init__(self, listings: Iterable[Listing]):
+        deduped: Dict[str, str] = {}
+        for symbol, name in listings:
+            deduped[symbol.upper()] = name or ""
+        self.symbols: List[str] = list(deduped)
+        self.names: List[str] = list(deduped.values())
+
+        # Sorted symbols for prefix search (parallel id array)
+        order = sorted(range(len(self.symbols)), key=self.symbols.__getitem__)
+        self._sorted_symbols = [self.symbols[i] for i in order]
+        self._sorted_symbol_ids = order
+
+        # Sorted (token, id) pairs over lower-cased company name words
+        tokens = sorted(
+            (token, i)
+            for i, name in enumerate(self.names)
+            for token in set(_TOKEN_RE.findall(name.lower()))
+        )
+        self._tokens = [t for t, _ in tokens]
+        self._token_ids = [i for _, i in tokens]
+
+        # Trigram -> listing ids over normalized "symbol name words" text
+        postings: Dict[str, List[int]] = defaultdict(list)
+        for i, (symbol, name) in enumerate(zip(self.symbols, self.names)):
+            text = " ".join([symbol.lower()] + _TOKEN_RE.findall(name.lower()))
+            for gram in _trigrams(text):
+                postings[gram].append(i)
+        self._postings = {g: np.asarray(ids, dtype=np.int32) for g, ids in postings.items()}
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def _prefix_scan(self, keys: Sequence[str], ids: Sequence[int], prefix: str) -> List[int]:
+        matches = []
+        i = bisect_left(keys, prefix)
+        while i < len(keys) and keys[i].startswith(prefix) and len(matches) < MAX_PREFIX_CANDIDATES:
+            matches.append(ids[i])
+            i += 1
+        return matches
+
+    def _fuzzy(self, query: str, limit: int, scores: Dict[int, Tuple[float, str]]) -> None:
+        query_grams = _trigrams(" ".join(_TOKEN_RE.findall(query)))
+        grams = [g for g in query_grams if g in self._postings]
+        if not grams:
+            return
+        shared = np.bincount(
+            np.concatenate([self._postings[g] for g in grams]),
+            minlength=len(self.symbols),
+        )
+        min_shared = max(1, int(np.ceil(FUZZY_MIN_SIMILARITY * len(query_grams))))
+        candidates = np.flatnonzero(shared >= min_shared)
+        similarity = shared[candidates] / len(query_grams)
+        # Only the best `limit` fuzzy hits can make the final ranking
+        if candidates.size > limit:
+            top = np.argpartition(-similarity, limit - 1)[:limit]
+            candidates, similarity = candidates[top], similarity[top]
+        for listing_id, sim in zip(candidates.tolist(), similarity.tolist()):
+            score = FUZZY_SCORE * sim
+            if listing_id not in scores or score > scores[listing_id][0]:
+                scores[listing_id] = (score, "fuzzy")
+
+    def search(self, query: str, limit: int = DEFAULT_SEARCH_LIMIT) -> List[Dict[str, object]]:
+        """Rank listings for a partial symbol or company-name fragment"""
+        text = query.strip()
+        if not text or limit <= 0:
+            return []
+        upper, lower = text.upper(), text.lower()
+        scores: Dict[int, Tuple[float, str]] = {}
+
+        for listing_id in self._prefix_scan(self._sorted_symbols, self._sorted_symbol_ids, upper):
+            symbol = self.symbols[listing_id]
+            if symbol == upper:
+                scores[listing_id] = (EXACT_SYMBOL_SCORE, "symbol")
+            else:
+                # Shorter completions rank above longer ones
+                scores[listing_id] = (SYMBOL_PREFIX_SCORE - min(len(symbol) - len(upper), 9), "symbol_prefix")
+
+        words = _TOKEN_RE.findall(lower)
+        if words:
+            # Every query word must prefix-match some word of the company name
+            candidate_sets = [
+                set(self._prefix_scan(self._tokens, self._token_ids, word)) for word in words
+            ]
+            for listing_id in set.intersection(*candidate_sets):
+                scores.setdefault(listing_id, (NAME_PREFIX_SCORE, "name_prefix"))
+
+        if len(scores) < limit:
+            self._fuzzy(lower, limit, scores)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1][0], self.symbols[item[0]]))[:limit]
+        return [
+            {
+                "symbol": self.symbols[i],
+                "name": self.names[i],
+                "score": round(score, 2),
+                "match": match,
+            }
+            for i, (score, match) in ranked
+        ]
+
+
+def load_listings_csv(path: str) -> List[Listing]:
+    """Read (symbol, name) listings from a CSV with `symbol` and `name` columns"""
+    with open(path, newline="", encoding="utf-8") as handle:
+        return [(row["symbol"], row.get("name", "")) for row in csv.DictReader(handle) if row.get("symbol")]
+
+
+_index: Optional[SymbolSearchIndex] = None
+
+
+def build_search_index(listings: Iterable[Listing]) -> SymbolSearchIndex:
+    """Build a new index and atomically make it the shared one"""
+    global _index
+    _index = SymbolSearchIndex(listings)
+    return _index
+
+
+def get_search_index(default: Optional[Callable[[], Iterable[Listing]]] = None) -> SymbolSearchIndex:
+    """Return the shared index; until build_search_index is called it is built
+    from `default()` on first use (empty without one)"""
+    global _index
+    if _index is None:
+        _index = SymbolSearchIndex(default() if default is not None else [])
+    return _index
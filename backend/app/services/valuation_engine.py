@@ -0,0 +1,450 @@
+"""
+Mark-to-market valuation of every portfolio
+
+PERFORMANCE NOTE: Holdings are one sparse (portfolios x symbols) matrix of
+share counts kept as flat NumPy arrays (entry -> portfolio row, symbol column,
+shares, cost), with a symbol-major index over the entries. Revaluing all
+portfolios is a single sparse matrix-vector product with the price vector;
+a quote tick only visits the entries of the symbols that changed and adds
+shares x price delta to the portfolios holding them, so its cost scales with
+the number of affected holdings rather than with the number of portfolios.
+"""
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CAPACITY = 1024
+# Full matrix-vector revaluation this often to shed accumulated float drift
+REVALUE_EVERY_UPDATES = 4096
+
+# Called with the ids (object array) of portfolios whose valuation changed
+ValuationListener = Callable[[np.ndarray], None]
+
+
+def _grown(values: np.ndarray, size: int, fill: float = 0.0) -> np.ndarray:
+    grown = np.full(size, fill, dtype=values.dtype)
+    grown[: len(values)] = values
+    return grown
+
+
+class ValuationEngine:
+    """Sparse holdings matrix with incremental revaluation on price changes"""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self._lock = threading.RLock()
+        # Portfolios (rows) and symbols (columns)
+        self._portfolio_index: Dict[str, int] = {}
+        self._ids = np.empty(capacity, dtype=object)  # row -> portfolio id
+        self._symbol_index: Dict[str, int] = {}
+        self._symbols: List[str] = []
+        self._price = np.full(capacity, np.nan)
+        self._previous_close = np.full(capacity, np.nan)
+        # Per-portfolio totals, maintained incrementally
+        self._rows_used = 0
+        self._value = np.zeros(capacity)
+        self._previous_value = np.zeros(capacity)
+        self._cost = np.zeros(capacity)
+        # Holdings as COO entries; replaced holdings become zero-share tombstones
+        self._entry_live = np.zeros(capacity, dtype=bool)
+        self._entry_row = np.zeros(capacity, dtype=np.int64)
+        self._entry_col = np.zeros(capacity, dtype=np.int64)
+        self._entry_shares = np.zeros(capacity)
+        self._entry_cost = np.zeros(capacity)
+        self._entries = 0
+        self._row_entries: Dict[int, np.ndarray] = {}
+        # Symbol-major (CSC-style) index over live entries, rebuilt lazily
+        self._by_symbol = np.zeros(0, dtype=np.int64)
+        self._symbol_ptr = np.zeros(1, dtype=np.int64)
+        self._index_dirty = False
+        self._updates_since_revalue = 0
+        self._listeners: List[ValuationListener] = []
+        # Quote store followed since attach(); prices symbols first held later
+        self._store: Any = None
+        self.ticks = 0
+        self.entries_touched = 0
+
+    def __len__(self) -> int:
+        return len(self._portfolio_index)
+
+    def __contains__(self, portfolio_id: str) -> bool:
+        return portfolio_id in self._portfolio_index
+
+    # ----------------------------- Layout ----------------------------- #
+    def _column(self, symbol: str) -> int:
+        symbol = symbol.upper()
+        col = self._symbol_index.get(symbol)
+        if col is None:
+            col = len(self._symbols)
+            if col == len(self._price):
+                self._price = _grown(self._price, col * 2, np.nan)
+                self._previous_close = _grown(self._previous_close, col * 2, np.nan)
+            self._symbol_index[symbol] = col
+            self._symbols.append(symbol)
+            quote_row = self._store.row(symbol) if self._store is not None else None
+            if quote_row is not None:
+                self._price[col] = self._store.column("price")[quote_row]
+                self._previous_close[col] = self._store.column("previous_close")[quote_row]
+        return col
+
+    def _row(self, portfolio_id: str) -> int:
+        row = self._portfolio_index.get(portfolio_id)
+        if row is None:
+            row = self._rows_used
+            if row == len(self._value):
+                size = row * 2
+                self._ids = _grown(self._ids, size, None)
+                self._value = _grown(self._value, size)
+                self._previous_value = _grown(self._previous_value, size)
+                self._cost = _grown(self._cost, size)
+            self._portfolio_index[portfolio_id] = row
+            self._ids[row] = portfolio_id
+            self._rows_used += 1
+        return row
+
+    def _reserve_entries(self, count: int) -> None:
+        needed = self._entries + count
+        if needed <= len(self._entry_row):
+            return
+        size = max(needed, len(self._entry_row) * 2)
+        self._entry_live = _grown(self._entry_live, size, False)
+        self._entry_row = _grown(self._entry_row, size)
+        self._entry_col = _grown(self._entry_col, size)
+        self._entry_shares = _grown(self._entry_shares, size)
+        self._entry_cost = _grown(self._entry_cost, size)
+
+    def _clear_row(self, row: int) -> None:
+        old = self._row_entries.pop(row, None)
+        if old is not None and len(old):
+            self._entry_live[old] = False
+            self._entry_shares[old] = 0.0
+            self._entry_cost[old] = 0.0
+            self._index_dirty = True
+        self._value[row] = self._previous_value[row] = self._cost[row] = 0.0
+
+    def _rebuild_index(self) -> None:
+        live = np.flatnonzero(self._entry_live[: self._entries])
+        if len(live) < self._entries // 2:
+            self._compact(live)
+            live = np.arange(self._entries)
+        cols = self._entry_col[live]
+        order = np.argsort(cols, kind="stable")
+        self._by_symbol = live[order]
+        self._symbol_ptr = np.zeros(len(self._symbols) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(cols, minlength=len(self._symbols)), out=self._symbol_ptr[1:])
+        self._index_dirty = False
+
+    def _compact(self, live: np.ndarray) -> None:
+        """Drop tombstones once they outnumber live entries"""
+        for name in ("_entry_live", "_entry_row", "_entry_col", "_entry_shares", "_entry_cost"):
+            values = getattr(self, name)
+            values[: len(live)] = values[live]
+        remap = np.full(self._entries, -1, dtype=np.int64)
+        remap[live] = np.arange(len(live))
+        self._row_entries = {row: remap[ids] for row, ids in self._row_entries.items()}
+        self._entries = len(live)
+
+    # ---------------------------- Holdings ---------------------------- #
+    def set_holdings(
+        self,
+        portfolio_id: str,
+        symbols: Sequence[str],
+        shares: Sequence[float],
+        avg_costs: Sequence[float],
+        seed_prices: Optional[Sequence[float]] = None,
+    ) -> bool:
+        """Replace a portfolio's holdings; returns False when they were already these.
+
+        `seed_prices` give a price for symbols that have not been quoted yet.
+        Unchanged holdings are left in place, so re-registering a portfolio on
+        every read costs no tombstones or index rebuild.
+        """
+        with self._lock:
+            col_list = [self._column(s) for s in symbols]
+            cols = np.array(col_list, dtype=np.int64)
+            shares_arr = np.asarray(shares, dtype=np.float64)
+            cost_arr = shares_arr * np.asarray(avg_costs, dtype=np.float64)
+            seeds = None if seed_prices is None else np.asarray(seed_prices, dtype=np.float64)
+            if len(set(col_list)) < len(col_list):
+                # One entry per (portfolio, symbol): merge repeated lots
+                unique_cols, first, inverse = np.unique(cols, return_index=True, return_inverse=True)
+                shares_arr = np.bincount(inverse, shares_arr, minlength=len(unique_cols))
+                cost_arr = np.bincount(inverse, cost_arr, minlength=len(unique_cols))
+                seeds = None if seeds is None else seeds[first]
+                cols = unique_cols
+            current = self._row_entries.get(self._portfolio_index.get(portfolio_id, -1))
+            if (current is not None and np.array_equal(self._entry_col[current], cols)
+                    and np.array_equal(self._entry_shares[current], shares_arr)
+                    and np.array_equal(self._entry_cost[current], cost_arr)):
+                return False
+            row = self._row(portfolio_id)
+            self._clear_row(row)
+            if seeds is not None:
+                unpriced = np.isnan(self._price[cols])
+                self._price[cols[unpriced]] = seeds[unpriced]
+                still_open = np.isnan(self._previous_close[cols])
+                self._previous_close[cols[still_open]] = self._price[cols[still_open]]
+
+            start = self._entries
+            self._reserve_entries(len(cols))
+            end = start + len(cols)
+            self._entry_live[start:end] = True
+            self._entry_row[start:end] = row
+            self._entry_col[start:end] = cols
+            self._entry_shares[start:end] = shares_arr
+            self._entry_cost[start:end] = cost_arr
+            self._entries = end
+            self._row_entries[row] = np.arange(start, end)
+            self._index_dirty = True
+
+            self._value[row] = float(shares_arr @ self._prices_or_zero(cols))
+            self._previous_value[row] = float(shares_arr @ self._previous_or_price(cols))
+            self._cost[row] = float(cost_arr.sum())
+        self._notify(np.array([portfolio_id], dtype=object))
+        return True
+
+    def remove_portfolio(self, portfolio_id: str) -> None:
+        with self._lock:
+            row = self._portfolio_index.pop(portfolio_id, None)
+            if row is None:
+                return
+            self._clear_row(row)
+            self._ids[row] = None
+
+    def _prices_or_zero(self, cols: np.ndarray) -> np.ndarray:
+        prices = self._price[cols]
+        return np.where(np.isnan(prices), 0.0, prices)
+
+    def _previous_or_price(self, cols: np.ndarray) -> np.ndarray:
+        previous = self._previous_close[cols]
+        previous = np.where(np.isnan(previous), self._price[cols], previous)
+        return np.where(np.isnan(previous), 0.0, previous)
+
+    # ----------------------------- Quotes ----------------------------- #
+    def update_prices(
+        self,
+        symbols: Sequence[str],
+        prices: Sequence[float],
+        previous_closes: Optional[Sequence[float]] = None,
+    ) -> np.ndarray:
+        """Apply new quotes; returns the ids of portfolios whose value changed"""
+        with self._lock:
+            known = [(i, self._symbol_index.get(s.upper())) for i, s in enumerate(symbols)]
+            known = [(i, c) for i, c in known if c is not None]
+            if not known:
+                return self._ids[:0]
+            positions = np.array([i for i, _ in known], dtype=np.int64)
+            cols = np.array([c for _, c in known], dtype=np.int64)
+
+            old_value_prices = self._prices_or_zero(cols)
+            old_previous = self._previous_or_price(cols)
+            new_prices = np.asarray(prices, dtype=np.float64)[positions]
+            self._price[cols] = np.where(np.isnan(new_prices), self._price[cols], new_prices)
+            if previous_closes is not None:
+                new_previous = np.asarray(previous_closes, dtype=np.float64)[positions]
+                self._previous_close[cols] = np.where(
+                    np.isnan(new_previous), self._previous_close[cols], new_previous
+                )
+            price_delta = self._prices_or_zero(cols) - old_value_prices
+            previous_delta = self._previous_or_price(cols) - old_previous
+
+            moved = (price_delta != 0) | (previous_delta != 0)
+            if not moved.any():
+                return self._ids[:0]
+            cols, price_delta, previous_delta = cols[moved], price_delta[moved], previous_delta[moved]
+
+            if self._index_dirty:
+                self._rebuild_index()
+            # Each symbol's holders are one contiguous slice of the symbol-major
+            # index, and a portfolio holds a symbol at most once, so plain
+            # fancy-index adds are safe within a slice
+            touched = []
+            for col, dp, dprev in zip(cols.tolist(), price_delta.tolist(), previous_delta.tolist()):
+                entries = self._by_symbol[self._symbol_ptr[col]:self._symbol_ptr[col + 1]]
+                if not len(entries):
+                    continue
+                rows = self._entry_row[entries]
+                shares = self._entry_shares[entries]
+                if dp:
+                    self._value[rows] += shares * dp
+                if dprev:
+                    self._previous_value[rows] += shares * dprev
+                touched.append(rows)
+                self.entries_touched += len(entries)
+            if not touched:
+                return self._ids[:0]
+            self.ticks += 1
+
+            self._updates_since_revalue += 1
+            if self._updates_since_revalue >= REVALUE_EVERY_UPDATES:
+                self.revalue_all()
+
+            rows = touched[0] if len(touched) == 1 else np.unique(np.concatenate(touched))
+            affected = self._ids[rows]
+        self._notify(affected)
+        return affected
+
+    def on_quote_changes(self, changes: Dict[str, Dict[str, Any]]) -> None:
+        """QuoteStore listener: revalue on price / previous close deltas"""
+        symbols = [s for s, delta in changes.items() if "price" in delta or "previous_close" in delta]
+        if not symbols:
+            return
+
+        def field(name: str) -> List[float]:
+            values = (changes[s].get(name) for s in symbols)
+            return [np.nan if v is None else v for v in values]
+
+        self.update_prices(symbols, field("price"), field("previous_close"))
+
+    def attach(self, store: Any) -> None:
+        """Mark to the store's current quotes and follow its future changes.
+
+        Symbols first held after this are priced from the store too, so seed
+        prices only stand in for symbols it has no quote for.
+        """
+        with self._lock:
+            self._store = store
+        symbols = store.symbols
+        if symbols:
+            rows = store.rows_for(symbols)
+            self.update_prices(symbols, store.column("price")[rows], store.column("previous_close")[rows])
+        store.add_listener(self.on_quote_changes)
+
+    def revalue_all(self) -> None:
+        """Recompute every portfolio as one sparse matrix-vector product"""
+        with self._lock:
+            n, size = self._entries, self._rows_used
+            rows, cols, shares = self._entry_row[:n], self._entry_col[:n], self._entry_shares[:n]
+            self._value[:size] = np.bincount(rows, shares * self._prices_or_zero(cols), minlength=size)
+            self._previous_value[:size] = np.bincount(
+                rows, shares * self._previous_or_price(cols), minlength=size
+            )
+            self._updates_since_revalue = 0
+
+    # ----------------------------- Reads ------------------------------ #
+    def add_listener(self, listener: ValuationListener) -> None:
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: ValuationListener) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, portfolio_ids: Sequence[str]) -> None:
+        if not len(portfolio_ids):
+            return
+        for listener in list(self._listeners):
+            try:
+                listener(portfolio_ids)
+            except Exception:
+                logger.error("Valuation listener failed", exc_info=True)
+
+    def valuation(self, portfolio_id: str) -> Optional[Dict[str, Any]]:
+        """Totals and per-holding values for one portfolio"""
+        with self._lock:
+            row = self._portfolio_index.get(portfolio_id)
+            if row is None:
+                return None
+            entries = self._row_entries.get(row, np.zeros(0, dtype=np.int64))
+            cols = self._entry_col[entries]
+            prices = self._prices_or_zero(cols)
+            values = self._entry_shares[entries] * prices
+            total = float(self._value[row])
+            previous = float(self._previous_value[row])
+            cost = float(self._cost[row])
+            holdings = {
+                self._symbols[c]: {
+                    "current_price": round(p, 2),
+                    "value": round(v, 2),
+                    "allocation": round(v / total * 100, 1) if total else 0.0,
+                }
+                for c, p, v in zip(cols.tolist(), prices.tolist(), values.tolist())
+            }
+        day_change = total - previous
+        gain = total - cost
+        return {
+            "total_value": round(total, 2),
+            "total_cost": round(cost, 2),
+            "day_change": round(day_change, 2),
+            "day_change_percent": round(day_change / previous * 100, 2) if previous else 0.0,
+            "total_gain_loss": round(gain, 2),
+            "total_gain_loss_percent": round(gain / cost * 100, 2) if cost else 0.0,
+            "holdings": holdings,
+        }
+
+    @property
+    def portfolio_ids(self) -> List[str]:
+        """Ids of every portfolio with holdings loaded"""
+        with self._lock:
+            return list(self._portfolio_index)
+
+    @property
+    def symbols(self) -> List[str]:
+        """Symbols held by any portfolio, in column order"""
+        return list(self._symbols)
+
+    def prices(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Current price and previous close per symbol (NaN when unknown), in column order"""
+        with self._lock:
+            n = len(self._symbols)
+            return self._price[:n].copy(), self._previous_close[:n].copy()
+
+    def values_at(self, *price_vectors: np.ndarray) -> Tuple[np.ndarray, List[np.ndarray]]:
+        """Ids of every live portfolio and its value at each given per-symbol price vector.
+
+        Vectors are in column order (see `symbols`); NaN and symbols added since
+        count as 0. Used to value portfolios at historical closes.
+        """
+        with self._lock:
+            n, size, width = self._entries, self._rows_used, len(self._symbols)
+            rows, cols, shares = self._entry_row[:n], self._entry_col[:n], self._entry_shares[:n]
+            live = np.fromiter(self._portfolio_index.values(), dtype=np.int64)
+            values = []
+            for prices in price_vectors:
+                padded = np.zeros(width)
+                prices = np.asarray(prices, dtype=np.float64)[:width]
+                padded[: len(prices)] = np.where(np.isnan(prices), 0.0, prices)
+                values.append(np.bincount(rows, shares * padded[cols], minlength=size)[live])
+            return np.array(list(self._portfolio_index), dtype=object), values
+
+    def rows_for(self, portfolio_ids: Sequence[str]) -> np.ndarray:
+        """Engine rows of the given portfolios (-1 for unknown ids); rows are never reused"""
+        with self._lock:
+            index = self._portfolio_index
+            return np.fromiter((index.get(pid, -1) for pid in portfolio_ids), dtype=np.int64, count=len(portfolio_ids))
+
+    def row_totals(self, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Current value and cost of the given rows"""
+        with self._lock:
+            return self._value[rows], self._cost[rows]
+
+    def totals(self) -> Dict[str, np.ndarray]:
+        """Value, previous-close value and cost of every live portfolio (aligned arrays)"""
+        with self._lock:
+            rows = np.fromiter(self._portfolio_index.values(), dtype=np.int64)
+            return {
+                "ids": np.array(list(self._portfolio_index), dtype=object),
+                "value": self._value[rows].copy(),
+                "previous_value": self._previous_value[rows].copy(),
+                "cost": self._cost[rows].copy(),
+            }
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "portfolios": len(self._portfolio_index),
+            "symbols": len(self._symbols),
+            "holdings": int(np.count_nonzero(self._entry_live[: self._entries])),
+            "ticks": self.ticks,
+            "entries_touched": self.entries_touched,
+        }
+
+
+# Process-wide engine behind the portfolio endpoints
+valuation_engine = ValuationEngine()
+
+
+def get_valuation_engine() -> ValuationEngine:
+    """Return the shared process-wide valuation engine"""
+    return valuation_engine
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Benchmark: chat turn latency with the intent pipeline versus tool calling
+
+Answers held-out chat queries (tests/data/intent_holdout.jsonl) against a local
+stand-in LLM server with a fixed latency per completion, three ways: the
+intent pipeline with every query parsed by the LLM, the pipeline with the
+local intent classifier in front, and the tool-calling mode. Reports LLM
+completions per turn and median/p95 turn latency. Quotes and trends come
+from the offline demo data, so the LLM dominates.
+
+Usage: python benchmarks/bench_chat_modes.py [--turns 60] [--llm-latency 0.3] [--concurrency 4]
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "tests"))
+os.environ.setdefault("ALPHA_VANTAGE_API_KEY", "")
+os.environ.setdefault("BARS_DIR", f"/tmp/stockvision-bench-{os.getpid()}")
+
+from app.routers import chatbot  # noqa: E402
+from app.services import llm_client  # noqa: E402
+from app.services.ai_services import AIStockAnalyzer  # noqa: E402
+from app.services.intent_cache import IntentCache  # noqa: E402
+from app.services.intent_classifier import IntentClassifier  # noqa: E402
+from stub_servers import LLMStubServer  # noqa: E402
+
+EVAL_SET = os.path.join(BACKEND_DIR, "tests", "data", "intent_holdout.jsonl")
+
+
+async def pipeline_turn(query: str, analyzer: AIStockAnalyzer) -> None:
+    analysis = await analyzer.analyze_stock_query(query)
+    data = await chatbot.fetch_stock_data(analysis)
+    await analyzer.generate_response(query, data)
+
+
+async def tools_turn(query: str, analyzer: AIStockAnalyzer) -> None:
+    if await chatbot.answer_with_tools(query, analyzer) is None:
+        raise RuntimeError("tool-calling turn failed")
+
+
+async def replay(queries, turn, analyzer: AIStockAnalyzer, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(query: str) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await turn(query, analyzer)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await llm_client.init_llm_client()
+    try:
+        await asyncio.gather(*(one(q) for q in queries))
+    finally:
+        await llm_client.close_llm_client()
+    return latencies
+
+
+def main(n_turns: int, llm_latency: float, concurrency: int) -> None:
+    with open(EVAL_SET, encoding="utf-8") as handle:
+        labeled = [json.loads(line)["query"] for line in handle if line.strip()]
+    queries = [labeled[i % len(labeled)] for i in range(n_turns)]
+    print(f"{len(queries)} chat turns, stand-in LLM latency {llm_latency * 1000:.0f} ms per completion, "
+          f"concurrency {concurrency}")
+
+    modes = (
+        ("pipeline, LLM parse", pipeline_turn, IntentClassifier(threshold=1.1)),
+        ("pipeline, local parse", pipeline_turn, IntentClassifier()),
+        ("tool calling", tools_turn, IntentClassifier()),
+    )
+    results = {}
+    with LLMStubServer(latency=llm_latency) as stub:
+        stub.tool_calls = [("get_real_time_stock_data", {"symbols": ["AAPL"]}),
+                           ("get_stock_trends", {"symbols": ["MSFT"], "days": 30})]
+        os.environ["OPENAI_API_KEY"] = "bench-key"
+        llm_client.OPENAI_BASE_URL = stub.url
+        for label, turn, classifier in modes:
+            stub.reset_counters()
+            # No cache, so repeated queries are not free for the pipeline
+            analyzer = AIStockAnalyzer(intent_cache=IntentCache(max_entries=0), classifier=classifier)
+            latencies = asyncio.run(replay(queries, turn, analyzer, concurrency))
+            results[label] = (stub.requests, latencies)
+
+    base = statistics.median(results["pipeline, LLM parse"][1])
+    for label, (calls, latencies) in results.items():
+        ordered = sorted(latencies)
+        p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+        median = statistics.median(latencies)
+        print(f"  {label:<22}: {calls / len(queries):4.2f} completions/turn  median {median:7.1f} ms "
+              f"({median / base:5.0%} of LLM-parse pipeline)  p95 {p95:7.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--turns", type=int, default=60)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+    main(args.turns, args.llm_latency, args.concurrency)
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark: end-of-day snapshot throughput
+
+Stores portfolios in a scratch SQLite database (the job reads them back a
+batch at a time; the valuation engine only supplies live quotes) and runs
+the snapshot job for a series of trading days, reporting
+portfolios per second for the first day (new yearly chunks) and for later
+days (appending to existing chunks), plus a no-op re-run of a finished day.
+
+Usage: python benchmarks/bench_eod_snapshots.py [--portfolios 50000] [--days 5] [--batch-size 1000]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import numpy as np  # noqa: E402
+from sqlalchemy import create_engine, insert  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.db import Base  # noqa: E402
+from app.portfolio_models import HoldingDB, PortfolioDB, PortfolioHistoryChunkDB, SnapshotLeaseDB, SnapshotRunDB  # noqa: E402
+from app.services.bar_store import BarStore  # noqa: E402
+from app.services.eod_snapshots import SnapshotJob, trading_days  # noqa: E402
+from app.services.valuation_engine import ValuationEngine  # noqa: E402
+
+
+def main(n_portfolios: int, days: int, batch_size: int, n_symbols: int = 500, holdings: int = 8) -> None:
+    rng = np.random.default_rng(1)
+    symbols = [f"SYM{i}" for i in range(n_symbols)]
+    prices = rng.uniform(5, 500, n_symbols)
+    valuation = ValuationEngine(capacity=n_portfolios)
+    portfolios, rows = [], []
+    for p in range(n_portfolios):
+        pid = f"p{p:07d}"
+        cols = rng.choice(n_symbols, size=holdings, replace=False)
+        shares = rng.integers(1, 100, holdings)
+        valuation.set_holdings(pid, [symbols[c] for c in cols.tolist()], shares, prices[cols], prices[cols])
+        portfolios.append({"id": pid, "name": pid})
+        rows.extend({"portfolio_id": pid, "symbol": symbols[c], "name": symbols[c], "shares": int(n),
+                     "avg_cost": float(prices[c]), "last_price": float(prices[c])}
+                    for c, n in zip(cols.tolist(), shares.tolist()))
+
+    with tempfile.TemporaryDirectory(prefix="stockvision-bench-") as scratch:
+        engine = create_engine(f"sqlite:///{os.path.join(scratch, 'snapshots.db')}")
+        Base.metadata.create_all(bind=engine, tables=[
+            PortfolioDB.__table__, HoldingDB.__table__, PortfolioHistoryChunkDB.__table__, SnapshotRunDB.__table__,
+            SnapshotLeaseDB.__table__,
+        ])
+        with engine.begin() as connection:
+            connection.execute(insert(PortfolioDB), portfolios)
+            connection.execute(insert(HoldingDB), rows)
+        job = SnapshotJob(engine=valuation, bars=BarStore(os.path.join(scratch, "bars")),
+                          session_factory=sessionmaker(bind=engine), batch_size=batch_size)
+        print(f"{n_portfolios:,} portfolios x {holdings} holdings, batches of {batch_size:,}")
+
+        first = datetime(2024, 1, 2, 22, 0)
+        for i, day in enumerate(trading_days(first.date() - timedelta(days=1), first.date() + timedelta(days=days * 2))[:days]):
+            valuation.update_prices(symbols, prices * rng.uniform(0.98, 1.02, n_symbols))
+            report = job.snapshot(day, live=True)
+            label = "first day (new chunks)" if i == 0 else f"day {i + 1} (append)"
+            print(f"  {label:<24}: {report['seconds']:7.2f} s  {report['portfolios_per_second']:10,.0f} portfolios/s")
+
+        start = time.perf_counter()
+        job.snapshot(day, live=True)
+        print(f"  re-run of a finished day : {(time.perf_counter() - start) * 1e3:7.2f} ms (no writes)")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--portfolios", type=int, default=50_000)
+    parser.add_argument("--days", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    args = parser.parse_args()
+    main(args.portfolios, args.days, args.batch_size)
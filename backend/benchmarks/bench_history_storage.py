@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Benchmark: compressed yearly history chunks vs one row per portfolio per day
+
+Stores the same multi-year daily histories twice in scratch SQLite
+databases, once as rows keyed by (portfolio_id, date) with a covering index
+and once as compressed per-year chunks, then compares file size and the
+time to read full, multi-year and recent ranges.
+
+Usage: python benchmarks/bench_history_storage.py [--portfolios 500] [--years 10]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import date
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import numpy as np  # noqa: E402
+from sqlalchemy import Column, Date, Float, Index, MetaData, String, Table, create_engine, insert, select  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from app.db import Base  # noqa: E402
+from app.portfolio_models import HoldingDB, PortfolioDB, PortfolioHistoryChunkDB  # noqa: E402
+from app.services.portfolio_database import PortfolioDatabaseService as service  # noqa: E402
+
+# One row per portfolio per day (the layout the chunks replace)
+row_metadata = MetaData()
+history_rows = Table(
+    "portfolio_history", row_metadata,
+    Column("portfolio_id", String, primary_key=True),
+    Column("date", Date, primary_key=True),
+    Column("value", Float, nullable=False),
+    Column("change", Float, nullable=False),
+    Column("change_percent", Float, nullable=False),
+    Index("ix_portfolio_history_range", "portfolio_id", "date", "value", "change", "change_percent"),
+)
+
+
+def histories(n_portfolios: int, years: int):
+    rng = np.random.default_rng(3)
+    end = np.datetime64(date.today(), "D")
+    dates = np.arange(end - 365 * years, end, dtype="datetime64[D]")
+    dates = dates[~np.isin(dates.view("int64") % 7, [2, 3])]  # trading days only
+    for p in range(n_portfolios):
+        values = np.round(10_000 * np.cumprod(1 + rng.normal(0.0003, 0.01, len(dates))), 2)
+        change = np.round(np.diff(values, prepend=values[0]), 2)
+        yield f"portfolio-{p:06d}-{'x' * 24}", dates, np.stack([values, change, np.round(change / values * 100, 2)], 1)
+
+
+def median_ms(read, ids, runs: int) -> float:
+    rng = np.random.default_rng(9)
+    timings = []
+    for _ in range(runs):
+        pid = ids[int(rng.integers(len(ids)))]
+        start = time.perf_counter()
+        read(pid)
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings)) * 1e3
+
+
+def main(n_portfolios: int, years: int, runs: int) -> None:
+    with tempfile.TemporaryDirectory(prefix="stockvision-bench-") as scratch:
+        row_path, chunk_path = os.path.join(scratch, "rows.db"), os.path.join(scratch, "chunks.db")
+        row_engine, chunk_engine = create_engine(f"sqlite:///{row_path}"), create_engine(f"sqlite:///{chunk_path}")
+        row_metadata.create_all(row_engine)
+        Base.metadata.create_all(
+            bind=chunk_engine, tables=[PortfolioDB.__table__, HoldingDB.__table__, PortfolioHistoryChunkDB.__table__]
+        )
+        session = sessionmaker(bind=chunk_engine)()
+
+        ids, points = [], 0
+        with row_engine.begin() as conn:
+            for pid, dates, columns in histories(n_portfolios, years):
+                ids.append(pid)
+                points += len(dates)
+                conn.execute(insert(history_rows), [
+                    {"portfolio_id": pid, "date": d, "value": v, "change": c, "change_percent": cp}
+                    for d, (v, c, cp) in zip(dates.tolist(), columns.tolist())
+                ])
+                service.add_history_arrays(session, {pid: (dates, columns)})
+        for engine in (row_engine, chunk_engine):
+            with engine.connect() as conn:
+                conn.exec_driver_sql("VACUUM")
+
+        row_size, chunk_size = os.path.getsize(row_path), os.path.getsize(chunk_path)
+        print(f"{n_portfolios:,} portfolios x {years} years ({points:,} daily points)")
+        print(f"  rows   : {row_size / 1e6:8.1f} MB ({row_size / points:5.1f} B/point)")
+        print(f"  chunks : {chunk_size / 1e6:8.1f} MB ({chunk_size / points:5.1f} B/point), "
+              f"{row_size / chunk_size:.1f}x smaller")
+
+        h = history_rows
+
+        def rows_between(pid, start=None, last=None):
+            with row_engine.connect() as conn:
+                query = select(h.c.date, h.c.value, h.c.change, h.c.change_percent).where(h.c.portfolio_id == pid)
+                if start is not None:
+                    query = query.where(h.c.date >= start)
+                query = query.order_by(h.c.date.desc()).limit(last) if last else query.order_by(h.c.date)
+                rows = conn.execute(query).all()
+            return np.array([r[0] for r in rows], dtype="datetime64[D]"), np.array([r[1:] for r in rows])
+
+        three_years = date(date.today().year - 3, 1, 1)
+        cases = [
+            (f"full {years} years", lambda pid: rows_between(pid), lambda pid: service.get_history_arrays(session, pid)),
+            ("last 3 calendar years", lambda pid: rows_between(pid, start=three_years),
+             lambda pid: service.get_history_arrays(session, pid, start=three_years)),
+            ("last 90 points", lambda pid: rows_between(pid, last=90),
+             lambda pid: service.get_history_arrays(session, pid, last=90)),
+        ]
+        for label, by_rows, by_chunks in cases:
+            rows_ms, chunks_ms = median_ms(by_rows, ids, runs), median_ms(by_chunks, ids, runs)
+            print(f"  read {label:<22}: rows {rows_ms:7.3f} ms   chunks {chunks_ms:7.3f} ms   "
+                  f"({rows_ms / chunks_ms:.1f}x)")
+        session.close()
+        row_engine.dispose()
+        chunk_engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--portfolios", type=int, default=500)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+    main(args.portfolios, args.years, args.runs)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Benchmark: intent parsing with and without the memoized intent cache
+
+Replays a chat query log (a file with one query per line, or a synthetic
+log with Zipf-distributed questions typed in varying case, punctuation and
+ticker spellings) through AIStockAnalyzer.analyze_stock_query against a
+local stand-in LLM server, once with the cache disabled and once enabled,
+and reports LLM calls, token spend, hit rate and parse latency.
+
+Usage: python benchmarks/bench_intent_cache.py [--queries 1000] [--llm-latency 0.3] [--concurrency 10] [--log queries.txt]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "tests"))
+
+import numpy as np  # noqa: E402
+
+from app.services import llm_client  # noqa: E402
+from app.services.ai_services import AIStockAnalyzer  # noqa: E402
+from app.services.intent_cache import IntentCache  # noqa: E402
+from stub_servers import LLMStubServer  # noqa: E402
+
+TEMPLATES = [
+    "price of {t}", "what's the price of {t}?", "how is {t} trending over the last 30 days",
+    "{t} stock price", "is {t} risky", "compare {t} and {u}", "{t} trend", "show me {t}",
+]
+GENERAL = ["market summary", "how is the market today?", "analyze my portfolio risk", "compare my portfolios"]
+TICKERS = {
+    "AAPL": "Apple", "MSFT": "Microsoft", "GOOGL": "Google", "AMZN": "Amazon", "TSLA": "Tesla",
+    "META": "Facebook", "NVDA": "Nvidia", "NFLX": "Netflix", "AMD": None, "INTC": None, "JPM": None, "DIS": None,
+}
+
+
+def spell(ticker: str, rng: np.random.Generator) -> str:
+    """One of the ways users write a ticker"""
+    name = TICKERS[ticker]
+    options = [ticker, ticker.lower(), "$" + ticker] + ([name, name.lower()] if name else [])
+    return options[int(rng.integers(len(options)))]
+
+
+def synthetic_log(n: int, seed: int = 11):
+    """Zipf-popular questions with random surface variations"""
+    rng = np.random.default_rng(seed)
+    symbols = list(TICKERS)
+    questions = [(q, None, None) for q in GENERAL]
+    for template in TEMPLATES:
+        for t in symbols:
+            if "{u}" in template:
+                questions += [(template, t, u) for u in symbols if u != t]
+            else:
+                questions.append((template, t, None))
+    rng.shuffle(questions)
+    ranks = np.minimum(rng.zipf(1.3, n), len(questions)) - 1
+    log = []
+    for rank in ranks.tolist():
+        template, t, u = questions[rank]
+        query = template.format(t=spell(t, rng) if t else "", u=spell(u, rng) if u else "")
+        if rng.random() < 0.3:
+            query = query.upper() if rng.random() < 0.5 else query.capitalize()
+        if rng.random() < 0.3:
+            query = "  " + query.replace(" ", "  ") + " ?"
+        log.append(query)
+    return log
+
+
+async def replay(log, analyzer: AIStockAnalyzer, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(query: str) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await analyzer.analyze_stock_query(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await llm_client.init_llm_client()
+    try:
+        start = time.perf_counter()
+        await asyncio.gather(*(one(q) for q in log))
+        return latencies, time.perf_counter() - start
+    finally:
+        await llm_client.close_llm_client()
+
+
+def main(n_queries: int, llm_latency: float, concurrency: int, log_path: str = None) -> None:
+    if log_path:
+        with open(log_path, encoding="utf-8") as handle:
+            log = [line.strip() for line in handle if line.strip()]
+    else:
+        log = synthetic_log(n_queries)
+    print(f"{len(log):,} queries, stand-in LLM latency {llm_latency * 1000:.0f} ms, concurrency {concurrency}")
+
+    results = {}
+    with LLMStubServer(latency=llm_latency) as stub:
+        os.environ["OPENAI_API_KEY"] = "bench-key"
+        llm_client.OPENAI_BASE_URL = stub.url
+        llm_client.LLM_MAX_CONCURRENCY = max(concurrency, 1)
+        for label, cache in (("no cache", IntentCache(max_entries=0)), ("intent cache", IntentCache())):
+            stub.reset_counters()
+            analyzer = AIStockAnalyzer(intent_cache=cache)
+            latencies, wall = asyncio.run(replay(log, analyzer, concurrency))
+            results[label] = (stub.requests, latencies, wall, cache.stats())
+
+    for label, (calls, latencies, wall, stats) in results.items():
+        ordered = sorted(latencies)
+        p95 = ordered[min(len(ordered) - 1, int(0.95 * len(ordered)))]
+        print(f"  {label:<13}: {calls:5,} LLM calls  hit rate {stats['hit_rate']:6.1%}  "
+              f"parse mean {statistics.mean(latencies):7.1f} ms  p50 {statistics.median(latencies):7.1f} ms  "
+              f"p95 {p95:7.1f} ms  wall {wall:6.2f} s")
+    base_calls = results["no cache"][0]
+    calls, _, _, stats = results["intent cache"]
+    tokens_per_parse = stats["tokens_saved"] / stats["hits"] if stats["hits"] else 0.0
+    print(f"  saved: {base_calls - calls:,} LLM calls ({1 - calls / base_calls:.1%}), "
+          f"{stats['tokens_saved']:,} tokens (~{tokens_per_parse:.0f} per parse); "
+          f"{stats['size']:,} distinct normalized queries cached")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--log", default=None, help="Query log to replay, one query per line")
+    args = parser.parse_args()
+    main(args.queries, args.llm_latency, args.concurrency, args.log)
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark: local intent classifier versus the keyword fallback it replaced
+
+Scores labeled query sets with the old substring fallback and with
+IntentClassifier: by default the tuning set the weights were fitted to
+(tests/data/intent_tuning.jsonl) and the held-out set that was never used
+for tuning (tests/data/intent_holdout.jsonl). For each it reports action
+and ticker accuracy, how many LLM calls each confidence threshold avoids and
+how accurate the locally answered queries are, calibration (expected
+calibration error, and the temperature that minimizes log loss) and the
+time to classify one query. The held-out figures are the ones to quote.
+
+Usage: python benchmarks/bench_intent_classifier.py [--eval tests/data/intent_holdout.jsonl ...] [--repeat 200]
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from app.services.intent_classifier import ACTIONS, IntentClassifier  # noqa: E402
+
+DEFAULT_EVAL = [
+    os.path.join(BACKEND_DIR, "tests", "data", "intent_tuning.jsonl"),
+    os.path.join(BACKEND_DIR, "tests", "data", "intent_holdout.jsonl"),
+]
+THRESHOLDS = (0.5, 0.6, 0.7, 0.8, 0.9, 0.95)
+TEMPERATURES = (0.5, 0.75, 1.0, 1.25, 1.5, 2.0, 3.0)
+
+
+def substring_analysis(query: str):
+    """The keyword fallback AIStockAnalyzer used before the classifier"""
+    query_lower = query.lower()
+    symbols = [s.upper() for s in ["aapl", "googl", "msft", "amzn", "tsla", "meta", "nvda", "nflx"] if s in query_lower]
+    if any(word in query_lower for word in ["price", "cost", "value", "current"]):
+        action = "get_price"
+    elif any(word in query_lower for word in ["trend", "analysis", "performance", "growth"]):
+        action = "get_trends"
+    elif any(word in query_lower for word in ["compare", "comparison", "portfolio"]):
+        action = "compare_portfolios"
+    elif any(word in query_lower for word in ["risk", "volatility"]):
+        action = "analyze_risk"
+    else:
+        action = "market_summary"
+    return action, symbols
+
+
+def softmax_top(scores, temperature: float):
+    best = max(ACTIONS, key=scores.__getitem__)
+    total = sum(math.exp((scores[a] - scores[best]) / temperature) for a in ACTIONS)
+    return best, {a: math.exp((scores[a] - scores[best]) / temperature) / total for a in ACTIONS}
+
+
+def expected_calibration_error(pairs, bins: int = 10) -> float:
+    """pairs of (confidence, correct); weighted mean |accuracy - confidence| per bin"""
+    error = 0.0
+    for b in range(bins):
+        members = [(c, ok) for c, ok in pairs if b / bins < c <= (b + 1) / bins or (b == 0 and c == 0)]
+        if members:
+            confidence = sum(c for c, _ in members) / len(members)
+            accuracy = sum(ok for _, ok in members) / len(members)
+            error += len(members) / len(pairs) * abs(accuracy - confidence)
+    return error
+
+
+def report(eval_path: str, repeat: int) -> None:
+    with open(eval_path, encoding="utf-8") as handle:
+        rows = [json.loads(line) for line in handle if line.strip()]
+    classifier = IntentClassifier()
+    print(f"{len(rows)} labeled queries from {os.path.relpath(eval_path, BACKEND_DIR)}")
+
+    legacy = [substring_analysis(r["query"]) for r in rows]
+    intents = [classifier.classify(r["query"]) for r in rows]
+    for label, actions, symbols in (
+        ("substring", [a for a, _ in legacy], [s for _, s in legacy]),
+        ("classifier", [i["action"] for i in intents], [i["symbols"] for i in intents]),
+    ):
+        action_acc = sum(a == r["action"] for a, r in zip(actions, rows)) / len(rows)
+        symbol_acc = sum(s == r["symbols"] for s, r in zip(symbols, rows)) / len(rows)
+        print(f"  {label:<10}: action accuracy {action_acc:6.1%}  ticker accuracy {symbol_acc:6.1%}")
+
+    correct = [i["action"] == r["action"] for i, r in zip(intents, rows)]
+    print(f"  confidence gate (temperature {classifier.temperature}, configured threshold {classifier.threshold}):")
+    for threshold in THRESHOLDS:
+        local = [ok for ok, i in zip(correct, intents) if i["confidence"] >= threshold]
+        local_acc = sum(local) / len(local) if local else float("nan")
+        marker = "  <- configured" if threshold == classifier.threshold else ""
+        print(f"    >= {threshold:<4}: {len(local) / len(rows):6.1%} answered locally (LLM calls avoided), "
+              f"accuracy {local_acc:6.1%}{marker}")
+
+    scores = [classifier.scores(r["query"])[0] for r in rows]
+    ece = expected_calibration_error([(i["confidence"], ok) for i, ok in zip(intents, correct)])
+    log_loss = {}
+    for temperature in TEMPERATURES:
+        probs = [softmax_top(s, temperature)[1][r["action"]] for s, r in zip(scores, rows)]
+        log_loss[temperature] = -sum(math.log(max(p, 1e-12)) for p in probs) / len(rows)
+    best = min(log_loss, key=log_loss.get)
+    print(f"  calibration: ECE {ece:.3f}; log loss "
+          + "  ".join(f"T={t}: {v:.3f}" for t, v in log_loss.items()) + f"  (lowest at T={best})")
+
+    queries = [r["query"] for r in rows]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            classifier.classify(query)
+    per_query = (time.perf_counter() - start) / (repeat * len(queries))
+    print(f"  classify: {per_query * 1e6:.1f} µs per query ({repeat} passes)")
+
+
+def main(eval_paths, repeat: int) -> None:
+    for eval_path in eval_paths:
+        report(eval_path, repeat)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--eval", nargs="+", default=DEFAULT_EVAL,
+                        help="JSONL files with query, action and symbols per line")
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    main(args.eval, args.repeat)
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Benchmark: /health latency while chat requests wait on the LLM
+
+Sends concurrent /api/chatbot/chat requests through the app against a local
+stand-in LLM server with a fixed latency per completion, and polls /health
+the whole time. Reports /health median/p99 idle and under load, and the chat
+completion throughput through the shared, concurrency-capped LLM client. A
+client that blocked the event loop would hold /health for a whole LLM call.
+
+Usage: python benchmarks/bench_llm_client.py [--chats 50] [--llm-latency 0.3] [--max-concurrency 10]
+"""
+import argparse
+import asyncio
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "tests"))
+os.environ.setdefault("ALPHA_VANTAGE_API_KEY", "")
+# Scratch database and bar files, removed when the run ends
+SCRATCH = tempfile.mkdtemp(prefix="stockvision-bench-")
+os.environ.setdefault("BARS_DIR", os.path.join(SCRATCH, "bars"))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(SCRATCH, 'bench.db')}")
+# Every query goes to the LLM, as it did before the local intent classifier
+os.environ.setdefault("INTENT_CONFIDENCE_THRESHOLD", "1.1")
+
+import httpx  # noqa: E402
+
+from app.services import llm_client  # noqa: E402
+from main import app  # noqa: E402
+from stub_servers import LLMStubServer  # noqa: E402
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def run(n_chats: int):
+    await llm_client.init_llm_client()
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as http:
+            async def health_ms() -> float:
+                start = time.perf_counter()
+                (await http.get("/health")).raise_for_status()
+                return (time.perf_counter() - start) * 1000
+
+            # One chat first so one-off setup (lazy imports, model schemas) is not measured
+            warmup = await http.post("/api/chatbot/chat", json={"message": "price of AAPL", "session_id": "warmup"})
+            warmup.raise_for_status()
+            idle = [await health_ms() for _ in range(50)]
+
+            start = time.perf_counter()
+            chats = [
+                asyncio.ensure_future(http.post("/api/chatbot/chat", json={
+                    "message": f"What is the price of AAPL? ({i})", "session_id": f"bench-{i}"
+                }))
+                for i in range(n_chats)
+            ]
+            loaded = []
+            while not all(chat.done() for chat in chats):
+                loaded.append(await health_ms())
+                await asyncio.sleep(0.02)
+            for response in await asyncio.gather(*chats):
+                response.raise_for_status()
+            return idle, loaded, time.perf_counter() - start, llm_client.get_llm_client().stats()
+    finally:
+        await llm_client.close_llm_client()
+
+
+def main(n_chats: int, llm_latency: float, max_concurrency: int) -> None:
+    with LLMStubServer(latency=llm_latency) as stub:
+        os.environ["OPENAI_API_KEY"] = "bench-key"
+        llm_client.OPENAI_BASE_URL = stub.url
+        llm_client.LLM_MAX_CONCURRENCY = max_concurrency
+        idle, loaded, elapsed, stats = asyncio.run(run(n_chats))
+
+    print(f"{n_chats} concurrent chats, stand-in LLM latency {llm_latency * 1000:.0f} ms per completion, "
+          f"at most {max_concurrency} in flight")
+    print(f"  /health idle        : median {statistics.median(idle):6.2f} ms  p99 {percentile(idle, 99):6.2f} ms")
+    print(f"  /health under load  : median {statistics.median(loaded):6.2f} ms  p99 {percentile(loaded, 99):6.2f} ms "
+          f"({len(loaded)} checks)")
+    print(f"  chats               : {elapsed:6.2f} s for {stats['calls']} completions "
+          f"(peak {stats['peak_in_flight']} in flight)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--llm-latency", type=float, default=0.3)
+    parser.add_argument("--max-concurrency", type=int, default=10)
+    args = parser.parse_args()
+    try:
+        main(args.chats, args.llm_latency, args.max_concurrency)
+    finally:
+        shutil.rmtree(SCRATCH, ignore_errors=True)
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Benchmark: portfolio list/get/history latency on the database-backed store
+
+Fills a scratch SQLite database with many portfolios (holdings and daily
+history included) and times the service queries behind the portfolio
+endpoints, counting the SQL statements each one issues. A lazy-loading
+list page (one extra query per portfolio, N+1) is timed next to the
+eager-loading one.
+
+Usage: python benchmarks/bench_portfolio_db.py [--portfolios 100000] [--history-days 30]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import numpy as np  # noqa: E402
+from sqlalchemy import create_engine, event, insert  # noqa: E402
+from sqlalchemy.orm import lazyload, sessionmaker  # noqa: E402
+
+from app.db import Base  # noqa: E402
+from app.portfolio_models import HoldingDB, PortfolioDB, PortfolioHistoryChunkDB  # noqa: E402
+from app.services.history_chunks import encode_chunk  # noqa: E402
+from app.services.portfolio_database import PortfolioDatabaseService as service  # noqa: E402
+
+SYMBOLS = ["AAPL", "MSFT", "GOOG", "AMZN", "NVDA", "META", "TSLA", "AMD", "VTI", "SPY", "QQQ", "NFLX"]
+BATCH = 20_000
+
+
+def populate(session, n_portfolios: int, holdings: int, history_days: int, owners: int) -> list:
+    rng = random.Random(7)
+    ids = [f"p{i:07d}" for i in range(n_portfolios)]
+    start = datetime(2020, 1, 1)
+    days = np.arange(history_days) + np.datetime64(date.today() - timedelta(days=history_days), "D")
+    columns = np.stack([10_000.0 + np.arange(history_days), np.ones(history_days), np.full(history_days, 0.01)], 1)
+    years = days.astype("datetime64[Y]").astype(np.int64) + 1970
+    chunks = [(int(y), encode_chunk(days[years == y], columns[years == y])) for y in np.unique(years)]
+    for lo in range(0, n_portfolios, BATCH):
+        chunk = ids[lo:lo + BATCH]
+        session.execute(insert(PortfolioDB), [
+            {"id": pid, "owner_id": f"user{rng.randrange(owners)}", "name": f"Portfolio {pid}",
+             "created_at": start + timedelta(minutes=lo + i), "updated_at": start}
+            for i, pid in enumerate(chunk)
+        ])
+        session.execute(insert(HoldingDB), [
+            {"portfolio_id": pid, "symbol": symbol, "name": symbol, "shares": rng.randrange(1, 200),
+             "avg_cost": 100.0, "last_price": 110.0}
+            for pid in chunk for symbol in rng.sample(SYMBOLS, holdings)
+        ])
+        session.execute(insert(PortfolioHistoryChunkDB), [
+            {"portfolio_id": pid, "year": year, **fields} for pid in chunk for year, fields in chunks
+        ])
+        session.commit()
+    return ids
+
+
+def timed(label: str, statements: list, runs: int, query) -> None:
+    timings, issued = [], 0
+    for _ in range(runs):
+        statements.clear()
+        start = time.perf_counter()
+        query()
+        timings.append(time.perf_counter() - start)
+        issued = len(statements)
+    print(f"  {label:<34}: p50 {np.median(timings) * 1e3:7.3f} ms  "
+          f"p95 {np.percentile(timings, 95) * 1e3:7.3f} ms  ({issued} statement{'s' if issued != 1 else ''})")
+
+
+def main(n_portfolios: int, holdings: int, history_days: int, owners: int, runs: int) -> None:
+    with tempfile.TemporaryDirectory(prefix="stockvision-bench-") as scratch:
+        run_benchmark(os.path.join(scratch, "portfolios.db"), n_portfolios, holdings, history_days, owners, runs)
+
+
+def run_benchmark(path: str, n_portfolios: int, holdings: int, history_days: int, owners: int, runs: int) -> None:
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(
+        bind=engine, tables=[PortfolioDB.__table__, HoldingDB.__table__, PortfolioHistoryChunkDB.__table__]
+    )
+    session = sessionmaker(bind=engine)()
+
+    start = time.perf_counter()
+    ids = populate(session, n_portfolios, holdings, history_days, owners)
+    print(f"{n_portfolios:,} portfolios x {holdings} holdings, {history_days} days of history each "
+          f"(loaded in {time.perf_counter() - start:.1f} s, {os.path.getsize(path) / 1e6:.0f} MB)")
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    rng = random.Random(11)
+    today = date.today()
+
+    def fresh(query):
+        def run():
+            session.expunge_all()
+            return query()
+        return run
+
+    def lazy_page():
+        page = (session.query(PortfolioDB).options(lazyload(PortfolioDB.holdings))
+                .filter(PortfolioDB.owner_id == f"user{rng.randrange(owners)}")
+                .order_by(PortfolioDB.created_at.desc()).limit(50).all())
+        return [len(p.holdings) for p in page]
+
+    def eager_page():
+        page = service.list_portfolios(session, owner_id=f"user{rng.randrange(owners)}", limit=50)
+        return [len(p.holdings) for p in page]
+
+    timed("list page of 50 (eager, 1 JOIN)", statements, runs, fresh(eager_page))
+    timed("list page of 50 (lazy, N+1)", statements, runs, fresh(lazy_page))
+    timed("get one with holdings", statements, runs,
+          fresh(lambda: service.get_portfolio(session, rng.choice(ids)).holdings))
+    timed("history, last 90 points", statements, runs,
+          lambda: service.get_history(session, rng.choice(ids), last=90))
+    timed("history, 2-week date range", statements, runs,
+          lambda: service.get_history(session, rng.choice(ids), start=today - timedelta(days=14), end=today))
+    session.close()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--portfolios", type=int, default=100_000)
+    parser.add_argument("--holdings", type=int, default=5)
+    parser.add_argument("--history-days", type=int, default=30)
+    parser.add_argument("--owners", type=int, default=5000)
+    parser.add_argument("--runs", type=int, default=200)
+    args = parser.parse_args()
+    main(args.portfolios, args.holdings, args.history_days, args.owners, args.runs)
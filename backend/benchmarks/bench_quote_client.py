@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-call AsyncClient vs the shared pooled client for quote fetching
+
+Runs the same quote workload against a local stand-in quote server and reports
+TCP handshakes per request plus p50/p99 latency for both strategies.
+
+Usage: python benchmarks/bench_quote_client.py [--requests 500] [--concurrency 10]
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+sys.path.insert(0, os.path.join(BACKEND_DIR, "tests"))
+
+import httpx  # noqa: E402
+
+from app.services import ai_services, http_client  # noqa: E402
+from stub_servers import QuoteStubServer  # noqa: E402
+
+SYMBOLS = ["AAPL", "GOOGL", "MSFT", "AMZN", "TSLA"]
+
+
+async def legacy_fetch(url: str, symbol: str) -> None:
+    """The previous behaviour: a brand new client (and connection) per quote"""
+    async with httpx.AsyncClient() as client:
+        response = await client.get(url, params={"function": "GLOBAL_QUOTE", "symbol": symbol})
+        response.raise_for_status()
+        response.json()
+
+
+async def pooled_fetch(url: str, symbol: str) -> None:
+    await ai_services.get_real_time_stock_data(symbol)
+
+
+async def run_workload(fetch, url: str, total: int, concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(i: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await fetch(url, SYMBOLS[i % len(SYMBOLS)])
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(one(i) for i in range(total)))
+    return latencies
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def report(label: str, stub: QuoteStubServer, latencies) -> None:
+    print(
+        f"{label:<10} requests={stub.requests:<6} connections={stub.connections:<6} "
+        f"handshakes/request={stub.connections / max(stub.requests, 1):.3f} "
+        f"p50={statistics.median(latencies):.2f}ms p99={percentile(latencies, 99):.2f}ms"
+    )
+
+
+async def main(total: int, concurrency: int, latency: float) -> None:
+    os.environ["ALPHA_VANTAGE_API_KEY"] = "bench-key"
+    with QuoteStubServer(latency=latency) as stub:
+        ai_services.ALPHA_VANTAGE_URL = stub.url
+
+        latencies = await run_workload(legacy_fetch, stub.url, total, concurrency)
+        report("before", stub, latencies)
+
+        stub.reset_counters()
+        await http_client.init_http_client()
+        try:
+            latencies = await run_workload(pooled_fetch, stub.url, total, concurrency)
+        finally:
+            await http_client.close_http_client()
+        report("after", stub, latencies)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.002, help="stub server latency (s)")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.concurrency, args.latency))
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Benchmark: dict of StockData models vs the columnar QuoteStore
+
+Reports memory held by each representation plus throughput of point lookups,
+a bulk update of a slice of the universe, and a top-N screen by change_percent.
+
+Usage: python benchmarks/bench_quote_store.py [--symbols 10000]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import numpy as np  # noqa: E402
+
+from app.models import StockData  # noqa: E402
+from app.services.quote_store import QuoteStore  # noqa: E402
+
+
+def make_stocks(n: int):
+    rng = random.Random(42)
+    stocks = []
+    for i in range(n):
+        price = rng.uniform(5, 500)
+        change_percent = rng.uniform(-8, 8)
+        stocks.append(StockData(
+            symbol=f"S{i:05d}", price=price, change=price * change_percent / 100,
+            change_percent=change_percent, volume=rng.randint(1_000, 50_000_000),
+            market_cap=price * rng.randint(10**6, 10**9), high=price * 1.02,
+            low=price * 0.98, open=price, previous_close=price * 0.99,
+        ))
+    return stocks
+
+
+def timed(label: str, ops: int, fn) -> None:
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {elapsed * 1000:9.2f} ms  ({ops / elapsed:,.0f} ops/s)")
+
+
+def main(n: int, updates: int) -> None:
+    stocks = make_stocks(n)
+    symbols = [s.symbol for s in stocks]
+    rng = np.random.default_rng(7)
+    lookup_symbols = [symbols[i] for i in rng.integers(0, n, 100_000)]
+    update_idx = rng.choice(n, size=min(updates, n), replace=False)
+    update_symbols = [symbols[i] for i in update_idx]
+    new_prices = rng.uniform(5, 500, size=len(update_symbols))
+
+    tracemalloc.start()
+    models = {s.symbol: s.model_copy() for s in stocks}
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    store = QuoteStore(capacity=n)
+    store.load_stocks(stocks)
+
+    print(f"Universe: {n:,} symbols")
+    print(f"  dict of StockData models     {dict_bytes / 1e6:9.2f} MB")
+    print(f"  columnar QuoteStore          {store.memory_bytes() / 1e6:9.2f} MB")
+
+    print("dict of models:")
+    timed("point lookup x100k", len(lookup_symbols), lambda: [models[s].price for s in lookup_symbols])
+
+    def dict_update():
+        for symbol, price in zip(update_symbols, new_prices.tolist()):
+            models[symbol] = models[symbol].model_copy(update={"price": price})
+
+    timed(f"bulk update x{len(update_symbols):,}", len(update_symbols), dict_update)
+    timed("top 10 by change_percent", 1, lambda: sorted(
+        models.values(), key=lambda s: s.change_percent, reverse=True)[:10])
+
+    print("columnar store:")
+    price = store._columns["price"]
+    timed("point lookup x100k", len(lookup_symbols), lambda: [price[store.row(s)] for s in lookup_symbols])
+    timed(f"bulk update x{len(update_symbols):,}", len(update_symbols),
+          lambda: store.bulk_update(update_symbols, {"price": new_prices}))
+    timed("top 10 by change_percent", 1, lambda: store.top_n("change_percent", 10))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--symbols", type=int, default=10_000)
+    parser.add_argument("--updates", type=int, default=2_000, help="symbols changed per bulk update")
+    args = parser.parse_args()
+    main(args.symbols, args.updates)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Load test: quote delta fan-out to thousands of simulated subscribers
+
+Each subscriber follows a random set of symbols and drains its queue in its
+own task; a fraction never read at all (stalled clients). The broadcaster
+publishes ticks of vectorized store updates and we report publish latency,
+encodes vs fan-out, end-to-end delivery latency and resyncs of stalled clients.
+
+Usage: python benchmarks/bench_quote_stream.py [--subscribers 5000] [--ticks 300]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import numpy as np  # noqa: E402
+
+from app.services.quote_store import QuoteStore  # noqa: E402
+from app.services.quote_stream import QuoteBroadcaster  # noqa: E402
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+async def main(n_subscribers: int, n_symbols: int, per_client: int, ticks: int,
+               changes_per_tick: int, stalled_fraction: float) -> None:
+    rng = random.Random(5)
+    symbols = [f"S{i:04d}" for i in range(n_symbols)]
+    store = QuoteStore(capacity=n_symbols)
+    store.bulk_update(symbols, {"price": np.full(n_symbols, 100.0), "volume": np.zeros(n_symbols, dtype=np.int64)})
+    broadcaster = QuoteBroadcaster(store)
+
+    delivered = 0
+    tick_sent_at = {}
+    delivery_latency = []
+
+    async def consume(subscriber):
+        nonlocal delivered
+        while True:
+            messages = await subscriber.next_messages()
+            delivered += len(messages)
+            now = time.perf_counter()
+            for message in messages:
+                # Volume carries the tick number so latency can be measured
+                tick = json.loads(message)["data"].get("volume")
+                if tick in tick_sent_at:
+                    delivery_latency.append((now - tick_sent_at[tick]) * 1000)
+
+    consumers = []
+    stalled = []
+    for i in range(n_subscribers):
+        subscriber = broadcaster.connect()
+        broadcaster.subscribe(subscriber, rng.sample(symbols, per_client))
+        if i < n_subscribers * stalled_fraction:
+            stalled.append(subscriber)  # never drained
+        else:
+            consumers.append(asyncio.create_task(consume(subscriber)))
+    await asyncio.sleep(0.1)  # let consumers drain their snapshots
+    delivered = 0
+
+    publish_ms = []
+    np_rng = np.random.default_rng(9)
+    start = time.perf_counter()
+    for tick in range(1, ticks + 1):
+        changed = [symbols[i] for i in np_rng.choice(n_symbols, changes_per_tick, replace=False)]
+        prices = 100 + np_rng.normal(0, 1, changes_per_tick)
+        tick_sent_at[tick] = time.perf_counter()
+        t0 = time.perf_counter()
+        store.bulk_update(changed, {"price": prices, "volume": np.full(changes_per_tick, tick)})
+        publish_ms.append((time.perf_counter() - t0) * 1000)
+        await asyncio.sleep(0)  # yield so consumers run between ticks
+    await asyncio.sleep(0.2)  # let consumers drain the last ticks
+    elapsed = time.perf_counter() - start
+
+    for task in consumers:
+        task.cancel()
+    stats = broadcaster.stats()
+    print(f"subscribers={n_subscribers:,} (stalled={len(stalled):,}) symbols={n_symbols:,} "
+          f"symbols/client={per_client} ticks={ticks} changes/tick={changes_per_tick}")
+    print(f"  publish (diff + encode + fan-out) p50={statistics.median(publish_ms):.2f}ms "
+          f"p99={percentile(publish_ms, 99):.2f}ms")
+    print(f"  encoded={stats['messages_encoded']:,} fanned_out={stats['messages_fanned_out']:,} "
+          f"(x{stats['messages_fanned_out'] / max(stats['messages_encoded'], 1):.0f} reuse per encode)")
+    print(f"  delivered={delivered:,} in {elapsed:.2f}s ({delivered / elapsed:,.0f} msg/s)")
+    if delivery_latency:
+        print(f"  delivery latency p50={statistics.median(delivery_latency):.2f}ms "
+              f"p99={percentile(delivery_latency, 99):.2f}ms")
+    print(f"  stalled clients resynced={sum(s.resyncs for s in stalled):,} "
+          f"max queued={max((s.pending() for s in stalled), default=0)} (bounded)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--subscribers", type=int, default=5000)
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--per-client", type=int, default=10)
+    parser.add_argument("--ticks", type=int, default=300)
+    parser.add_argument("--changes-per-tick", type=int, default=50)
+    parser.add_argument("--stalled-fraction", type=float, default=0.02)
+    args = parser.parse_args()
+    asyncio.run(main(args.subscribers, args.symbols, args.per_client, args.ticks,
+                     args.changes_per_tick, args.stalled_fraction))
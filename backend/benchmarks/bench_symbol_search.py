@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Benchmark: typeahead search over a synthetic ~50k listing universe
+
+Measures index build time, per-query p50/p99 latency for prefix, name and
+fuzzy queries, and endpoint latency while many simulated users type queries
+one keystroke at a time concurrently.
+
+Usage: python benchmarks/bench_symbol_search.py [--listings 50000] [--users 200]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import string
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+from app.routers import stocks  # noqa: E402
+from app.services.symbol_search import build_search_index  # noqa: E402
+
+WORDS = [
+    "micro", "systems", "global", "energy", "health", "capital", "bio", "semi",
+    "conductor", "networks", "foods", "motors", "pharma", "realty", "trust",
+    "financial", "holdings", "digital", "solar", "mining", "airlines", "retail",
+    "software", "devices", "materials", "logistics", "media", "gaming", "water",
+]
+SUFFIXES = ["Inc.", "Corp.", "Group", "Ltd.", "Holdings", "Co."]
+SYLLABLES = ["ka", "lo", "ver", "tan", "qui", "rex", "mon", "dal", "sar", "pen", "zo", "tri", "nu", "bel"]
+
+
+def make_listings(n: int):
+    """Listings whose names mix common industry words with ~2k distinct brand words"""
+    rng = random.Random(11)
+    brands = list({"".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))) for _ in range(3000)})
+    listings = {}
+    while len(listings) < n:
+        symbol = "".join(rng.choices(string.ascii_uppercase, k=rng.randint(1, 5)))
+        words = [rng.choice(brands)] + rng.sample(WORDS, rng.randint(0, 2))
+        listings[symbol] = f"{' '.join(w.capitalize() for w in words)} {rng.choice(SUFFIXES)}"
+    return list(listings.items())
+
+
+def percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def bench_index(index, queries) -> None:
+    latencies = []
+    for query in queries:
+        start = time.perf_counter()
+        index.search(query)
+        latencies.append((time.perf_counter() - start) * 1e6)
+    print(f"  index.search      p50={statistics.median(latencies):8.1f}us "
+          f"p99={percentile(latencies, 99):8.1f}us  ({len(queries)} queries)")
+
+
+async def bench_typeahead(queries, users: int) -> None:
+    app = FastAPI()
+    app.include_router(stocks.router)
+    latencies = []
+
+    async def user(client, query):
+        for i in range(1, len(query) + 1):
+            start = time.perf_counter()
+            response = await client.get("/api/stocks/search", params={"q": query[:i]})
+            response.raise_for_status()
+            latencies.append((time.perf_counter() - start) * 1e3)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        start = time.perf_counter()
+        await asyncio.gather(*(user(client, queries[i % len(queries)]) for i in range(users)))
+        elapsed = time.perf_counter() - start
+    print(f"  endpoint ({users} concurrent users) p50={statistics.median(latencies):.2f}ms "
+          f"p99={percentile(latencies, 99):.2f}ms  {len(latencies) / elapsed:,.0f} req/s")
+
+
+def main(n: int, users: int) -> None:
+    listings = make_listings(n)
+    start = time.perf_counter()
+    index = build_search_index(listings)
+    print(f"Built index over {len(index):,} listings in {(time.perf_counter() - start) * 1e3:.0f} ms")
+
+    rng = random.Random(3)
+    symbols = [s for s, _ in listings]
+    queries = (
+        [rng.choice(symbols)[:rng.randint(1, 3)] for _ in range(2000)]       # symbol prefixes
+        + [rng.choice(WORDS)[:rng.randint(2, 6)] for _ in range(2000)]     # name fragments
+        + ["semicondcutor", "fianncial", "pharam", "logstics"] * 250         # typos (fuzzy)
+    )
+    bench_index(index, queries)
+    asyncio.run(bench_typeahead(queries, users))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--listings", type=int, default=50_000)
+    parser.add_argument("--users", type=int, default=200)
+    args = parser.parse_args()
+    main(args.listings, args.users)
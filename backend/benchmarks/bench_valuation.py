@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark: incremental mark-to-market vs revaluing every portfolio
+
+Loads hundreds of thousands of portfolios into the valuation engine, then
+times a full sparse matrix-vector revaluation and quote ticks that only touch
+the holders of the changed symbols, next to a per-portfolio Python loop.
+
+Usage: python benchmarks/bench_valuation.py [--portfolios 200000] [--symbols 3000]
+"""
+import argparse
+import os
+import sys
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+import numpy as np  # noqa: E402
+
+from app.services.valuation_engine import ValuationEngine  # noqa: E402
+
+
+def main(n_portfolios: int, n_symbols: int, holdings: int, ticks: int) -> None:
+    rng = np.random.default_rng(5)
+    symbols = [f"SYM{i}" for i in range(n_symbols)]
+    # Popularity is skewed: a few symbols are held by many portfolios
+    popularity = 1.0 / np.arange(1, n_symbols + 1)
+    popularity /= popularity.sum()
+    prices = rng.uniform(5, 500, n_symbols)
+
+    engine = ValuationEngine(capacity=n_portfolios)
+    all_cols = rng.choice(n_symbols, size=(n_portfolios, holdings), p=popularity)
+    all_shares = rng.integers(1, 200, (n_portfolios, holdings))
+    books = list(zip(all_cols, all_shares))
+    start = time.perf_counter()
+    for p, (cols, shares) in enumerate(books):
+        engine.set_holdings(f"p{p}", [symbols[c] for c in cols.tolist()], shares, prices[cols], prices[cols])
+    print(f"{n_portfolios:,} portfolios x {holdings} holdings over {n_symbols:,} symbols "
+          f"(loaded in {time.perf_counter() - start:.1f} s)")
+
+    start = time.perf_counter()
+    engine.revalue_all()
+    print(f"  full matrix-vector revalue : {(time.perf_counter() - start) * 1e3:9.2f} ms")
+
+    for size, label in ((1, "popular symbol"), (1, "typical symbol"), (50, "50 symbols")):
+        timings, touched = [], 0
+        for _ in range(ticks):
+            if label == "popular symbol":
+                changed = [0]
+            elif label == "typical symbol":
+                changed = [int(rng.integers(n_symbols // 10, n_symbols))]
+            else:
+                changed = rng.choice(n_symbols, size=size, replace=False)
+            before = engine.entries_touched
+            start = time.perf_counter()
+            affected = engine.update_prices([symbols[c] for c in changed], prices[changed] * rng.uniform(0.99, 1.01))
+            timings.append(time.perf_counter() - start)
+            touched += engine.entries_touched - before
+        print(f"  tick, {label:<15}    : {np.median(timings) * 1e3:9.3f} ms "
+              f"(~{touched // ticks:,} holdings, {len(affected):,} portfolios)")
+
+    sample = min(n_portfolios, 20_000)
+    price_of = dict(zip(symbols, prices.tolist()))
+    start = time.perf_counter()
+    for cols, shares in books[:sample]:
+        sum(price_of[symbols[c]] * s for c, s in zip(cols.tolist(), shares.tolist()))
+    loop = (time.perf_counter() - start) / sample * n_portfolios
+    print(f"  per-portfolio Python loop  : {loop * 1e3:9.2f} ms (extrapolated from {sample:,})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--portfolios", type=int, default=200_000)
+    parser.add_argument("--symbols", type=int, default=3000)
+    parser.add_argument("--holdings", type=int, default=10)
+    parser.add_argument("--ticks", type=int, default=50)
+    args = parser.parse_args()
+    main(args.portfolios, args.symbols, args.holdings, args.ticks)
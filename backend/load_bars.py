@@ -0,0 +1,30 @@
+"""
+Bulk-load historical OHLCV bars from CSV into the memory-mapped bar store
+
+Usage: python load_bars.py bars.csv [more.csv ...] [--symbol AAPL] [--interval 1d]
+"""
+import argparse
+import os
+import sys
+
+from dotenv import load_dotenv
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.bar_store import DAILY, get_bar_store
+
+# Same BARS_DIR as the server when it is set in .env
+load_dotenv()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load OHLCV bars from CSV files")
+    parser.add_argument("paths", nargs="+", help="CSV files with date,open,high,low,close,volume[,symbol]")
+    parser.add_argument("--symbol", help="Symbol for files without a symbol column")
+    parser.add_argument("--interval", default=DAILY, help="Bar interval directory (default: 1d)")
+    args = parser.parse_args()
+
+    store = get_bar_store()
+    for path in args.paths:
+        loaded = store.load_csv(path, symbol=args.symbol, interval=args.interval)
+        print(f"{path}: {sum(loaded.values())} new bars for {len(loaded)} symbols -> {store.root}")
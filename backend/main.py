@@ -1,19 +1,51 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
+from contextlib import asynccontextmanager
 import uvicorn
 import os
 from dotenv import load_dotenv
 
+# Load environment variables before importing the app: its modules read
+# their configuration (DATABASE_URL, BARS_DIR, LISTINGS_CSV, ...) at import
+load_dotenv()
+
 # Import routers
-from app.routers import stocks, market, portfolios, auth, chatbot
+from app.routers import stocks, stream, market, portfolios, auth, chatbot
 
 # Import database
-from app.db import engine, Base
+from app.db import engine, Base, SessionLocal
 from app.user_models import UserDB
 
-# Load environment variables
-load_dotenv()
+# Import shared services
+from app.services.http_client import init_http_client, close_http_client
+from app.services.llm_client import init_llm_client, close_llm_client
+from app.services.quote_scheduler import get_quote_scheduler
+from app.services.eod_snapshots import get_snapshot_scheduler
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Open the pooled upstream HTTP client once for the whole process
+    await init_http_client()
+    # One async LLM client (shared pool, in-flight cap) for every chat request
+    await init_llm_client()
+    # Start the rate-limited upstream quote scheduler and its background refresh
+    await get_quote_scheduler().start()
+    # Restore stored portfolios (the first boot stores the samples instead)
+    db = SessionLocal()
+    try:
+        portfolios.restore_portfolios(db)
+    finally:
+        db.close()
+    # Append each portfolio's closing value to its history after every market close
+    await get_snapshot_scheduler().start()
+    try:
+        yield
+    finally:
+        await get_snapshot_scheduler().stop()
+        await get_quote_scheduler().stop()
+        await close_llm_client()
+        await close_http_client()
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -21,7 +53,8 @@ app = FastAPI(
     description="FastAPI backend for StockVision application",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # CORS middleware configuration
@@ -39,6 +72,7 @@ app.add_middleware(
 
 # Include routers
 app.include_router(stocks.router)
+app.include_router(stream.router)
 app.include_router(market.router)
 app.include_router(portfolios.router)
 app.include_router(auth.router)  # Auth routes added
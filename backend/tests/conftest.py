@@ -0,0 +1,77 @@
+"""
+Shared pytest configuration for the StockVision backend tests
+"""
+import os
+import sys
+import tempfile
+
+# Make the backend package importable regardless of the working directory
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Keep tests away from the committed development database and real providers
+_TEST_DB_DIR = tempfile.mkdtemp(prefix="stockvision-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_TEST_DB_DIR, 'test.db')}")
+os.environ.setdefault("BARS_DIR", os.path.join(_TEST_DB_DIR, "bars"))
+os.environ.setdefault("OPENAI_API_KEY", "")
+os.environ.setdefault("ALPHA_VANTAGE_API_KEY", "")
+# Tests exercise the scheduler logic, not the real provider quota
+os.environ.setdefault("QUOTE_RATE_LIMIT_PER_MINUTE", "60000")
+# Streamed symbols are refreshed in the background; demo ticks would move seeded prices under tests
+os.environ.setdefault("DEMO_QUOTE_TICKS", "false")
+# Snapshot runs are driven explicitly by their tests, never by the app lifespan
+os.environ.setdefault("EOD_SNAPSHOTS_ENABLED", "false")
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def reset_quote_cache():
+    """Start every test with empty shared quote/intent caches and scheduler"""
+    from app.services.intent_cache import get_intent_cache
+    from app.services.intent_classifier import get_intent_classifier
+    from app.services.quote_cache import get_quote_cache
+    from app.services.quote_scheduler import get_quote_scheduler
+
+    cache = get_quote_cache()
+    cache.invalidate()
+    cache.reset_stats()
+    intents = get_intent_cache()
+    intents.invalidate()
+    intents.reset_stats()
+    get_intent_classifier().reset_stats()
+    get_quote_scheduler().reset()
+    yield
+    cache.invalidate()
+    intents.invalidate()
+    get_quote_scheduler().reset()
+
+
+@pytest.fixture
+def llm_parses_every_intent(monkeypatch):
+    """Route every chat query to the LLM parser, however sure the local classifier is"""
+    from app.services.intent_classifier import get_intent_classifier
+
+    monkeypatch.setattr(get_intent_classifier(), "threshold", 1.1)
+
+
+@pytest.fixture
+def stored_samples():
+    """The sample portfolios (with history) stored and valued for one test, then deleted"""
+    from main import app  # noqa: F401 - creates the tables
+    from app.db import SessionLocal
+    from app.routers import portfolios
+
+    db = SessionLocal()
+    samples = portfolios.sample_portfolios()
+    try:
+        for portfolio, history in samples:
+            portfolios.portfolio_service.save_portfolio(db, portfolio, owner_id="sample-owner")
+            portfolios.portfolio_service.add_history(db, history)
+            portfolios.register_holdings(portfolio)
+        yield [portfolio for portfolio, _ in samples]
+    finally:
+        for portfolio, _ in samples:
+            portfolios.portfolio_service.delete_portfolio(db, portfolio.id)
+            portfolios.drop_portfolio(portfolio.id)
+        db.close()
@@ -0,0 +1,87 @@
+"""
+Straightforward pure-Python indicator loops, used as the reference for the
+vectorized engine in tests and as the baseline in benchmarks
+"""
+import math
+
+
+def log_returns(prices):
+    return [math.nan] + [math.log(b / a) for a, b in zip(prices, prices[1:])]
+
+
+def sma(prices, window):
+    out = []
+    for i in range(len(prices)):
+        out.append(sum(prices[i - window + 1:i + 1]) / window if i >= window - 1 else math.nan)
+    return out
+
+
+def ema(prices, span=None, alpha=None):
+    alpha = alpha if alpha is not None else 2.0 / (span + 1)
+    out = [prices[0]]
+    for price in prices[1:]:
+        out.append(alpha * price + (1 - alpha) * out[-1])
+    return out
+
+
+def std(values, ddof=0):
+    mean = sum(values) / len(values)
+    return math.sqrt(sum((v - mean) ** 2 for v in values) / (len(values) - ddof))
+
+
+def rsi(prices, period=14):
+    out = [math.nan] * len(prices)
+    moves = [b - a for a, b in zip(prices, prices[1:])]
+    if len(moves) < period:
+        return out
+    avg_gain = sum(max(m, 0) for m in moves[:period]) / period
+    avg_loss = sum(max(-m, 0) for m in moves[:period]) / period
+    for i in range(period, len(prices)):
+        if i > period:
+            move = moves[i - 1]
+            avg_gain = (avg_gain * (period - 1) + max(move, 0)) / period
+            avg_loss = (avg_loss * (period - 1) + max(-move, 0)) / period
+        out[i] = 100.0 if avg_loss == 0 else 100 - 100 / (1 + avg_gain / avg_loss)
+    return out
+
+
+def macd(prices, fast=12, slow=26, signal=9):
+    line = [f - s for f, s in zip(ema(prices, fast), ema(prices, slow))]
+    signal_line = ema(line, signal)
+    return line, signal_line, [m - s for m, s in zip(line, signal_line)]
+
+
+def bollinger(prices, window=20, k=2.0):
+    mid, upper, lower = [], [], []
+    for i in range(len(prices)):
+        if i < window - 1:
+            mid.append(math.nan)
+            upper.append(math.nan)
+            lower.append(math.nan)
+            continue
+        chunk = prices[i - window + 1:i + 1]
+        m, s = sum(chunk) / window, std(chunk)
+        mid.append(m)
+        upper.append(m + k * s)
+        lower.append(m - k * s)
+    return mid, upper, lower
+
+
+def realized_volatility(prices, window=20, periods_per_year=252):
+    returns = log_returns(prices)
+    out = [math.nan] * len(prices)
+    for i in range(window, len(prices)):
+        out[i] = std(returns[i - window + 1:i + 1], ddof=1) * math.sqrt(periods_per_year)
+    return out
+
+
+def all_indicators(prices):
+    return {
+        "log_return": log_returns(prices),
+        "volatility": realized_volatility(prices),
+        "sma_20": sma(prices, 20),
+        "ema_20": ema(prices, 20),
+        "rsi_14": rsi(prices),
+        "macd": macd(prices)[0],
+        "bollinger_upper": bollinger(prices)[1],
+    }
@@ -0,0 +1,229 @@
+"""
+Local stand-in servers for upstream providers used by tests and benchmarks
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    # HTTP/1.1 so clients can keep connections alive between requests
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.stub.record_connection()
+
+    def log_message(self, format, *args):  # noqa: A002 - silence request logging
+        pass
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        stub = self.server.stub
+        stub.record_request()
+        if stub.latency:
+            time.sleep(stub.latency)
+        params = parse_qs(urlparse(self.path).query)
+        symbol = params.get("symbol", ["UNKNOWN"])[0].upper()
+        self._send_json(200, stub.quote_payload(symbol))
+
+
+class QuoteStubServer:
+    """Threaded stand-in for the Alpha Vantage GLOBAL_QUOTE endpoint.
+
+    Counts accepted TCP connections separately from requests so callers can
+    measure how many handshakes each request costs.
+    """
+
+    handler_class = _StubHandler
+
+    def __init__(self, latency: float = 0.0, host: str = "127.0.0.1"):
+        self.latency = latency
+        self.connections = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, 0), self.handler_class)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/query"
+
+    def record_connection(self) -> None:
+        with self._lock:
+            self.connections += 1
+
+    def record_request(self) -> None:
+        with self._lock:
+            self.requests += 1
+
+    def reset_counters(self) -> None:
+        with self._lock:
+            self.connections = 0
+            self.requests = 0
+
+    def quote_payload(self, symbol: str) -> Dict[str, Any]:
+        price = 100.0 + (sum(map(ord, symbol)) % 400)
+        return {
+            "Global Quote": {
+                "01. symbol": symbol,
+                "03. high": f"{price * 1.01:.4f}",
+                "04. low": f"{price * 0.99:.4f}",
+                "05. price": f"{price:.4f}",
+                "06. volume": "1000000",
+                "09. change": "1.2500",
+                "10. change percent": "0.8500%",
+            }
+        }
+
+    def start(self) -> "QuoteStubServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def __enter__(self) -> "QuoteStubServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+
+class _LLMStubHandler(_StubHandler):
+    def do_POST(self):
+        stub = self.server.stub
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        stub.record_request()
+        stub.bodies.append(body)
+        stub.enter()
+        try:
+            stub.gate.wait()
+            if stub.latency:
+                time.sleep(stub.latency)
+            if body.get("stream"):
+                self._send_stream(stub, body)
+                return
+        finally:
+            stub.leave()
+        self._send_json(200, stub.completion_payload(body))
+
+    def _send_stream(self, stub: "LLMStubServer", body: Dict[str, Any]) -> None:
+        # No Content-Length: the body ends when the connection closes
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        for i, token in enumerate(stub.answer_tokens()):
+            if i and stub.token_delay:
+                time.sleep(stub.token_delay)
+            chunk = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+class LLMStubServer(QuoteStubServer):
+    """Threaded stand-in for an OpenAI-compatible chat completions endpoint.
+
+    JSON-mode requests get an intent object, requests offering tools (before
+    any tool results) get `tool_calls`, other requests a short answer
+    (streamed word by word, `token_delay` seconds apart, when asked to).
+    Keeps the request bodies and the most requests it was serving at once.
+    Clearing `gate` holds every completion until it is set again.
+    """
+
+    handler_class = _LLMStubHandler
+    intent = {"action": "get_price", "symbols": ["AAPL"], "time_range": 30, "confidence": 0.9}
+    answer = "AAPL is trading near its recent range."
+    tool_calls = [("get_real_time_stock_data", {"symbols": ["AAPL"]})]
+
+    def __init__(self, latency: float = 0.0, token_delay: float = 0.0, host: str = "127.0.0.1"):
+        super().__init__(latency=latency, host=host)
+        self.token_delay = token_delay
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.bodies: List[Dict[str, Any]] = []
+        self.gate = threading.Event()
+        self.gate.set()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def enter(self) -> None:
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def leave(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+
+    def stop(self) -> None:
+        self.gate.set()  # release held completions so the server can shut down
+        super().stop()
+
+    def answer_tokens(self) -> List[str]:
+        words = self.answer.split(" ")
+        return [word if i == 0 else " " + word for i, word in enumerate(words)]
+
+    def completion_payload(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+        messages = body.get("messages", [])
+        wants_tools = (body.get("tools") and body.get("tool_choice") != "none"
+                       and not any(m.get("role") == "tool" for m in messages))
+        content = json.dumps(self.intent) if json_mode else self.answer
+        message: Dict[str, Any] = {"role": "assistant", "content": content}
+        if wants_tools and self.tool_calls:
+            message = {"role": "assistant", "content": None, "tool_calls": [
+                {"id": f"call_{i}", "type": "function",
+                 "function": {"name": name, "arguments": json.dumps(arguments)}}
+                for i, (name, arguments) in enumerate(self.tool_calls)
+            ]}
+            content = json.dumps(message["tool_calls"])
+        # Rough token counts (~4 characters per token) so callers can total their spend
+        prompt_tokens = sum(len(m.get("content") or "") for m in messages) // 4
+        completion_tokens = max(1, len(content) // 4)
+        return {
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "tool_calls" if "tool_calls" in message else "stop",
+                "message": message,
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+            },
+        }
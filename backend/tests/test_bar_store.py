@@ -0,0 +1,93 @@
+"""
+Tests for the memory-mapped OHLCV bar store
+"""
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.services import ai_services
+from app.services.bar_store import BarStore, make_bars
+
+
+def _daily(start, closes):
+    days = np.arange(np.datetime64(start), np.datetime64(start) + len(closes))
+    return make_bars((str(d), c, c + 1, c - 1, c, 1000.0) for d, c in zip(days, closes))
+
+
+def test_root_is_read_from_the_environment_on_first_use(tmp_path, monkeypatch):
+    store = BarStore()  # created at import, before .env is loaded
+    monkeypatch.setenv("BARS_DIR", str(tmp_path))
+
+    assert store.root == str(tmp_path)
+    assert store.path("aapl").startswith(str(tmp_path))
+
+
+def test_date_range_reads_are_views_into_the_mapping(tmp_path):
+    store = BarStore(str(tmp_path))
+    store.append("aapl", _daily("2024-01-01", np.arange(100, 131, dtype=float)))
+
+    window = store.read("AAPL", start="2024-01-10", end="2024-01-12")
+
+    assert window["close"].tolist() == [109.0, 110.0, 111.0]
+    assert isinstance(window.base, np.memmap) or isinstance(window, np.memmap)
+    assert not window.flags.writeable
+    assert len(store.read("AAPL", start="2025-01-01")) == 0
+    assert len(store.read("MSFT")) == 0
+
+
+def test_appends_extend_history_and_replace_todays_bar(tmp_path):
+    store = BarStore(str(tmp_path))
+    store.append("AAPL", _daily("2024-01-01", [1.0, 2.0]))
+    before = store.version("AAPL")
+
+    store.append("AAPL", _daily("2024-01-02", [2.5, 3.0]))
+
+    assert store.read("AAPL")["close"].tolist() == [1.0, 2.5, 3.0]
+    assert store.version("AAPL") > before
+    with pytest.raises(ValueError):
+        store.append("AAPL", _daily("2024-01-01", [9.0]))
+    assert store.count("AAPL") == 3
+
+
+def test_intraday_bars_use_their_own_files(tmp_path):
+    store = BarStore(str(tmp_path))
+    bars = make_bars([
+        ("2024-01-02T14:30:00", 10, 11, 9, 10.5, 100),
+        ("2024-01-02T14:31:00", 10.5, 12, 10, 11.5, 200),
+    ])
+    store.append("AAPL", bars, interval="1m")
+
+    window = store.read("AAPL", start="2024-01-02T14:31:00", interval="1m")
+    assert window["close"].tolist() == [11.5]
+    assert store.count("AAPL") == 0
+
+
+def test_csv_loader_splits_symbols_and_skips_known_rows(tmp_path):
+    csv_path = tmp_path / "bars.csv"
+    csv_path.write_text(
+        "Date,Symbol,Open,High,Low,Close,Volume\n"
+        "2024-01-03,aapl,3,3,3,3,30\n"
+        "2024-01-02,AAPL,2,2,2,2,20\n"
+        "2024-01-02,MSFT,5,5,5,5,50\n"
+    )
+    store = BarStore(str(tmp_path / "store"))
+
+    assert store.load_csv(str(csv_path)) == {"AAPL": 2, "MSFT": 1}
+    assert store.load_csv(str(csv_path)) == {"AAPL": 0, "MSFT": 0}
+    assert store.read("AAPL")["close"].tolist() == [2.0, 3.0]
+    assert store.symbols() == ["AAPL", "MSFT"]
+
+
+def test_stock_trends_read_stored_history(tmp_path, monkeypatch):
+    store = BarStore(str(tmp_path))
+    today = np.datetime64("today", "D")
+    store.append("AAPL", _daily(str(today - 60), np.linspace(100, 160, 60)))
+    monkeypatch.setattr(ai_services, "get_bar_store", lambda: store)
+
+    trends = asyncio.run(ai_services.get_stock_trends("AAPL", days=10))
+
+    assert len(trends["trend_data"]) == 10
+    assert trends["trend_direction"] == "upward"
+    assert trends["trend_data"][-1]["price"] == 160.0
+    assert "note" not in trends
@@ -0,0 +1,125 @@
+"""
+Tests for the token-streaming (Server-Sent Events) chat endpoint
+"""
+import asyncio
+import json
+import time
+
+from fastapi.testclient import TestClient
+
+from app.db import SessionLocal
+from app.routers import chatbot
+from app.services import llm_client
+from app.services.ai_services import AIStockAnalyzer
+from app.services.chat_database import ChatDatabaseService
+from main import app
+from stub_servers import LLMStubServer
+
+TOKEN_DELAY = 0.1
+
+
+def _parse(chunk):
+    event, data = chunk.strip().split("\n")
+    return event[len("event: "):], json.loads(data[len("data: "):])
+
+
+def _messages(session_id):
+    db = SessionLocal()
+    try:
+        return ChatDatabaseService.get_session_messages(db, session_id)
+    finally:
+        db.close()
+
+
+def test_tokens_arrive_before_the_answer_is_complete(monkeypatch, llm_parses_every_intent):
+    request = chatbot.ChatRequest(message="What is the price of AAPL?", session_id="stream-tokens")
+
+    async def run():
+        await llm_client.init_llm_client()
+        db = SessionLocal()
+        try:
+            started = time.perf_counter()
+            events = []
+            async for chunk in chatbot._chat_events(request, db, AIStockAnalyzer(), started):
+                events.append((time.perf_counter() - started, *_parse(chunk)))
+            return events
+        finally:
+            db.close()
+            await llm_client.close_llm_client()
+
+    with LLMStubServer(token_delay=TOKEN_DELAY) as stub:
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        monkeypatch.setattr(llm_client, "OPENAI_BASE_URL", stub.url)
+        events = asyncio.run(run())
+
+    names = [name for _, name, _ in events]
+    tokens = stub.answer_tokens()
+    assert names == ["intent"] + ["token"] * len(tokens) + ["done"]
+    assert events[0][2]["analysis"] == stub.intent and "AAPL" in events[0][2]["data"]
+    assert [payload["text"] for _, name, payload in events if name == "token"] == tokens
+
+    # The first token is on the wire long before the last one is generated
+    first_token_at, done_at = events[1][0], events[-1][0]
+    assert done_at - first_token_at >= (len(tokens) - 1) * TOKEN_DELAY * 0.9
+    timings = events[-1][2]["timings"]
+    assert timings["first_byte_ms"] <= timings["first_token_ms"] < timings["total_ms"]
+    assert timings["total_ms"] - timings["first_token_ms"] >= (len(tokens) - 1) * TOKEN_DELAY * 1000 * 0.9
+
+    # The question is stored up front and the answer once, after the last token
+    stored = _messages("stream-tokens")
+    assert [(m["role"], m["content"]) for m in stored] == [("user", request.message), ("assistant", stub.answer)]
+    assert stored[1]["metadata"]["timings"]["first_token_ms"] == timings["first_token_ms"]
+
+
+def test_stream_endpoint_without_llm_sends_intent_tokens_and_done():
+    with TestClient(app) as client:
+        response = client.post("/api/chatbot/chat/stream", json={
+            "message": "price of MSFT", "session_id": "stream-endpoint", "user_id": "u1"
+        })
+        history = client.get("/api/chatbot/sessions/stream-endpoint").json()["messages"]
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [_parse(chunk) for chunk in response.text.split("\n\n") if chunk.strip()]
+    assert [name for name, _ in events] == ["intent", "token", "done"]
+    assert events[0][1]["analysis"]["symbols"] == ["MSFT"]
+    assert events[2][1]["response"] == events[1][1]["text"]
+    assert [m["role"] for m in history] == ["user", "assistant"]
+
+
+def test_stream_reports_errors_as_an_event(monkeypatch):
+    async def broken_fetch(analysis, user_id=None):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(chatbot, "fetch_stock_data", broken_fetch)
+    request = chatbot.ChatRequest(message="price of AAPL", session_id="stream-error")
+
+    async def run():
+        db = SessionLocal()
+        try:
+            return [chunk async for chunk in chatbot._chat_events(request, db, AIStockAnalyzer(), time.perf_counter())]
+        finally:
+            db.close()
+
+    events = [_parse(chunk) for chunk in asyncio.run(run())]
+    assert [name for name, _ in events] == ["error"]
+    assert chatbot.ChatErrorCodes.PROCESSING_ERROR in events[0][1]["detail"]
+    # The question survives the failure; there is no answer to store
+    assert [(m["role"], m["content"]) for m in _messages("stream-error")] == [("user", request.message)]
+
+
+def test_disconnected_stream_keeps_the_users_message():
+    request = chatbot.ChatRequest(message="price of NVDA", session_id="stream-disconnect")
+
+    async def run():
+        db = SessionLocal()
+        events = chatbot._chat_events(request, db, AIStockAnalyzer(), time.perf_counter())
+        try:
+            first = await events.__anext__()
+            await events.aclose()  # the client goes away after the intent event
+            return first
+        finally:
+            db.close()
+
+    assert _parse(asyncio.run(run()))[0] == "intent"
+    assert [m["role"] for m in _messages("stream-disconnect")] == ["user"]
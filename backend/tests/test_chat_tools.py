@@ -0,0 +1,86 @@
+"""
+Tests for the tool-calling chat mode (one conversation picks the tools and answers)
+"""
+import asyncio
+import time
+
+from fastapi.testclient import TestClient
+
+from app.routers import chatbot
+from app.services import llm_client
+from app.services.ai_services import AIStockAnalyzer
+from main import app
+from stub_servers import LLMStubServer
+
+
+def test_chat_runs_the_tools_the_model_picks(monkeypatch):
+    with LLMStubServer() as stub:
+        stub.tool_calls = [
+            ("get_real_time_stock_data", {"symbols": ["aapl"]}),
+            ("get_stock_trends", {"symbols": ["MSFT"], "days": 7}),
+        ]
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        monkeypatch.setattr(llm_client, "OPENAI_BASE_URL", stub.url)
+        monkeypatch.setattr(chatbot, "CHAT_TOOL_CALLING", True)
+        with TestClient(app) as client:
+            response = client.post("/api/chatbot/chat", json={
+                "message": "How is Apple priced, and how has Microsoft moved this week?",
+                "session_id": "tools-chat", "user_id": "u1"
+            })
+            history = client.get("/api/chatbot/sessions/tools-chat").json()["messages"]
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["response"] == stub.answer
+    assert set(body["data"]) == {"AAPL", "MSFT_trends"}
+    # Tool choice and answer: two completions, with no separate intent parse
+    assert stub.requests == 2
+    tool_messages = [m for m in stub.bodies[1]["messages"] if m["role"] == "tool"]
+    assert [m["tool_call_id"] for m in tool_messages] == ["call_0", "call_1"]
+    assert stub.bodies[1]["tool_choice"] == "none"
+    analysis = history[1]["metadata"]["analysis"]
+    assert analysis["mode"] == "tools"
+    assert [c["name"] for c in analysis["tool_calls"]] == ["get_real_time_stock_data", "get_stock_trends"]
+
+
+def test_independent_tool_calls_run_concurrently(monkeypatch):
+    running = []
+    peak = []
+
+    async def slow_tool(name, arguments):
+        running.append(name)
+        peak.append(len(running))
+        await asyncio.sleep(0.2)
+        running.remove(name)
+        return {f"{arguments['symbols'][0]}_{name}": {"ok": True}}
+
+    async def run():
+        await llm_client.init_llm_client()
+        try:
+            start = time.perf_counter()
+            answer, calls = await AIStockAnalyzer().answer_with_tools("compare three stocks", slow_tool)
+            return answer, calls, time.perf_counter() - start
+        finally:
+            await llm_client.close_llm_client()
+
+    with LLMStubServer() as stub:
+        stub.tool_calls = [("get_real_time_stock_data", {"symbols": [s]}) for s in ("AAPL", "MSFT", "NVDA")]
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        monkeypatch.setattr(llm_client, "OPENAI_BASE_URL", stub.url)
+        answer, calls, elapsed = asyncio.run(run())
+
+    assert answer == stub.answer and len(calls) == 3
+    assert max(peak) == 3
+    assert elapsed < 0.5  # three 0.2 s tools side by side, not 0.6 s in a row
+
+
+def test_model_failure_falls_back_to_the_intent_pipeline(monkeypatch):
+    async def unavailable(query, run_tool):
+        raise ConnectionError("provider down")
+
+    analyzer = AIStockAnalyzer()
+    monkeypatch.setattr(analyzer, "answer_with_tools", unavailable)
+    assert asyncio.run(chatbot.answer_with_tools("price of AAPL", analyzer)) is None
+
+    unknown = asyncio.run(chatbot.run_chat_tool("get_weather", {}))
+    assert "error" in unknown
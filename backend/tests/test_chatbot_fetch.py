@@ -0,0 +1,77 @@
+"""
+Tests for the concurrent symbol fan-out in the chatbot router
+"""
+import asyncio
+import time
+
+from app.routers import chatbot
+
+
+def _patch_quotes(monkeypatch, delays):
+    in_flight = {"now": 0, "peak": 0}
+
+    async def fake_quote(symbol):
+        in_flight["now"] += 1
+        in_flight["peak"] = max(in_flight["peak"], in_flight["now"])
+        try:
+            delay = delays.get(symbol, 0.1)
+            if delay == "fail":
+                raise RuntimeError("upstream exploded")
+            await asyncio.sleep(delay)
+            return {"symbol": symbol, "price": 10.0}
+        finally:
+            in_flight["now"] -= 1
+
+    monkeypatch.setattr(chatbot, "get_real_time_stock_data", fake_quote)
+    return in_flight
+
+
+def test_price_symbols_are_fetched_concurrently(monkeypatch):
+    _patch_quotes(monkeypatch, {})
+    analysis = {"action": "get_price", "symbols": ["AAPL", "MSFT", "TSLA", "AMZN", "GOOGL"]}
+
+    start = time.perf_counter()
+    data = asyncio.run(chatbot.fetch_stock_data(analysis))
+    elapsed = time.perf_counter() - start
+
+    assert list(data) == analysis["symbols"]
+    assert elapsed < 0.3  # five sequential fetches would take at least 0.5s
+
+
+def test_fan_out_respects_concurrency_limit(monkeypatch):
+    in_flight = _patch_quotes(monkeypatch, {})
+    monkeypatch.setattr(chatbot, "FETCH_CONCURRENCY", 2)
+
+    asyncio.run(chatbot.fetch_symbols_concurrently(["A", "B", "C", "D", "E"], chatbot.get_real_time_stock_data))
+
+    assert in_flight["peak"] == 2
+
+
+def test_slow_and_failing_symbols_give_partial_results(monkeypatch):
+    _patch_quotes(monkeypatch, {"SLOW": 5.0, "BAD": "fail"})
+    monkeypatch.setattr(chatbot, "SYMBOL_FETCH_TIMEOUT", 0.2)
+    analysis = {"action": "get_price", "symbols": ["AAPL", "SLOW", "BAD"]}
+
+    start = time.perf_counter()
+    data = asyncio.run(chatbot.fetch_stock_data(analysis))
+    elapsed = time.perf_counter() - start
+
+    assert data["AAPL"]["price"] == 10.0
+    assert "error" in data["SLOW"]
+    assert "error" in data["BAD"]
+    assert elapsed < 1.0
+
+
+def test_trend_results_keep_their_keys(monkeypatch):
+    async def fake_trends(symbol, days=30):
+        return {"symbol": symbol, "period": f"{days} days"}
+
+    monkeypatch.setattr(chatbot, "get_stock_trends", fake_trends)
+    analysis = {"action": "get_trends", "symbols": ["AAPL", "AAPL", "TSLA"], "time_range": 7}
+
+    data = asyncio.run(chatbot.fetch_stock_data(analysis))
+
+    assert data == {
+        "AAPL_trends": {"symbol": "AAPL", "period": "7 days"},
+        "TSLA_trends": {"symbol": "TSLA", "period": "7 days"},
+    }
@@ -0,0 +1,121 @@
+"""
+Tests for LTTB and min/max chart downsampling
+"""
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+from app.models import PortfolioHistory
+from app.routers import portfolios
+from app.services.downsampling import downsample_frame, lttb_indices, minmax_indices
+
+
+def _reference_lttb(x, y, n_out):
+    """Textbook per-point LTTB loop"""
+    n = len(y)
+    every = (n - 2) / (n_out - 2)
+    selected, a = [0], 0
+    for b in range(n_out - 2):
+        lo, hi = int(b * every) + 1, int((b + 1) * every) + 1
+        nlo, nhi = hi, min(int((b + 2) * every) + 1, n - 1)
+        if nlo >= nhi:
+            cx, cy = x[n - 1], y[n - 1]
+        else:
+            cx = sum(x[nlo:nhi]) / (nhi - nlo)
+            cy = sum(y[nlo:nhi]) / (nhi - nlo)
+        best, best_area = lo, -1.0
+        for i in range(lo, hi):
+            area = abs((x[a] - cx) * (y[i] - y[a]) - (x[a] - x[i]) * (cy - y[a]))
+            if area > best_area:
+                best, best_area = i, area
+        selected.append(best)
+        a = best
+    return selected + [n - 1]
+
+
+def _walk(n=5000, seed=4):
+    return np.cumsum(np.random.default_rng(seed).normal(0, 1, n))
+
+
+@pytest.mark.parametrize("n, n_out", [(5000, 600), (1000, 7), (101, 100)])
+def test_lttb_matches_reference_loop(n, n_out):
+    y = _walk(n)
+    x = np.arange(n, dtype=float)
+    assert lttb_indices(x, y, n_out).tolist() == _reference_lttb(x.tolist(), y.tolist(), n_out)
+
+
+def test_minmax_keeps_every_extreme_within_budget():
+    y = _walk()
+    y[1234], y[4321] = 500.0, -500.0
+    keep = minmax_indices(y, 200)
+
+    assert len(keep) <= 200 and keep[0] == 0 and keep[-1] == len(y) - 1
+    assert {1234, 4321} <= set(keep.tolist())
+    assert (np.diff(keep) > 0).all()
+    assert minmax_indices(y[:50], 200).tolist() == list(range(50))
+    with pytest.raises(ValueError):
+        minmax_indices(y, 3)
+
+
+def test_frame_downsampling_keeps_each_column_shape():
+    index = pd.date_range("2015-01-01", periods=3000, freq="D")
+    frame = pd.DataFrame({"a": _walk(3000, 1), "b": _walk(3000, 2)}, index=index)
+    frame.iloc[:1000, 1] = np.nan  # b starts later
+
+    reduced = downsample_frame(frame, 300)
+    assert len(reduced) <= 300
+    assert reduced.index[0] == index[0] and reduced.index[-1] == index[-1]
+    assert index[1000] in reduced.index  # b's first point survives
+
+    many = pd.DataFrame(np.tile(_walk(3000)[:, None], 200), index=index)
+    assert len(downsample_frame(many, 100)) == 100
+    assert downsample_frame(frame, None) is frame
+
+
+@pytest.fixture
+def long_history():
+    from main import app
+    from app.db import SessionLocal
+
+    client = TestClient(app)
+    pid = client.post("/api/portfolios/", json={"name": "Decade"}).json()["id"]
+    today = date.today()
+    values = 10_000 + _walk(3650) * 50
+    with SessionLocal() as db:
+        portfolios.portfolio_service.add_history(db, [
+            PortfolioHistory(
+                portfolio_id=pid, date=(today - timedelta(days=3650 - i)).isoformat(),
+                value=round(float(v), 2), change=0.0, change_percent=0.0
+            )
+            for i, v in enumerate(values)
+        ])
+    yield client, pid
+    client.delete(f"/api/portfolios/{pid}")
+
+
+def test_history_endpoint_downsamples(long_history):
+    client, pid = long_history
+    full = client.get(f"/api/portfolios/{pid}/history", params={"days": 0}).json()
+    reduced = client.get(f"/api/portfolios/{pid}/history", params={"days": 0, "max_points": 300}).json()
+    minmax = client.get(
+        f"/api/portfolios/{pid}/history", params={"days": 0, "max_points": 300, "downsample": "minmax"}
+    ).json()
+
+    assert len(full) == 3650 and len(reduced) == 300 and len(minmax) <= 300
+    assert reduced[0] == full[0] and reduced[-1] == full[-1]
+    assert max(p["value"] for p in minmax) == max(p["value"] for p in full)
+    assert client.get(f"/api/portfolios/{pid}/history", params={"max_points": 2}).status_code == 422
+    assert client.get(f"/api/portfolios/{pid}/history", params={"downsample": "every"}).status_code == 422
+
+
+def test_compare_endpoint_downsamples_chart_not_metrics(long_history):
+    client, pid = long_history
+    body = {"portfolios": [pid], "time_range": "max", "metrics": ["max_drawdown"]}
+    full = client.post("/api/portfolios/compare", json=body).json()
+    reduced = client.post("/api/portfolios/compare", json={**body, "max_points": 200}).json()
+
+    assert len(full["comparison_data"]) == 3650 and len(reduced["comparison_data"]) == 200
+    assert reduced["portfolios"][0]["metrics"] == full["portfolios"][0]["metrics"]
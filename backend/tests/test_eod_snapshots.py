@@ -0,0 +1,206 @@
+"""
+Tests for the end-of-day portfolio snapshot job
+"""
+from datetime import date, datetime
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base
+from app.portfolio_models import HoldingDB, PortfolioDB, PortfolioHistoryChunkDB, SnapshotLeaseDB, SnapshotRunDB
+from app.services.bar_store import BarStore, make_bars
+from app.services.eod_snapshots import (
+    COMPLETE, SnapshotJob, SnapshotLease, SnapshotLeaseLost, last_closed_day, seconds_until_next_close, trading_days
+)
+from app.services.portfolio_database import PortfolioDatabaseService as service
+from app.services.valuation_engine import ValuationEngine
+
+MONDAY = date(2024, 6, 10)
+
+
+def _portfolio(pid, holdings):
+    return PortfolioDB(id=pid, name=pid, holdings=[
+        HoldingDB(symbol=symbol, name=symbol, shares=shares, avg_cost=10.0, last_price=last_price)
+        for symbol, shares, last_price in holdings
+    ])
+
+
+@pytest.fixture
+def setup(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'snapshots.db'}")
+    Base.metadata.create_all(bind=engine, tables=[
+        PortfolioDB.__table__, HoldingDB.__table__, PortfolioHistoryChunkDB.__table__, SnapshotRunDB.__table__,
+        SnapshotLeaseDB.__table__,
+    ])
+    sessions = sessionmaker(bind=engine)
+    db = sessions()
+    for i in range(25):
+        db.add(_portfolio(f"p{i:02d}", [("AAA", i + 1, 20.0), ("BBB", 2, 50.0)]))
+    db.commit()
+    db.close()
+    # This worker's engine: the portfolios it loaded, and its live quotes
+    valuation = ValuationEngine()
+    for i in range(25):
+        valuation.set_holdings(f"p{i:02d}", ["AAA", "BBB"], [i + 1, 2], [10.0, 10.0], seed_prices=[20.0, 50.0])
+    valuation.update_prices(["AAA", "BBB"], [21.0, 50.0], [20.0, 50.0])
+    bars = BarStore(str(tmp_path / "bars"))
+    job = SnapshotJob(engine=valuation, bars=bars, session_factory=sessions, batch_size=10)
+    yield job, sessions, bars
+    engine.dispose()
+
+
+def _history(sessions, pid):
+    db = sessions()
+    try:
+        return service.get_history_arrays(db, pid)
+    finally:
+        db.close()
+
+
+def test_snapshot_is_idempotent_per_date(setup):
+    job, sessions, _ = setup
+    report = job.snapshot(MONDAY, live=True)
+
+    assert report["status"] == COMPLETE and report["written"] == 25
+    assert report["portfolios_per_second"] > 0
+    dates, columns = _history(sessions, "p03")
+    assert dates.tolist() == [MONDAY]
+    assert columns[0].tolist() == [4 * 21.0 + 100.0, 4.0, round(4 / 180 * 100, 2)]
+
+    again = job.snapshot(MONDAY, live=True)
+    assert again["written"] == 0 and again["portfolios"] == 25
+    assert len(_history(sessions, "p03")[0]) == 1
+
+
+def test_interrupted_run_resumes_after_its_cursor(setup, monkeypatch):
+    job, sessions, _ = setup
+    original, calls = job.store.add_history_arrays, []
+
+    def crash_on_third_batch(db, series, **kwargs):
+        calls.append(sorted(series))
+        if len(calls) == 3:
+            raise RuntimeError("worker killed")
+        return original(db, series, **kwargs)
+
+    monkeypatch.setattr(job.store, "add_history_arrays", crash_on_third_batch)
+    with pytest.raises(RuntimeError):
+        job.snapshot(MONDAY)
+    db = sessions()
+    run = db.get(SnapshotRunDB, MONDAY)
+    assert (run.status, run.cursor, run.portfolios) == ("running", "p19", 20)
+    db.close()
+
+    monkeypatch.setattr(job.store, "add_history_arrays", original)
+    report = job.run(now=datetime(2024, 6, 10, 22, 0))
+    assert [r["written"] for r in report] == [5] and report[0]["portfolios"] == 25
+    for i in range(25):
+        assert _history(sessions, f"p{i:02d}")[0].tolist() == [MONDAY]
+
+
+def test_portfolios_changed_by_other_workers_are_snapshotted(setup):
+    job, sessions, _ = setup
+    # Behind this worker's back: one portfolio deleted, one created with a symbol it never quoted
+    db = sessions()
+    service.delete_portfolio(db, "p03")
+    db.add(_portfolio("p99", [("AAA", 1, 20.0), ("ZZZ", 10, 7.5)]))
+    db.commit()
+    db.close()
+
+    report = job.snapshot(MONDAY, live=True)
+    assert report["written"] == 25
+    assert len(_history(sessions, "p03")[0]) == 0
+    db = sessions()
+    assert db.query(PortfolioHistoryChunkDB).filter_by(portfolio_id="p03").count() == 0
+    db.close()
+    dates, columns = _history(sessions, "p99")
+    # AAA at this worker's live quote, ZZZ at its stored last price
+    assert dates.tolist() == [MONDAY]
+    assert columns[0].tolist() == [21.0 + 75.0, 1.0, round(1 / 95 * 100, 2)]
+
+
+def _worker(job, holder):
+    """A second API worker's job over the same database"""
+    return SnapshotJob(engine=job.engine, bars=job.bars, session_factory=job.session_factory,
+                       batch_size=job.batch_size, lease=SnapshotLease(holder))
+
+
+def test_one_worker_runs_the_job_at_a_time(setup):
+    job, sessions, _ = setup
+    other = _worker(job, "worker-2")
+    db = sessions()
+    assert job.lease.acquire(db)
+    db.close()
+
+    # While the lease is held the other worker writes nothing
+    db = sessions()
+    assert other.run(now=datetime(2024, 6, 10, 22, 0)) == []
+    assert db.get(SnapshotRunDB, MONDAY) is None
+    with pytest.raises(SnapshotLeaseLost):
+        other.snapshot(MONDAY)
+
+    assert [r["written"] for r in job.run(now=datetime(2024, 6, 10, 22, 0))] == [25]
+    # Released after the run, so the other worker can take the next one
+    assert other.lease.acquire(db)
+    assert other.run(now=datetime(2024, 6, 10, 22, 0)) == []
+    db.close()
+
+
+def test_worker_stops_writing_once_its_lease_is_taken_over(setup, monkeypatch):
+    job, sessions, _ = setup
+    other = _worker(job, "worker-2")
+    original, calls = job.store.add_history_arrays, []
+
+    def stalls_past_its_lease(db, series, **kwargs):
+        calls.append(sorted(series))
+        if len(calls) == 2:
+            # The first worker stalls; its lease expires and the other worker takes over
+            expire = sessions()
+            expire.get(SnapshotLeaseDB, "eod-snapshots").expires_at = datetime(2000, 1, 1)
+            expire.commit()
+            assert other.lease.acquire(expire)
+            expire.close()
+        return original(db, series, **kwargs)
+
+    monkeypatch.setattr(job.store, "add_history_arrays", stalls_past_its_lease)
+    assert job.run(now=datetime(2024, 6, 10, 22, 0)) == []
+    db = sessions()
+    run = db.get(SnapshotRunDB, MONDAY)
+    # The stalled worker's second batch was rolled back with its checkpoint
+    assert (run.status, run.cursor, run.portfolios) == ("running", "p09", 10)
+    db.close()
+    assert _history(sessions, "p09")[0].tolist() == [MONDAY]
+    for i in range(10, 25):
+        assert len(_history(sessions, f"p{i:02d}")[0]) == 0
+
+    report = other.run(now=datetime(2024, 6, 10, 22, 0))
+    assert [r["written"] for r in report] == [15] and report[0]["portfolios"] == 25
+    for i in range(25):
+        assert _history(sessions, f"p{i:02d}")[0].tolist() == [MONDAY]
+
+
+def test_missed_days_are_backfilled_from_daily_bars(setup):
+    job, sessions, bars = setup
+    closes = {"2024-06-07": 19.0, "2024-06-10": 20.0, "2024-06-11": 22.0, "2024-06-12": 23.0, "2024-06-13": 21.0}
+    bars.append("AAA", make_bars((day, c, c, c, c, 1e6) for day, c in closes.items()))
+    job.run(now=datetime(2024, 6, 10, 21, 30))  # Monday's close
+
+    # Down Tuesday and Wednesday; back on Thursday evening (and again on Friday morning)
+    reports = job.run(now=datetime(2024, 6, 13, 23, 0))
+    assert [r["date"] for r in reports] == ["2024-06-11", "2024-06-12", "2024-06-13"]
+    assert job.run(now=datetime(2024, 6, 14, 9, 0)) == []
+
+    dates, columns = _history(sessions, "p00")
+    assert dates.tolist() == [date(2024, 6, d) for d in (10, 11, 12, 13)]
+    # p00 holds 1 AAA (bars, live quote on the latest day) and 2 BBB (no bars: live quote)
+    assert columns[:, 0].tolist() == [121.0, 122.0, 123.0, 121.0]
+    assert columns[1, 1] == 2.0 and columns[2, 1] == 1.0
+
+
+def test_calendar_helpers():
+    assert last_closed_day(datetime(2024, 6, 10, 20, 59)) == date(2024, 6, 7)  # Monday before close -> Friday
+    assert last_closed_day(datetime(2024, 6, 15, 12, 0)) == date(2024, 6, 14)  # Saturday
+    assert trading_days(date(2024, 6, 7), date(2024, 6, 11)) == [date(2024, 6, 10), date(2024, 6, 11)]
+    assert seconds_until_next_close(datetime(2024, 6, 14, 22, 0)) == (2 * 24 + 23) * 3600  # Fri -> Mon
+    assert np.isclose(seconds_until_next_close(datetime(2024, 6, 10, 20, 0)), 3600)
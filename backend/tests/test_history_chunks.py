@@ -0,0 +1,86 @@
+"""
+Tests for compressed per-year history chunks
+"""
+from datetime import date
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base
+from app.portfolio_models import HoldingDB, PortfolioDB, PortfolioHistoryChunkDB
+from app.services import portfolio_database
+from app.services.history_chunks import decode_chunk, encode_chunk, merge_points, split_years
+from app.services.portfolio_database import PortfolioDatabaseService as service
+
+
+def _series(start="2015-01-01", days=3650, seed=2):
+    rng = np.random.default_rng(seed)
+    dates = np.arange(np.datetime64(start), np.datetime64(start) + days, dtype="datetime64[D]")
+    dates = dates[~np.isin(dates.view("int64") % 7, [2, 3])]  # skip weekends
+    values = np.round(10_000 * np.cumprod(1 + rng.normal(0, 0.01, len(dates))), 2)
+    change = np.round(np.diff(values, prepend=values[0]), 2)
+    columns = np.stack([values, change, np.round(change / values * 100, 4)], axis=1)
+    return dates, columns
+
+
+def test_chunk_round_trip_is_exact_and_compact():
+    dates, columns = _series(days=366)
+    chunk = encode_chunk(dates, columns)
+    decoded_dates, decoded_columns = decode_chunk(chunk["first_date"], chunk["points"], chunk["dates"], chunk["values"])
+
+    assert (decoded_dates == dates).all()
+    assert np.array_equal(decoded_columns, columns)
+    assert chunk["first_date"] == dates[0].item() and chunk["last_date"] == dates[-1].item()
+    # One row per day would store the id, the date and three floats (plus index entries)
+    assert len(chunk["dates"]) + len(chunk["values"]) < len(dates) * 3 * 8
+
+    with pytest.raises(ValueError):
+        encode_chunk(dates[::-1], columns)
+
+
+def test_merge_replaces_same_day_points():
+    dates, columns = _series(days=30)
+    new_dates = np.array([dates[3], dates[-1] + 1, dates[-1] + 1], dtype="datetime64[D]")
+    new_columns = np.array([[1.0, 0, 0], [2.0, 0, 0], [3.0, 0, 0]])
+    merged_dates, merged_columns, added = merge_points(dates, columns, new_dates, new_columns)
+
+    assert added == 1 and len(merged_dates) == len(dates) + 1
+    assert merged_columns[3, 0] == 1.0 and merged_columns[-1, 0] == 3.0  # last write wins
+    assert (np.diff(merged_dates.astype("int64")) > 0).all()
+    assert [year for year, _ in split_years(np.array(["2023-12-31", "2024-01-01"], dtype="datetime64[D]"))] == [2023, 2024]
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(
+        bind=engine, tables=[PortfolioDB.__table__, HoldingDB.__table__, PortfolioHistoryChunkDB.__table__]
+    )
+    session = sessionmaker(bind=engine)()
+    yield session
+    session.close()
+
+
+def test_store_round_trip_decodes_only_touched_chunks(db, monkeypatch):
+    dates, columns = _series()
+    # Appended in two overlapping batches, as daily snapshots would be
+    assert service.add_history_arrays(db, {"p": (dates[:2000], columns[:2000])}) == 2000
+    assert service.add_history_arrays(db, {"p": (dates[1990:], columns[1990:])}) == len(dates) - 2000
+    assert db.query(PortfolioHistoryChunkDB).count() == 10
+
+    stored_dates, stored_columns = service.get_history_arrays(db, "p")
+    assert (stored_dates == dates).all() and np.array_equal(stored_columns, columns)
+
+    decoded = []
+    original = portfolio_database.decode_chunk
+    monkeypatch.setattr(portfolio_database, "decode_chunk", lambda *a: decoded.append(a[0]) or original(*a))
+    window_dates, window_columns = service.get_history_arrays(db, "p", start=date(2019, 6, 1), end=date(2020, 2, 1))
+    assert len(decoded) == 2
+    inside = (dates >= np.datetime64("2019-06-01")) & (dates <= np.datetime64("2020-02-01"))
+    assert (window_dates == dates[inside]).all() and np.array_equal(window_columns, columns[inside])
+
+    decoded.clear()
+    recent_dates, _ = service.get_history_arrays(db, "p", last=10)
+    assert len(decoded) == 1 and (recent_dates == dates[-10:]).all()
@@ -0,0 +1,54 @@
+"""
+Tests for the shared pooled HTTP client used for quote fetching
+"""
+import asyncio
+
+from app.services import ai_services, http_client
+from stub_servers import QuoteStubServer
+
+
+def _fetch_quotes(symbols, timeout=None):
+    async def run():
+        await http_client.init_http_client()
+        try:
+            return [
+                await ai_services.get_real_time_stock_data(symbol, timeout=timeout)
+                for symbol in symbols
+            ]
+        finally:
+            await http_client.close_http_client()
+
+    return asyncio.run(run())
+
+
+def test_quotes_reuse_a_single_connection(monkeypatch):
+    monkeypatch.setenv("ALPHA_VANTAGE_API_KEY", "test-key")
+    with QuoteStubServer() as stub:
+        monkeypatch.setattr(ai_services, "ALPHA_VANTAGE_URL", stub.url)
+        quotes = _fetch_quotes(["AAPL"] + [f"SYM{i}" for i in range(29)])
+
+    assert stub.requests == 30
+    assert stub.connections == 1
+    assert quotes[0]["symbol"] == "AAPL"
+    assert "error" not in quotes[0]
+    assert quotes[0]["price"] == float(stub.quote_payload("AAPL")["Global Quote"]["05. price"])
+
+
+def test_per_request_timeout_falls_back(monkeypatch):
+    monkeypatch.setenv("ALPHA_VANTAGE_API_KEY", "test-key")
+    with QuoteStubServer(latency=0.5) as stub:
+        monkeypatch.setattr(ai_services, "ALPHA_VANTAGE_URL", stub.url)
+        quotes = _fetch_quotes(["AAPL"], timeout=0.05)
+
+    assert "error" in quotes[0]
+
+
+def test_client_follows_application_lifespan():
+    from fastapi.testclient import TestClient
+    from main import app
+
+    with TestClient(app) as client:
+        assert client.get("/health").status_code == 200
+        assert http_client._client is not None
+        assert not http_client._client.is_closed
+    assert http_client._client is None
@@ -0,0 +1,95 @@
+"""
+Tests for the vectorized indicator engine against plain Python loops
+"""
+import asyncio
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+import indicator_reference as ref
+from app.routers import stocks
+from app.services import ai_services, indicators
+from app.services.bar_store import BarStore, make_bars
+
+
+def _prices(n=300, seed=1):
+    rng = np.random.default_rng(seed)
+    return 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+
+
+def test_indicators_match_reference_loops():
+    prices = _prices()
+    vectorized = indicators.compute_indicators(prices)
+    expected = ref.all_indicators(prices.tolist())
+
+    for name, values in expected.items():
+        np.testing.assert_allclose(vectorized[name], values, rtol=1e-9, atol=1e-9, err_msg=name)
+
+
+def test_matrix_input_equals_row_by_row():
+    matrix = np.vstack([_prices(seed=s) for s in range(5)])
+    together = indicators.compute_indicators(matrix)
+
+    for row in range(5):
+        alone = indicators.compute_indicators(matrix[row])
+        for name in together:
+            np.testing.assert_allclose(together[name][row], alone[name], equal_nan=True)
+
+
+def test_short_series_stay_nan_instead_of_failing():
+    result = indicators.compute_indicators(np.array([10.0, 11.0, 12.0]))
+    assert np.isnan(result["rsi_14"]).all()
+    assert np.isnan(result["sma_20"]).all()
+    assert indicators.summarize(np.array([10.0, 11.0]))["trend_direction"] == "upward"
+
+
+def test_volatility_label_reflects_the_series():
+    calm = 100 * np.exp(np.cumsum(np.full(100, 0.001) + np.tile([0.002, -0.002], 50)))
+    wild = _prices(seed=3) * np.exp(np.random.default_rng(4).normal(0, 0.05, 300))
+
+    assert indicators.summarize(calm)["volatility"] == "low"
+    assert indicators.summarize(wild)["volatility"] == "high"
+
+
+@pytest.fixture
+def bar_store(tmp_path, monkeypatch):
+    store = BarStore(str(tmp_path))
+    today = np.datetime64("today", "D")
+    closes = _prices(200)
+    store.append("AAPL", make_bars(
+        (str(today - 200 + i), c, c, c, c, 1e6) for i, c in enumerate(closes)
+    ))
+    monkeypatch.setattr(stocks, "get_bar_store", lambda: store)
+    monkeypatch.setattr(ai_services, "get_bar_store", lambda: store)
+    return store
+
+
+def test_trends_include_indicator_summary(bar_store):
+    trends = asyncio.run(ai_services.get_stock_trends("AAPL", days=30))
+
+    assert len(trends["trend_data"]) == 30
+    assert trends["volatility"] in {"low", "moderate", "high"}
+    # Warm-up bars before the window make every indicator available
+    assert all(value is not None for value in trends["indicators"].values())
+
+
+def test_indicator_endpoint_returns_window_series(bar_store):
+    from main import app
+
+    client = TestClient(app)
+    response = client.get("/api/stocks/aapl/indicators", params={"days": 60})
+
+    assert response.status_code == 200
+    data = response.json()["data"]
+    assert len(data["series"]["date"]) == 60
+    assert len(data["series"]["rsi_14"]) == 60 and data["series"]["rsi_14"][0] is not None
+    assert data["summary"]["rsi_14"] == data["series"]["rsi_14"][-1]
+
+    cached = client.get(
+        "/api/stocks/AAPL/indicators",
+        params={"days": 60},
+        headers={"If-None-Match": response.headers["etag"]},
+    )
+    assert cached.status_code == 304
+    assert client.get("/api/stocks/NOPE/indicators").status_code == 404
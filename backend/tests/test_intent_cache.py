@@ -0,0 +1,93 @@
+"""
+Tests for the memoized intent cache in front of the LLM query parser
+"""
+import asyncio
+
+from app.services import llm_client
+from app.services.ai_services import AIStockAnalyzer
+from app.services.intent_cache import IntentCache, normalize_query
+from stub_servers import LLMStubServer
+
+
+def test_normalization_folds_surface_differences():
+    same = [
+        "What's the price of AAPL?",
+        "  whats the   price of $aapl ",
+        "WHAT'S THE PRICE OF NASDAQ:AAPL!!",
+        "what's the price of Apple",
+    ]
+    assert {normalize_query(q) for q in same} == {"whats the price of AAPL"}
+    assert normalize_query("Tesla's trend") == normalize_query("TSLA trend") == "TSLA trend"
+    assert normalize_query("BRK.B price") == normalize_query("brk-b price")
+    # Different tickers, periods or wording stay different
+    assert normalize_query("price of AAPL") != normalize_query("price of MSFT")
+    assert normalize_query("AAPL trend 30 days") != normalize_query("AAPL trend 7 days")
+
+
+def test_lru_eviction_ttl_and_hit_rate():
+    now = [0.0]
+    cache = IntentCache(ttl_seconds=60, max_entries=2, clock=lambda: now[0])
+    cache.set("price of AAPL", {"action": "get_price", "symbols": ["AAPL"]}, tokens=100)
+    cache.set("price of MSFT", {"action": "get_price", "symbols": ["MSFT"]}, tokens=100)
+
+    hit = cache.get("Price of $AAPL?")
+    assert hit == {"action": "get_price", "symbols": ["AAPL"]}
+    hit["symbols"].append("X")  # callers get a copy
+    cache.set("market summary", {"action": "market_summary", "symbols": []})  # evicts MSFT, the LRU entry
+
+    assert cache.get("price of MSFT") is None
+    assert cache.get("price of aapl")["symbols"] == ["AAPL"]
+    now[0] = 61.0
+    assert cache.get("price of AAPL") is None
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["expirations"]) == (2, 2, 1, 1)
+    assert stats["hit_rate"] == 0.5 and stats["llm_calls_saved"] == 2 and stats["tokens_saved"] == 200
+    assert stats["size"] == 1
+
+
+def test_a_hit_skips_the_llm_call(monkeypatch, llm_parses_every_intent):
+    cache = IntentCache()
+    analyzer = AIStockAnalyzer(intent_cache=cache)
+
+    async def run():
+        await llm_client.init_llm_client()
+        try:
+            return [await analyzer.analyze_stock_query(q) for q in
+                    ["price of AAPL", "Price of $aapl?", "price of apple", "market summary"]]
+        finally:
+            await llm_client.close_llm_client()
+
+    with LLMStubServer() as stub:
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        monkeypatch.setattr(llm_client, "OPENAI_BASE_URL", stub.url)
+        intents = asyncio.run(run())
+
+    assert intents[:3] == [stub.intent] * 3
+    assert stub.requests == 2
+    stats = cache.stats()
+    assert stats["hits"] == 2 and stats["misses"] == 2
+    assert stats["tokens_saved"] > 0
+
+
+def test_fallback_intents_are_not_cached(monkeypatch, llm_parses_every_intent):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    cache = IntentCache()
+    analyzer = AIStockAnalyzer(intent_cache=cache)
+    calls = []
+
+    async def unavailable(query):
+        calls.append(query)
+        return analyzer._simple_query_analysis(query), None
+
+    async def run():
+        try:
+            for _ in range(2):
+                await analyzer.analyze_stock_query("price of AAPL")
+        finally:
+            await llm_client.close_llm_client()
+
+    monkeypatch.setattr(analyzer, "_llm_query_analysis", unavailable)
+    asyncio.run(run())
+
+    assert len(calls) == 2 and len(cache) == 0
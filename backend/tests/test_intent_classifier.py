@@ -0,0 +1,98 @@
+"""
+Tests for the local intent classifier and its confidence gate in front of the LLM
+"""
+import asyncio
+import json
+import os
+
+from app.services import llm_client
+from app.services.ai_services import AIStockAnalyzer
+from app.services.intent_cache import IntentCache
+from app.services.intent_classifier import IntentClassifier
+from stub_servers import LLMStubServer
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+# The weights were tuned on this set, so it only guards against regressions
+TUNING_SET = os.path.join(DATA_DIR, "intent_tuning.jsonl")
+# Never used for tuning: the confidence gate is judged on these queries
+HOLDOUT_SET = os.path.join(DATA_DIR, "intent_holdout.jsonl")
+
+
+def score(path: str):
+    """(action accuracy, ticker accuracy, local accuracy, local share) for a labeled set"""
+    with open(path, encoding="utf-8") as handle:
+        rows = [json.loads(line) for line in handle if line.strip()]
+    classifier = IntentClassifier()
+    intents = [classifier.classify(row["query"]) for row in rows]
+
+    correct = [i["action"] == r["action"] for i, r in zip(intents, rows)]
+    local = [ok for ok, i in zip(correct, intents) if classifier.is_confident(i)]
+    assert classifier.stats()["answered_locally"] == len(local)
+    return (
+        sum(correct) / len(rows),
+        sum(i["symbols"] == r["symbols"] for i, r in zip(intents, rows)) / len(rows),
+        sum(local) / len(local),
+        len(local) / len(rows),
+    )
+
+
+def test_actions_symbols_and_time_ranges():
+    classifier = IntentClassifier()
+    cases = [
+        ("What's the price of $aapl?", "get_price", ["AAPL"]),
+        ("how has Tesla trended over the past 3 months", "get_trends", ["TSLA"]),
+        ("is NVDA too volatile for me", "analyze_risk", ["NVDA"]),
+        ("compare my portfolios", "compare_portfolios", []),
+        ("how are the markets doing today", "market_summary", []),
+        ("WHAT IS THE PRICE OF MSFT", "get_price", ["MSFT"]),
+        ("AAPL vs GOOGL 50 day moving average", "get_trends", ["AAPL", "GOOGL"]),
+    ]
+    for query, action, symbols in cases:
+        intent = classifier.classify(query)
+        assert (intent["action"], intent["symbols"]) == (action, symbols), query
+        assert 0.2 <= intent["confidence"] <= 1.0
+    assert classifier.classify("tesla trend over the past 3 months")["time_range"] == 90
+    assert classifier.classify("AAPL 50 day moving average")["time_range"] == 50
+    assert classifier.classify("price of AAPL")["time_range"] == 30
+    # No evidence at all: a low-confidence guess the LLM gets to overrule
+    assert classifier.classify("hello there")["confidence"] < classifier.threshold
+
+
+def test_tuning_set_accuracy():
+    action_acc, ticker_acc, local_acc, _ = score(TUNING_SET)
+    assert action_acc >= 0.97
+    assert ticker_acc >= 0.97
+    assert local_acc >= 0.97
+
+
+def test_holdout_accuracy_and_llm_calls_avoided():
+    action_acc, ticker_acc, local_acc, local_share = score(HOLDOUT_SET)
+    assert action_acc >= 0.95
+    assert ticker_acc >= 0.95
+    # At the configured threshold, answering locally must not cost accuracy on
+    # unseen queries, and must avoid a real share of LLM calls
+    assert local_acc >= 0.97
+    assert local_share >= 0.6
+
+
+def test_only_unsure_queries_reach_the_llm(monkeypatch):
+    classifier = IntentClassifier()
+    analyzer = AIStockAnalyzer(intent_cache=IntentCache(), classifier=classifier)
+    queries = ["what is the price of AAPL", "market summary", "tell me something interesting"]
+
+    async def run():
+        await llm_client.init_llm_client()
+        try:
+            return [await analyzer.analyze_stock_query(q) for q in queries]
+        finally:
+            await llm_client.close_llm_client()
+
+    with LLMStubServer() as stub:
+        monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+        monkeypatch.setattr(llm_client, "OPENAI_BASE_URL", stub.url)
+        intents = asyncio.run(run())
+
+    assert [i["action"] for i in intents[:2]] == ["get_price", "market_summary"]
+    assert intents[2] == stub.intent
+    assert stub.requests == 1
+    assert classifier.stats()["answered_locally"] == 2
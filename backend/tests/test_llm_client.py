@@ -0,0 +1,95 @@
+"""
+Tests for the shared async LLM client used by the chatbot
+"""
+import asyncio
+
+import httpx
+
+from app.services import llm_client
+from app.services.ai_services import AIStockAnalyzer
+from stub_servers import LLMStubServer
+
+def _use_stub(monkeypatch, stub, max_concurrency, queue_timeout=10.0):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    monkeypatch.setattr(llm_client, "OPENAI_BASE_URL", stub.url)
+    monkeypatch.setattr(llm_client, "LLM_MAX_CONCURRENCY", max_concurrency)
+    monkeypatch.setattr(llm_client, "LLM_QUEUE_TIMEOUT", queue_timeout)
+
+
+def test_health_is_served_while_chats_wait_on_the_llm(monkeypatch, llm_parses_every_intent):
+    from main import app
+
+    async def until(condition, timeout=10.0):
+        deadline = asyncio.get_running_loop().time() + timeout
+        while not condition():
+            assert asyncio.get_running_loop().time() < deadline, "timed out"
+            await asyncio.sleep(0.01)
+
+    async def run(stub):
+        client = await llm_client.init_llm_client()
+        transport = httpx.ASGITransport(app=app)
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+                # Hold every completion so the chats stay blocked on the LLM
+                stub.gate.clear()
+                chats = [
+                    asyncio.ensure_future(http.post("/api/chatbot/chat", json={
+                        "message": f"What is the price of AAPL? ({i})", "session_id": f"llm-load-{i}"
+                    }))
+                    for i in range(50)
+                ]
+                await until(lambda: stub.in_flight == 10)
+
+                # A blocking client would leave the event loop stuck in those calls
+                health = [await asyncio.wait_for(http.get("/health"), 5.0) for _ in range(20)]
+                pending = sum(not chat.done() for chat in chats)
+                in_flight = stub.in_flight
+
+                stub.gate.set()
+                return health, pending, in_flight, await asyncio.gather(*chats), client.stats()
+        finally:
+            stub.gate.set()
+            await llm_client.close_llm_client()
+
+    with LLMStubServer() as stub:
+        _use_stub(monkeypatch, stub, max_concurrency=10)
+        health, pending, in_flight, responses, stats = asyncio.run(run(stub))
+
+    assert [r.status_code for r in health] == [200] * 20
+    # Every health check was answered while all 50 chats waited on the LLM
+    assert pending == 50 and in_flight == 10
+    assert [r.status_code for r in responses] == [200] * 50
+    assert responses[0].json()["response"] == stub.answer
+    # Two completions per chat, never more than the cap in flight
+    assert stub.requests == 100 and stats["calls"] == 100
+    assert stub.peak_in_flight <= 10 and stats["peak_in_flight"] == 10
+
+
+def test_busy_llm_falls_back_to_keyword_analysis(monkeypatch, llm_parses_every_intent):
+    analyzer = AIStockAnalyzer()
+
+    async def run():
+        await llm_client.init_llm_client()
+        try:
+            return await asyncio.gather(
+                analyzer.analyze_stock_query("price of TSLA"),
+                analyzer.analyze_stock_query("risk of TSLA"),
+            )
+        finally:
+            await llm_client.close_llm_client()
+
+    with LLMStubServer(latency=0.5) as stub:
+        _use_stub(monkeypatch, stub, max_concurrency=1, queue_timeout=0.05)
+        first, second = asyncio.run(run())
+
+    assert first == stub.intent
+    # The second query never got a slot: keyword analysis, JSON mode kept
+    assert second["action"] == "analyze_risk" and second["symbols"] == ["TSLA"]
+    assert stub.requests == 1
+    assert analyzer._json_mode_supported
+
+
+def test_no_api_key_means_no_client(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "")
+    assert llm_client.get_llm_client() is None
+    assert AIStockAnalyzer().client is None
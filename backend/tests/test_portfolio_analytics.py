@@ -0,0 +1,181 @@
+"""
+Tests for running portfolio analytics against a full scan
+"""
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services import portfolio_analytics as analytics_module
+from app.services.portfolio_analytics import PortfolioAnalytics
+from app.services.valuation_engine import ValuationEngine
+
+SYMBOLS = [f"S{i}" for i in range(12)]
+
+
+def _full_scan(engine, names):
+    """The old O(N) summary: re-sum everything and scan for best/worst"""
+    totals = engine.totals()
+    rows = [(names[pid], v, c, (v - c) / c * 100 if c else 0.0)
+            for pid, v, c in zip(totals["ids"], totals["value"], totals["cost"]) if pid in names]
+    value = sum(r[1] for r in rows)
+    cost = sum(r[2] for r in rows)
+    return {
+        "total_portfolios": len(rows),
+        "combined_value": round(value, 2),
+        "combined_gain_loss_percent": round((value - cost) / cost * 100, 2) if cost > 0 else 0.0,
+        "best": max((r[3] for r in rows), default=None),
+        "worst": min((r[3] for r in rows), default=None),
+    }
+
+
+def _check(analytics, engine, names):
+    summary = analytics.summary()
+    expected = _full_scan(engine, names)
+    assert summary["total_portfolios"] == expected["total_portfolios"]
+    assert summary["combined_value"] == pytest.approx(expected["combined_value"], abs=0.01)
+    assert summary["combined_gain_loss_percent"] == pytest.approx(expected["combined_gain_loss_percent"], abs=0.01)
+    if expected["best"] is None:
+        assert summary["best_performer"] is None and summary["worst_performer"] is None
+    else:
+        assert summary["best_performer"]["gain_loss_percent"] == round(expected["best"], 2)
+        assert summary["worst_performer"]["gain_loss_percent"] == round(expected["worst"], 2)
+
+
+def _add(engine, analytics, names, rng, pid):
+    held = rng.choice(len(SYMBOLS), size=rng.integers(0, 5), replace=False)
+    engine.set_holdings(
+        pid, [SYMBOLS[c] for c in held], rng.integers(1, 50, len(held)), rng.uniform(20, 80, len(held)),
+        seed_prices=np.full(len(held), 50.0)
+    )
+    names[pid] = f"Portfolio {pid}"
+    analytics.track(pid, names[pid])
+
+
+def test_running_aggregates_match_full_scan(monkeypatch):
+    monkeypatch.setattr(analytics_module, "RESUM_EVERY_UPDATES", 50)
+    rng = np.random.default_rng(5)
+    engine = ValuationEngine()
+    analytics = PortfolioAnalytics(engine)
+    names = {}
+    _check(analytics, engine, names)
+
+    next_id = 0
+    for step in range(600):
+        action = rng.random()
+        if action < 0.2 or not names:
+            _add(engine, analytics, names, rng, f"p{next_id}")
+            next_id += 1
+        elif action < 0.3:
+            pid = rng.choice(sorted(names))
+            analytics.forget(pid)
+            engine.remove_portfolio(pid)
+            del names[pid]
+        elif action < 0.35:
+            pid = rng.choice(sorted(names))
+            _add(engine, analytics, names, rng, pid)  # holdings replaced
+        else:
+            changed = list(rng.choice(SYMBOLS, size=rng.integers(1, 4), replace=False))
+            engine.update_prices(changed, rng.uniform(10, 120, len(changed)))
+        if step % 10 == 0:
+            _check(analytics, engine, names)
+    _check(analytics, engine, names)
+
+    engine.update_prices(SYMBOLS, rng.uniform(10, 120, len(SYMBOLS)))  # heap rebuild path
+    _check(analytics, engine, names)
+    assert analytics.heap_rebuilds >= 1
+    assert analytics.stats()["best_heap"] <= 4 * len(names) + 64
+
+
+def test_renamed_and_deleted_portfolios():
+    engine = ValuationEngine()
+    analytics = PortfolioAnalytics(engine)
+    engine.set_holdings("a", ["X"], [10], [10.0], seed_prices=[20.0])
+    engine.set_holdings("b", ["X", "Y"], [1, 1], [10.0, 10.0], seed_prices=[20.0, 5.0])
+    analytics.track("a", "Alpha")
+    analytics.track("b", "Beta")
+
+    summary = analytics.summary()
+    assert summary["best_performer"] == {"name": "Alpha", "gain_loss_percent": 100.0}
+    assert summary["worst_performer"] == {"name": "Beta", "gain_loss_percent": 25.0}
+    assert summary["combined_value"] == 225.0
+
+    analytics.track("a", "Renamed")
+    engine.update_prices(["X"], [4.0])
+    summary = analytics.summary()
+    assert summary["best_performer"]["name"] == "Beta"
+    assert summary["worst_performer"] == {"name": "Renamed", "gain_loss_percent": -60.0}
+
+    analytics.forget("a")
+    engine.remove_portfolio("a")
+    summary = analytics.summary()
+    assert summary["total_portfolios"] == 1
+    assert summary["best_performer"]["name"] == summary["worst_performer"]["name"] == "Beta"
+
+    with pytest.raises(KeyError):
+        analytics.track("missing", "Nope")
+
+
+def test_summary_endpoint_matches_portfolio_list(stored_samples):
+    from main import app
+    from app.db import SessionLocal
+    from app.routers import portfolios as router
+
+    client = TestClient(app)
+    created = client.post("/api/portfolios/", json={"name": "Empty"}).json()
+    db = SessionLocal()
+    try:
+        # Value exactly the stored portfolios, as a freshly started worker does
+        router.restore_portfolios(db)
+        portfolios = client.get("/api/portfolios/", params={"limit": router.MAX_PAGE_SIZE}).json()
+        summary = client.get("/api/portfolios/analytics/summary").json()
+    finally:
+        client.delete(f"/api/portfolios/{created['id']}")
+        db.close()
+
+    percents = [p["total_gain_loss_percent"] for p in portfolios]
+    assert summary["total_portfolios"] == len(portfolios)
+    assert summary["combined_value"] == pytest.approx(sum(p["total_value"] for p in portfolios), abs=0.05)
+    assert summary["best_performer"]["gain_loss_percent"] == max(percents)
+    assert summary["worst_performer"]["gain_loss_percent"] == min(percents)
+    after = client.get("/api/portfolios/analytics/summary").json()
+    assert after["total_portfolios"] == len(portfolios) - 1
+
+
+def test_summary_follows_changes_made_by_other_workers(stored_samples):
+    import uuid
+    from datetime import datetime
+
+    from main import app
+    from app.db import SessionLocal
+    from app.models import Portfolio, PortfolioStock
+    from app.routers import portfolios as router
+
+    client = TestClient(app)
+    db = SessionLocal()
+    # Bought for almost nothing, so it is the best performer by far
+    other = Portfolio(
+        id=str(uuid.uuid4()), name="Other worker", description=None, total_value=0.0, total_cost=0.0,
+        day_change=0.0, day_change_percent=0.0, total_gain_loss=0.0, total_gain_loss_percent=0.0,
+        stocks=[PortfolioStock(symbol="AAPL", name="Apple", shares=10, avg_cost=0.01, current_price=150.0,
+                               value=1500.0, allocation=100.0)],
+        created_at=datetime.now(), updated_at=datetime.now()
+    )
+    try:
+        before = client.get("/api/portfolios/analytics/summary").json()
+
+        # Another worker's writes reach only the database
+        router.portfolio_service.save_portfolio(db, other)
+        created = client.get("/api/portfolios/analytics/summary").json()
+        assert created["total_portfolios"] == before["total_portfolios"] + 1
+        assert created["best_performer"]["name"] == "Other worker"
+
+        other.name, other.updated_at = "Renamed elsewhere", datetime.now()
+        router.portfolio_service.save_portfolio(db, other)
+        assert client.get("/api/portfolios/analytics/summary").json()["best_performer"]["name"] == "Renamed elsewhere"
+
+        router.portfolio_service.delete_portfolio(db, other.id)
+        assert client.get("/api/portfolios/analytics/summary").json() == before
+    finally:
+        router.portfolio_service.delete_portfolio(db, other.id)
+        router.drop_portfolio(other.id)
+        db.close()
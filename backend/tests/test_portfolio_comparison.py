@@ -0,0 +1,159 @@
+"""
+Tests for date-aligned portfolio comparison
+"""
+from datetime import date, timedelta
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.models import PortfolioHistory
+from app.routers import portfolios
+from app.services.portfolio_comparison import (
+    align_histories, compute_metrics, fill_gaps, rebase, time_range_start
+)
+
+
+def _series(start, values):
+    dates = np.arange(np.datetime64(start), np.datetime64(start) + len(values), dtype="datetime64[D]")
+    return dates, np.asarray(values, dtype=float)
+
+
+def test_histories_are_joined_by_date_not_position():
+    frame = align_histories({
+        "old": _series("2024-01-01", [100, 101, 102, 103]),
+        "new": _series("2024-01-03", [50, 55]),
+    })
+
+    assert [str(d.date()) for d in frame.index] == ["2024-01-01", "2024-01-02", "2024-01-03", "2024-01-04"]
+    assert np.isnan(frame["new"].iloc[:2]).all()
+    assert frame.loc["2024-01-03", "new"] == 50 and frame.loc["2024-01-03", "old"] == 102
+
+
+def test_forward_fill_and_rebase():
+    dates = np.array(["2024-01-01", "2024-01-02", "2024-01-04"], dtype="datetime64[D]")
+    frame = align_histories({
+        "a": (dates, [200.0, 210.0, 220.0]),
+        "b": _series("2024-01-02", [10.0, 11.0, 12.0]),
+    })
+
+    filled = fill_gaps(frame)
+    assert filled.loc["2024-01-03", "a"] == 210.0
+    assert np.isnan(filled.loc["2024-01-01", "b"])
+    rebased = rebase(filled)
+    assert rebased["a"].iloc[0] == 100.0 and rebased["b"].iloc[1] == 100.0
+    assert rebased.loc["2024-01-04", "b"] == pytest.approx(120.0)
+    assert np.isnan(rebased["b"].iloc[0])
+
+
+def test_metrics_match_per_portfolio_calculation():
+    rng = np.random.default_rng(3)
+    a = 100 * np.cumprod(1 + rng.normal(0.001, 0.01, 400))
+    b = 50 * np.cumprod(1 + rng.normal(0.0, 0.02, 200))
+    frame = align_histories({"a": _series("2022-01-01", a), "b": _series("2022-08-08", b)})
+    metrics = compute_metrics(frame, ["value", "returns", "volatility", "sharpe", "max_drawdown"])
+
+    for key, values in (("a", a), ("b", b)):
+        daily = values[1:] / values[:-1] - 1
+        peak = np.maximum.accumulate(values)
+        assert metrics[key]["value"] == pytest.approx(values[-1], abs=1e-4)
+        assert metrics[key]["returns"] == pytest.approx((values[-1] / values[0] - 1) * 100, abs=1e-4)
+        assert metrics[key]["volatility"] == pytest.approx(daily.std(ddof=1) * np.sqrt(252) * 100, abs=1e-4)
+        assert metrics[key]["sharpe"] == pytest.approx(
+            daily.mean() / daily.std(ddof=1) * np.sqrt(252), abs=1e-4
+        )
+        assert metrics[key]["max_drawdown"] == pytest.approx(((values / peak) - 1).min() * 100, abs=1e-4)
+
+    with pytest.raises(ValueError):
+        compute_metrics(frame, ["value", "alpha"])
+
+
+def test_time_range_parsing():
+    today = date(2024, 6, 15)
+    assert time_range_start("max", today) is None
+    assert time_range_start("ytd", today) == np.datetime64("2024-01-01")
+    assert time_range_start("3m", today) == np.datetime64(today - timedelta(days=90))
+    with pytest.raises(ValueError):
+        time_range_start("forever", today)
+
+
+@pytest.fixture
+def staggered():
+    from main import app
+    from app.db import SessionLocal
+
+    client = TestClient(app)
+    ids = [client.post("/api/portfolios/", json={"name": name}).json()["id"] for name in ("Early", "Late")]
+    today = date.today()
+
+    def history(pid, days):
+        return [
+            PortfolioHistory(
+                portfolio_id=pid, date=(today - timedelta(days=d)).isoformat(),
+                value=1000.0 + d, change=0.0, change_percent=0.0
+            )
+            for d in range(days, 0, -1)
+        ]
+
+    with SessionLocal() as db:
+        portfolios.portfolio_service.add_history(db, history(ids[0], 30) + history(ids[1], 10))
+    yield client, ids
+    for pid in ids:
+        client.delete(f"/api/portfolios/{pid}")
+
+
+def test_compare_endpoint_aligns_by_date(staggered):
+    client, ids = staggered
+    response = client.post("/api/portfolios/compare", json={
+        "portfolios": ids, "metrics": ["value", "returns", "max_drawdown"], "rebase": True,
+    })
+
+    assert response.status_code == 200
+    body = response.json()
+    rows = body["comparison_data"]
+    assert len(rows) == 30
+    assert rows[0]["Late"] is None and rows[20]["Late"] == 100.0
+    assert rows[20]["Early"] == pytest.approx(1010 / 1030 * 100, abs=0.01)
+    assert body["portfolios"][1]["metrics"]["value"] == 1001.0
+    assert set(body["portfolios"][0]["metrics"]) == {"value", "returns", "max_drawdown"}
+
+
+def test_compare_endpoint_rejects_bad_options(staggered):
+    client, ids = staggered
+
+    assert client.post("/api/portfolios/compare", json={"portfolios": ids, "metrics": ["alpha"]}).status_code == 400
+    assert client.post("/api/portfolios/compare", json={"portfolios": ids, "time_range": "soon"}).status_code == 400
+    short = client.post("/api/portfolios/compare", json={"portfolios": ids, "time_range": "5d"}).json()
+    assert len(short["comparison_data"]) == 5
+
+
+def test_compare_endpoint_reads_only_the_requested_range(monkeypatch):
+    from main import app
+    from app.db import SessionLocal
+    from app.services import portfolio_database
+
+    client = TestClient(app)
+    pid = client.post("/api/portfolios/", json={"name": "Decade"}).json()["id"]
+    today = date.today()
+    decoded = []
+    decode_chunk = portfolio_database.decode_chunk
+
+    def counting_decode(first_date, *args):
+        decoded.append(first_date)
+        return decode_chunk(first_date, *args)
+
+    try:
+        with SessionLocal() as db:
+            portfolios.portfolio_service.add_history(db, [
+                PortfolioHistory(portfolio_id=pid, date=(today - timedelta(days=d)).isoformat(),
+                                 value=1000.0 + d, change=0.0, change_percent=0.0)
+                for d in range(3650, 0, -1)
+            ])
+        monkeypatch.setattr(portfolio_database, "decode_chunk", counting_decode)
+        rows = client.post("/api/portfolios/compare", json={"portfolios": [pid], "time_range": "30d"}).json()
+    finally:
+        client.delete(f"/api/portfolios/{pid}")
+
+    assert len(rows["comparison_data"]) == 30
+    # Only this year's chunk (and last year's, early in January) of the eleven stored
+    assert 1 <= len(decoded) <= 2
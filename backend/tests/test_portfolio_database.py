@@ -0,0 +1,170 @@
+"""
+Tests for the database-backed portfolio store
+"""
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.db import Base
+from app.models import Portfolio, PortfolioHistory, PortfolioStock
+from app.portfolio_models import HoldingDB, PortfolioDB, PortfolioHistoryChunkDB
+from app.services.portfolio_database import PortfolioDatabaseService as service
+
+
+def _portfolio(name, symbols=("AAPL", "MSFT", "NVDA"), created_at=None):
+    now = created_at or datetime.utcnow()
+    return Portfolio(
+        id=str(uuid.uuid4()), name=name, description=None, total_value=0.0, total_cost=0.0,
+        day_change=0.0, day_change_percent=0.0, total_gain_loss=0.0, total_gain_loss_percent=0.0,
+        stocks=[
+            PortfolioStock(symbol=s, name=s, shares=10, avg_cost=100.0, current_price=120.0,
+                           value=1200.0, allocation=0.0)
+            for s in symbols
+        ],
+        created_at=now, updated_at=now
+    )
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(
+        bind=engine, tables=[PortfolioDB.__table__, HoldingDB.__table__, PortfolioHistoryChunkDB.__table__]
+    )
+    statements = []
+    event.listen(engine, "before_cursor_execute",
+                 lambda conn, cursor, sql, params, context, many: statements.append((sql, params)))
+    session = sessionmaker(bind=engine)()
+
+    @contextmanager
+    def counting():
+        statements.clear()
+        yield statements
+
+    session.counting = counting
+    yield session
+    session.close()
+
+
+def test_get_and_list_load_holdings_in_one_query(db):
+    start = datetime(2024, 1, 1)
+    stored = [service.save_portfolio(db, _portfolio(f"P{i}", created_at=start + timedelta(days=i)),
+                                     owner_id="alice" if i % 2 else "bob") for i in range(20)]
+    target = stored[7].id
+    db.expunge_all()
+
+    with db.counting() as statements:
+        row = service.get_portfolio(db, target)
+        symbols = [h.symbol for h in row.holdings]
+    assert len(statements) == 1 and symbols == ["AAPL", "MSFT", "NVDA"]
+
+    db.expunge_all()
+    with db.counting() as statements:
+        page = service.list_portfolios(db, owner_id="alice", limit=5)
+        holdings = sum(len(p.holdings) for p in page)
+    assert len(statements) == 1
+    assert [p.name for p in page] == ["P19", "P17", "P15", "P13", "P11"] and holdings == 15
+    assert service.to_portfolio(page[0]).total_value == 3 * 1200.0
+
+
+def test_history_is_stored_and_read_back_by_range(db):
+    portfolio = _portfolio("History")
+    service.save_portfolio(db, portfolio)
+    day = datetime(2023, 1, 1).date()
+    points = [
+        PortfolioHistory(portfolio_id=portfolio.id, date=(day + timedelta(days=i)).isoformat(),
+                         value=1000.0 + i, change=1.0, change_percent=0.1)
+        for i in range(400)
+    ]
+    assert service.add_history(db, points) == 400
+    assert db.query(PortfolioHistoryChunkDB).count() == 2  # 2023 and 2024
+
+    with db.counting() as statements:
+        window = service.get_history(db, portfolio.id, start=day + timedelta(days=10), end=day + timedelta(days=19))
+    assert len(statements) == 1
+    assert [p.value for p in window] == [1010.0 + i for i in range(10)]
+    assert service.get_history(db, portfolio.id) == points
+
+    last = service.get_history(db, portfolio.id, last=5)
+    assert [p.date for p in last] == [p.date for p in points[-5:]]
+
+    assert service.delete_portfolio(db, portfolio.id)
+    assert service.get_history(db, portfolio.id) == [] and service.get_portfolio(db, portfolio.id) is None
+
+
+def test_portfolios_survive_a_restart():
+    from main import app
+    from app.db import SessionLocal
+    from app.routers import portfolios
+
+    client = TestClient(app)
+    session = SessionLocal()
+    try:
+        portfolios.restore_portfolios(session)  # first boot stores the samples
+        before = {p["id"]: p["name"] for p in client.get("/api/portfolios/").json()}
+        assert before
+        sample = next(iter(before))
+        history = client.get(f"/api/portfolios/{sample}/history").json()
+        assert history
+
+        assert portfolios.restore_portfolios(session) == service.count_portfolios(session)
+        assert {p["id"]: p["name"] for p in client.get("/api/portfolios/").json()} == before
+        assert client.get(f"/api/portfolios/{sample}/history").json() == history
+    finally:
+        session.close()
+
+
+def test_every_worker_reads_the_database():
+    from main import app
+    from app.db import SessionLocal
+    from app.routers import portfolios
+
+    client = TestClient(app)
+    session = SessionLocal()
+    other = _portfolio("Other worker", symbols=("AAPL",))
+    try:
+        # Created elsewhere (another worker): listed and found on first read
+        service.save_portfolio(session, other, owner_id="carol")
+        listed = client.get("/api/portfolios/", params={"owner_id": "carol"}).json()
+        assert [p["id"] for p in listed] == [other.id] and listed[0]["owner_id"] == "carol"
+        fetched = client.get(f"/api/portfolios/{other.id}")
+        assert fetched.status_code == 200 and fetched.json()["stocks"][0]["shares"] == 10
+
+        # Updated elsewhere: the next read sees the new holdings and values them
+        other.stocks[0].shares = 25
+        service.save_portfolio(session, other, owner_id="carol")
+        assert client.get(f"/api/portfolios/{other.id}").json()["stocks"][0]["shares"] == 25
+
+        # Deleted elsewhere: gone from this worker too, including its valuation
+        service.delete_portfolio(session, other.id)
+        assert client.get(f"/api/portfolios/{other.id}").status_code == 404
+        assert other.id not in portfolios.valuation_engine.portfolio_ids
+        assert client.get("/api/portfolios/", params={"owner_id": "carol"}).json() == []
+    finally:
+        service.delete_portfolio(session, other.id)
+        session.close()
+
+
+def test_portfolio_list_is_paged_and_owned():
+    from main import app
+
+    client = TestClient(app)
+    created = [
+        client.post("/api/portfolios/", json={"name": f"Dave {i}", "owner_id": "dave"}).json()["id"]
+        for i in range(3)
+    ]
+    try:
+        first = client.get("/api/portfolios/", params={"owner_id": "dave", "limit": 2}).json()
+        rest = client.get("/api/portfolios/", params={"owner_id": "dave", "limit": 2, "offset": 2}).json()
+        assert len(first) == 2 and len(rest) == 1
+        assert sorted(p["id"] for p in first + rest) == sorted(created)
+        assert all(p["owner_id"] == "dave" for p in first + rest)
+        assert client.get("/api/portfolios/", params={"limit": 0}).status_code == 422
+    finally:
+        for pid in created:
+            client.delete(f"/api/portfolios/{pid}")
@@ -0,0 +1,119 @@
+"""
+Tests for the TTL/LRU quote cache and its single-flight fetches
+"""
+import asyncio
+
+from app.services import ai_services, http_client
+from app.services.quote_cache import QuoteCache, get_quote_cache
+from stub_servers import QuoteStubServer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = QuoteCache(ttl_seconds=10, clock=clock)
+    cache.set("aapl", {"symbol": "AAPL", "price": 1.0})
+
+    clock.now = 9.9
+    assert cache.get("AAPL")["price"] == 1.0
+    clock.now = 10.0
+    assert cache.get("AAPL") is None
+
+
+def test_per_symbol_ttl_override():
+    clock = FakeClock()
+    cache = QuoteCache(ttl_seconds=10, ttl_overrides={"spy": 1}, clock=clock)
+    cache.set("SPY", {"price": 1.0})
+    cache.set("AAPL", {"price": 2.0})
+
+    clock.now = 2
+    assert cache.get("SPY") is None
+    assert cache.get("AAPL") is not None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = QuoteCache(max_entries=2)
+    cache.set("AAPL", {"price": 1.0})
+    cache.set("MSFT", {"price": 2.0})
+    cache.get("AAPL")
+    cache.set("TSLA", {"price": 3.0})
+
+    assert cache.get("MSFT") is None
+    assert cache.get("AAPL") is not None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_concurrent_misses_share_one_fetch():
+    cache = QuoteCache()
+    calls = []
+
+    async def fetch(symbol):
+        calls.append(symbol)
+        await asyncio.sleep(0.05)
+        return {"symbol": symbol, "price": 10.0}
+
+    async def run():
+        return await asyncio.gather(*(cache.get_or_fetch("AAPL", fetch) for _ in range(20)))
+
+    results = asyncio.run(run())
+
+    assert calls == ["AAPL"]
+    assert all(r["price"] == 10.0 for r in results)
+    stats = cache.stats()
+    assert (stats["misses"], stats["coalesced"], stats["hits"]) == (1, 19, 0)
+    assert cache.get("AAPL") is not None
+
+
+def test_fetch_errors_reach_all_waiters_and_are_not_cached():
+    cache = QuoteCache()
+
+    async def fetch(symbol):
+        await asyncio.sleep(0.01)
+        raise RuntimeError("throttled")
+
+    async def run():
+        return await asyncio.gather(
+            *(cache.get_or_fetch("AAPL", fetch) for _ in range(3)), return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert len(cache) == 0
+
+
+def test_stock_data_is_served_from_cache(monkeypatch):
+    monkeypatch.setenv("ALPHA_VANTAGE_API_KEY", "test-key")
+
+    async def run():
+        await http_client.init_http_client()
+        try:
+            first = await ai_services.get_real_time_stock_data("AAPL")
+            again = await asyncio.gather(
+                *(ai_services.get_real_time_stock_data("AAPL") for _ in range(5))
+            )
+        finally:
+            await http_client.close_http_client()
+        return first, again
+
+    with QuoteStubServer() as stub:
+        monkeypatch.setattr(ai_services, "ALPHA_VANTAGE_URL", stub.url)
+        first, again = asyncio.run(run())
+
+    assert stub.requests == 1
+    assert all(quote["price"] == first["price"] and not quote["stale"] for quote in again)
+    assert get_quote_cache().stats()["hits"] == 5
+
+
+def test_callers_cannot_mutate_cached_quotes():
+    cache = QuoteCache()
+    cache.set("AAPL", {"symbol": "AAPL", "price": 1.0})
+    cache.get("AAPL")["price"] = "changed"
+    assert cache.get("AAPL")["price"] == 1.0
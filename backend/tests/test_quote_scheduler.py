@@ -0,0 +1,182 @@
+"""
+Tests for the rate-limited, prioritized upstream quote scheduler
+"""
+import asyncio
+
+from app.services import ai_services, http_client
+from app.services.quote_cache import QuoteCache
+from app.services.quote_scheduler import (
+    REFRESH_PRIORITY,
+    QuoteRateLimited,
+    QuoteScheduler,
+    TokenBucket,
+)
+from stub_servers import QuoteStubServer
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_token_bucket_refills_at_its_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=0.5, capacity=2, clock=clock)
+
+    assert bucket.try_acquire() and bucket.try_acquire()
+    assert not bucket.try_acquire()
+    assert bucket.delay() == 2.0
+    clock.now += 1
+    assert bucket.delay() == 1.0
+    clock.now += 10
+    assert bucket.tokens == 2  # capped at capacity
+
+
+def test_user_requests_run_before_background_refresh():
+    calls = []
+
+    async def fetch(symbol):
+        calls.append(symbol)
+        return {"symbol": symbol, "price": 1.0}
+
+    async def run():
+        # One call per 50ms so the queue builds up behind the bucket
+        scheduler = QuoteScheduler(fetch, bucket=TokenBucket(rate=20, capacity=1), cache=QuoteCache())
+        scheduler.bucket.drain()
+        await scheduler.start()
+        for symbol in ["BG1", "BG2", "BG3"]:
+            scheduler.request_refresh(symbol, REFRESH_PRIORITY)
+        quote = await scheduler.get_quote("USER", wait=1.0)
+        await scheduler.stop()
+        return quote
+
+    quote = asyncio.run(run())
+
+    assert calls[0] == "USER"
+    assert quote["price"] == 1.0 and quote["age_seconds"] == 0.0
+
+
+def test_stale_quote_is_returned_immediately_while_refreshing():
+    clock = FakeClock()
+    release = None
+    calls = []
+
+    async def fetch(symbol):
+        calls.append(symbol)
+        if len(calls) > 1:
+            await release.wait()  # the provider is slow for the refresh
+        return {"symbol": symbol, "price": float(len(calls))}
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        cache = QuoteCache(ttl_seconds=60, clock=clock)
+        scheduler = QuoteScheduler(fetch, cache=cache, clock=clock)
+        first = await scheduler.get_quote("AAPL")
+
+        clock.now += 90
+        stale = await asyncio.wait_for(scheduler.get_quote("AAPL"), 0.1)
+        await asyncio.sleep(0.05)
+        release.set()
+        await asyncio.sleep(0.05)
+        fresh = await scheduler.get_quote("AAPL")
+        await scheduler.stop()
+        return first, stale, fresh
+
+    first, stale, fresh = asyncio.run(run())
+
+    assert first["price"] == 1.0 and not first["stale"]
+    assert stale["price"] == 1.0 and stale["stale"] and stale["age_seconds"] == 90.0
+    assert fresh["price"] == 2.0 and not fresh["stale"]
+    assert calls == ["AAPL", "AAPL"]
+
+
+def test_refresh_candidates_rank_staleness_times_popularity():
+    clock = FakeClock()
+
+    async def fetch(symbol):
+        return {"symbol": symbol, "price": 1.0}
+
+    async def run():
+        scheduler = QuoteScheduler(fetch, cache=QuoteCache(ttl_seconds=60, clock=clock), clock=clock)
+        for symbol in ["AAPL", "MSFT", "TSLA"]:
+            await scheduler.get_quote(symbol)
+        await scheduler.stop()
+        return scheduler
+
+    scheduler = asyncio.run(run())
+    for _ in range(9):
+        scheduler._record_request("MSFT")
+
+    clock.now += 30
+    assert scheduler.next_refresh_candidate() is None  # nothing is stale yet
+    clock.now += 70
+    assert scheduler.next_refresh_candidate() == "MSFT"
+    scheduler._latest["AAPL"] = (clock.now - 2000, scheduler._latest["AAPL"][1])
+    assert scheduler.next_refresh_candidate() == "AAPL"  # 20x staler beats 10x popularity
+
+
+def test_cache_stats_count_scheduler_traffic():
+    calls = []
+
+    async def fetch(symbol):
+        calls.append(symbol)
+        await asyncio.sleep(0.05)
+        return {"symbol": symbol, "price": 1.0}
+
+    async def run():
+        cache = QuoteCache()
+        scheduler = QuoteScheduler(fetch, cache=cache)
+        await asyncio.gather(*(scheduler.get_quote("AAPL", wait=1.0) for _ in range(3)))
+        await scheduler.get_quote("AAPL")
+        await scheduler.stop()
+        return cache.stats()
+
+    stats = asyncio.run(run())
+
+    assert calls == ["AAPL"]
+    assert (stats["misses"], stats["coalesced"], stats["hits"], stats["upstream_requests"]) == (1, 2, 1, 1)
+    assert stats["hit_rate"] == 0.75
+
+
+def test_throttled_provider_drains_bucket_and_retries():
+    attempts = []
+
+    async def fetch(symbol):
+        attempts.append(symbol)
+        if len(attempts) == 1:
+            raise QuoteRateLimited("Thank you for using Alpha Vantage!")
+        return {"symbol": symbol, "price": 5.0}
+
+    async def run():
+        scheduler = QuoteScheduler(fetch, bucket=TokenBucket(rate=10, capacity=3), cache=QuoteCache())
+        quote = await scheduler.get_quote("AAPL", wait=1.0)
+        await scheduler.stop()
+        return scheduler, quote
+
+    scheduler, quote = asyncio.run(run())
+
+    assert quote["price"] == 5.0
+    assert attempts == ["AAPL", "AAPL"]
+    assert scheduler.stats()["throttled"] == 1
+
+
+def test_unavailable_quote_has_no_made_up_price(monkeypatch):
+    monkeypatch.setenv("ALPHA_VANTAGE_API_KEY", "test-key")
+
+    async def run():
+        await http_client.init_http_client()
+        try:
+            return await ai_services.get_real_time_stock_data("AAPL", timeout=0.05)
+        finally:
+            await http_client.close_http_client()
+
+    with QuoteStubServer(latency=0.5) as stub:
+        monkeypatch.setattr(ai_services, "ALPHA_VANTAGE_URL", stub.url)
+        quote = asyncio.run(run())
+
+    assert quote["pending"] is True
+    assert "price" not in quote
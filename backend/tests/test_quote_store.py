@@ -0,0 +1,83 @@
+"""
+Tests for the columnar in-memory quote store
+"""
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from app.models import StockData
+from app.services.quote_store import QuoteStore
+
+
+def _stock(symbol, price, change_percent, **extra):
+    return StockData(
+        symbol=symbol, price=price, change=price * change_percent / 100,
+        change_percent=change_percent, volume=1000, **extra
+    )
+
+
+def test_point_lookup_round_trips_stock_data():
+    store = QuoteStore()
+    stamp = datetime(2024, 1, 2, 15, 30, tzinfo=timezone.utc)
+    stock = _stock("aapl", 150.25, 1.45, market_cap=2.5e12, timestamp=stamp)
+    store.upsert_stock(stock)
+
+    quote = store.get("AAPL")
+    assert quote["symbol"] == "AAPL"
+    assert quote["high"] is None
+    assert StockData(**quote) == stock.model_copy(update={"symbol": "AAPL"})
+    assert store.get("MSFT") is None
+
+
+def test_bulk_update_is_vectorized_and_appends_new_symbols():
+    store = QuoteStore(capacity=2)
+    store.load_stocks([_stock("AAPL", 1.0, 0.0), _stock("MSFT", 2.0, 0.0)])
+
+    rows = store.bulk_update(
+        ["MSFT", "TSLA", "AMZN"],
+        {"price": np.array([20.0, 30.0, 40.0]), "volume": np.array([5, 6, 7])},
+    )
+
+    assert rows.tolist() == [1, 2, 3]
+    assert store.column("price").tolist() == [1.0, 20.0, 30.0, 40.0]
+    assert store.get("TSLA")["volume"] == 6
+    assert store.symbols == ["AAPL", "MSFT", "TSLA", "AMZN"]
+
+
+def test_versions_track_writes_per_row():
+    store = QuoteStore()
+    store.load_stocks([_stock("AAPL", 1.0, 0.0), _stock("MSFT", 2.0, 0.0)])
+    before = (store.version, store.row_version("AAPL"), store.row_version("MSFT"))
+
+    store.upsert("MSFT", price=3.0)
+
+    assert store.version == before[0] + 1
+    assert store.row_version("AAPL") == before[1]
+    assert store.row_version("MSFT") > before[2]
+    assert store.row_version("NOPE") == -1
+
+
+def test_top_n_ignores_missing_values_and_respects_threshold():
+    store = QuoteStore()
+    store.load_stocks([
+        _stock("A", 1.0, 3.0), _stock("B", 1.0, -2.0), _stock("C", 1.0, 5.0),
+        _stock("D", 1.0, -7.0), _stock("E", 1.0, 0.5),
+    ])
+    store.upsert("F", price=1.0)  # change_percent missing
+
+    assert store.top_n("change_percent", 2) == ["C", "A"]
+    assert store.top_n("change_percent", 10, largest=False, threshold=0.0) == ["D", "B"]
+    assert store.top_n("change_percent", 10, threshold=0.0) == ["C", "A", "E"]
+
+
+def test_columns_are_read_only_views():
+    store = QuoteStore()
+    store.upsert("AAPL", price=1.0)
+    with pytest.raises(ValueError):
+        store.column("price")[0] = 2.0
+
+
+def test_unknown_field_is_rejected():
+    with pytest.raises(KeyError):
+        QuoteStore().upsert("AAPL", bid=1.0)
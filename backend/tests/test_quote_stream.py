@@ -0,0 +1,210 @@
+"""
+Tests for the streaming quote feed
+"""
+import asyncio
+import json
+
+from fastapi.testclient import TestClient
+
+from app.services.quote_cache import QuoteCache
+from app.services.quote_scheduler import QuoteScheduler, get_quote_scheduler
+from app.services.quote_store import QuoteStore, get_quote_store
+from app.services.quote_stream import QuoteBroadcaster
+from main import app
+
+
+def _decode(messages):
+    return [json.loads(m) for m in messages]
+
+
+def test_store_reports_only_changed_fields():
+    store = QuoteStore()
+    store.upsert("AAPL", price=1.0, volume=10)
+    seen = []
+    store.add_listener(seen.append)
+
+    store.bulk_update(["AAPL", "MSFT"], {"price": [1.0, 5.0], "volume": [11, 3]})
+    store.upsert("AAPL", price=1.0)
+
+    assert seen == [{"AAPL": {"volume": 11}, "MSFT": {"price": 5.0, "volume": 3}}]
+
+
+def test_deltas_are_encoded_once_and_shared():
+    async def run():
+        store = QuoteStore()
+        store.upsert("AAPL", price=1.0)
+        broadcaster = QuoteBroadcaster(store)
+        subscribers = [broadcaster.connect() for _ in range(50)]
+        for sub in subscribers:
+            broadcaster.subscribe(sub, ["aapl"])
+            assert _decode(await sub.next_messages())[0]["type"] == "snapshot"
+
+        store.upsert("AAPL", price=2.0)
+        received = [await sub.next_messages() for sub in subscribers]
+        return broadcaster, received
+
+    broadcaster, received = asyncio.run(run())
+
+    assert broadcaster.messages_encoded == 1
+    assert all(msgs[0] is received[0][0] for msgs in received)
+    assert json.loads(received[0][0]) == {"type": "delta", "symbol": "AAPL", "data": {"price": 2.0}}
+
+
+def test_slow_consumer_is_resynced_without_blocking_others():
+    async def run():
+        store = QuoteStore()
+        store.upsert("AAPL", price=0.0)
+        broadcaster = QuoteBroadcaster(store, queue_size=4)
+        slow, fast = broadcaster.connect(), broadcaster.connect()
+        broadcaster.subscribe(slow, ["AAPL"])
+        broadcaster.subscribe(fast, ["AAPL"])
+        await fast.next_messages()
+
+        fast_prices = []
+        for tick in range(1, 21):
+            store.upsert("AAPL", price=float(tick))
+            fast_prices += [m["data"]["price"] for m in _decode(await fast.next_messages())]
+        return slow, fast_prices, _decode(await slow.next_messages())
+
+    slow, fast_prices, slow_messages = asyncio.run(run())
+
+    assert fast_prices == [float(t) for t in range(1, 21)]
+    assert slow.resyncs > 0 and slow.dropped > 0
+    assert slow_messages == [{"type": "snapshot", "symbol": "AAPL", "data": slow_messages[0]["data"]}]
+    assert slow_messages[0]["data"]["price"] == 20.0
+
+
+def test_scheduler_fetches_reach_stream_subscribers():
+    async def fetch(symbol):
+        return {"symbol": symbol, "price": 101.5, "change": 1.5, "change_percent": 1.5,
+                "volume": 900, "high": 102.0, "low": 99.0, "rolling": {"ticks": 1}}
+
+    async def run():
+        store = QuoteStore()
+        store.upsert("AAPL", price=100.0, change=0.0, change_percent=0.0, volume=800,
+                     high=100.0, low=99.0, previous_close=100.0, market_cap=2e12)
+        broadcaster = QuoteBroadcaster(store)
+        sub = broadcaster.connect()
+        broadcaster.subscribe(sub, ["AAPL"])
+        await sub.next_messages()  # snapshot
+
+        scheduler = QuoteScheduler(fetch, cache=QuoteCache(), store=store)
+        try:
+            await scheduler.get_quote("AAPL", wait=1.0)
+            return store, _decode(await asyncio.wait_for(sub.next_messages(), 1.0))
+        finally:
+            await scheduler.stop()
+
+    store, messages = asyncio.run(run())
+
+    assert messages == [{"type": "delta", "symbol": "AAPL", "data": {
+        "price": 101.5, "change": 1.5, "change_percent": 1.5, "volume": 900, "high": 102.0
+    }}]
+    # Fields the provider does not return are left alone
+    assert store.get("AAPL")["market_cap"] == 2e12 and store.get("AAPL")["previous_close"] == 100.0
+    assert get_quote_scheduler().store is get_quote_store()
+
+
+def test_subscribed_symbols_are_refreshed_without_other_callers():
+    fetched = []
+
+    async def fetch(symbol):
+        fetched.append(symbol)
+        return {"symbol": symbol, "price": 101.5 + len(fetched), "change": 1.5, "change_percent": 1.5,
+                "volume": 900, "high": 105.0, "low": 99.0}
+
+    async def run():
+        store = QuoteStore()
+        store.upsert("AAPL", price=100.0, change=0.0, change_percent=0.0, volume=800,
+                     high=100.0, low=99.0, previous_close=100.0)
+        scheduler = QuoteScheduler(fetch, cache=QuoteCache(ttl_seconds=0.2), store=store, refresh_interval=0.05)
+        broadcaster = QuoteBroadcaster(store, scheduler=scheduler)
+        sub = broadcaster.connect()
+        try:
+            broadcaster.subscribe(sub, ["aapl"])
+            await sub.next_messages()  # snapshot
+            # Nobody calls get_quote: the subscription alone keeps the symbol refreshed
+            first = _decode(await asyncio.wait_for(sub.next_messages(), 1.0))
+            second = _decode(await asyncio.wait_for(sub.next_messages(), 1.0))
+            watched = scheduler.stats()["watched_symbols"]
+            broadcaster.disconnect(sub)
+            return first, second, watched, scheduler.stats()["watched_symbols"]
+        finally:
+            await scheduler.stop()
+
+    first, second, watched, after = asyncio.run(run())
+
+    assert first[0]["data"]["price"] == 102.5 and second[0]["data"]["price"] == 103.5
+    assert fetched[:2] == ["AAPL", "AAPL"]
+    assert (watched, after) == (1, 0)
+
+
+def test_demo_mode_quotes_move_from_the_last_price(monkeypatch):
+    from app.services import quote_scheduler
+
+    monkeypatch.setattr(quote_scheduler, "DEMO_QUOTE_TICKS", True)
+    last = {"price": 200.0, "previous_close": 190.0, "volume": 5000, "high": 201.0, "low": 195.0}
+    quote = asyncio.run(quote_scheduler._fetch_upstream("DEMO"))
+    assert quote["symbol"] == "DEMO" and quote["price"] > 0
+    quote = quote_scheduler.demo_quote("DEMO", last)
+    assert abs(quote["price"] - 200.0) < 10 and quote["change"] == round(quote["price"] - 190.0, 2)
+    assert quote["high"] >= 201.0 and quote["low"] <= 195.0
+
+
+def test_listener_detaches_when_last_subscriber_leaves():
+    async def run():
+        store = QuoteStore()
+        broadcaster = QuoteBroadcaster(store)
+        sub = broadcaster.connect()
+        attached = len(store._listeners)
+        broadcaster.disconnect(sub)
+        return attached, len(store._listeners)
+
+    assert asyncio.run(run()) == (1, 0)
+
+
+def test_websocket_stream_sends_snapshot_then_deltas():
+    from app.routers.stocks import quote_store
+
+    original = quote_store.get("MSFT")["price"]
+    with TestClient(app) as client:
+        with client.websocket_connect("/api/stocks/stream/ws") as ws:
+            ws.send_json({"action": "subscribe", "symbols": ["msft"]})
+            snapshot = ws.receive_json()
+            assert snapshot["type"] == "snapshot"
+            assert snapshot["data"]["price"] == original
+
+            try:
+                quote_store.upsert("MSFT", price=original + 1)
+                assert ws.receive_json() == {
+                    "type": "delta", "symbol": "MSFT", "data": {"price": original + 1}
+                }
+            finally:
+                quote_store.upsert("MSFT", price=original)
+            assert ws.receive_json()["data"] == {"price": original}
+
+            ws.send_json({"action": "bogus", "symbols": []})
+            assert ws.receive_json()["type"] == "error"
+
+
+def test_sse_events_frame_snapshots_and_deltas():
+    from app.routers import stream
+
+    class FakeRequest:
+        async def is_disconnected(self):
+            return False
+
+    async def run():
+        broadcaster = stream.get_quote_broadcaster()
+        subscriber = broadcaster.connect()
+        broadcaster.subscribe(subscriber, stream._parse_symbols("tsla, aapl,"))
+        events = stream._sse_events(FakeRequest(), subscriber)
+        first = await events.__anext__()
+        await events.aclose()
+        return first, len(broadcaster)
+
+    first, remaining = asyncio.run(run())
+
+    frames = [f for f in first.split("\n\n") if f]
+    assert [json.loads(f[len("data: "):])["symbol"] for f in frames] == ["TSLA", "AAPL"]
+    assert remaining == 0
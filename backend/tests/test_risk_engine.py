@@ -0,0 +1,188 @@
+"""
+Tests for the portfolio risk engine against straightforward loop computations
+"""
+import asyncio
+import math
+import uuid
+from datetime import datetime
+from statistics import NormalDist
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.models import Portfolio, PortfolioStock
+from app.routers import chatbot
+from app.services import ai_services
+from app.services.bar_store import BarStore, make_bars
+from app.services.portfolio_database import PortfolioDatabaseService
+from app.services.risk_engine import RiskEngine, portfolio_risk
+
+
+def _returns(days=250, assets=3, seed=5):
+    rng = np.random.default_rng(seed)
+    mixing = rng.normal(0, 0.01, (assets, assets))
+    return rng.normal(0.0005, 1.0, (days, assets)) @ mixing
+
+
+def test_portfolio_risk_matches_loop_formulas():
+    returns = _returns()
+    weights = np.array([0.5, 0.3, 0.2])
+    risk = portfolio_risk(returns, weights, confidence=0.95)
+
+    rows = returns.tolist()
+    days, assets = len(rows), len(weights)
+    means = [sum(r[i] for r in rows) / days for i in range(assets)]
+    cov = [[sum((r[i] - means[i]) * (r[j] - means[j]) for r in rows) / (days - 1)
+            for j in range(assets)] for i in range(assets)]
+    variance = sum(weights[i] * weights[j] * cov[i][j] for i in range(assets) for j in range(assets))
+    assert risk["daily_volatility"] == pytest.approx(math.sqrt(variance), rel=1e-10)
+    assert risk["annualized_volatility"] == pytest.approx(math.sqrt(variance * 252), rel=1e-10)
+
+    daily = [sum(w * x for w, x in zip(weights, r)) for r in rows]
+    var = -float(np.quantile(daily, 0.05))
+    assert risk["historical"]["var"] == pytest.approx(var)
+    assert risk["historical"]["cvar"] == pytest.approx(-np.mean([x for x in daily if x <= -var]))
+    assert risk["historical"]["cvar"] >= risk["historical"]["var"]
+
+    mu = sum(w * m for w, m in zip(weights, means))
+    sigma = math.sqrt(variance)
+    assert risk["parametric"]["var"] == pytest.approx(-(mu + NormalDist().inv_cdf(0.05) * sigma))
+    assert risk["parametric"]["cvar"] > risk["parametric"]["var"]
+
+    # Euler contributions add up to the whole portfolio's volatility
+    assert risk["risk_contribution"].sum() == pytest.approx(1.0)
+
+    wealth, peak, drawdown = 1.0, 1.0, 0.0
+    for x in daily:
+        wealth *= 1 + x
+        peak = max(peak, wealth)
+        drawdown = max(drawdown, 1 - wealth / peak)
+    assert risk["max_drawdown"] == pytest.approx(drawdown) and drawdown > 0
+
+
+def _bars(closes, start_offset=0, skip=()):
+    today = np.datetime64("today", "D")
+    return make_bars(
+        (str(today - len(closes) - start_offset + i), c, c, c, c, 1e6)
+        for i, c in enumerate(closes) if i not in skip
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = BarStore(str(tmp_path))
+    rng = np.random.default_rng(9)
+    market = rng.normal(0.0003, 0.01, 200)
+    spy = 400 * np.cumprod(1 + np.concatenate([[0.0], market]))
+    # AAPL moves exactly twice as much as the index every day: beta 2
+    aapl = 150 * np.cumprod(1 + np.concatenate([[0.0], 2 * market]))
+    msft = 300 * np.cumprod(1 + np.concatenate([[0.0], rng.normal(0, 0.015, 200)]))
+    store.append("SPY", _bars(spy))
+    store.append("AAPL", _bars(aapl))
+    store.append("MSFT", _bars(msft, skip={50, 51}))
+    return store
+
+
+def test_engine_aligns_history_and_reports_beta(store):
+    engine = RiskEngine(store=store, history_days=400, benchmark="SPY")
+
+    alone = engine.analyze({"AAPL": 10_000})
+    assert alone["beta"] == pytest.approx(2.0, abs=1e-6)
+    assert alone["risk_contribution"] == {"AAPL": pytest.approx(1.0)}
+
+    mixed = engine.analyze({"AAPL": 6_000, "MSFT": 4_000, "NOPE": 1_000})
+    assert mixed["missing_history"] == ["NOPE"]
+    assert mixed["weights"] == {"AAPL": 0.6, "MSFT": 0.4}
+    # MSFT lacks two of the 201 days, so every column is cut to the 199 shared ones
+    assert mixed["observations"] == 199 - 1
+    assert mixed["historical_var"]["amount"] == pytest.approx(
+        mixed["historical_var"]["return"] * 10_000, abs=0.01
+    )
+    assert 0 < mixed["max_drawdown"]["return"] < 1
+
+
+def test_covariance_is_cached_until_history_changes(store):
+    engine = RiskEngine(store=store, history_days=400, benchmark="SPY")
+    first = engine.analyze({"AAPL": 1.0, "MSFT": 1.0})
+    engine.analyze({"AAPL": 5.0, "MSFT": 1.0})  # new weights reuse the covariance
+    assert engine.stats() == {"entries": 1, "hits": 1, "misses": 1}
+
+    # Re-appending the latest bar corrects it in place
+    last = store.tail("MSFT", 1)[0]
+    store.append("MSFT", make_bars([(last["time"], 1, 1, 1, 1, 0)]))
+    updated = engine.analyze({"AAPL": 1.0, "MSFT": 1.0})
+
+    assert engine.stats()["misses"] == 2
+    assert updated["daily_volatility"] != first["daily_volatility"]
+
+
+def test_short_history_is_reported_not_estimated(tmp_path):
+    store = BarStore(str(tmp_path))
+    store.append("AAPL", _bars(np.linspace(100, 110, 5)))
+
+    result = RiskEngine(store=store, history_days=30).analyze({"AAPL": 1.0})
+    assert "error" in result and result["observations"] == 4
+
+
+@pytest.fixture
+def demo_engine(tmp_path, monkeypatch):
+    engine = RiskEngine(store=BarStore(str(tmp_path)))
+    monkeypatch.setattr(ai_services, "get_risk_engine", lambda: engine)
+    monkeypatch.setattr(ai_services, "get_bar_store", lambda: engine.store)
+    return engine
+
+
+def test_risk_endpoint_uses_portfolio_holdings(demo_engine, stored_samples):
+    from main import app
+
+    portfolio = stored_samples[0]
+    response = TestClient(app).get(f"/api/portfolios/{portfolio.id}/risk")
+
+    assert response.status_code == 200
+    risk = response.json()
+    assert set(risk["symbols"]) == {stock.symbol for stock in portfolio.stocks}
+    assert risk["beta"] is not None and "note" in risk
+    assert TestClient(app).get("/api/portfolios/missing/risk").status_code == 404
+
+
+def _owned(name, symbols):
+    now = datetime.utcnow()
+    return Portfolio(
+        id=str(uuid.uuid4()), name=name, description=None, total_value=0.0, total_cost=0.0,
+        day_change=0.0, day_change_percent=0.0, total_gain_loss=0.0, total_gain_loss_percent=0.0,
+        stocks=[PortfolioStock(symbol=s, name=s, shares=10, avg_cost=100.0, current_price=120.0,
+                               value=1200.0, allocation=0.0) for s in symbols],
+        created_at=now, updated_at=now
+    )
+
+
+def test_chatbot_analyze_risk_action(demo_engine):
+    from main import app  # noqa: F401 - creates the tables
+    from app.db import SessionLocal
+
+    basket = asyncio.run(chatbot.fetch_stock_data({"action": "analyze_risk", "symbols": ["AAPL", "TSLA"]}))
+    assert basket["basket_risk"]["weights"] == {"AAPL": 0.5, "TSLA": 0.5}
+
+    db = SessionLocal()
+    stored = [
+        (_owned("Alice Growth", ("AAPL", "MSFT")), "alice"),
+        (_owned("Alice Income", ("JNJ",)), "alice"),
+        (_owned("Bob Secret", ("TSLA",)), "bob"),
+    ]
+    try:
+        for portfolio, owner in stored:
+            PortfolioDatabaseService.save_portfolio(db, portfolio, owner_id=owner)
+        risk_query = {"action": "analyze_risk", "symbols": []}
+        overall = asyncio.run(chatbot.fetch_stock_data(risk_query, "alice"))
+        anonymous = asyncio.run(chatbot.fetch_stock_data(risk_query))
+    finally:
+        for portfolio, _ in stored:
+            PortfolioDatabaseService.delete_portfolio(db, portfolio.id)
+        db.close()
+
+    # Only the requesting user's portfolios, never another user's holdings
+    assert set(overall) == {"Alice Growth_risk", "Alice Income_risk"}
+    assert all("annualized_volatility" in value for value in overall.values())
+    assert "VaR" in ai_services.AIStockAnalyzer()._generate_simple_response("risk?", overall)
+    assert set(anonymous) == {"info"}
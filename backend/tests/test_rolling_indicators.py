@@ -0,0 +1,81 @@
+"""
+Tests for the O(1) rolling indicators against a full recompute
+"""
+import asyncio
+
+import numpy as np
+import pytest
+
+from app.services import ai_services, http_client, indicators, rolling_indicators
+from app.services.rolling_indicators import RollingIndicators
+from stub_servers import QuoteStubServer
+
+
+def _ticks(n=500, seed=2):
+    rng = np.random.default_rng(seed)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.01, n)))
+    prices[200:230] = prices[199]  # a flat stretch exercises ties in the deques
+    return prices
+
+
+def test_every_tick_matches_a_full_recompute():
+    window = 20
+    prices = _ticks()
+    state = RollingIndicators(window=window, ema_span=10, rsi_period=14)
+    expected_ema = indicators.ema(prices, span=10)
+    expected_rsi = indicators.rsi(prices, period=14)
+
+    for i, price in enumerate(prices):
+        reading = state.update("AAPL", price)
+        recent = prices[max(0, i - window + 1):i + 1]
+        assert reading["mean"] == pytest.approx(recent.mean(), rel=1e-12)
+        if len(recent) > 1:
+            assert reading["std"] == pytest.approx(recent.std(ddof=1), rel=1e-7, abs=1e-9)
+        assert reading["min"] == recent.min() and reading["max"] == recent.max()
+        assert reading["ema"] == pytest.approx(expected_ema[i], rel=1e-12)
+        if np.isnan(expected_rsi[i]):
+            assert reading["rsi"] is None
+        else:
+            assert reading["rsi"] == pytest.approx(expected_rsi[i], rel=1e-9)
+
+
+def test_symbols_keep_independent_state_across_growth():
+    state = RollingIndicators(window=5, capacity=2)
+    for i in range(50):
+        for j, symbol in enumerate(["A", "B", "C", "D", "E"]):
+            last = state.update(symbol, 10.0 * (j + 1) + i % 7)
+
+    assert len(state) == 5
+    # Last five ticks of E: 50 + (45..49 % 7) = 53, 54, 55, 56, 50
+    assert last["max"] == 56.0 and last["min"] == 50.0
+    assert state.update("A", 1000.0)["max"] == 1000.0
+
+
+def test_reset_forgets_history():
+    state = RollingIndicators(window=3)
+    for price in [5.0, 9.0, 7.0]:
+        state.update("AAPL", price)
+    state.reset("AAPL")
+
+    reading = state.update("AAPL", 1.0)
+    assert (reading["ticks"], reading["max"], reading["std"]) == (1, 1.0, None)
+
+
+def test_fetched_quotes_feed_the_shared_state(monkeypatch):
+    monkeypatch.setenv("ALPHA_VANTAGE_API_KEY", "test-key")
+    monkeypatch.setattr(rolling_indicators, "rolling_indicators", RollingIndicators())
+    monkeypatch.setattr(ai_services, "get_rolling_indicators", lambda: rolling_indicators.rolling_indicators)
+
+    async def run():
+        await http_client.init_http_client()
+        try:
+            return [await ai_services.fetch_alpha_vantage_quote("AAPL") for _ in range(3)]
+        finally:
+            await http_client.close_http_client()
+
+    with QuoteStubServer() as stub:
+        monkeypatch.setattr(ai_services, "ALPHA_VANTAGE_URL", stub.url)
+        quotes = asyncio.run(run())
+
+    assert [q["rolling"]["ticks"] for q in quotes] == [1, 2, 3]
+    assert quotes[-1]["rolling"]["mean"] == quotes[-1]["price"]
@@ -0,0 +1,107 @@
+"""
+Tests for the stocks router
+"""
+import pytest
+from fastapi.testclient import TestClient
+
+from app.models import MAX_BATCH_SYMBOLS
+from main import app
+
+
+@pytest.fixture
+def client():
+    with TestClient(app) as test_client:
+        yield test_client
+
+
+def test_batch_returns_quotes_in_request_order(client):
+    response = client.post("/api/stocks/batch", json={"symbols": ["msft", "AAPL", "MSFT"]})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert [q["symbol"] for q in body["quotes"]] == ["MSFT", "AAPL"]
+    assert body["quotes"][1]["price"] == client.get("/api/stocks/AAPL").json()["data"]["price"]
+    assert body["count"] == 2 and body["not_found"] == []
+
+
+def test_batch_reports_unknown_symbols_inline(client):
+    response = client.post("/api/stocks/batch", json={"symbols": ["AAPL", "NOPE"]})
+
+    body = response.json()
+    assert body["quotes"][1] == {"symbol": "NOPE", "error": "not_found"}
+    assert body["not_found"] == ["NOPE"]
+    assert body["count"] == 1
+
+
+def test_batch_field_subset(client):
+    response = client.post(
+        "/api/stocks/batch", json={"symbols": ["TSLA"], "fields": ["price", "change_percent"]}
+    )
+
+    assert response.json()["quotes"] == [{"symbol": "TSLA", "price": 245.30, "change_percent": -3.42}]
+
+
+def test_batch_rejects_unknown_fields_and_oversized_batches(client):
+    assert client.post("/api/stocks/batch", json={"symbols": ["AAPL"], "fields": ["nope"]}).status_code == 400
+    too_many = {"symbols": [f"S{i}" for i in range(MAX_BATCH_SYMBOLS + 1)]}
+    assert client.post("/api/stocks/batch", json=too_many).status_code == 422
+
+
+def test_quote_endpoints_serve_etags_and_304(client):
+    for path in ("/api/stocks/", "/api/stocks/AAPL", "/api/stocks/aapl/price"):
+        first = client.get(path)
+        etag = first.headers["etag"]
+        assert first.status_code == 200 and etag.startswith('"')
+
+        revalidated = client.get(path, headers={"If-None-Match": etag})
+        assert revalidated.status_code == 304
+        assert revalidated.content == b""
+        assert revalidated.headers["etag"] == etag
+
+
+def test_snapshots_are_serialized_once_per_version(client):
+    from app.routers import stocks
+
+    client.get("/api/stocks/MSFT")
+    builds = stocks._response_cache.builds
+    for _ in range(5):
+        client.get("/api/stocks/MSFT")
+    assert stocks._response_cache.builds == builds
+
+
+def test_quote_change_invalidates_cached_bytes(client):
+    from app.routers import stocks
+
+    original = stocks.MOCK_STOCKS["AMZN"]
+    list_etag = client.get("/api/stocks/").headers["etag"]
+    price_etag = client.get("/api/stocks/AMZN/price").headers["etag"]
+    other_etag = client.get("/api/stocks/AAPL").headers["etag"]
+    try:
+        stocks.upsert_stock(original.model_copy(update={"price": 999.5}))
+
+        changed = client.get("/api/stocks/AMZN/price", headers={"If-None-Match": price_etag})
+        assert changed.status_code == 200
+        assert changed.json()["price"] == 999.5
+        assert client.get("/api/stocks/").headers["etag"] != list_etag
+        assert client.get("/api/stocks/AAPL", headers={"If-None-Match": other_etag}).status_code == 304
+    finally:
+        stocks.upsert_stock(original)
+
+
+def test_unknown_symbol_is_still_404(client):
+    assert client.get("/api/stocks/NOPE").status_code == 404
+    assert client.get("/api/stocks/NOPE/price").status_code == 404
+
+
+def test_search_reads_listings_csv_when_first_needed(client, tmp_path, monkeypatch):
+    from app.services import symbol_search
+
+    path = tmp_path / "listings.csv"
+    path.write_text("symbol,name\nZZZQ,Zebra Quartz Holdings\n", encoding="utf-8")
+    # Set after the app was imported, as a .env loaded late would be
+    monkeypatch.setenv("LISTINGS_CSV", str(path))
+    monkeypatch.setattr(symbol_search, "_index", None)
+
+    results = client.get("/api/stocks/search", params={"q": "zebra"}).json()["results"]
+    assert results[0]["symbol"] == "ZZZQ"
+    assert client.get("/api/stocks/search", params={"q": "msft"}).json()["results"][0]["symbol"] == "MSFT"
@@ -0,0 +1,64 @@
+"""
+Tests for the typeahead symbol search index and endpoint
+"""
+from fastapi.testclient import TestClient
+
+from app.services.symbol_search import SymbolSearchIndex, load_listings_csv
+from main import app
+
+LISTINGS = [
+    ("MSFT", "Microsoft Corporation"),
+    ("MU", "Micron Technology Inc."),
+    ("MCHP", "Microchip Technology Inc."),
+    ("AAPL", "Apple Inc."),
+    ("AMZN", "Amazon.com Inc."),
+    ("A", "Agilent Technologies Inc."),
+    ("AA", "Alcoa Corporation"),
+]
+
+
+def test_exact_symbol_ranks_first():
+    results = SymbolSearchIndex(LISTINGS).search("a")
+    assert results[0]["symbol"] == "A"
+    assert results[0]["match"] == "symbol"
+    assert results[1]["symbol"] == "AA"
+
+
+def test_company_name_fragment_matches():
+    results = SymbolSearchIndex(LISTINGS).search("mic")
+    assert {r["symbol"] for r in results} == {"MSFT", "MCHP", "MU"}
+    assert all(r["match"] == "name_prefix" for r in results)
+
+
+def test_multi_word_name_prefix():
+    results = SymbolSearchIndex(LISTINGS).search("micro tech")
+    assert [r["symbol"] for r in results] == ["MCHP", "MU"]
+
+
+def test_fuzzy_match_tolerates_typos():
+    results = SymbolSearchIndex(LISTINGS).search("microsfot")
+    assert results[0]["symbol"] == "MSFT"
+    assert results[0]["match"] == "fuzzy"
+
+
+def test_limit_and_empty_queries():
+    index = SymbolSearchIndex(LISTINGS)
+    assert len(index.search("a", limit=2)) == 2
+    assert index.search("   ") == []
+    assert index.search("qqqqq") == []
+
+
+def test_load_listings_csv(tmp_path):
+    path = tmp_path / "listings.csv"
+    path.write_text("symbol,name\nmsft,Microsoft Corporation\n,Nameless\n")
+    assert load_listings_csv(str(path)) == [("msft", "Microsoft Corporation")]
+
+
+def test_search_endpoint():
+    with TestClient(app) as client:
+        response = client.get("/api/stocks/search", params={"q": "mic"})
+        assert response.status_code == 200
+        assert response.json()["results"][0]["symbol"] == "MSFT"
+        assert client.get("/api/stocks/search").status_code == 422
+        # Exact-symbol POST search keeps its original contract
+        assert client.post("/api/stocks/search", json={"symbol": "msft"}).json()["success"] is True
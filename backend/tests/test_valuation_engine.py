@@ -0,0 +1,174 @@
+"""
+Tests for incremental mark-to-market valuation against a dense recompute
+"""
+import asyncio
+
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+
+from app.services import ai_services
+from app.services.quote_cache import QuoteCache
+from app.services.quote_scheduler import QuoteScheduler, get_quote_scheduler
+from app.services.quote_store import QuoteStore
+from app.services.valuation_engine import ValuationEngine
+
+SYMBOLS = [f"S{i}" for i in range(30)]
+
+
+def _random_book(engine, rng, n_portfolios=200):
+    shares = np.zeros((n_portfolios, len(SYMBOLS)))
+    for p in range(n_portfolios):
+        held = rng.choice(len(SYMBOLS), size=rng.integers(0, 6), replace=False)
+        shares[p, held] = rng.integers(1, 100, len(held))
+        engine.set_holdings(
+            f"p{p}", [SYMBOLS[c] for c in held], shares[p, held], np.full(len(held), 10.0),
+            seed_prices=np.full(len(held), 50.0)
+        )
+    return shares
+
+
+def _dense_values(engine, shares):
+    prices = np.array([engine._price[engine._symbol_index[s]] if s in engine._symbol_index else 0.0
+                       for s in SYMBOLS])
+    return shares @ np.nan_to_num(prices)
+
+
+def test_incremental_ticks_match_dense_matrix_product():
+    rng = np.random.default_rng(0)
+    engine = ValuationEngine(capacity=4)
+    shares = _random_book(engine, rng)
+    seen = []
+    engine.add_listener(seen.extend)
+
+    for _ in range(300):
+        changed = list(rng.choice(SYMBOLS, size=rng.integers(1, 4), replace=False))
+        seen.clear()
+        affected = engine.update_prices(changed, rng.uniform(10, 100, len(changed)))
+        cols = [SYMBOLS.index(s) for s in changed]
+        holders = {f"p{p}" for p in np.flatnonzero(shares[:, cols].any(axis=1))}
+        assert set(affected) == holders
+        assert seen == list(affected)
+
+    totals = engine.totals()
+    expected = _dense_values(engine, shares)
+    order = [int(pid[1:]) for pid in totals["ids"]]
+    np.testing.assert_allclose(totals["value"], expected[order], rtol=1e-9)
+
+
+def test_replacing_holdings_and_compaction_keep_values_exact():
+    rng = np.random.default_rng(1)
+    engine = ValuationEngine()
+    for _ in range(5):  # every round turns the previous book into tombstones
+        shares = _random_book(engine, rng, n_portfolios=50)
+        engine.update_prices(SYMBOLS, rng.uniform(10, 100, len(SYMBOLS)))
+    engine.remove_portfolio("p0")
+
+    totals = engine.totals()
+    order = [int(pid[1:]) for pid in totals["ids"]]
+    np.testing.assert_allclose(totals["value"], _dense_values(engine, shares)[order], rtol=1e-9)
+    assert "p0" not in engine and engine.valuation("p0") is None
+    assert engine.stats()["holdings"] == int(np.count_nonzero(shares[1:]))
+
+    engine.revalue_all()
+    np.testing.assert_allclose(engine.totals()["value"], totals["value"], rtol=1e-12)
+
+
+def test_quote_store_changes_drive_day_change_and_gain():
+    store = QuoteStore()
+    store.upsert("AAPL", price=100.0, previous_close=95.0)
+    engine = ValuationEngine()
+    engine.set_holdings("p", ["AAPL", "MSFT"], [10, 5], [80.0, 200.0], seed_prices=[1.0, 300.0])
+    engine.attach(store)
+
+    store.upsert("AAPL", price=110.0)
+    valuation = engine.valuation("p")
+
+    assert valuation["total_value"] == 10 * 110 + 5 * 300
+    assert valuation["day_change"] == 10 * (110 - 95)
+    assert valuation["total_gain_loss"] == valuation["total_value"] - (800 + 1000)
+    assert valuation["holdings"]["AAPL"]["allocation"] == round(1100 / 2600 * 100, 1)
+    assert len(engine.update_prices(["NOPE"], [1.0])) == 0
+
+
+def test_portfolio_endpoints_follow_live_quotes(stored_samples):
+    from main import app
+    from app.routers.stocks import quote_store
+
+    client = TestClient(app)
+    original = quote_store.get("AAPL")["price"]
+    try:
+        quote_store.upsert("AAPL", price=original + 5)  # a fresh quote replaces the stored price
+        portfolio = next(p for p in client.get("/api/portfolios/", params={"owner_id": "sample-owner"}).json()
+                         if any(s["symbol"] == "AAPL" for s in p["stocks"]))
+        aapl = next(s for s in portfolio["stocks"] if s["symbol"] == "AAPL")
+        quote_store.upsert("AAPL", price=original + 15)
+        updated = client.get(f"/api/portfolios/{portfolio['id']}").json()
+    finally:
+        quote_store.upsert("AAPL", price=original)
+
+    assert updated["total_value"] == pytest.approx(portfolio["total_value"] + 10 * aapl["shares"], abs=0.01)
+    assert next(s for s in updated["stocks"] if s["symbol"] == "AAPL")["current_price"] == round(original + 15, 2)
+    assert sum(s["value"] for s in updated["stocks"]) == pytest.approx(updated["total_value"], abs=0.05)
+
+
+def test_scheduler_quotes_revalue_portfolios():
+    async def fetch(symbol):
+        return {"symbol": symbol, "price": 120.0, "change": 20.0, "change_percent": 20.0, "volume": 1}
+
+    async def run():
+        store = QuoteStore()
+        store.upsert("AAPL", price=100.0, previous_close=100.0)
+        engine = ValuationEngine()
+        engine.attach(store)
+        engine.set_holdings("p", ["AAPL"], [10], [90.0])
+        before = engine.valuation("p")
+        scheduler = QuoteScheduler(fetch, cache=QuoteCache(), store=store)
+        try:
+            await scheduler.get_quote("AAPL", wait=1.0)
+        finally:
+            await scheduler.stop()
+        return before, engine.valuation("p")
+
+    before, after = asyncio.run(run())
+
+    assert (before["total_value"], before["day_change"]) == (1000.0, 0.0)
+    assert (after["total_value"], after["day_change"]) == (1200.0, 200.0)
+
+
+def test_live_quotes_reach_the_portfolio_endpoints(stored_samples, monkeypatch):
+    from main import app
+    from app.routers.stocks import quote_store
+
+    scheduler = get_quote_scheduler()
+    original = quote_store.get("AAPL")
+
+    async def fetch(symbol):
+        price = original["price"] + 7
+        return {"symbol": symbol, "price": price, "change": price - original["previous_close"],
+                "change_percent": 1.0, "volume": original["volume"]}
+
+    async def live_quote():
+        try:
+            return await ai_services.get_real_time_stock_data("AAPL", timeout=1.0)
+        finally:
+            await scheduler.stop()
+
+    monkeypatch.setenv("ALPHA_VANTAGE_API_KEY", "test-key")
+    monkeypatch.setattr(scheduler, "fetch", fetch)
+    client = TestClient(app)
+    portfolio = next(p for p in stored_samples if any(s.symbol == "AAPL" for s in p.stocks))
+    shares = next(s.shares for s in portfolio.stocks if s.symbol == "AAPL")
+    before = client.get(f"/api/portfolios/{portfolio.id}").json()
+    try:
+        assert asyncio.run(live_quote())["price"] == original["price"] + 7
+        after = client.get(f"/api/portfolios/{portfolio.id}").json()
+    finally:
+        quote_store.upsert("AAPL", price=original["price"], change=original["change"])
+
+    # Marked to the store's quote from the start, then to the fetched one
+    assert next(s for s in before["stocks"] if s["symbol"] == "AAPL")["current_price"] == original["price"]
+    assert next(s for s in after["stocks"] if s["symbol"] == "AAPL")["current_price"] == original["price"] + 7
+    assert after["total_value"] == pytest.approx(before["total_value"] + 7 * shares, abs=0.01)
+    # Same previous close, so the whole move is today's change
+    assert after["day_change"] == pytest.approx(before["day_change"] + 7 * shares, abs=0.01)
@@ -33,6 +33,10 @@ export interface PortfolioComparison {
   portfolios: string[];
   time_range?: string;
   metrics?: string[];
+  rebase?: boolean;
+  forward_fill?: boolean;
+  max_points?: number;
+  downsample?: 'lttb' | 'minmax';
 }
 
 class PortfolioAPI {
@@ -81,8 +85,9 @@ class PortfolioAPI {
     });
   }
 
-  async getPortfolioHistory(portfolioId: string, days: number = 90): Promise<PortfolioHistory[]> {
-    return this.request<PortfolioHistory[]>(`/api/portfolios/${portfolioId}/history?days=${days}`);
+  async getPortfolioHistory(portfolioId: string, days: number = 90, maxPoints?: number): Promise<PortfolioHistory[]> {
+    const downsample = maxPoints ? `&max_points=${maxPoints}` : '';
+    return this.request<PortfolioHistory[]>(`/api/portfolios/${portfolioId}/history?days=${days}${downsample}`);
   }
 
   async comparePortfolios(comparison: PortfolioComparison): Promise<any> {